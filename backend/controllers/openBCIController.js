@@ -498,7 +498,9 @@ exports.getConnectionStatus = async (req, res) => {
         return res.json({ 
             connected: result.connected,
             message: result.message,
-            data: result
+            data: result,
+            // Per-hop p50/p95/p99 of the EEG stream packets Node has received
+            latency: openBCIService.getLatencySummary()
         });
     } catch (error) {
         console.error('Error checking connection status:', error);
@@ -581,7 +583,6 @@ exports.stopRecording = async (req, res) => {
         console.log(`Stopping EEG recording for experiment: ${experimentId} with name: ${experimentName}`);
         const recordingResult = await openBCIService.stopRecording(
             experimentId, 
-            duration || 5,
             experimentName || ''
         );
         console.log('Stop recording result:', JSON.stringify(recordingResult));
@@ -600,7 +601,9 @@ exports.stopRecording = async (req, res) => {
                 samplingRate: recordingResult.sampling_rate || 250,
                 channelCount: recordingResult.channels || 16,
                 sampleCount: recordingResult.samples || 0,
-                filePath: recordingResult.file_path || recordingResult.filename
+                filePath: recordingResult.file_path || recordingResult.filename,
+                summaryPath: recordingResult.summary_file,
+                summary: recordingResult.summary
             });
             
             await eegRecording.save();
@@ -35,6 +35,14 @@ const EEGRecordingSchema = new mongoose.Schema({
     type: String,
     required: true
   },
+  // Per-channel quality and band power summary written by the bridge at stop,
+  // so listings need not reread the raw recording
+  summaryPath: {
+    type: String
+  },
+  summary: {
+    type: mongoose.Schema.Types.Mixed
+  },
   createdAt: {
     type: Date,
     default: Date.now
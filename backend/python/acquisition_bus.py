@@ -0,0 +1,322 @@
+"""
+In-process publish/subscribe bus for acquired board data.
+
+One acquisition thread polls the board and publishes every chunk of samples
+once, as read-only NumPy arrays that all subscribers share. Each consumer
+(web stream, recorder, DSP, ...) subscribes with its own bounded queue and
+overflow policy, so adding a consumer adds no board polls and a slow
+consumer only fills its own queue.
+
+Run as a script to benchmark fan-out while consumers are added and removed:
+
+    python acquisition_bus.py --consumers 1 2 4 8 --seconds 1
+"""
+import argparse
+import collections
+import json
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from synthetic_eeg import SyntheticEEGGenerator, GeneratorBoard
+
+# drop_oldest: make room by discarding the oldest queued chunk (live views)
+# drop_newest: discard the incoming chunk (consumers that want a prefix)
+# block: make the publisher wait (lossless consumers; the board buffers meanwhile)
+OVERFLOW_POLICIES = ('drop_oldest', 'drop_newest', 'block')
+DEFAULT_QUEUE_CHUNKS = 256
+BLOCK_CHECK_INTERVAL = 0.1  # Seconds between checks for a closed queue while blocked
+
+# A chunk of samples published on the bus
+#   sequence:        chunk counter of the session
+#   first_sample:    sample number of the first sample (sample numbers run on across reconnects)
+#   eeg:             read-only (channels, samples) array
+#   timestamps:      read-only board timestamps of the samples
+#   package_numbers: read-only package counter values, or None
+#   read_time:       host time the chunk was read from the board
+#   sampling_rate:   nominal sampling rate of the board
+#   events:          tuple of event dicts to handle before the samples (e.g. discontinuities)
+Chunk = namedtuple('Chunk', ['sequence', 'first_sample', 'eeg', 'timestamps', 'package_numbers', 'read_time',
+                             'sampling_rate', 'events'])
+
+
+def make_chunk(sequence, first_sample, eeg, timestamps, package_numbers=None, read_time=None, sampling_rate=None,
+               events=()):
+    """Build a Chunk whose arrays are made read-only, so subscribers can share them without copying."""
+    for array in (eeg, timestamps, package_numbers):
+        if array is not None:
+            array.setflags(write=False)
+    return Chunk(sequence, first_sample, eeg, timestamps, package_numbers, read_time, sampling_rate, tuple(events))
+
+
+class Subscription:
+    """Bounded queue of chunks for one consumer.
+
+    When the queue is full the overflow policy decides what happens; the
+    events of a dropped chunk are moved to the next chunk the consumer
+    gets, so markers such as discontinuities are never lost.
+    """
+
+    def __init__(self, name, maxsize=DEFAULT_QUEUE_CHUNKS, policy='drop_oldest'):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy {policy!r}; expected one of {', '.join(OVERFLOW_POLICIES)}")
+        if maxsize < 1:
+            raise ValueError("A subscription queue holds at least one chunk")
+        self.name = name
+        self.maxsize = maxsize
+        self.policy = policy
+        self.delivered_chunks = 0
+        self.delivered_samples = 0
+        self.dropped_chunks = 0
+        self.dropped_samples = 0
+        self.blocked_seconds = 0.0
+        self._chunks = collections.deque()
+        self._carried_events = ()
+        self._condition = threading.Condition()
+        self._closed = False
+
+    def offer(self, chunk):
+        """Queue a chunk according to the overflow policy; returns False when it was dropped."""
+        with self._condition:
+            if self._closed:
+                return False
+            if len(self._chunks) >= self.maxsize:
+                if self.policy == 'block':
+                    started = time.monotonic()
+                    while len(self._chunks) >= self.maxsize and not self._closed:
+                        self._condition.wait(BLOCK_CHECK_INTERVAL)
+                    self.blocked_seconds += time.monotonic() - started
+                    if self._closed:
+                        return False
+                elif self.policy == 'drop_newest':
+                    self._drop(chunk)
+                    return False
+                else:
+                    self._drop(self._chunks.popleft())
+                    if self._chunks and self._carried_events:
+                        # Events of the dropped chunk go with the chunk now at the head
+                        self._chunks[0] = self._chunks[0]._replace(events=self._carried_events +
+                                                                   self._chunks[0].events)
+                        self._carried_events = ()
+            if self._carried_events:
+                chunk = chunk._replace(events=self._carried_events + chunk.events)
+                self._carried_events = ()
+            self._chunks.append(chunk)
+            self._condition.notify_all()
+            return True
+
+    def _drop(self, chunk):
+        self.dropped_chunks += 1
+        self.dropped_samples += chunk.eeg.shape[1]
+        self._carried_events += chunk.events
+
+    def get(self, timeout=None):
+        """Next chunk; None once the subscription is closed and drained, or after `timeout` seconds."""
+        with self._condition:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while not self._chunks:
+                if self._closed:
+                    return None
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+            chunk = self._chunks.popleft()
+            self.delivered_chunks += 1
+            self.delivered_samples += chunk.eeg.shape[1]
+            # Wake a publisher blocked on a full queue
+            self._condition.notify_all()
+            return chunk
+
+    def depth(self):
+        return len(self._chunks)
+
+    def discard(self):
+        """Drop every queued chunk (counted as dropped); returns how many there were."""
+        with self._condition:
+            count = len(self._chunks)
+            while self._chunks:
+                self._drop(self._chunks.popleft())
+            self._condition.notify_all()
+            return count
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def close(self):
+        """Stop accepting chunks; the consumer still gets the queued ones, then None."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def stats(self):
+        return {
+            'name': self.name,
+            'policy': self.policy,
+            'maxsize': self.maxsize,
+            'depth': self.depth(),
+            'delivered_chunks': self.delivered_chunks,
+            'delivered_samples': self.delivered_samples,
+            'dropped_chunks': self.dropped_chunks,
+            'dropped_samples': self.dropped_samples,
+            'blocked_seconds': round(self.blocked_seconds, 6),
+        }
+
+
+class AcquisitionBus:
+    """Fan-out of published chunks to every current subscription."""
+
+    def __init__(self):
+        self._subscriptions = ()
+        self._lock = threading.Lock()
+        self.published_chunks = 0
+        self.published_samples = 0
+
+    def subscribe(self, name, maxsize=DEFAULT_QUEUE_CHUNKS, policy='drop_oldest'):
+        """Add a consumer; it gets the chunks published from now on."""
+        subscription = Subscription(name, maxsize, policy)
+        with self._lock:
+            self._subscriptions = self._subscriptions + (subscription,)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Remove a consumer and close its queue."""
+        with self._lock:
+            self._subscriptions = tuple(s for s in self._subscriptions if s is not subscription)
+        subscription.close()
+
+    def publish(self, chunk):
+        """Offer a chunk to every subscription (the tuple is replaced, never mutated, so no lock is held)."""
+        for subscription in self._subscriptions:
+            subscription.offer(chunk)
+        self.published_chunks += 1
+        self.published_samples += chunk.eeg.shape[1]
+
+    def close(self):
+        """Close every subscription; consumers drain their queues and then get None."""
+        for subscription in self._subscriptions:
+            subscription.close()
+
+    @property
+    def subscriptions(self):
+        return self._subscriptions
+
+    def depth(self):
+        """Chunks waiting in all subscription queues."""
+        return sum(subscription.depth() for subscription in self._subscriptions)
+
+    def stats(self):
+        return {
+            'published_chunks': self.published_chunks,
+            'published_samples': self.published_samples,
+            'subscriptions': [subscription.stats() for subscription in self._subscriptions],
+        }
+
+
+class _BenchConsumer:
+    """Benchmark consumer: averages each chunk (optionally slowly) and records delivery latency."""
+
+    def __init__(self, bus, name, work_seconds=0.0, maxsize=DEFAULT_QUEUE_CHUNKS, policy='drop_oldest'):
+        self.subscription = bus.subscribe(name, maxsize, policy)
+        self.work_seconds = work_seconds
+        self.latencies = []
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while True:
+            chunk = self.subscription.get()
+            if chunk is None:
+                return
+            self.latencies.append(time.time() - chunk.read_time)
+            chunk.eeg.mean(axis=1)
+            if self.work_seconds:
+                time.sleep(self.work_seconds)
+
+
+def bench_fanout(consumer_counts=(1, 2, 4, 8), seconds=1.0, channels=16, rate=4000, poll_interval=0.01,
+                 slow_consumer=True):
+    """Publish from a generator board while consumers are added, then removed, stage by stage.
+
+    A reference consumer stays subscribed throughout (plus, optionally, a
+    slow consumer with a small drop_oldest queue). Returns one result per
+    stage: board polls per second, the reference consumer's samples and
+    p99 delivery latency, and the slow consumer's drops, so the stages show
+    whether extra consumers add board load or slow the others down.
+    """
+    board = GeneratorBoard(SyntheticEEGGenerator(channels, rate, seed=0))
+    board.prepare_session()
+    board.start_stream()
+    bus = AcquisitionBus()
+    running = threading.Event()
+    running.set()
+    polls = [0]
+
+    def acquire():
+        sequence = first_sample = 0
+        while running.is_set():
+            time.sleep(poll_interval)
+            data = board.get_board_data()
+            polls[0] += 1
+            if data.shape[1]:
+                bus.publish(make_chunk(sequence, first_sample, data[board.eeg_channels, :],
+                                       data[board.timestamp_channel, :], data[board.package_num_channel, :],
+                                       time.time(), rate))
+                sequence += 1
+                first_sample += data.shape[1]
+
+    reference = _BenchConsumer(bus, 'reference')
+    slow = _BenchConsumer(bus, 'slow', work_seconds=poll_interval * 5, maxsize=4) if slow_consumer else None
+    thread = threading.Thread(target=acquire, daemon=True)
+    thread.start()
+
+    extra = []
+    stages = list(consumer_counts) + list(reversed(consumer_counts[:-1]))
+    results = []
+    for count in stages:
+        while len(extra) < count:
+            extra.append(_BenchConsumer(bus, f'consumer_{len(extra) + 1}'))
+        while len(extra) > count:
+            consumer = extra.pop()
+            bus.unsubscribe(consumer.subscription)
+            consumer.thread.join()
+        polls_before = polls[0]
+        samples_before = reference.subscription.delivered_samples
+        latencies_before = len(reference.latencies)
+        dropped_before = slow.subscription.dropped_samples if slow else 0
+        started = time.monotonic()
+        time.sleep(seconds)
+        elapsed = time.monotonic() - started
+        latencies = np.array(reference.latencies[latencies_before:]) * 1000
+        results.append({
+            'consumers': count + 1 + (1 if slow else 0),
+            'polls_per_second': round((polls[0] - polls_before) / elapsed, 1),
+            'reference_samples_per_second': round((reference.subscription.delivered_samples - samples_before) /
+                                                  elapsed, 1),
+            'reference_p99_latency_ms': round(float(np.percentile(latencies, 99)), 3) if len(latencies) else None,
+            'slow_dropped_samples': (slow.subscription.dropped_samples - dropped_before) if slow else 0,
+        })
+
+    running.clear()
+    thread.join()
+    bus.close()
+    reference.thread.join()
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark acquisition bus fan-out while consumers come and go')
+    parser.add_argument('--consumers', type=int, nargs='+', default=[1, 2, 4, 8],
+                        help='Extra consumer counts to step through (then back down)')
+    parser.add_argument('--seconds', type=float, default=1.0, help='Seconds per stage')
+    parser.add_argument('--channels', type=int, default=16, help='Channel count of the generator board')
+    parser.add_argument('--rate', type=int, default=4000, help='Sampling rate of the generator board in Hz')
+    parser.add_argument('--no_slow_consumer', action='store_true', help='Leave out the slow consumer')
+    args = parser.parse_args()
+
+    for stage in bench_fanout(args.consumers, args.seconds, args.channels, args.rate,
+                              slow_consumer=not args.no_slow_consumer):
+        print(json.dumps(stage))
@@ -0,0 +1,330 @@
+"""
+Batch analysis of EEG recordings.
+
+Runs the selected analyses over many CSV recordings in parallel worker
+processes and writes one consolidated results table per batch. Each file
+is streamed in chunks, so memory stays bounded however large it is, and
+files whose results are already up to date for the same settings are
+skipped.
+
+Analyses:
+    quality   per-channel RMS, min/max, rail %, flat channels, timestamp gaps
+    bands     Welch band powers (delta, theta, alpha, beta, gamma)
+    filtered  bandpass-filtered copy of the recording
+    epochs    per-epoch RMS and rail flags for fixed-length epochs
+
+    python batch_analysis.py uploads/eeg --analyses quality bands --workers 8
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from recording_export import SCIPY_AVAILABLE, StreamingFilter
+from recordings import CACHE_DIR, CHUNK_ROWS, RECORDINGS_DIR, iter_chunks, list_recordings, path_stem, read_clock, \
+    read_header, recording_sampling_rate
+from summaries import BANDS, BandPowerAccumulator, QualityAccumulator
+from synthetic_eeg import RAIL_UV
+
+ANALYSES = ('quality', 'bands', 'filtered', 'epochs')
+DEFAULT_ANALYSES = ['quality', 'bands']
+OUTPUT_DIR = os.path.join('uploads', 'analysis')
+RESULTS_TABLE = 'batch_results.csv'
+
+
+class FilteredExporter:
+    """Writes a bandpass-filtered copy of a recording, carrying filter state across chunks."""
+
+    def __init__(self, header, sampling_rate, output_path, lowcut, highcut):
+        if not SCIPY_AVAILABLE:
+            raise RuntimeError("scipy is required for the filtered analysis")
+        self.filter = StreamingFilter(sampling_rate, lowcut, min(highcut, 0.45 * sampling_rate))
+        self.output_path = output_path
+        self.rows = 0
+        self.file = open(output_path, 'w')
+        self.file.write(','.join(header) + '\n')
+        self.fmt = None
+
+    def update(self, timestamps, values):
+        if self.fmt is None:
+            self.fmt = ['%.6f'] + ['%.4f'] * values.shape[1]
+        filtered = self.filter.process(values)
+        np.savetxt(self.file, np.column_stack((timestamps, filtered)), delimiter=',', fmt=self.fmt)
+        self.rows += len(values)
+
+    def result(self):
+        self.file.close()
+        return {'file': self.output_path, 'rows': self.rows}
+
+
+class EpochWriter:
+    """Splits a recording into fixed-length epochs and writes per-epoch RMS and rail flags."""
+
+    def __init__(self, channels, sampling_rate, output_path, epoch_seconds):
+        self.epoch_samples = max(1, int(round(epoch_seconds * sampling_rate)))
+        self.output_path = output_path
+        self.epochs = 0
+        self.railed_epochs = 0
+        self._carry_ts = None
+        self._carry = None
+        self.file = open(output_path, 'w')
+        self.file.write(','.join(['epoch', 'start_time', 'end_time'] +
+                                 [f'channel_{i + 1}_rms' for i in range(channels)] + ['railed']) + '\n')
+
+    def update(self, timestamps, values):
+        if self._carry is not None:
+            timestamps = np.concatenate((self._carry_ts, timestamps))
+            values = np.concatenate((self._carry, values))
+        complete = len(values) // self.epoch_samples
+        if complete:
+            used = complete * self.epoch_samples
+            epochs = values[:used].reshape(complete, self.epoch_samples, -1)
+            epoch_ts = timestamps[:used].reshape(complete, self.epoch_samples)
+            rms = np.sqrt(np.mean(np.square(epochs), axis=1))
+            railed = (np.abs(epochs) >= RAIL_UV).any(axis=(1, 2))
+            rows = np.column_stack((self.epochs + np.arange(complete), epoch_ts[:, 0], epoch_ts[:, -1], rms, railed))
+            np.savetxt(self.file, rows, delimiter=',',
+                       fmt=['%d', '%.6f', '%.6f'] + ['%.4f'] * rms.shape[1] + ['%d'])
+            self.epochs += complete
+            self.railed_epochs += int(railed.sum())
+            timestamps, values = timestamps[used:], values[used:]
+        self._carry_ts, self._carry = timestamps.copy(), values.copy()
+
+    def result(self):
+        self.file.close()
+        return {'file': self.output_path, 'epochs': self.epochs, 'railed_epochs': self.railed_epochs,
+                'epoch_samples': self.epoch_samples}
+
+
+def config_key(config):
+    """Stable hash of the analysis settings, used to detect stale results."""
+    return hashlib.sha1(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+def result_path(file_path, output_dir):
+    return os.path.join(output_dir, path_stem(file_path) + '.analysis.json')
+
+
+def load_up_to_date(file_path, output_dir, config):
+    """Saved results for `file_path` if they match the source file and settings, else None."""
+    try:
+        with open(result_path(file_path, output_dir), 'r') as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return None
+    stat = os.stat(file_path)
+    if saved.get('config_key') != config_key(config) or saved.get('source_size') != stat.st_size \
+            or saved.get('source_mtime') != stat.st_mtime:
+        return None
+    if not all(os.path.exists(path) for path in saved.get('outputs', [])):
+        return None
+    return saved
+
+
+def summary_row(file_path, details):
+    """Flatten per-channel details into one row of the consolidated table."""
+    row = {'file': os.path.basename(file_path)}
+    quality = details.get('quality')
+    if quality:
+        row.update({
+            'samples': quality['samples'],
+            'duration_s': round(quality['duration_s'], 3),
+            'mean_rms_uv': round(float(np.mean(quality['rms_uv'])), 3),
+            'max_rail_pct': round(float(np.max(quality['rail_pct'])), 3),
+            'flat_channels': len(quality['flat_channels']),
+            'gaps': quality['gaps'],
+        })
+    bands = details.get('bands')
+    if bands and bands.get('segments'):
+        for name, _, _ in BANDS:
+            row[f'{name}_rel'] = round(float(np.mean(bands[f'{name}_rel'])), 4)
+    if 'epochs' in details:
+        row['epochs'] = details['epochs']['epochs']
+        row['railed_epochs'] = details['epochs']['railed_epochs']
+    if 'filtered' in details:
+        row['filtered_file'] = details['filtered']['file']
+    return row
+
+
+def analyze_recording(file_path, output_dir, config, cache_dir=None):
+    """Run the configured analyses over one recording, streaming it in chunks.
+
+    Returns the saved result (with 'row', 'details' and 'cached'); results that are
+    already up to date are returned without reading the recording. With
+    `cache_dir` the chunks come from the memory-mapped binary cache.
+    """
+    saved = load_up_to_date(file_path, output_dir, config)
+    if saved is not None:
+        saved['cached'] = True
+        return saved
+
+    started = time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+    header = read_header(file_path)
+    channels = len(header) - 1
+    stem = path_stem(file_path)
+    analyses = config['analyses']
+    accumulators = {}
+    sampling_rate = recording_sampling_rate(file_path, config.get('sampling_rate'), cache_dir)
+
+    for timestamps, values in iter_chunks(file_path, config.get('chunk_rows', CHUNK_ROWS), cache_dir):
+        if not accumulators:
+            if 'quality' in analyses:
+                accumulators['quality'] = QualityAccumulator(channels, sampling_rate,
+                                                             read_clock(file_path, cache_dir)['gaps'])
+            if 'bands' in analyses:
+                accumulators['bands'] = BandPowerAccumulator(channels, sampling_rate)
+            if 'filtered' in analyses:
+                accumulators['filtered'] = FilteredExporter(
+                    header, sampling_rate, os.path.join(output_dir, f'{stem}_filtered.csv'),
+                    config['lowcut'], config['highcut'])
+            if 'epochs' in analyses:
+                accumulators['epochs'] = EpochWriter(channels, sampling_rate,
+                                                     os.path.join(output_dir, f'{stem}_epochs.csv'),
+                                                     config['epoch_seconds'])
+        for name, accumulator in accumulators.items():
+            if name == 'bands':
+                accumulator.update(values)
+            else:
+                accumulator.update(timestamps, values)
+
+    details = {name: accumulator.result() for name, accumulator in accumulators.items()}
+    stat = os.stat(file_path)
+    result = {
+        'source': file_path,
+        'source_size': stat.st_size,
+        'source_mtime': stat.st_mtime,
+        'config_key': config_key(config),
+        'sampling_rate': sampling_rate,
+        'channels': channels,
+        'outputs': [details[name]['file'] for name in ('filtered', 'epochs') if name in details],
+        'details': details,
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+    result['row'] = dict(summary_row(file_path, details), sampling_rate=sampling_rate, channels=channels)
+    with open(result_path(file_path, output_dir), 'w') as f:
+        json.dump(result, f)
+    result['cached'] = False
+    return result
+
+
+def _analyze_safely(file_path, output_dir, config, cache_dir=None):
+    """analyze_recording for worker processes: errors become result rows."""
+    try:
+        return analyze_recording(file_path, output_dir, config, cache_dir)
+    except Exception as e:
+        return {'source': file_path, 'row': {'file': os.path.basename(file_path), 'error': str(e)}, 'cached': False}
+
+
+def write_table(rows, table_path):
+    """Write the consolidated results table as CSV (columns in first-seen order)."""
+    columns = []
+    for row in rows:
+        columns.extend(key for key in row if key not in columns)
+    with open(table_path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def run_batch(files, output_dir=OUTPUT_DIR, config=None, workers=None, log=print, cache_dir=None):
+    """Analyze `files` with a process pool and write the consolidated table; returns the results."""
+    config = dict(config or {'analyses': DEFAULT_ANALYSES})
+    config['analyses'] = sorted(config['analyses'])
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+
+    results = {}
+    if workers == 1:
+        for file_path in files:
+            results[file_path] = _analyze_safely(file_path, output_dir, config, cache_dir)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_analyze_safely, file_path, output_dir, config, cache_dir): file_path
+                       for file_path in files}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+                result = results[futures[future]]
+                state = 'error' if 'error' in result['row'] else ('cached' if result['cached'] else 'done')
+                log(f"[{len(results)}/{len(files)}] {os.path.basename(futures[future])}: {state}")
+
+    # Table rows in input order
+    ordered = [results[file_path] for file_path in files]
+    for result in ordered:
+        result['row']['cached'] = result['cached']
+    write_table([result['row'] for result in ordered], os.path.join(output_dir, RESULTS_TABLE))
+    return ordered
+
+
+def collect_files(inputs):
+    """Expand directories into their CSV recordings."""
+    files = []
+    for path in inputs:
+        files.extend(list_recordings(path) if os.path.isdir(path) else [path])
+    return files
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Analyze many EEG recordings in parallel')
+    parser.add_argument('inputs', nargs='*', default=[RECORDINGS_DIR],
+                        help='Recording files or directories of CSV recordings (default: uploads/eeg)')
+    parser.add_argument('--analyses', nargs='+', choices=ANALYSES, default=DEFAULT_ANALYSES,
+                        help='Analyses to run (default: quality bands)')
+    parser.add_argument('--output', type=str, default=OUTPUT_DIR,
+                        help='Directory for per-file results, exports and the results table')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Worker processes (default: CPU count)')
+    parser.add_argument('--chunk_rows', type=int, default=CHUNK_ROWS,
+                        help='Rows read per chunk (bounds memory per worker)')
+    parser.add_argument('--sampling_rate', type=float, default=None,
+                        help="Sampling rate in Hz (default: the rate of each recording's sample clock)")
+    parser.add_argument('--lowcut', type=float, default=1.0,
+                        help='Bandpass low cutoff in Hz for the filtered analysis')
+    parser.add_argument('--highcut', type=float, default=50.0,
+                        help='Bandpass high cutoff in Hz for the filtered analysis')
+    parser.add_argument('--epoch_seconds', type=float, default=2.0,
+                        help='Epoch length in seconds for the epochs analysis')
+    parser.add_argument('--no_cache', action='store_true',
+                        help='Parse the CSV files directly instead of using the binary cache in uploads/cache')
+    parser.add_argument('--force', action='store_true',
+                        help='Re-analyze files even when their results are up to date')
+
+    args = parser.parse_args()
+
+    files = collect_files(args.inputs)
+    if not files:
+        print("No recordings found")
+        sys.exit(1)
+
+    config = {
+        'analyses': args.analyses,
+        'chunk_rows': args.chunk_rows,
+        'sampling_rate': args.sampling_rate,
+        'lowcut': args.lowcut,
+        'highcut': args.highcut,
+        'epoch_seconds': args.epoch_seconds,
+    }
+    if args.force:
+        for file_path in files:
+            try:
+                os.remove(result_path(file_path, args.output))
+            except OSError:
+                pass
+
+    started = time.perf_counter()
+    results = run_batch(files, args.output, config, args.workers,
+                        cache_dir=None if args.no_cache else CACHE_DIR)
+    errors = [result for result in results if 'error' in result['row']]
+    cached = sum(1 for result in results if result['cached'])
+    print(f"Analyzed {len(results)} recordings in {time.perf_counter() - started:.1f} s "
+          f"({cached} up to date, {len(errors)} failed)")
+    print(f"Results table: {os.path.join(args.output, RESULTS_TABLE)}")
+    for result in errors:
+        print(f"FAILED {result['row']['file']}: {result['row']['error']}")
+    sys.exit(1 if errors else 0)
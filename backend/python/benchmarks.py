@@ -0,0 +1,327 @@
+"""
+Benchmarks for the Python hot paths of the OpenBCI bridge and visualizer.
+
+Runs offline with the synthetic EEG generator, at several channel counts,
+and saves machine-readable JSON results. Pass --compare with an earlier
+results file to flag regressions (exit code 1 when any are found).
+
+    python benchmarks.py --channels 8 16 64 --output results.json
+    python benchmarks.py --compare baseline.json --threshold 0.25
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+from synthetic_eeg import SyntheticEEGGenerator, GeneratorBoard
+
+DEFAULT_CHANNELS = [8, 16, 64]
+SAMPLE_RATE = 250
+WINDOW_SECONDS = 5.0        # Visualizer display window
+EXPORT_SECONDS = 10.0       # Recording length for the CSV export benchmark
+POLL_INTERVAL = 0.04        # Bridge polling interval at 250 Hz (sampling_rate / 10)
+
+# Temporary directory for benchmarks that write files; set while run_benchmarks runs
+scratch_dir = None
+
+
+class ManualClock:
+    """Clock advanced explicitly, so board polls see a fixed amount of new data."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def generate(channels, seconds, rate=SAMPLE_RATE, seed=0):
+    """Generate (timestamps, data[channels, samples]) with the synthetic generator."""
+    generator = SyntheticEEGGenerator(channels, rate, seed=seed, start_time=1700000000.0)
+    return generator.generate(int(seconds * rate))
+
+
+def bench_export_csv(channels):
+    """Bridge: write a recording to CSV."""
+    import openbci_bridge
+    timestamps, data = generate(channels, EXPORT_SECONDS)
+    path = os.path.join(scratch_dir, f'export_{channels}.csv')
+
+    def op(_):
+        openbci_bridge.export_csv(path, timestamps, data)
+
+    return None, op, data.shape[1]
+
+
+def bench_stream_packets(channels):
+    """Bridge: packetize one second of samples into EEG_STREAM lines."""
+    import openbci_bridge
+    timestamps, data = generate(channels, 1.0)
+
+    def op(_):
+        openbci_bridge.build_stream_packets(data, 0, 'benchmark', 'generator', timestamps, timestamps[-1])
+
+    return None, op, data.shape[1]
+
+
+def bench_poll_board(channels):
+    """Bridge: poll the board for one interval's worth of new samples."""
+    import openbci_bridge
+    clock = ManualClock()
+    board = GeneratorBoard(SyntheticEEGGenerator(channels, SAMPLE_RATE, seed=0), clock=clock)
+    board.prepare_session()
+    board.start_stream()
+
+    def setup():
+        # Generate the interval's samples outside the timed section
+        clock.advance(POLL_INTERVAL)
+        board.get_board_data_count()
+
+    def op(_):
+        openbci_bridge.poll_board_data(board, board.eeg_channels, board.timestamp_channel)
+
+    return setup, op, int(POLL_INTERVAL * SAMPLE_RATE)
+
+
+def _visualizer(channels):
+    """Import the visualizer and size its per-channel state for `channels`."""
+    import brainwave_visualizer as viz
+    viz.channel_count = channels
+    viz.railed_percentages = [0] * channels
+    viz.head_map_data = [0] * channels
+    viz.fft_data = {}
+    return viz
+
+
+def _display_buffer(channels):
+    """Build a visualizer data buffer holding one display window ending now."""
+    timestamps, data = generate(channels, WINDOW_SECONDS)
+    timestamps = timestamps - timestamps[-1] + time.time()
+    return list(zip(timestamps.tolist(), data.T.tolist()))
+
+
+def bench_display_snapshot(channels):
+    """Visualizer: compute a display snapshot (filter, smooth, metrics, FFT)."""
+    viz = _visualizer(channels)
+    buffer = _display_buffer(channels)
+
+    def op(_):
+        viz.compute_display_snapshot(buffer, buffer[-1][0])
+
+    return None, op, len(buffer)
+
+
+def bench_update_plot(channels):
+    """Visualizer: update_plot swapping in a new snapshot and updating artists."""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    import matplotlib.patches as patches
+
+    viz = _visualizer(channels)
+    buffer = _display_buffer(channels)
+
+    # Headless figure with the same artists the visualizer creates
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    viz.lines = [ax.plot([], [])[0] for _ in range(channels)]
+    viz.rms_texts = [ax.text(0, 0, '') for _ in range(channels)]
+    viz.signal_indicators = [ax.add_patch(patches.Circle((0, 0), 0.02)) for _ in range(channels)]
+    viz.fft_ax = ax
+    viz.fft_lines = [ax.plot([], [])[0] for _ in range(channels)]
+    viz.head_circles = [ax.add_patch(patches.Circle((0, 0), 0.1)) for _ in range(channels)]
+    viz.status_time_text = ax.text(0, 0, '')
+    viz.status_info_text = ax.text(0, 0, '')
+    viz.status_fps_text = ax.text(0, 0, '')
+    snapshot = viz.compute_display_snapshot(buffer, buffer[-1][0])
+
+    def setup():
+        # A fresh snapshot object each frame so update_plot does the full swap
+        viz.publish_snapshot(snapshot._replace())
+
+    def op(_):
+        viz.update_plot(0)
+
+    return setup, op, len(buffer)
+
+
+def _window_per_channel(channels):
+    _, data = generate(channels, WINDOW_SECONDS)
+    return data
+
+
+def bench_apply_bandpass(channels):
+    """Visualizer: bandpass filter every channel's display window."""
+    viz = _visualizer(channels)
+    viz.filter_enabled = True
+    data = _window_per_channel(channels)
+
+    def op(_):
+        for row in data:
+            viz.apply_bandpass(row)
+
+    return None, op, data.shape[1]
+
+
+def bench_calculate_fft(channels):
+    """Visualizer: FFT of every channel's display window."""
+    viz = _visualizer(channels)
+    data = _window_per_channel(channels)
+
+    def op(_):
+        for row in data:
+            viz.calculate_fft(row)
+
+    return None, op, data.shape[1]
+
+
+def bench_analyze_signal(channels):
+    """Visualizer: quality metrics of every channel's display window."""
+    viz = _visualizer(channels)
+    data = _window_per_channel(channels)
+
+    def op(_):
+        for row in data:
+            viz.analyze_signal(row)
+
+    return None, op, data.shape[1]
+
+
+BENCHMARKS = {
+    'bridge.export_csv': bench_export_csv,
+    'bridge.build_stream_packets': bench_stream_packets,
+    'bridge.poll_board_data': bench_poll_board,
+    'visualizer.compute_display_snapshot': bench_display_snapshot,
+    'visualizer.update_plot': bench_update_plot,
+    'visualizer.apply_bandpass': bench_apply_bandpass,
+    'visualizer.calculate_fft': bench_calculate_fft,
+    'visualizer.analyze_signal': bench_analyze_signal,
+}
+
+
+def measure(op, setup=None, repeat=30, warmup=3):
+    """Time `op` `repeat` times (after `warmup` runs); `setup` runs untimed before each call."""
+    timings = []
+    for i in range(warmup + repeat):
+        state = setup() if setup else None
+        started = time.perf_counter()
+        op(state)
+        elapsed = time.perf_counter() - started
+        if i >= warmup:
+            timings.append(elapsed)
+    return np.array(timings)
+
+
+def run_benchmarks(channels=None, repeat=30, only=None):
+    """Run the selected benchmarks at each channel count and return result dicts."""
+    global scratch_dir
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix='eeg_bench_') as scratch_dir:
+        for name, factory in BENCHMARKS.items():
+            if only and not any(pattern in name for pattern in only):
+                continue
+            for count in channels or DEFAULT_CHANNELS:
+                setup, op, samples = factory(count)
+                timings = measure(op, setup, repeat=repeat)
+                median = float(np.median(timings))
+                results.append({
+                    'name': name,
+                    'channels': count,
+                    'repeat': repeat,
+                    'samples': samples,
+                    'median_ms': median * 1000,
+                    'p95_ms': float(np.percentile(timings, 95)) * 1000,
+                    'min_ms': float(timings.min()) * 1000,
+                    'mean_ms': float(timings.mean()) * 1000,
+                    'samples_per_sec': samples / median if median > 0 else None,
+                })
+                print(f"{name:40s} {count:4d} ch  median {results[-1]['median_ms']:9.3f} ms  "
+                      f"p95 {results[-1]['p95_ms']:9.3f} ms")
+    scratch_dir = None
+    return results
+
+
+def environment_info():
+    """Describe the machine and library versions the results were produced on."""
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def save_results(results, output_file):
+    """Write results with environment metadata as JSON."""
+    with open(output_file, 'w') as f:
+        json.dump({'environment': environment_info(), 'results': results}, f, indent=2)
+
+
+def compare_results(current, baseline, threshold=0.25):
+    """Compare median times with a baseline; return rows and the regressions beyond `threshold`."""
+    previous = {(r['name'], r['channels']): r for r in baseline}
+    rows, regressions = [], []
+    for result in current:
+        base = previous.get((result['name'], result['channels']))
+        if base is None or not base['median_ms']:
+            continue
+        ratio = result['median_ms'] / base['median_ms']
+        row = {
+            'name': result['name'],
+            'channels': result['channels'],
+            'baseline_ms': base['median_ms'],
+            'current_ms': result['median_ms'],
+            'ratio': ratio,
+            'regression': ratio > 1 + threshold,
+        }
+        rows.append(row)
+        if row['regression']:
+            regressions.append(row)
+    return rows, regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the OpenBCI bridge and visualizer hot paths')
+    parser.add_argument('--channels', type=int, nargs='+', default=DEFAULT_CHANNELS,
+                        help='Channel counts to benchmark (default: 8 16 64)')
+    parser.add_argument('--repeat', type=int, default=30,
+                        help='Timed repetitions per benchmark (default: 30)')
+    parser.add_argument('--only', type=str, nargs='+',
+                        help='Only run benchmarks whose name contains one of these strings')
+    parser.add_argument('--output', type=str, default='benchmark_results.json',
+                        help='JSON file to save results to (default: benchmark_results.json)')
+    parser.add_argument('--compare', type=str,
+                        help='Baseline results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Relative slowdown of the median counted as a regression (default: 0.25)')
+
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.channels, args.repeat, args.only)
+    save_results(results, args.output)
+    print(f"Results saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)['results']
+        rows, regressions = compare_results(results, baseline, args.threshold)
+        for row in rows:
+            flag = 'REGRESSION' if row['regression'] else ''
+            print(f"{row['name']:40s} {row['channels']:4d} ch  {row['baseline_ms']:9.3f} -> "
+                  f"{row['current_ms']:9.3f} ms  x{row['ratio']:.2f} {flag}")
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+            sys.exit(1)
+        print("No regressions")
@@ -1,17 +1,25 @@
 import sys
 import json
+import atexit
 import numpy as np
 import threading
 import time
 import os
 import signal
 import argparse
-from collections import deque
+from collections import deque, namedtuple
 import select
 import math
 import csv
 from io import StringIO
 
+from eeg_replay import CSVReplayEngine
+from recordings import CACHE_DIR, load_recording
+from synthetic_eeg import SyntheticEEGGenerator
+from shm_ring import DEFAULT_SHM_NAME, RingReader
+from latency import LatencyTracker, RollingLatencyTracker, probe_packet
+from profiling import start_profiling, default_report_path
+
 # Try to force a good interactive backend
 try:
     import matplotlib
@@ -26,7 +34,6 @@ try:
         print("Using TkAgg backend")
         
     import matplotlib.pyplot as plt
-    from matplotlib.animation import FuncAnimation
     from matplotlib.gridspec import GridSpec
     import matplotlib.patches as patches
     from matplotlib.colors import LinearSegmentedColormap
@@ -44,6 +51,54 @@ try:
         SCIPY_AVAILABLE = False
         print("Scipy not available. Signal processing will be limited.")
         
+    class FrameTimedAnimation:
+        """Calls `update` on a canvas timer and blits the artists it returns, timing each draw.
+        
+        Built on matplotlib's public blitting API (copy_from_bbox,
+        draw_artist, blit) and its draw_event, instead of FuncAnimation's
+        private drawing hooks, whose signatures change between releases.
+        """
+        def __init__(self, fig, update, interval=33):
+            self.fig = fig
+            self.canvas = fig.canvas
+            self.update = update
+            self.frame = 0
+            self.background = None
+            self.animated = []
+            self.canvas.mpl_connect('draw_event', self.on_draw)
+            self.timer = self.canvas.new_timer(interval=interval)
+            self.timer.add_callback(self.step)
+            self.timer.start()
+        
+        def on_draw(self, event):
+            """After a full redraw (first show, resize) keep the static background, then add the animated artists"""
+            self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+            for artist in self.animated:
+                self.fig.draw_artist(artist)
+        
+        def step(self):
+            artists = self.update(self.frame)
+            self.frame += 1
+            new_artists = [artist for artist in artists if not artist.get_animated()]
+            if new_artists or self.background is None:
+                # Leave new artists out of the background: redraw it without them
+                for artist in new_artists:
+                    artist.set_animated(True)
+                    self.animated.append(artist)
+                self.canvas.draw_idle()
+                return
+            
+            started = time.perf_counter()
+            self.canvas.restore_region(self.background)
+            for artist in self.animated:
+                self.fig.draw_artist(artist)
+            self.canvas.blit(self.fig.bbox)
+            self.canvas.flush_events()
+            frame_timer.record('draw', time.perf_counter() - started)
+        
+        def stop(self):
+            self.timer.stop()
+    
     MATPLOTLIB_AVAILABLE = True
 except ImportError as e:
     print(f"Matplotlib import error: {e}")
@@ -88,6 +143,31 @@ max_frequency = 60                  # Maximum frequency to display in FFT (Hz)
 max_uv_fft = 100                    # Maximum amplitude for FFT display (uV)
 head_map_data = [0] * 16            # Data for head map visualization
 
+# Latency of bridge packets received on stdin (emit->consumer, board->consumer)
+STREAM_PREFIX = 'EEG_STREAM:'
+latency_tracker = LatencyTracker()
+
+# Processing worker state (filtering/FFT/metrics run off the GUI thread)
+PROCESSING_INTERVAL = 0.033         # Target seconds between processed snapshots
+snapshot_lock = threading.Lock()    # Guards the front buffer swap
+latest_snapshot = None              # Front buffer: last published DisplaySnapshot
+drawn_snapshot = None               # Snapshot currently shown on screen
+processing_thread = None            # Worker thread computing display snapshots
+processing_time_ms = 0.0            # Last processing latency (worker thread)
+draw_time_ms = 0.0                  # Last draw latency (GUI thread)
+
+# Per-stage frame timings (rolling window for the overlay, whole session for the JSON dump)
+FRAME_STAGES = ('buffer', 'filter', 'smooth', 'metrics', 'fft', 'artists', 'head_map', 'draw')
+FRAME_STATS_WINDOW = 10.0           # Seconds per rolling histogram window
+frame_timer = RollingLatencyTracker(window=FRAME_STATS_WINDOW)
+debug_overlay_enabled = False       # Show per-stage timings on screen
+debug_overlay_text = None           # Overlay text artist
+
+# Immutable, display-ready data for one channel and for one full frame
+ChannelFrame = namedtuple('ChannelFrame', ['times', 'values', 'rms', 'fft_freqs', 'fft_values'])
+DisplaySnapshot = namedtuple('DisplaySnapshot', ['reference_time', 'channels', 'railed_percentages',
+                                                 'head_map', 'processing_ms'])
+
 # UI elements that need global access
 status_time_text = None
 status_info_text = None
@@ -106,6 +186,8 @@ start_button = None
 data_thread = None
 test_thread = None
 csv_thread = None
+shm_thread = None
+SHM_ATTACH_INTERVAL = 0.5           # Seconds between attempts to attach to the bridge's ring
 
 # Function to format time (HH:MM:SS)
 def format_time():
@@ -133,13 +215,14 @@ def signal_handler(sig, frame):
     sys.exit(0)
 
 # Simple bandpass filter implementation
-def apply_bandpass(data, lowcut=1.0, highcut=50.0, fs=SAMPLE_RATE, order=4):
+def apply_bandpass(data, lowcut=1.0, highcut=50.0, fs=None, order=4):
     """Apply a bandpass filter to the signal"""
     global filter_enabled
     
     if not filter_enabled or len(data) < 10:
         return data
     
+    fs = fs or SAMPLE_RATE
     if SCIPY_AVAILABLE:
         nyq = 0.5 * fs
         low = lowcut / nyq
@@ -154,8 +237,9 @@ def apply_bandpass(data, lowcut=1.0, highcut=50.0, fs=SAMPLE_RATE, order=4):
         return data
 
 # Calculate FFT for visualization
-def calculate_fft(data, fs=SAMPLE_RATE):
+def calculate_fft(data, fs=None):
     """Calculate FFT for visualization"""
+    fs = fs or SAMPLE_RATE
     if len(data) < fs//2:  # Need at least half a second of data
         return np.zeros(fs//2), np.zeros(fs//2)
     
@@ -173,6 +257,41 @@ def calculate_fft(data, fs=SAMPLE_RATE):
     mask = freqs <= max_frequency
     return freqs[mask], fft_result[mask]
 
+# Parse one line received on stdin
+def handle_input_line(line):
+    """Add one JSON, EEG_STREAM packet or CSV line to the data buffer; return True if accepted"""
+    global data_buffer, sample_count, is_data_flowing
+    
+    received = time.time()
+    if line.startswith(STREAM_PREFIX):
+        line = line[len(STREAM_PREFIX):]
+    
+    try:
+        data = json.loads(line)
+        if isinstance(data, dict):
+            # Bridge stream packet: record per-hop latency, keep the channel values
+            probe_packet(latency_tracker, data, received)
+            data = data.get('channels', [])
+        # Store with timestamp
+        data_buffer.append((received, data))
+        sample_count += 1
+        is_data_flowing = True
+        return True
+    except json.JSONDecodeError:
+        # Try as CSV
+        try:
+            csv_data = list(csv.reader(StringIO(line)))[0]
+            if len(csv_data) >= 17:  # Timestamp + 16 channels
+                timestamp = float(csv_data[0])
+                values = [float(x) for x in csv_data[1:17]]
+                data_buffer.append((timestamp, values))
+                sample_count += 1
+                is_data_flowing = True
+                return True
+        except:
+            pass
+    return False
+
 # Thread to read data from stdin
 def read_data_from_stdin():
     """Read EEG data from stdin (sent by OpenBCI bridge)"""
@@ -191,46 +310,12 @@ def read_data_from_stdin():
             if os.name == 'nt':  # Windows
                 line = sys.stdin.readline().strip()
                 if line:
-                    try:
-                        data = json.loads(line)
-                        # Store with timestamp
-                        data_buffer.append((time.time(), data))
-                        sample_count += 1
-                        is_data_flowing = True
-                    except json.JSONDecodeError:
-                        # Try as CSV
-                        try:
-                            csv_data = list(csv.reader(StringIO(line)))[0]
-                            if len(csv_data) >= 17:  # Timestamp + 16 channels
-                                timestamp = float(csv_data[0])
-                                values = [float(x) for x in csv_data[1:17]]
-                                data_buffer.append((timestamp, values))
-                                sample_count += 1
-                                is_data_flowing = True
-                        except:
-                            pass
+                    handle_input_line(line)
             else:  # Unix-like platforms
                 if sys.stdin in select.select([sys.stdin], [], [], 0.001)[0]:
                     line = sys.stdin.readline().strip()
                     if line:
-                        try:
-                            data = json.loads(line)
-                            # Store with timestamp
-                            data_buffer.append((time.time(), data))
-                            sample_count += 1
-                            is_data_flowing = True
-                        except json.JSONDecodeError:
-                            # Try as CSV
-                            try:
-                                csv_data = list(csv.reader(StringIO(line)))[0]
-                                if len(csv_data) >= 17:  # Timestamp + 16 channels
-                                    timestamp = float(csv_data[0])
-                                    values = [float(x) for x in csv_data[1:17]]
-                                    data_buffer.append((timestamp, values))
-                                    sample_count += 1
-                                    is_data_flowing = True
-                            except:
-                                pass
+                        handle_input_line(line)
             
             # Reset "is_data_flowing" flag if no data received for 1 second
             if time.time() - buffer_clear_time > 1.0:
@@ -239,6 +324,10 @@ def read_data_from_stdin():
                 is_data_flowing = False
                 sample_count = 0
                 buffer_clear_time = time.time()
+            
+            # Periodic latency summary for bridge packets
+            if latency_tracker.hops and latency_tracker.summary_due():
+                print(latency_tracker.format_summary())
                 
             # Small delay to prevent high CPU usage
             time.sleep(0.001)
@@ -247,42 +336,78 @@ def read_data_from_stdin():
                 print(f"Error reading data: {e}")
             time.sleep(0.01)
     
+    if latency_tracker.hops:
+        print(latency_tracker.format_summary())
     print("Data input thread stopped")
 
+# Thread to read data from the bridge's shared memory
+def read_data_from_shm(name=DEFAULT_SHM_NAME):
+    """Follow the bridge's shared-memory ring buffer, attaching again whenever the bridge restarts it"""
+    global running, data_buffer, sample_count, is_data_flowing, stream_active
+    
+    print(f"Shared memory input thread started, reading from {name}")
+    
+    while running:
+        try:
+            reader = RingReader(name)
+        except FileNotFoundError:
+            # The bridge creates the ring when it starts streaming
+            time.sleep(SHM_ATTACH_INTERVAL)
+            continue
+        except Exception as e:
+            print(f"Error attaching to shared memory: {e}")
+            time.sleep(SHM_ATTACH_INTERVAL)
+            continue
+        
+        print(f"Attached to {name}: {reader.channel_count} channels at {reader.sampling_rate} Hz")
+        try:
+            for timestamps, data in reader.follow(should_continue=lambda: running):
+                if not stream_active:
+                    continue  # Skip samples while streaming is paused
+                # Read-only views of the ring; converted once into the display buffer
+                latency_tracker.record('board->consumer', time.time() - timestamps)
+                data_buffer.extend(zip(timestamps.tolist(), data.tolist()))
+                sample_count += len(timestamps)
+                is_data_flowing = True
+        except Exception as e:
+            print(f"Error reading shared memory: {e}")
+        finally:
+            if reader.lost_samples:
+                print(f"Shared memory reader fell behind; {reader.lost_samples} samples overwritten before read")
+            reader.close()
+    
+    print("Shared memory input thread stopped")
+
 # Process CSV data
-def process_csv(file_path):
-    """Process a CSV file with EEG data"""
+def process_csv(file_path, speed=1.0, loop=False, start_at=0.0, cache_dir=CACHE_DIR):
+    """Replay a CSV file with EEG data, paced by its recorded timestamps"""
     global running, data_buffer, stream_active
     
     print(f"CSV processing thread started, reading from {file_path}")
     
     try:
-        with open(file_path, 'r') as f:
-            # Skip header
-            header = f.readline()
+        # Parse the CSV once into the binary cache; later opens memory-map it
+        cache = None
+        if cache_dir:
+            started = time.perf_counter()
+            cache = load_recording(file_path, cache_dir)
+            print(f"Loaded {len(cache.data)} cached rows in {time.perf_counter() - started:.2f} s")
+        
+        # Follow the end of the file (live recordings) unless looping
+        engine = CSVReplayEngine(file_path, speed=speed, loop=loop, follow=not loop, cache=cache)
+        print(f"Replaying {engine.channel_count} channels at {engine.speed}x speed")
+        if start_at:
+            engine.seek(start_at)
+        
+        for batch in engine.batches(should_continue=lambda: running):
+            # Hold the batch while streaming is paused, then re-anchor pacing
+            if not stream_active:
+                while running and not stream_active:
+                    time.sleep(0.1)
+                engine.resync()
             
-            # Process data rows
-            while running:
-                if not stream_active:
-                    time.sleep(0.1)  # Sleep while streaming is paused
-                    continue
-                    
-                line = f.readline()
-                if not line:  # EOF
-                    time.sleep(0.1)  # Sleep before checking again (for live files)
-                    continue
-                    
-                try:
-                    csv_data = list(csv.reader(StringIO(line)))[0]
-                    if len(csv_data) >= 17:  # Timestamp + 16 channels
-                        timestamp = float(csv_data[0])
-                        values = [float(x) for x in csv_data[1:17]]
-                        data_buffer.append((timestamp, values))
-                except Exception as e:
-                    print(f"Error processing CSV line: {e}")
-                
-                # Control replay speed
-                time.sleep(1.0 / (SAMPLE_RATE * 1.0))  # 1.0x speed
+            # Display by replay time so recorded timestamps fall inside the window
+            data_buffer.extend(zip(batch.wall_times.tolist(), batch.values.tolist()))
                 
     except Exception as e:
         print(f"Error in CSV processing: {e}")
@@ -311,27 +436,24 @@ def analyze_signal(channel_data):
     
     return rms, rail_percentage, variance
 
-# Update function for matplotlib animation
-def update_plot(frame):
-    """Update the visualization with new data"""
-    global data_buffer, railed_percentages, fps_counter, last_update_time
-    global fft_data, head_map_data, fft_ax, fft_lines, head_circles, smoothing_enabled
+def _frozen(array):
+    """Return a read-only float array so snapshots cannot be mutated after publishing"""
+    array = np.asarray(array, dtype=float)
+    array.setflags(write=False)
+    return array
+
+# Compute display-ready arrays (runs on the processing worker, never on the GUI thread)
+def compute_display_snapshot(buffer_items, now):
+    """Filter, smooth and analyze the buffered samples in the display window"""
+    global railed_percentages, fft_data, head_map_data
     
-    # Track FPS
-    current_time = time.time()
-    fps_counter += 1
-    if current_time - last_update_time >= 1.0:
-        fps = fps_counter / (current_time - last_update_time)
-        status_fps_text.set_text(f"FPS: {fps:.0f}")
-        fps_counter = 0
-        last_update_time = current_time
+    started = time.perf_counter()
     
     # Get data for display window
     display_data = {}
     rail_counts = {}
     
     # Current window timeframe
-    now = time.time()
     window_start = now - TIME_WINDOW
     
     # Initialize processing arrays
@@ -339,125 +461,273 @@ def update_plot(frame):
         display_data[ch] = {'times': [], 'values': []}
         rail_counts[ch] = {'count': 0, 'total': 0}
     
-    # Process data in buffer for display
-    if len(data_buffer) > 0:
-        # Extract data within our time window
-        for timestamp, values in data_buffer:
-            if timestamp >= window_start:
-                rel_time = timestamp - now  # Time relative to now (negative values)
+    # Extract data within our time window
+    stage_started = time.perf_counter()
+    for timestamp, values in buffer_items:
+        if timestamp >= window_start:
+            rel_time = timestamp - now  # Time relative to now (negative values)
+            
+            for ch in range(min(channel_count, len(values))):
+                val = values[ch]
+                display_data[ch]['times'].append(rel_time)
+                display_data[ch]['values'].append(val)
                 
-                for ch in range(min(channel_count, len(values))):
-                    val = values[ch]
-                    display_data[ch]['times'].append(rel_time)
-                    display_data[ch]['values'].append(val)
-                    
-                    # Track if sample is railed
-                    rail_counts[ch]['total'] += 1
-                    if abs(val) > VERTICAL_SCALE * 0.95:
-                        rail_counts[ch]['count'] += 1
+                # Track if sample is railed
+                rail_counts[ch]['total'] += 1
+                if abs(val) > VERTICAL_SCALE * 0.95:
+                    rail_counts[ch]['count'] += 1
     
-    # Updated artists list
-    updated_artists = []
+    frame_timer.record('buffer', time.perf_counter() - stage_started)
     
-    # Update all channel plots and calculate FFT data
+    # Stage times summed over channels, recorded once per frame
+    filter_s = smooth_s = metrics_s = fft_s = 0.0
+    
+    channels = []
     for ch in range(channel_count):
-        # Update line data
-        if len(display_data[ch]['times']) > 0:
-            # Get channel data as numpy array for processing
-            times = np.array(display_data[ch]['times'])
-            values = np.array(display_data[ch]['values'])
-            
-            # Apply filtering if enabled
-            if filter_enabled and len(values) > 10:
-                filtered_values = apply_bandpass(values)
-            else:
-                filtered_values = values
+        if len(display_data[ch]['times']) == 0:
+            channels.append(None)
+            continue
+        
+        # Get channel data as numpy array for processing
+        times = np.array(display_data[ch]['times'])
+        values = np.array(display_data[ch]['values'])
+        
+        # Apply filtering if enabled
+        t0 = time.perf_counter()
+        if filter_enabled and len(values) > 10:
+            filtered_values = apply_bandpass(values)
+        else:
+            filtered_values = values
+        t1 = time.perf_counter()
+        
+        # Apply smoothing if enabled
+        if smoothing_enabled and len(filtered_values) > 3:
+            # Simple moving average smoothing
+            window_size = 5
+            smoothed_values = np.convolve(filtered_values, np.ones(window_size)/window_size, mode='same')
+        else:
+            smoothed_values = filtered_values
+        t2 = time.perf_counter()
+        
+        # Calculate metrics on original (unsmoothed) data
+        rms, rail_pct, var = analyze_signal(values)
+        
+        # Smooth railed percentage
+        if rail_counts[ch]['total'] > 0:
+            current_rail_pct = 100 * rail_counts[ch]['count'] / rail_counts[ch]['total']
+            railed_percentages[ch] = 0.7 * railed_percentages[ch] + 0.3 * current_rail_pct
+        t3 = time.perf_counter()
+        
+        # Calculate FFT for this channel if we have enough data
+        fft_freqs = fft_values = None
+        if len(values) > SAMPLE_RATE//4:  # At least 1/4 second of data
+            freqs, fft_vals = calculate_fft(values)
+            fft_data[ch] = {'freqs': freqs, 'values': fft_vals}
+            fft_freqs, fft_values = _frozen(freqs), _frozen(fft_vals)
             
-            # Apply smoothing if enabled
-            if smoothing_enabled and len(filtered_values) > 3:
-                # Simple moving average smoothing
-                window_size = 5
-                smoothed_values = np.convolve(filtered_values, np.ones(window_size)/window_size, mode='same')
-            else:
-                smoothed_values = filtered_values
+            # Store signal strength for head map
+            head_map_data[ch] = rms
+        elif ch in fft_data:
+            # Keep showing the last spectrum until enough data is available again
+            fft_freqs = _frozen(fft_data[ch]['freqs'])
+            fft_values = _frozen(fft_data[ch]['values'])
+        
+        filter_s += t1 - t0
+        smooth_s += t2 - t1
+        metrics_s += t3 - t2
+        fft_s += time.perf_counter() - t3
+        
+        channels.append(ChannelFrame(_frozen(times), _frozen(smoothed_values), float(rms),
+                                     fft_freqs, fft_values))
+    
+    frame_timer.record('filter', filter_s)
+    frame_timer.record('smooth', smooth_s)
+    frame_timer.record('metrics', metrics_s)
+    frame_timer.record('fft', fft_s)
+    
+    return DisplaySnapshot(reference_time=now,
+                           channels=tuple(channels),
+                           railed_percentages=tuple(railed_percentages),
+                           head_map=tuple(head_map_data),
+                           processing_ms=(time.perf_counter() - started) * 1000)
+
+# Publish a snapshot to the front buffer
+def publish_snapshot(snapshot):
+    """Swap a freshly computed snapshot in as the latest one"""
+    global latest_snapshot, processing_time_ms
+    with snapshot_lock:
+        latest_snapshot = snapshot
+        processing_time_ms = snapshot.processing_ms
+
+# Get the most recent published snapshot
+def get_latest_snapshot():
+    """Return the latest published snapshot (or None before the first one)"""
+    with snapshot_lock:
+        return latest_snapshot
+
+# Thread computing display snapshots at its own rate
+def process_display_data():
+    """Continuously turn the data buffer into display snapshots"""
+    print("Processing thread started")
+    
+    while running:
+        started = time.perf_counter()
+        try:
+            # Copy the buffer so the reader thread can keep appending
+            publish_snapshot(compute_display_snapshot(list(data_buffer), time.time()))
+        except Exception as e:
+            print(f"Error processing display data: {e}")
+        
+        # Sleep for the remainder of the interval; slow frames just skip the sleep
+        elapsed = time.perf_counter() - started
+        time.sleep(max(0.001, PROCESSING_INTERVAL - elapsed))
+    
+    print("Processing thread stopped")
+
+# Start the processing worker
+def start_processing_thread():
+    """Start the background thread producing display snapshots"""
+    global processing_thread
+    if processing_thread is not None and processing_thread.is_alive():
+        return processing_thread
+    processing_thread = threading.Thread(target=process_display_data)
+    processing_thread.daemon = True
+    processing_thread.start()
+    return processing_thread
+
+# Update function for matplotlib animation
+def update_plot(frame):
+    """Update the visualization with the latest processed snapshot"""
+    global fps_counter, last_update_time, drawn_snapshot, draw_time_ms
+    
+    draw_started = time.perf_counter()
+    
+    # Track FPS
+    current_time = time.time()
+    fps_counter += 1
+    if current_time - last_update_time >= 1.0:
+        fps = fps_counter / (current_time - last_update_time)
+        status_fps_text.set_text(f"FPS: {fps:.0f} | Proc: {processing_time_ms:.1f} ms | Draw: {draw_time_ms:.1f} ms")
+        if debug_overlay_enabled and debug_overlay_text is not None:
+            debug_overlay_text.set_text(format_frame_stats())
+        fps_counter = 0
+        last_update_time = current_time
+    
+    # Updated artists list
+    updated_artists = []
+    
+    snapshot = get_latest_snapshot()
+    if snapshot is not None and snapshot is not drawn_snapshot:
+        drawn_snapshot = snapshot
+        artists_started = time.perf_counter()
+        
+        # Update all channel plots
+        for ch in range(min(channel_count, len(snapshot.channels))):
+            channel = snapshot.channels[ch]
+            if channel is None:
+                continue
             
             # Update main time series plot
-            lines[ch].set_data(times, smoothed_values)
+            lines[ch].set_data(channel.times, channel.values)
             updated_artists.append(lines[ch])
             
-            # Calculate metrics on original (unsmoothed) data
-            rms, rail_pct, var = analyze_signal(values)
-            
-            # Smooth railed percentage
-            if rail_counts[ch]['total'] > 0:
-                current_rail_pct = 100 * rail_counts[ch]['count'] / rail_counts[ch]['total']
-                railed_percentages[ch] = 0.7 * railed_percentages[ch] + 0.3 * current_rail_pct
-            
             # Update RMS text with rail percentage (like OpenBCI GUI)
+            railed = snapshot.railed_percentages[ch]
             rms_color = 'white'
             rail_text = ""
             
-            if railed_percentages[ch] > 90:
-                rail_text = f"Railed {railed_percentages[ch]:.2f}% "
+            if railed > 90:
+                rail_text = f"Railed {railed:.2f}% "
                 rms_color = 'red'
-            elif railed_percentages[ch] > 50:
-                rail_text = f"Near Railed {railed_percentages[ch]:.2f}% "
+            elif railed > 50:
+                rail_text = f"Near Railed {railed:.2f}% "
                 rms_color = 'yellow'
-            elif railed_percentages[ch] > 1:
-                rail_text = f"Railed {railed_percentages[ch]:.2f}% "
+            elif railed > 1:
+                rail_text = f"Railed {railed:.2f}% "
                 rms_color = 'red'
             
             # Update RMS text display
-            rms_texts[ch].set_text(f"{rail_text}{rms:.2f} µVrms")
+            rms_texts[ch].set_text(f"{rail_text}{channel.rms:.2f} µVrms")
             rms_texts[ch].set_color(rms_color)
             updated_artists.append(rms_texts[ch])
             
             # Update channel signal indicators
-            if rms < 0.1:  # No signal
+            if channel.rms < 0.1:  # No signal
                 signal_indicators[ch].set_color('#555555')
-            elif railed_percentages[ch] > 50:  # Railed signal
+            elif railed > 50:  # Railed signal
                 signal_indicators[ch].set_color('red')
-            elif rms > 50:  # Strong signal
+            elif channel.rms > 50:  # Strong signal
                 signal_indicators[ch].set_color('lime')
             else:  # Normal signal
                 signal_indicators[ch].set_color('green')
             updated_artists.append(signal_indicators[ch])
             
-            # Calculate FFT for this channel if we have enough data
-            if len(values) > SAMPLE_RATE//4:  # At least 1/4 second of data
-                freqs, fft_vals = calculate_fft(values)
-                fft_data[ch] = {'freqs': freqs, 'values': fft_vals}
-                
-                # Store signal strength for head map
-                head_map_data[ch] = rms
-    
-    # Update FFT plot
-    if fft_ax is not None and len(fft_data) > 0:
-        for ch in range(min(channel_count, len(fft_lines))):
-            if ch in fft_data and len(fft_data[ch]['freqs']) > 0:
-                fft_lines[ch].set_data(fft_data[ch]['freqs'], fft_data[ch]['values'])
+            # Update FFT plot
+            if fft_ax is not None and ch < len(fft_lines) and channel.fft_freqs is not None \
+                    and len(channel.fft_freqs) > 0:
+                fft_lines[ch].set_data(channel.fft_freqs, channel.fft_values)
                 updated_artists.append(fft_lines[ch])
-    
-    # Update head map
-    if head_circles and len(head_circles) > 0:
-        update_head_map(head_map_data)
-        updated_artists.extend(head_circles)
+        
+        # Update head map
+        head_map_started = time.perf_counter()
+        frame_timer.record('artists', head_map_started - artists_started)
+        if head_circles and len(head_circles) > 0:
+            update_head_map(snapshot.head_map, snapshot.railed_percentages)
+            updated_artists.extend(head_circles)
+        frame_timer.record('head_map', time.perf_counter() - head_map_started)
     
     # Update status text
     status_time_text.set_text(f"Time: {format_time()}")
     status_info_text.set_text(f"Runtime: {format_elapsed_time()} | Sample Rate: {SAMPLE_RATE} Hz")
     updated_artists.extend([status_time_text, status_info_text, status_fps_text])
+    if debug_overlay_text is not None:
+        updated_artists.append(debug_overlay_text)
     
+    draw_time_ms = (time.perf_counter() - draw_started) * 1000
     return updated_artists
 
+# Per-stage frame timing summaries
+def format_frame_stats():
+    """One-line p50/p95 of every frame stage for the debug overlay"""
+    stats = frame_timer.summary()
+    parts = []
+    for stage in FRAME_STAGES:
+        stage_stats = stats.get(stage)
+        if stage_stats and stage_stats['count']:
+            parts.append(f"{stage} {stage_stats['p50_ms']:.1f}/{stage_stats['p95_ms']:.1f}")
+    return "p50/p95 ms: " + ("  ".join(parts) if parts else "no frames yet")
+
+def save_frame_stats(file_path):
+    """Write the rolling and whole-session frame stage timings to a JSON file"""
+    try:
+        with open(file_path, 'w') as f:
+            json.dump({'stages': list(FRAME_STAGES),
+                       'window_seconds': FRAME_STATS_WINDOW,
+                       'recent': frame_timer.summary(),
+                       'session': frame_timer.session_summary()}, f, indent=2)
+        print(f"Frame timings saved to {file_path}")
+    except Exception as e:
+        print(f"Could not save frame timings: {e}")
+
+def toggle_debug_overlay(event):
+    """Show or hide the frame timing overlay with the 'd' key"""
+    global debug_overlay_enabled
+    if event.key != 'd' or debug_overlay_text is None:
+        return
+    debug_overlay_enabled = not debug_overlay_enabled
+    debug_overlay_text.set_text(format_frame_stats() if debug_overlay_enabled else "")
+
 # New function to update head map
-def update_head_map(data):
+def update_head_map(data, railed=None):
     """Update the head map visualization with current channel data"""
     global head_circles, railed_percentages, channel_count
     
     if not head_circles or len(head_circles) == 0:
         return
     
+    if railed is None:
+        railed = railed_percentages
+    
     # Normalize data for visualization
     normalized_data = np.array(data)
     max_val = max(0.1, np.max(normalized_data))  # Avoid division by zero
@@ -471,7 +741,7 @@ def update_head_map(data):
             continue
             
         # Color based on signal strength and rail status
-        if railed_percentages[ch] > 50:
+        if railed[ch] > 50:
             color = [1.0, 0.0, 0.0, val]  # Red for railed (with alpha for intensity)
         else:
             # Blue-to-red colormap for normal signal
@@ -551,46 +821,21 @@ def create_control_buttons(fig):
     return [start_button, filter_button, smooth_button, settings_button, layout_button]
 
 # Generate test data for development when no input is available
-def generate_test_data():
+def generate_test_data(test_channels=16, test_rate=None):
     """Generate simulated EEG data for testing the visualizer"""
     global data_buffer, running, stream_active
     
-    print("Generating test data...")
-    base_freq = 10  # Base frequency in Hz
+    generator = SyntheticEEGGenerator(test_channels, test_rate or SAMPLE_RATE)
+    print(f"Generating test data: {generator.channel_count} channels at {generator.sampling_rate} Hz...")
     
-    while running:
+    # Blocks of ~10 ms, paced against a monotonic clock by the generator
+    for timestamps, data in generator.stream(block_seconds=0.01, should_continue=lambda: running):
         if not stream_active:
             time.sleep(0.1)  # Sleep while streaming is paused
             continue
-            
-        current_time = time.time()
-        
-        # Generate 16 channels of test data with different characteristics
-        data = []
-        for ch in range(16):
-            # Different frequency for each channel
-            freq = base_freq + (ch * 1.5)
-            
-            # Amplitude varies by channel
-            amp = 30 + (ch * 5) % 150
-            
-            # Add some randomness
-            noise = np.random.normal(0, 10)
-            
-            # Generate value
-            value = amp * np.sin(2 * np.pi * freq * (current_time % 1)) + noise
-            
-            # Every third channel gets occasional railing
-            if ch % 3 == 0 and np.random.random() < 0.1:
-                value = VERTICAL_SCALE * 0.98 * np.sign(value)
-                
-            data.append(value)
         
         # Add to buffer
-        data_buffer.append((current_time, data))
-        
-        # Sleep to simulate realistic sample rate
-        time.sleep(1.0 / SAMPLE_RATE)
+        data_buffer.extend(zip(timestamps.tolist(), data.T.tolist()))
     
     print("Test data generation stopped")
 
@@ -601,7 +846,7 @@ def start_visualization(board_type='cyton', experiment_name='Unnamed Experiment'
     global lines, rms_texts, signal_indicators
     global status_time_text, status_info_text, status_fps_text
     global fft_ax, fft_lines, head_ax, head_circles, buttons
-    global smooth_button, filter_button, start_button
+    global smooth_button, filter_button, start_button, debug_overlay_text
     
     if not MATPLOTLIB_AVAILABLE:
         print("ERROR: Matplotlib is not available. Visualization cannot start.")
@@ -657,6 +902,11 @@ def start_visualization(board_type='cyton', experiment_name='Unnamed Experiment'
         footer_ax.set_facecolor(COLORS['header'])
         footer_ax.axis('off')
         
+        # Frame timing debug overlay (toggle with 'd')
+        debug_overlay_text = footer_ax.text(0.01, 0.5, "", transform=footer_ax.transAxes, va='center',
+                                            fontsize=8, family='monospace', color='white')
+        fig.canvas.mpl_connect('key_press_event', toggle_debug_overlay)
+        
         # Initialize arrays to store plot elements
         axes = []          # All subplot axes
         lines = []         # Line objects for each channel
@@ -799,9 +1049,11 @@ def start_visualization(board_type='cyton', experiment_name='Unnamed Experiment'
             start_button.label.set_text('Stop Data Stream')
             start_button.color = 'salmon'
         
+        # Start the processing worker so the animation only swaps in snapshots
+        start_processing_thread()
+        
         # Create animation with fast updates
-        ani = FuncAnimation(fig, update_plot, interval=33,  # ~30 FPS
-                           blit=True, cache_frame_data=False)
+        ani = FrameTimedAnimation(fig, update_plot, interval=33)  # ~30 FPS
         
         # Try to maximize window
         try:
@@ -842,8 +1094,9 @@ def start_visualization(board_type='cyton', experiment_name='Unnamed Experiment'
 if __name__ == "__main__":
     # Create command-line argument parser
     parser = argparse.ArgumentParser(description='OpenBCI EEG Visualization')
-    parser.add_argument('--board_type', default='cyton', choices=['cyton', 'cyton_daisy'],
-                        help='Board type: cyton (8 channels) or cyton_daisy (16 channels)')
+    parser.add_argument('--board_type', default=None, choices=['cyton', 'cyton_daisy'],
+                        help='Board type: cyton (8 channels) or cyton_daisy (16 channels). '
+                             'Defaults to cyton, or to the channel count of --csv_file')
     parser.add_argument('--experiment_name', default='Unnamed Experiment',
                         help='Name of the experiment for display purposes')
     parser.add_argument('--vertical_scale', type=int, default=200,
@@ -860,14 +1113,40 @@ if __name__ == "__main__":
                         help='Enable bandpass filtering (default: True)')
     parser.add_argument('--test_mode', action='store_true',
                         help='Run with simulated test data instead of reading from stdin')
+    parser.add_argument('--test_channels', type=int, default=None,
+                        help='Channels generated in test mode, 1-256 (default: board channel count)')
+    parser.add_argument('--test_rate', type=int, default=None,
+                        help='Sampling rate in Hz for test mode, up to 16000 (default: 250)')
     parser.add_argument('--auto_start', action='store_true', 
                         help='Automatically start data stream on launch')
     parser.add_argument('--csv_file', type=str,
                         help='Read data from a CSV file instead of stdin')
+    parser.add_argument('--shm', type=str, nargs='?', const=DEFAULT_SHM_NAME,
+                        help='Read data from the bridge\'s shared-memory ring buffer (openbci_bridge.py --shm) '
+                             f'instead of stdin (default name: {DEFAULT_SHM_NAME})')
+    parser.add_argument('--replay_speed', type=float, default=1.0,
+                        help='CSV replay speed multiplier, 0.25-100 (default: 1.0)')
+    parser.add_argument('--loop', action='store_true',
+                        help='Loop the CSV file instead of following it for new rows')
+    parser.add_argument('--seek', type=float, default=0.0,
+                        help='Start CSV replay this many seconds into the recording')
+    parser.add_argument('--no_cache', action='store_true',
+                        help='Parse the CSV file directly instead of using the binary cache in uploads/cache')
+    parser.add_argument('--debug_overlay', action='store_true',
+                        help="Show per-stage frame timings on screen (toggle with the 'd' key)")
+    parser.add_argument('--frame_stats', type=str,
+                        help='Save per-stage frame timings to this JSON file on exit')
+    parser.add_argument('--profile', type=str, nargs='?', const='',
+                        help='Profile the run (cProfile, tracemalloc, GC pauses) and write a report at exit '
+                             '(default: uploads/profiles/brainwave_visualizer_<time>.txt)')
     
     # Parse arguments
     args = parser.parse_args()
     
+    if args.profile is not None:
+        # Started before any data thread so every thread is profiled
+        start_profiling(args.profile or default_report_path('brainwave_visualizer'))
+    
     # Update global settings
     VERTICAL_SCALE = args.vertical_scale
     TIME_WINDOW = args.time_window
@@ -876,6 +1155,9 @@ if __name__ == "__main__":
     smoothing_enabled = args.smoothing
     filter_enabled = args.filtering
     stream_active = args.auto_start
+    debug_overlay_enabled = args.debug_overlay
+    if args.frame_stats:
+        atexit.register(save_frame_stats, args.frame_stats)
     
     print("Starting Enhanced EEG Visualizer...")
     
@@ -889,14 +1171,39 @@ if __name__ == "__main__":
     running = True
     
     # Start appropriate data source thread
+    board_type = args.board_type or 'cyton'
     if args.csv_file:
         print(f"Using CSV file as data source: {args.csv_file}")
-        csv_thread = threading.Thread(target=process_csv, args=(args.csv_file,))
+        if args.board_type is None:
+            # Match the display to the recording's channel count
+            with open(args.csv_file, 'r') as f:
+                board_type = 'cyton_daisy' if len(f.readline().split(',')) - 1 > 8 else 'cyton'
+        csv_thread = threading.Thread(target=process_csv,
+                                      args=(args.csv_file, args.replay_speed, args.loop, args.seek,
+                                            None if args.no_cache else CACHE_DIR))
         csv_thread.daemon = True
         csv_thread.start()
+    elif args.shm:
+        print(f"Using shared memory as data source: {args.shm}")
+        if args.board_type is None:
+            # Match the display to the ring's channel count when the bridge is already streaming
+            try:
+                reader = RingReader(args.shm)
+                board_type = 'cyton_daisy' if reader.channel_count > 8 else 'cyton'
+                reader.close()
+            except Exception:
+                pass
+        shm_thread = threading.Thread(target=read_data_from_shm, args=(args.shm,))
+        shm_thread.daemon = True
+        shm_thread.start()
     elif args.test_mode:
         print("Starting in TEST MODE with simulated data")
-        test_thread = threading.Thread(target=generate_test_data)
+        if args.test_rate:
+            # Filters, FFT and the buffer follow the simulated rate
+            SAMPLE_RATE = args.test_rate
+            data_buffer = deque(maxlen=max(10000, int(SAMPLE_RATE * TIME_WINDOW * 2)))
+        test_channels = args.test_channels or (16 if board_type == 'cyton_daisy' else 8)
+        test_thread = threading.Thread(target=generate_test_data, args=(test_channels, args.test_rate))
         test_thread.daemon = True
         test_thread.start()
     else:
@@ -906,4 +1213,4 @@ if __name__ == "__main__":
         data_thread.start()
     
     # Start visualization
-    start_visualization(args.board_type, args.experiment_name)
\ No newline at end of file
+    start_visualization(board_type, args.experiment_name)
\ No newline at end of file
@@ -0,0 +1,435 @@
+"""
+EDF+ and BDF+ export of EEG recordings.
+
+EDFWriter streams data records block by block as samples arrive, so it can
+run live next to the bridge's CSV writer or offline over existing CSV
+recordings (several files in parallel with --workers). EDF+ stores 16-bit
+samples; BDF+ stores 24-bit samples, and with the Cyton full-scale range
+(+/-187500 uV over +/-8388607) every Cyton count is stored exactly.
+Dropped samples (the recording's clock gaps) and markers become EDF+
+annotations.
+
+    python edf_export.py uploads/eeg --format bdf --output uploads/edf --workers 4
+"""
+import argparse
+import bisect
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import numpy as np
+
+from recordings import MARKERS_SUFFIX, RECORDINGS_DIR, iter_chunks, list_recordings, read_clock, read_header, \
+    recording_sampling_rate
+from summaries import read_summary
+from synthetic_eeg import RAIL_UV
+
+EDF_FORMATS = {
+    # format: (version field, reserved prefix, bytes per sample, digital min, digital max, annotations label)
+    'edf': ('0', 'EDF+C', 2, -32767, 32767, 'EDF Annotations'),
+    'bdf': ('\xffBIOSEMI', 'BDF+C', 3, -8388607, 8388607, 'BDF Annotations'),
+}
+RECORD_SECONDS = 1.0        # Duration of one data record
+ANNOTATION_BYTES = 240      # Annotation space per data record
+OUTPUT_DIR = os.path.join('uploads', 'edf')
+MONTHS = ('JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC')
+
+
+def _field(value, width):
+    """ASCII header field, space-padded (or truncated) to `width` bytes."""
+    return str(value)[:width].ljust(width).encode('latin-1')
+
+
+def _number(value, width=8):
+    """Shortest decimal representation of `value` that fits the field width."""
+    for decimals in range(6, -1, -1):
+        text = f"{value:.{decimals}f}"
+        if '.' in text:
+            text = text.rstrip('0').rstrip('.')
+        if len(text) <= width:
+            return text
+    raise ValueError(f"{value} does not fit in {width} characters")
+
+
+def _seconds(value):
+    """Signed onset/duration text for annotations."""
+    return ('+' if value >= 0 else '-') + _number(abs(value), 20)
+
+
+def full_scale_ranges(channels):
+    """Cyton full-scale physical range for every channel (lossless in BDF)."""
+    return [(-RAIL_UV, RAIL_UV)] * channels
+
+
+class EDFWriter:
+    """Write EDF+/BDF+ files incrementally from channels x samples blocks.
+
+    The header is written with an unknown record count (-1), complete data
+    records are appended as soon as enough samples have arrived, and the
+    record count is patched in on close. Annotations queued with annotate()
+    go into the annotation signal of the record their onset falls in, or of
+    the next one with room (all that are left go into the last records).
+    Call start() before queueing annotations ahead of the samples.
+
+    `gaps` is the recording's (row, missing) list of dropped samples, such
+    as ClockTracker.gaps; it is read as samples are written, and each gap
+    becomes a 'Gap' annotation where it occurs. Gaps are not guessed from
+    timestamp steps, which host batching makes unreliable.
+    """
+
+    def __init__(self, file_path, labels, sampling_rate, fmt='bdf', physical_ranges=None,
+                 record_seconds=RECORD_SECONDS, patient='X X X X', recording='X X X', gaps=None):
+        if fmt not in EDF_FORMATS:
+            raise ValueError(f"Unknown format {fmt!r}; expected one of {', '.join(EDF_FORMATS)}")
+        self.file_path = file_path
+        self.labels = list(labels)
+        self.fmt = fmt
+        self.version, self.reserved, self.bytes_per_sample, self.digital_min, self.digital_max, \
+            self.annotation_label = EDF_FORMATS[fmt]
+        self.record_seconds = record_seconds
+        self.samples_per_record = int(round(sampling_rate * record_seconds))
+        if self.samples_per_record < 1:
+            raise ValueError(f"Sampling rate {sampling_rate} Hz gives no samples per record")
+        self.sampling_rate = self.samples_per_record / record_seconds
+        self.annotation_samples = ANNOTATION_BYTES // self.bytes_per_sample
+        self.patient = patient
+        self.recording = recording
+
+        # Ranges go through their header text so the stored scaling is exactly what readers see
+        ranges = physical_ranges or full_scale_ranges(len(self.labels))
+        self.physical_ranges = []
+        for low, high in ranges:
+            if high <= low:
+                high = low + 1.0
+            self.physical_ranges.append((float(_number(low)), float(_number(high))))
+        lows = np.array([low for low, _ in self.physical_ranges])
+        highs = np.array([high for _, high in self.physical_ranges])
+        self._gain = (highs - lows) / (self.digital_max - self.digital_min)
+        self._low = lows
+
+        self.file = None
+        self.start_timestamp = None
+        self.records = 0
+        self.samples = 0
+        self.gaps = 0
+        self.gap_list = gaps if gaps is not None else []
+        self._pending = np.empty((len(self.labels), 0))
+        self._annotations = []
+        self._last_values = np.zeros((len(self.labels), 1))
+
+    def _header(self, start):
+        signals = self.labels + [self.annotation_label]
+        count = len(signals)
+        ranges = self.physical_ranges + [(-1.0, 1.0)]
+        per_record = [self.samples_per_record] * len(self.labels) + [self.annotation_samples]
+        annotation_digital = (-32768, 32767) if self.fmt == 'edf' else (-8388608, 8388607)
+        digital = [(self.digital_min, self.digital_max)] * len(self.labels) + [annotation_digital]
+
+        header = b''.join([
+            _field(self.version, 8),
+            _field(self.patient, 80),
+            _field(f"Startdate {start.day:02d}-{MONTHS[start.month - 1]}-{start.year} {self.recording}", 80),
+            _field(start.strftime('%d.%m.%y'), 8),
+            _field(start.strftime('%H.%M.%S'), 8),
+            _field(256 * (count + 1), 8),
+            _field(self.reserved, 44),
+            _field(-1, 8),
+            _field(_number(self.record_seconds), 8),
+            _field(count, 4),
+        ])
+        header += b''.join(_field(label if label == self.annotation_label else f"EEG {label}", 16)
+                           for label in signals)
+        header += b''.join(_field('', 80) for _ in signals)
+        header += b''.join(_field('' if label == self.annotation_label else 'uV', 8) for label in signals)
+        header += b''.join(_field(_number(low), 8) for low, _ in ranges)
+        header += b''.join(_field(_number(high), 8) for _, high in ranges)
+        header += b''.join(_field(low, 8) for low, _ in digital)
+        header += b''.join(_field(high, 8) for _, high in digital)
+        header += b''.join(_field('', 80) for _ in signals)
+        header += b''.join(_field(n, 8) for n in per_record)
+        header += b''.join(_field('', 32) for _ in signals)
+        return header
+
+    def start(self, start_timestamp):
+        """Write the header for a recording starting at `start_timestamp` (done by the first write otherwise)."""
+        self.start_timestamp = start_timestamp
+        self.file = open(self.file_path, 'wb')
+        self.file.write(self._header(datetime.fromtimestamp(start_timestamp)))
+
+    def annotate(self, onset, text, duration=None):
+        """Queue an annotation `onset` seconds after the start of the recording."""
+        tal = _seconds(onset)
+        if duration is not None:
+            tal += '\x15' + _number(duration, 20)
+        # Long texts are cut so every annotation fits in one record next to the time-keeping TAL
+        encoded = (tal + '\x14' + text.replace('\x14', ' ')).encode('utf-8')[:ANNOTATION_BYTES - 40]
+        bisect.insort(self._annotations, (onset, encoded.decode('utf-8', 'ignore').encode('utf-8') + b'\x14\x00'))
+
+    def annotate_at(self, timestamp, text, duration=None):
+        """Queue an annotation at a recording timestamp."""
+        self.annotate(timestamp - (self.start_timestamp or timestamp), text, duration)
+
+    def _annotation_block(self, record, final=False):
+        """Time-keeping TAL for a record plus the queued annotations up to its end (all with `final`) that fit."""
+        block = (_seconds(record * self.record_seconds) + '\x14\x14\x00').encode('utf-8')
+        end = (record + 1) * self.record_seconds
+        while self._annotations and (final or self._annotations[0][0] < end) and \
+                len(block) + len(self._annotations[0][1]) <= ANNOTATION_BYTES:
+            block += self._annotations.pop(0)[1]
+        return block.ljust(self.annotation_samples * self.bytes_per_sample, b'\x00')
+
+    def _encode(self, digital):
+        if self.bytes_per_sample == 2:
+            return digital.astype('<i2').view(np.uint8).reshape(digital.shape[0], -1)
+        # 24-bit little-endian: the low three bytes of each 32-bit value
+        as_bytes = digital.astype('<i4').view(np.uint8).reshape(digital.shape[0], -1, 4)[:, :, :3]
+        return as_bytes.reshape(digital.shape[0], -1)
+
+    def _write_records(self, block, final=False):
+        """Write complete records from a channels x (records * samples_per_record) block."""
+        records = block.shape[1] // self.samples_per_record
+        digital = np.rint((block - self._low[:, None]) / self._gain[:, None]) + self.digital_min
+        digital = np.clip(digital, self.digital_min, self.digital_max).astype(np.int32)
+        # (channels, records, samples) -> one row of bytes per record
+        digital = digital.reshape(len(self.labels), records, self.samples_per_record).transpose(1, 0, 2)
+        data = self._encode(digital.reshape(records, -1))
+        annotations = np.frombuffer(b''.join(self._annotation_block(self.records + r, final) for r in range(records)),
+                                    dtype=np.uint8).reshape(records, -1)
+        self.file.write(np.hstack((data, annotations)).tobytes())
+        self.records += records
+
+    def write(self, timestamps, eeg_data):
+        """Append samples (eeg_data is channels x samples in microvolts)."""
+        count = eeg_data.shape[1]
+        if count == 0:
+            return
+        timestamps = np.asarray(timestamps, dtype=float)
+        if self.file is None:
+            self.start(float(timestamps[0]))
+
+        # Gaps before the samples written so far become annotations at the sample position where they occur
+        while self.gaps < len(self.gap_list) and self.gap_list[self.gaps][0] < self.samples + count:
+            row, missing = self.gap_list[self.gaps]
+            self.annotate(row / self.sampling_rate, 'Gap', round(missing / self.sampling_rate, 6))
+            self.gaps += 1
+        self._last_values = eeg_data[:, -1:]
+
+        self.samples += count
+        pending = np.concatenate((self._pending, eeg_data), axis=1)
+        complete = pending.shape[1] - pending.shape[1] % self.samples_per_record
+        if complete:
+            self._write_records(pending[:, :complete])
+        self._pending = pending[:, complete:]
+
+    def close(self):
+        """Write the last (padded) record and any remaining annotations, then patch the record count."""
+        if self.file is None:
+            self.start(time.time())
+        if self._pending.shape[1] or self._annotations:
+            # The last record is padded by holding the last value; the annotation marks where data ends
+            self.annotate(self.samples / self.sampling_rate, 'Recording end')
+        while self._pending.shape[1] or self._annotations:
+            padding = self.samples_per_record - self._pending.shape[1]
+            last = self._pending[:, -1:] if self._pending.shape[1] else self._last_values
+            self._write_records(np.concatenate((self._pending, np.repeat(last, padding, axis=1)), axis=1), final=True)
+            self._pending = self._pending[:, :0]
+        self.file.seek(236)
+        self.file.write(_field(self.records, 8))
+        self.file.close()
+
+    def move(self, file_path):
+        """Close and rename the file to `file_path`."""
+        self.close()
+        os.replace(self.file_path, file_path)
+        self.file_path = file_path
+
+
+def read_edf(file_path):
+    """Read an EDF+/BDF+ file written by EDFWriter.
+
+    Returns (header, signals, annotations): header fields, physical values as
+    a channels x samples array, and a list of (onset, duration, text).
+    """
+    with open(file_path, 'rb') as f:
+        content = f.read()
+
+    def text(start, width):
+        return content[start:start + width].decode('latin-1').strip()
+
+    count = int(text(252, 4))
+    fields = {}
+    position = 256
+    for name, width in (('label', 16), ('transducer', 80), ('dimension', 8), ('physical_min', 8),
+                        ('physical_max', 8), ('digital_min', 8), ('digital_max', 8), ('prefiltering', 80),
+                        ('samples', 8), ('reserved', 32)):
+        fields[name] = [text(position + i * width, width) for i in range(count)]
+        position += width * count
+    header = {
+        'version': text(0, 8),
+        'reserved': text(192, 44),
+        'records': int(text(236, 8)),
+        'record_seconds': float(text(244, 8)),
+        'start': text(168, 8) + ' ' + text(176, 8),
+        'labels': fields['label'],
+        'samples_per_record': [int(n) for n in fields['samples']],
+        'physical_min': [float(v) for v in fields['physical_min']],
+        'physical_max': [float(v) for v in fields['physical_max']],
+        'digital_min': [int(v) for v in fields['digital_min']],
+        'digital_max': [int(v) for v in fields['digital_max']],
+    }
+    bytes_per_sample = 3 if header['version'].endswith('BIOSEMI') else 2
+    per_record = header['samples_per_record']
+    record_bytes = sum(per_record) * bytes_per_sample
+    records = np.frombuffer(content, dtype=np.uint8, offset=int(text(184, 8)))
+    records = records[:header['records'] * record_bytes].reshape(header['records'], record_bytes)
+
+    signals = []
+    annotations = []
+    start = 0
+    for i, n in enumerate(per_record):
+        block = records[:, start:start + n * bytes_per_sample]
+        start += n * bytes_per_sample
+        if header['labels'][i].endswith('Annotations'):
+            for record in block:
+                for tal in bytes(record).split(b'\x00'):
+                    parts = tal.decode('utf-8').split('\x14')
+                    if len(parts) < 3 or not parts[1]:
+                        continue
+                    onset, _, duration = parts[0].partition('\x15')
+                    annotations.append((float(onset), float(duration) if duration else None, parts[1]))
+            continue
+        raw = block.reshape(-1, bytes_per_sample)
+        if bytes_per_sample == 3:
+            digital = (raw[:, 0].astype(np.int32) | (raw[:, 1].astype(np.int32) << 8) |
+                       (raw[:, 2].astype(np.int32) << 16))
+            digital = np.where(digital >= 1 << 23, digital - (1 << 24), digital)
+        else:
+            digital = raw.copy().view('<i2').ravel().astype(np.int32)
+        gain = (header['physical_max'][i] - header['physical_min'][i]) / \
+            (header['digital_max'][i] - header['digital_min'][i])
+        signals.append((digital - header['digital_min'][i]) * gain + header['physical_min'][i])
+    return header, np.array(signals), annotations
+
+
+def read_markers(file_path):
+    """Markers from a CSV with timestamp,duration,text columns (duration may be empty)."""
+    markers = []
+    with open(file_path, 'r', newline='') as f:
+        for row in csv.DictReader(f):
+            duration = row.get('duration')
+            markers.append((float(row['timestamp']), float(duration) if duration else None, row.get('text', '')))
+    return markers
+
+
+def data_ranges(file_path, cache_dir=None):
+    """Per-channel (min, max) of a recording, from its summary when it has one."""
+    summary = read_summary(file_path)
+    if summary and summary.get('samples'):
+        return [(stats['min_uv'], stats['max_uv']) for stats in summary['channel_stats']]
+    low = high = None
+    for _, values in iter_chunks(file_path, cache_dir=cache_dir):
+        low = values.min(axis=0) if low is None else np.minimum(low, values.min(axis=0))
+        high = values.max(axis=0) if high is None else np.maximum(high, values.max(axis=0))
+    if low is None:
+        return None
+    return list(zip(low.tolist(), high.tolist()))
+
+
+def convert_file(file_path, output_path=None, fmt='bdf', ranges=None, sampling_rate=None, markers=None,
+                 cache_dir=None):
+    """Convert a CSV recording to EDF+/BDF+ in one streaming pass; returns a result dict.
+
+    `ranges` is 'full_scale' (the Cyton range; lossless for BDF), 'data'
+    (each channel's own min/max, for the best 16-bit EDF resolution) or an
+    explicit list of (min, max). By default BDF uses full scale and EDF uses
+    the data ranges. Markers default to a <recording>.markers.csv next to
+    the recording, when there is one. The sampling rate (unless given) and
+    the gaps come from the recording's sample clock (see
+    recordings.read_clock).
+    """
+    output_path = output_path or os.path.splitext(file_path)[0] + '.' + fmt
+    header = read_header(file_path)
+    labels = header[1:]
+    ranges = ranges or ('full_scale' if fmt == 'bdf' else 'data')
+    if ranges == 'full_scale':
+        ranges = full_scale_ranges(len(labels))
+    elif ranges == 'data':
+        ranges = data_ranges(file_path, cache_dir)
+
+    clock = read_clock(file_path, cache_dir)
+    if not clock['rows']:
+        raise ValueError("Recording has no samples")
+    sampling_rate = recording_sampling_rate(file_path, sampling_rate, cache_dir)
+    if markers is None and os.path.exists(file_path + MARKERS_SUFFIX):
+        markers = read_markers(file_path + MARKERS_SUFFIX)
+
+    writer = None
+    for timestamps, values in iter_chunks(file_path, cache_dir=cache_dir):
+        if writer is None:
+            # Markers are queued before any record is written, so each can go into its own record
+            writer = EDFWriter(output_path, labels, sampling_rate, fmt, ranges, gaps=clock['gaps'])
+            writer.start(float(timestamps[0]))
+            for timestamp, duration, text in markers or ():
+                writer.annotate_at(timestamp, text, duration)
+        writer.write(timestamps, values.T)
+    if writer is None:
+        raise ValueError("Recording has no samples")
+    writer.close()
+    return {'status': 'success', 'file': file_path, 'output': output_path, 'records': writer.records,
+            'samples': writer.samples, 'gaps': writer.gaps}
+
+
+def _convert_safely(file_path, output_path, fmt):
+    try:
+        return convert_file(file_path, output_path, fmt)
+    except Exception as e:
+        return {'status': 'error', 'file': file_path, 'message': str(e)}
+
+
+def convert_files(files, output_dir=OUTPUT_DIR, fmt='bdf', workers=None):
+    """Convert recordings in parallel worker processes; returns one result per file, in order."""
+    os.makedirs(output_dir, exist_ok=True)
+    outputs = {file_path: os.path.join(output_dir, os.path.splitext(os.path.basename(file_path))[0] + '.' + fmt)
+               for file_path in files}
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return [_convert_safely(file_path, outputs[file_path], fmt) for file_path in files]
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_convert_safely, file_path, outputs[file_path], fmt): file_path
+                   for file_path in files}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+    return [results[file_path] for file_path in files]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert EEG recordings to EDF+ or BDF+')
+    parser.add_argument('inputs', nargs='*', default=[RECORDINGS_DIR],
+                        help='Recording files or directories of CSV recordings (default: uploads/eeg)')
+    parser.add_argument('--format', choices=sorted(EDF_FORMATS), default='bdf',
+                        help='bdf (24-bit, default) or edf (16-bit)')
+    parser.add_argument('--output', type=str, default=OUTPUT_DIR,
+                        help='Directory for the converted files')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Worker processes (default: CPU count)')
+
+    args = parser.parse_args()
+
+    files = []
+    for path in args.inputs:
+        files.extend(list_recordings(path) if os.path.isdir(path) else [path])
+    results = convert_files(files, args.output, args.format, args.workers)
+    for result in results:
+        if result['status'] == 'success':
+            print(f"{result['file']} -> {result['output']} ({result['records']} records, {result['gaps']} gaps)",
+                  file=sys.stderr)
+        else:
+            print(f"FAILED {result['file']}: {result['message']}", file=sys.stderr)
+    failed = sum(1 for result in results if result['status'] != 'success')
+    print(json.dumps({'status': 'error' if failed else 'success', 'results': results}))
+    sys.exit(1 if failed else 0)
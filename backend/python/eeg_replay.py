@@ -0,0 +1,249 @@
+import os
+import io
+import time
+from collections import namedtuple
+
+import numpy as np
+
+# Replay limits
+MIN_SPEED = 0.25
+MAX_SPEED = 100.0
+BLOCK_BYTES = 256 * 1024      # Bytes of CSV parsed per block
+INDEX_INTERVAL = 1000         # Rows between line-offset index entries
+BATCH_SECONDS = 0.02          # Wall-clock time covered by one emitted batch
+FOLLOW_POLL = 0.1             # Seconds between checks for new rows in a live file
+
+# One paced batch of replayed samples
+#   timestamps: recorded timestamps (n,)
+#   wall_times: wall-clock time at which each sample is "replayed" (n,)
+#   values:     channel values (n, channels)
+ReplayBatch = namedtuple('ReplayBatch', ['timestamps', 'wall_times', 'values'])
+
+
+def parse_csv_rows(text, columns):
+    """Parse complete CSV rows into a (rows, columns) float array."""
+    if not text.strip():
+        return np.empty((0, columns))
+    rows = np.loadtxt(io.StringIO(text), delimiter=',', ndmin=2, dtype=float)
+    if rows.shape[1] != columns:
+        raise ValueError(f"Expected {columns} columns, got {rows.shape[1]}")
+    return rows
+
+
+class CSVReplayEngine:
+    """Replay an EEG CSV recording paced by its recorded timestamps.
+
+    The file is parsed in blocks, emitted in small batches against a
+    monotonic clock (so sleep granularity does not accumulate drift) and
+    can be sped up, slowed down, looped and seeked by time through a
+    line-offset index built when the file is opened.
+
+    With `cache` (a recordings.CachedRecording) rows are sliced from the
+    memory-mapped binary cache instead, seeking searches its timestamps and
+    no index scan is needed; only rows appended to the CSV after the cache
+    was built are parsed.
+    """
+
+    def __init__(self, file_path, speed=1.0, loop=False, follow=False,
+                 block_bytes=BLOCK_BYTES, index_interval=INDEX_INTERVAL, batch_seconds=BATCH_SECONDS,
+                 cache=None):
+        self.file_path = file_path
+        self.loop = loop
+        self.follow = follow
+        self.block_bytes = block_bytes
+        self.index_interval = index_interval
+        self.batch_seconds = batch_seconds
+        self.speed = 1.0
+        self.set_speed(speed)
+
+        with open(file_path, 'rb') as f:
+            header = f.readline()
+            self.data_offset = f.tell()
+        self.header = header.decode('utf-8').strip().split(',')
+        self.columns = len(self.header)
+        self.channel_count = self.columns - 1
+        self.cache = cache
+        self.block_rows = max(1, block_bytes // (12 * self.columns))
+        self._row = 0
+
+        if cache is not None:
+            # Row positions into the cached array stand in for the line-offset index
+            self.row_count = len(cache.data)
+            self.index_rows = np.arange(0, self.row_count, index_interval)
+            self.index_offsets = np.full(len(self.index_rows), cache.data_end, dtype=np.int64)
+            self.index_timestamps = np.asarray(cache.data[self.index_rows, 0]) if self.row_count else np.empty(0)
+        else:
+            # Line-offset index: (row number, byte offset, timestamp) every index_interval rows
+            self.index_rows, self.index_offsets, self.index_timestamps = self._build_index()
+        self.start_timestamp = self.index_timestamps[0] if len(self.index_timestamps) else None
+
+        self._offset = cache.data_end if cache is not None else self.data_offset
+        self._pending = None
+        self._skip_before = None
+        self._anchor_mono = None
+        self._anchor_ts = None
+        self._stopped = False
+        self._generation = 0
+
+    def _build_index(self):
+        """Scan the file once and record the byte offset of every Nth row."""
+        rows, offsets = [], []
+        row = 0
+        with open(self.file_path, 'rb') as f:
+            f.seek(self.data_offset)
+            base = self.data_offset
+            line_start = base
+            while True:
+                chunk = f.read(1024 * 1024)
+                if not chunk:
+                    break
+                newlines = np.flatnonzero(np.frombuffer(chunk, dtype=np.uint8) == 10)
+                if len(newlines):
+                    # Start offsets of every complete line ending in this chunk
+                    starts = np.concatenate(([line_start], base + newlines[:-1] + 1))
+                    selected = np.flatnonzero((row + np.arange(len(starts))) % self.index_interval == 0)
+                    rows.extend((row + selected).tolist())
+                    offsets.extend(starts[selected].tolist())
+                    row += len(starts)
+                    line_start = base + int(newlines[-1]) + 1
+                base += len(chunk)
+
+            # A final row without a trailing newline still counts
+            if line_start < base:
+                if row % self.index_interval == 0:
+                    rows.append(row)
+                    offsets.append(line_start)
+                row += 1
+
+            timestamps = []
+            for offset in offsets:
+                f.seek(offset)
+                timestamps.append(float(f.readline().split(b',', 1)[0]))
+
+        self.row_count = row
+        return np.array(rows, dtype=np.int64), np.array(offsets, dtype=np.int64), np.array(timestamps)
+
+    @property
+    def duration(self):
+        """Approximate recorded duration in seconds (up to the last indexed row)."""
+        if self.start_timestamp is None:
+            return 0.0
+        return float(self.index_timestamps[-1] - self.start_timestamp)
+
+    def set_speed(self, speed):
+        """Change the replay speed multiplier (clamped to 0.25x-100x)."""
+        speed = min(MAX_SPEED, max(MIN_SPEED, float(speed)))
+        if speed != self.speed:
+            self.speed = speed
+            self.resync()
+
+    def resync(self):
+        """Re-anchor pacing at the next batch (after a pause or a speed change)."""
+        self._anchor_mono = None
+        self._anchor_ts = None
+
+    def stop(self):
+        """Stop an ongoing replay at the next batch boundary."""
+        self._stopped = True
+
+    def seek(self, seconds):
+        """Position the replay at `seconds` after the first recorded sample."""
+        if self.start_timestamp is None:
+            return
+        target = self.start_timestamp + max(0.0, float(seconds))
+        if self.cache is not None:
+            self._row = int(np.searchsorted(self.cache.data[:, 0], target, side='left'))
+            self._offset = self.cache.data_end
+        else:
+            pos = max(0, int(np.searchsorted(self.index_timestamps, target, side='right')) - 1)
+            self._offset = int(self.index_offsets[pos])
+        self._pending = None
+        self._skip_before = target
+        self._generation += 1
+        self.resync()
+
+    def _read_block(self):
+        """Read and parse the next block of complete rows from the current offset."""
+        if self.cache is not None and self._row < len(self.cache.data):
+            rows = np.array(self.cache.data[self._row:self._row + self.block_rows])
+            self._row += len(rows)
+            return self._skip_seeked(rows)
+        with open(self.file_path, 'rb') as f:
+            f.seek(self._offset)
+            chunk = f.read(self.block_bytes)
+        end = chunk.rfind(b'\n')
+        if end < 0:
+            # Last row without a trailing newline only counts once the file is complete
+            if chunk and not self.follow and self._offset + len(chunk) == os.path.getsize(self.file_path):
+                end = len(chunk) - 1
+            else:
+                return None
+        self._offset += end + 1
+        rows = parse_csv_rows(chunk[:end + 1].decode('utf-8'), self.columns)
+        return self._skip_seeked(rows)
+
+    def _skip_seeked(self, rows):
+        """Drop rows before a pending seek target."""
+        if self._skip_before is not None:
+            rows = rows[rows[:, 0] >= self._skip_before]
+            self._skip_before = None if len(rows) else self._skip_before
+        return rows
+
+    def _pace(self, last_timestamp):
+        """Sleep until the batch ending at `last_timestamp` is due."""
+        if self._anchor_mono is None:
+            return
+        due = self._anchor_mono + (last_timestamp - self._anchor_ts) / self.speed
+        delay = due - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def batches(self, should_continue=None):
+        """Yield paced ReplayBatch objects until EOF (or forever when looping/following)."""
+        self._stopped = False
+        while not self._stopped and (should_continue is None or should_continue()):
+            rows = self._pending if self._pending is not None else self._read_block()
+            self._pending = None
+
+            if rows is None:
+                if self.loop and self.start_timestamp is not None:
+                    self.seek(0)
+                    continue
+                if self.follow:
+                    time.sleep(FOLLOW_POLL)
+                    continue
+                return
+            if len(rows) == 0:
+                continue
+
+            timestamps = rows[:, 0]
+            if self._anchor_mono is None:
+                self._anchor_mono = time.monotonic()
+                self._anchor_ts = timestamps[0]
+
+            # Cut the block into batches each covering batch_seconds of wall-clock time
+            span = self.batch_seconds * self.speed
+            bins = np.floor((timestamps - timestamps[0]) / span).astype(np.int64)
+            edges = np.flatnonzero(np.diff(bins)) + 1
+            generation = self._generation
+            start = 0
+            for end in list(edges) + [len(rows)]:
+                if generation != self._generation:
+                    # Seeked while this block was being emitted
+                    break
+                if self._stopped or (should_continue is not None and not should_continue()):
+                    self._pending = rows[start:]
+                    return
+                batch = rows[start:end]
+                self._pace(batch[-1, 0])
+                if self._anchor_mono is None:
+                    # Pacing was resynced while this batch was pending
+                    self._anchor_mono = time.monotonic()
+                    self._anchor_ts = batch[0, 0]
+                wall_times = self._anchor_wall() + (batch[:, 0] - self._anchor_ts) / self.speed
+                yield ReplayBatch(batch[:, 0], wall_times, batch[:, 1:])
+                start = end
+
+    def _anchor_wall(self):
+        """Wall-clock time corresponding to the pacing anchor."""
+        return time.time() - (time.monotonic() - self._anchor_mono)
@@ -0,0 +1,192 @@
+import bisect
+import threading
+import time
+
+import numpy as np
+
+# Log-spaced bucket edges from 10 us to 100 s, 20 buckets per decade
+BUCKET_EDGES_MS = np.logspace(-2, 5, 7 * 20 + 1)
+_BUCKET_EDGES = BUCKET_EDGES_MS.tolist()   # For bisect on the scalar path
+SUMMARY_INTERVAL = 10.0     # Seconds between periodic summary logs
+
+
+class LatencyHistogram:
+    """Fixed log-bucket histogram of latencies in milliseconds.
+
+    Recording is a bucket lookup and an increment, cheap enough for the
+    streaming hot path; percentiles are read from the cumulative counts
+    (accurate to the ~12% bucket width).
+    """
+
+    def __init__(self):
+        self.counts = np.zeros(len(BUCKET_EDGES_MS) + 1, dtype=np.int64)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, latency_ms):
+        """Record a single latency in milliseconds."""
+        # Scalar path without NumPy temporaries; same buckets as record_many
+        latency_ms = max(float(latency_ms), 0.0)
+        bucket = bisect.bisect_left(_BUCKET_EDGES, latency_ms)
+        with self._lock:
+            self.counts[bucket] += 1
+            self.count += 1
+            self.total_ms += latency_ms
+            if latency_ms > self.max_ms:
+                self.max_ms = latency_ms
+
+    def record_many(self, latencies_ms):
+        """Record an array of latencies in milliseconds (negative values count as zero)."""
+        latencies_ms = np.maximum(np.asarray(latencies_ms, dtype=float), 0.0)
+        if latencies_ms.size == 0:
+            return
+        buckets = np.searchsorted(BUCKET_EDGES_MS, latencies_ms)
+        with self._lock:
+            np.add.at(self.counts, buckets, 1)
+            self.count += latencies_ms.size
+            self.total_ms += float(latencies_ms.sum())
+            self.max_ms = max(self.max_ms, float(latencies_ms.max()))
+
+    @classmethod
+    def combine(cls, *histograms):
+        """New histogram holding the records of every given histogram (None entries are skipped)."""
+        combined = cls()
+        for histogram in histograms:
+            if histogram is None:
+                continue
+            with histogram._lock:
+                combined.counts += histogram.counts
+                combined.count += histogram.count
+                combined.total_ms += histogram.total_ms
+                combined.max_ms = max(combined.max_ms, histogram.max_ms)
+        return combined
+
+    def percentile(self, q):
+        """Approximate q-th percentile (0-100) in milliseconds."""
+        with self._lock:
+            if self.count == 0:
+                return None
+            cumulative = np.cumsum(self.counts)
+            max_ms = self.max_ms
+        bucket = int(np.searchsorted(cumulative, q / 100.0 * cumulative[-1]))
+        # Report the bucket's upper edge, never above the largest value seen
+        edge = BUCKET_EDGES_MS[bucket] if bucket < len(BUCKET_EDGES_MS) else max_ms
+        return float(min(edge, max_ms))
+
+    def summary(self):
+        """Count, mean, p50/p95/p99 and max in milliseconds."""
+        if self.count == 0:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total_ms / self.count, 3),
+            'p50_ms': round(self.percentile(50), 3),
+            'p95_ms': round(self.percentile(95), 3),
+            'p99_ms': round(self.percentile(99), 3),
+            'max_ms': round(self.max_ms, 3),
+        }
+
+
+class LatencyTracker:
+    """Named per-hop latency histograms with a periodic summary."""
+
+    def __init__(self, summary_interval=SUMMARY_INTERVAL):
+        self.hops = {}
+        self.summary_interval = summary_interval
+        self._last_summary = time.monotonic()
+        self._lock = threading.Lock()
+
+    def histogram(self, hop):
+        """Return the histogram for `hop`, creating it on first use."""
+        histogram = self.hops.get(hop)
+        if histogram is None:
+            with self._lock:
+                histogram = self.hops.setdefault(hop, LatencyHistogram())
+        return histogram
+
+    def record(self, hop, seconds):
+        """Record latencies in seconds (scalar or array) for `hop`."""
+        self.histogram(hop).record_many(np.asarray(seconds, dtype=float).ravel() * 1000.0)
+
+    def summary(self):
+        """Per-hop summary dictionaries."""
+        return {hop: histogram.summary() for hop, histogram in list(self.hops.items())}
+
+    def format_summary(self):
+        """One-line human readable summary of every hop."""
+        parts = []
+        for hop, stats in self.summary().items():
+            if stats['count']:
+                parts.append(f"{hop} p50 {stats['p50_ms']:.1f} p95 {stats['p95_ms']:.1f} "
+                             f"p99 {stats['p99_ms']:.1f} ms (n={stats['count']})")
+        return "Latency: " + (" | ".join(parts) if parts else "no samples")
+
+    def summary_due(self):
+        """True once per summary interval; used to emit periodic summary logs."""
+        now = time.monotonic()
+        if now - self._last_summary >= self.summary_interval:
+            self._last_summary = now
+            return True
+        return False
+
+    def reset(self):
+        """Drop all recorded latencies."""
+        with self._lock:
+            self.hops = {}
+
+
+class RollingLatencyTracker(LatencyTracker):
+    """LatencyTracker whose summary covers only recent records, plus a whole-session view.
+
+    Histograms are rotated every `window` seconds and summary() combines the
+    previous and current windows, so it follows recent behaviour without
+    any per-record bookkeeping beyond a bucket increment.
+    """
+
+    def __init__(self, window=10.0, summary_interval=SUMMARY_INTERVAL):
+        super().__init__(summary_interval)
+        self.window = window
+        self.previous = {}
+        self.session = LatencyTracker(summary_interval)
+        self._rotated = time.monotonic()
+
+    def record(self, hop, seconds):
+        """Record one latency in seconds for `hop`."""
+        now = time.monotonic()
+        if now - self._rotated >= self.window:
+            with self._lock:
+                self.previous, self.hops = self.hops, {}
+                self._rotated = now
+        self.histogram(hop).record(seconds * 1000.0)
+        self.session.histogram(hop).record(seconds * 1000.0)
+
+    def summary(self):
+        """Per-hop summaries of the last one to two windows."""
+        current, previous = dict(self.hops), dict(self.previous)
+        hops = list(previous) + [hop for hop in current if hop not in previous]
+        return {hop: LatencyHistogram.combine(previous.get(hop), current.get(hop)).summary() for hop in hops}
+
+    def session_summary(self):
+        """Per-hop summaries since the tracker was created (or reset)."""
+        return self.session.summary()
+
+    def reset(self):
+        with self._lock:
+            self.hops = {}
+            self.previous = {}
+        self.session.reset()
+
+
+def probe_packet(tracker, packet, received=None):
+    """Record consumer-side hops for a received EEG_STREAM packet.
+
+    Adds `emit->consumer` (bridge emit to receipt) and `board->consumer`
+    (board acquisition to receipt) when the packet carries those stamps.
+    """
+    received = time.time() if received is None else received
+    if 'emit_time' in packet:
+        tracker.record('emit->consumer', received - packet['emit_time'])
+    if 'board_timestamp' in packet:
+        tracker.record('board->consumer', received - packet['board_timestamp'])
@@ -0,0 +1,145 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from latency import LatencyHistogram
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+SUMMARY_QUANTILES = (50, 95, 99)
+
+
+class Counter:
+    """Monotonic counter.
+
+    Several threads increment the same counters (the acquisition thread,
+    the recorder and the stop path), so increments take a lock; reads see
+    the last complete value without one.
+    """
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def snapshot(self):
+        return self.value
+
+    def samples(self):
+        return [(self.name, '', self.value)]
+
+
+class Gauge:
+    """Value that goes up and down; `function` is called at read time when given."""
+
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, function=None):
+        self.name = name
+        self.help = help_text
+        self.function = function
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+    def snapshot(self):
+        return self.function() if self.function else self.value
+
+    def samples(self):
+        return [(self.name, '', self.snapshot())]
+
+
+class Timer:
+    """Duration histogram in seconds, exported as a Prometheus summary."""
+
+    kind = 'summary'
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.histogram = LatencyHistogram()
+
+    def observe(self, seconds):
+        self.histogram.record(seconds * 1000.0)
+
+    def snapshot(self):
+        return self.histogram.summary()
+
+    def samples(self):
+        histogram = self.histogram
+        samples = []
+        for q in SUMMARY_QUANTILES:
+            value = histogram.percentile(q)
+            samples.append((self.name, f'{{quantile="{q / 100}"}}', value / 1000.0 if value is not None else 'NaN'))
+        samples.append((self.name + '_sum', '', histogram.total_ms / 1000.0))
+        samples.append((self.name + '_count', '', histogram.count))
+        return samples
+
+
+class MetricsRegistry:
+    """Named counters, gauges and timers with JSON and Prometheus text views."""
+
+    def __init__(self, prefix=''):
+        self.prefix = prefix
+        self.metrics = {}
+
+    def _register(self, metric):
+        self.metrics[metric.name[len(self.prefix):]] = metric
+        return metric
+
+    def counter(self, name, help_text):
+        return self._register(Counter(self.prefix + name, help_text))
+
+    def gauge(self, name, help_text, function=None):
+        return self._register(Gauge(self.prefix + name, help_text, function))
+
+    def timer(self, name, help_text):
+        return self._register(Timer(self.prefix + name, help_text))
+
+    def snapshot(self):
+        """Current values keyed by metric name (without the prefix)."""
+        return {name: metric.snapshot() for name, metric in self.metrics.items()}
+
+    def prometheus_text(self):
+        """Render every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{labels} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def serve_metrics(registry, port, host='127.0.0.1'):
+    """Serve Prometheus text on http://host:port/metrics from a daemon thread.
+
+    Returns the server; call shutdown() on it to stop serving.
+    """
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+            body = registry.prometheus_text().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', PROMETHEUS_CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # Keep scrape requests out of the bridge's stdout
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
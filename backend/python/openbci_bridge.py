@@ -7,11 +7,21 @@ import numpy as np
 from datetime import datetime
 import traceback
 import subprocess
-import queue
+import signal
 import threading
 
-# Add delay for initialization
-time.sleep(1)
+from synthetic_eeg import SyntheticEEGGenerator, GeneratorBoard
+from latency import LatencyTracker
+from metrics import MetricsRegistry, serve_metrics
+from profiling import start_profiling, default_report_path
+from recordings import RECORDINGS_DIR, RecordingWriter, read_clock
+from summaries import RecordingSummary, summary_path
+from edf_export import EDFWriter, convert_file
+from readiness import INITIAL_INTERVAL, BACKOFF_FACTOR, ReadinessTimeout, serial_port_ready, wait_until
+from port_discovery import PROBE_TIMEOUT, candidate_ports, probe_concurrently
+from acquisition_bus import AcquisitionBus, make_chunk
+from stream_emitter import EMIT_POLICIES, DEFAULT_EMIT_POLICY, DECIMATE_FACTOR, StreamEmitter, stdout_lock
+from shm_ring import DEFAULT_SHM_NAME, RingWriter
 
 try:
     from brainflow.board_shim import BoardShim, BrainFlowInputParams, BoardIds, LogLevels
@@ -32,84 +42,489 @@ is_streaming = False
 
 # Visualization-related globals
 visualizer_process = None
-data_queue = queue.Queue()
 stream_running = False
 data_thread = None
 
+# The acquisition thread (data_thread) publishes board chunks on the bus; the stdout emitter and
+# the recorder each consume them on their own thread from their own bounded queue
+acquisition_bus = None
+stdout_emitter = None
+recorder_thread = None
+WEB_QUEUE_CHUNKS = 256        # Live view: drop the oldest chunks when stdout falls behind
+RECORDER_QUEUE_CHUNKS = 4096  # Recording: minutes of polls; new chunks are dropped (and logged as gaps) when full
+CONSUMER_JOIN_TIMEOUT = 10.0
+STDOUT_DRAIN_TIMEOUT = 1.0    # A stalled Node reader must not hold up stopping
+
+# How the stdout emitter catches up while Node reads slower than the board streams
+stdout_policy = DEFAULT_EMIT_POLICY
+decimate_factor = DECIMATE_FACTOR
+
+# Optional shared-memory ring buffer (named shm_name) that local readers such as the
+# visualizer attach to instead of parsing stdout; a third bus consumer writes it
+shm_name = None
+shm_writer = None
+shm_thread = None
+SHM_QUEUE_CHUNKS = 256
+
+# Serial port of the streaming session, for reconnecting when the board stalls or fails
+stream_serial_port = None
+reconnecting = False
+
+# Set to wake the stream thread at once when it is stopped
+stream_wakeup = threading.Event()
+
+# A long-running stream action registers itself here; stop_recording in another process
+# leaves a stop request for it and waits for the result it writes back
+SESSION_FILE = os.path.join('uploads', 'stream_session.json')
+STOP_TIMEOUT = 10.0
+STOP_POLL_INTERVAL = 0.02
+
+# Export threads still finishing after an asynchronous stop
+pending_finalizers = []
+
+# Recording file written incrementally while samples are streamed (None when idle),
+# with its per-channel summary accumulated alongside
+recording_writer = None
+recording_summary = None
+
+# Optional EDF+/BDF+ copy of the recording ('edf' or 'bdf'), written live next to the CSV
+export_format = None
+recording_export = None
+
+# Per-hop latency from board acquisition to stdout emit
+latency_tracker = LatencyTracker()
+STATUS_FILE = os.path.join('uploads', 'bridge_status.json')
+
+# Board type detected on each serial port, so later connections skip the board types that failed
+BOARD_CACHE_FILE = os.path.join('uploads', 'board_cache.json')
+# Ports are probed in parallel during discovery; cache updates are read-modify-write
+board_cache_lock = threading.Lock()
+
+# Runtime metrics, reported by the status action and optionally as Prometheus text
+session_started = None
+metrics = MetricsRegistry(prefix='openbci_bridge_')
+samples_acquired = metrics.counter('samples_acquired_total', 'Samples read from the board')
+samples_emitted = metrics.counter('samples_emitted_total', 'Samples written to stdout as EEG_STREAM packets')
+samples_written = metrics.counter('samples_written_total', 'Samples saved to recording files')
+dropped_chunks = metrics.counter('dropped_chunks_total', 'Chunks lost to errors in the stream loop')
+recorder_dropped_samples = metrics.counter('recorder_dropped_samples_total',
+                                           'Samples left out of the recording while its queue was full')
+file_bytes_written = metrics.counter('file_bytes_written_total', 'Bytes written to recording files')
+board_buffer_depth = metrics.gauge('board_buffer_samples', 'Samples waiting in the board buffer at the last poll')
+metrics.gauge('data_queue_depth', 'Chunks waiting in the acquisition bus subscriber queues',
+              lambda: acquisition_bus.depth() if acquisition_bus is not None else 0)
+metrics.gauge('stdout_dropped_samples', 'Samples left out of the stdout stream while Node fell behind',
+              lambda: stdout_emitter.dropped_samples if stdout_emitter is not None else 0)
+metrics.gauge('stdout_decimated_samples', 'Samples left out by decimating the stdout stream while Node fell behind',
+              lambda: stdout_emitter.decimated_samples if stdout_emitter is not None else 0)
+metrics.gauge('stdout_coalesced_samples', 'Samples written to stdout in coalesced writes while Node fell behind',
+              lambda: stdout_emitter.coalesced_samples if stdout_emitter is not None else 0)
+metrics.gauge('session_uptime_seconds', 'Seconds since the current streaming session started',
+              lambda: session_uptime())
+poll_time = metrics.timer('poll_seconds', 'Time to poll the board for new samples')
+serialization_time = metrics.timer('serialization_seconds', 'Time to serialize a chunk into EEG_STREAM packets')
+connect_time = metrics.timer('connect_seconds', 'Time from a connect request until the board session is ready')
+first_sample_time = metrics.timer('first_sample_seconds', 'Time from a connect request until the first sample is read')
+connect_attempts = metrics.counter('connect_attempts_total',
+                                   'Board session attempts, including retries while the board gets ready')
+connect_failures = metrics.counter('connect_failures_total', 'Connect requests that failed or timed out')
+board_cache_hits = metrics.counter('board_cache_hits_total', 'Connections that tried the cached board type first')
+stream_faults = metrics.counter('stream_faults_total', 'Board stalls and repeated read errors while streaming')
+reconnects = metrics.counter('reconnects_total', 'Board sessions reopened to resume a stalled or failed stream')
+reconnect_time = metrics.timer('reconnect_seconds', 'Time from a stream fault until the board streams again')
+stop_time = metrics.timer('stop_seconds', 'Time for stop_recording to flush and finalize the recording')
+discovery_time = metrics.timer('discovery_seconds', 'Time to probe every candidate serial port for a board')
+
+# Deadlines for the board to get ready; readiness is polled with backoff instead of fixed sleeps
+CONNECT_TIMEOUT = 10.0      # Serial device plus BrainFlow session, in seconds
+FIRST_SAMPLE_TIMEOUT = 5.0  # First sample after starting the stream, in seconds
+connect_timeout = CONNECT_TIMEOUT
+connect_started = None
+
+# Stream supervision: a board that sends nothing for STALL_TIMEOUT seconds, or whose reads fail
+# MAX_POLL_ERRORS times in a row, is reopened with backoff up to RECONNECT_MAX_INTERVAL between tries
+STALL_TIMEOUT = 2.0
+MAX_POLL_ERRORS = 3
+RECONNECT_MAX_INTERVAL = 5.0
+
+# Board id used when the synthetic EEG generator stands in for a physical board
+GENERATOR_BOARD_ID = 'generator'
+
+# Board source selected with --board, and the board types each source tries in order
+BOARD_SOURCES = {
+    'cyton': ['cyton_daisy', 'cyton'],
+    'synthetic': ['synthetic'],
+    'playback': ['playback'],
+    'generator': ['generator'],
+}
+BOARD_LABELS = {
+    'cyton_daisy': 'Cyton+Daisy',
+    'cyton': 'Cyton',
+    'synthetic': 'BrainFlow synthetic',
+    'playback': 'Playback file',
+    'generator': 'Synthetic EEG generator',
+}
+PLAYBACK_DIR = os.path.join('uploads', 'eeg', 'playback')
+
+board_source = 'cyton'
+playback_file = None
+playback_master_board_id = None
+generator_channels = 16
+generator_rate = 250
+
+def board_type_name(board_id):
+    """Return the board type reported to Node for a board id."""
+    if board_id == GENERATOR_BOARD_ID:
+        return 'generator'
+    if board_id == BoardIds.SYNTHETIC_BOARD:
+        return 'synthetic'
+    if board_id == BoardIds.PLAYBACK_FILE_BOARD:
+        return 'playback'
+    return 'cyton_daisy' if board_id == BoardIds.CYTON_DAISY_BOARD else 'cyton'
+
+def descriptor_board_id(board_id):
+    """Board id whose channel layout describes the data (the recorded board for playback)."""
+    if board_id == BoardIds.PLAYBACK_FILE_BOARD:
+        return playback_master_board_id
+    return board_id
+
+def get_sampling_rate(board_id):
+    """Sampling rate of the current board type."""
+    if board_id == GENERATOR_BOARD_ID:
+        return generator_rate
+    return BoardShim.get_sampling_rate(descriptor_board_id(board_id))
+
+def get_eeg_channels(board_id):
+    """Rows of the board data holding EEG channels."""
+    if board_id == GENERATOR_BOARD_ID:
+        return list(range(1, generator_channels + 1))
+    return BoardShim.get_eeg_channels(descriptor_board_id(board_id))
+
+def get_timestamp_channel(board_id):
+    """Row of the board data holding timestamps."""
+    if board_id == GENERATOR_BOARD_ID:
+        return generator_channels + 1
+    return BoardShim.get_timestamp_channel(descriptor_board_id(board_id))
+
+def get_package_num_channel(board_id):
+    """Row of the board data holding the package counter (used to find dropped samples)."""
+    if board_id == GENERATOR_BOARD_ID:
+        return 0
+    return BoardShim.get_package_num_channel(descriptor_board_id(board_id))
+
+def board_available():
+    """True when BrainFlow is usable or the synthetic generator is the board source."""
+    return BRAINFLOW_AVAILABLE or board_source == 'generator' or current_board_id == GENERATOR_BOARD_ID
+
+def prepare_playback_file(recording):
+    """Convert one of our CSV recordings into a BrainFlow playback file.
+    
+    Returns (playback_path, master_board_id). The recording is laid out like the
+    Cyton (up to 8 channels) or Cyton+Daisy board it was recorded from; the
+    converted file is cached in uploads/eeg/playback until the recording changes.
+    """
+    from brainflow.data_filter import DataFilter
+    
+    if not os.path.dirname(recording) and not os.path.exists(recording):
+        recording = os.path.join('uploads', 'eeg', recording)
+    
+    with open(recording, 'r') as f:
+        channel_count = len(f.readline().strip().split(',')) - 1
+    master_board_id = BoardIds.CYTON_DAISY_BOARD if channel_count > 8 else BoardIds.CYTON_BOARD
+    
+    os.makedirs(PLAYBACK_DIR, exist_ok=True)
+    playback_path = os.path.join(PLAYBACK_DIR, os.path.splitext(os.path.basename(recording))[0] + '.txt')
+    if os.path.exists(playback_path) and os.path.getmtime(playback_path) >= os.path.getmtime(recording):
+        return playback_path, master_board_id
+    
+    rows = np.loadtxt(recording, delimiter=',', skiprows=1, ndmin=2)
+    data = np.zeros((BoardShim.get_num_rows(master_board_id), rows.shape[0]))
+    data[BoardShim.get_timestamp_channel(master_board_id)] = rows[:, 0]
+    data[BoardShim.get_eeg_channels(master_board_id)[:channel_count]] = rows[:, 1:].T
+    DataFilter.write_file(data, playback_path, 'w')
+    
+    print(f"Prepared playback file {playback_path} from {recording}", file=sys.stderr)
+    return playback_path, master_board_id
+
+def create_board(board_type, serial_port):
+    """Create an unprepared board of `board_type`; returns (board, board_id)."""
+    global playback_master_board_id
+    
+    if board_type == 'generator':
+        return GeneratorBoard(SyntheticEEGGenerator(generator_channels, generator_rate)), GENERATOR_BOARD_ID
+    
+    params = BrainFlowInputParams()
+    if board_type == 'synthetic':
+        board_id = BoardIds.SYNTHETIC_BOARD
+    elif board_type == 'playback':
+        if not playback_file:
+            raise Exception("No playback file given (--playback_file)")
+        params.file, playback_master_board_id = prepare_playback_file(playback_file)
+        params.master_board = playback_master_board_id
+        board_id = BoardIds.PLAYBACK_FILE_BOARD
+    else:
+        params.serial_port = serial_port
+        board_id = BoardIds.CYTON_DAISY_BOARD if board_type == 'cyton_daisy' else BoardIds.CYTON_BOARD
+    
+    return BoardShim(board_id, params), board_id
+
+def read_board_cache():
+    """Board types detected per serial port ({} when there is no cache file)."""
+    try:
+        with open(BOARD_CACHE_FILE, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def write_board_cache(cache):
+    try:
+        os.makedirs(os.path.dirname(BOARD_CACHE_FILE), exist_ok=True)
+        with open(BOARD_CACHE_FILE + '.tmp', 'w') as f:
+            json.dump(cache, f, indent=2)
+        os.replace(BOARD_CACHE_FILE + '.tmp', BOARD_CACHE_FILE)
+    except Exception as e:
+        print(f"Could not save board cache: {e}", file=sys.stderr)
+
+def cached_board_type(serial_port):
+    """Board type last detected on a serial port, or None."""
+    entry = read_board_cache().get(serial_port)
+    return entry['board_type'] if entry else None
+
+def remember_board_type(serial_port, board_type, board_id):
+    """Cache the board type detected on a serial port with its channel layout and sampling rate."""
+    try:
+        entry = {
+            'board_type': board_type,
+            'board_id': int(board_id),
+            'eeg_channels': [int(channel) for channel in BoardShim.get_eeg_channels(board_id)],
+            'sampling_rate': int(BoardShim.get_sampling_rate(board_id)),
+            'detected': datetime.now().isoformat()
+        }
+    except Exception as e:
+        print(f"Could not describe {board_type} board for the cache: {e}", file=sys.stderr)
+        return
+    with board_cache_lock:
+        cache = read_board_cache()
+        if {key: value for key, value in cache.get(serial_port, {}).items() if key != 'detected'} != \
+                {key: value for key, value in entry.items() if key != 'detected'}:
+            cache[serial_port] = entry
+            write_board_cache(cache)
+
+def forget_board_type(serial_port):
+    """Drop the cached board type of a serial port after it failed to connect."""
+    with board_cache_lock:
+        cache = read_board_cache()
+        if cache.pop(serial_port, None) is not None:
+            write_board_cache(cache)
+
+def board_type_order(serial_port):
+    """Board types of the board source in the order to try them, the cached type first."""
+    board_types = BOARD_SOURCES[board_source]
+    cached = cached_board_type(serial_port) if board_source == 'cyton' and serial_port else None
+    if cached not in board_types:
+        return board_types, None
+    return [cached] + [board_type for board_type in board_types if board_type != cached], cached
+
+def open_board(serial_port, start=False):
+    """Prepare (and optionally start streaming) the first board type of the board source that works.
+    
+    For a Cyton the board type cached for the serial port is tried first;
+    it is dropped from the cache if it fails, and the type that works is
+    cached. Returns (board, board_id, board_type); raises when every
+    board type fails.
+    """
+    board_types, cached = board_type_order(serial_port)
+    if cached:
+        board_cache_hits.inc()
+        print(f"Using cached {BOARD_LABELS[cached]} board type for {serial_port}", file=sys.stderr)
+    
+    errors = []
+    for board_type in board_types:
+        label = BOARD_LABELS[board_type]
+        board = None
+        try:
+            print(f"Trying {label} board...", file=sys.stderr)
+            board, board_id = create_board(board_type, serial_port)
+            
+            print("Preparing session...", file=sys.stderr)
+            board.prepare_session()
+            if board_type == 'playback':
+                # Replay the recording in a loop with live timestamps
+                board.config_board('loopback_true')
+                board.config_board('new_timestamps')
+            if start:
+                board.start_stream()
+            
+            print(f"{label} board ready", file=sys.stderr)
+            if board_source == 'cyton' and serial_port:
+                remember_board_type(serial_port, board_type, board_id)
+            return board, board_id, board_type
+        except Exception as e:
+            print(f"Failed with {label} board: {e}", file=sys.stderr)
+            print(traceback.format_exc(), file=sys.stderr)
+            errors.append(f"{label}: {e}")
+            if board_type == cached:
+                forget_board_type(serial_port)
+            
+            # Do not leave a half-opened session holding the port
+            if board is not None:
+                try:
+                    if board.is_prepared():
+                        board.release_session()
+                except Exception:
+                    pass
+    
+    raise Exception(f"Could not connect to any board type: {'; '.join(errors)}")
+
+def port_can_be_probed(serial_port):
+    """True for serial ports that name a device we can open (a path, or a COM port on Windows)."""
+    if not serial_port:
+        return False
+    if os.name == 'nt':
+        return serial_port.upper().startswith('COM') or serial_port.startswith('\\\\')
+    return os.path.isabs(serial_port)
+
+def connect_board(serial_port, start=False):
+    """Open the board of the board source as soon as it is ready.
+    
+    For a Cyton on a serial device, the device is polled until it can be
+    opened, then the BrainFlow session is retried while it fails, both with
+    exponential backoff, until connect_timeout. Other sources are opened
+    once. Returns (board, board_id, board_type) like open_board.
+    """
+    global connect_started
+    
+    connect_started = time.monotonic()
+    
+    def attempt():
+        connect_attempts.inc()
+        return open_board(serial_port, start)
+    
+    try:
+        if board_source == 'cyton' and port_can_be_probed(serial_port):
+            _, attempts, elapsed = wait_until(lambda: serial_port_ready(serial_port), connect_timeout,
+                                              f'Serial port {serial_port}')
+            print(f"Serial port {serial_port} ready after {elapsed:.3f} s ({attempts} probes)", file=sys.stderr)
+            remaining = max(connect_timeout - (time.monotonic() - connect_started), 0)
+            opened, attempts, _ = wait_until(attempt, remaining, 'Board session')
+        else:
+            opened, attempts = attempt(), 1
+    except ReadinessTimeout as e:
+        connect_failures.inc()
+        # Report the board's own error rather than the timeout alone
+        raise Exception(str(e.last_error or e)) from e
+    except Exception:
+        connect_failures.inc()
+        raise
+    
+    elapsed = time.monotonic() - connect_started
+    connect_time.observe(elapsed)
+    print(f"Board session ready after {elapsed:.3f} s ({attempts} attempts)", file=sys.stderr)
+    return opened
+
+def probe_port(serial_port):
+    """Detect the Cyton board on one serial port and release it again.
+    
+    Returns a discovery result: 'found' with the board type, channel count
+    and sampling rate, 'busy' when the device cannot be opened (missing,
+    in use or no permission) or 'no_board' when no board type answers.
+    """
+    started = time.monotonic()
+    result = {'port': serial_port}
+    if port_can_be_probed(serial_port) and not serial_port_ready(serial_port):
+        result.update(status='busy', message='Port cannot be opened (missing, in use or no permission)')
+    else:
+        try:
+            board, board_id, board_type = open_board(serial_port)
+        except Exception as e:
+            result.update(status='no_board', message=str(e))
+        else:
+            try:
+                result.update(status='found', board_type=board_type, label=BOARD_LABELS[board_type],
+                              channels=len(get_eeg_channels(board_id)),
+                              sampling_rate=int(get_sampling_rate(board_id)))
+            finally:
+                board.release_session()
+    result['seconds'] = round(time.monotonic() - started, 3)
+    return result
+
+def discover_boards(ports=None, timeout=PROBE_TIMEOUT):
+    """Probe serial ports for Cyton boards in parallel.
+    
+    `ports` defaults to every candidate serial port. Each port gets its own
+    `timeout`, so discovery takes about as long as the slowest port.
+    Returns every port's result and the boards that were found.
+    """
+    if board_source != 'cyton':
+        return {
+            'status': 'error',
+            'message': 'Discovery probes serial ports for Cyton boards (use --board cyton)'
+        }
+    if not BRAINFLOW_AVAILABLE:
+        return {
+            'status': 'error',
+            'message': 'BrainFlow library not available'
+        }
+    
+    ports = candidate_ports() if ports is None else ports
+    print(f"Probing {len(ports)} serial ports: {', '.join(ports) or 'none'}", file=sys.stderr)
+    started = time.monotonic()
+    results = probe_concurrently(ports, probe_port, timeout)
+    elapsed = time.monotonic() - started
+    discovery_time.observe(elapsed)
+    boards = [result for result in results if result['status'] == 'found']
+    
+    return {
+        'status': 'success',
+        'message': f"Found {len(boards)} board{'s' if len(boards) != 1 else ''} on {len(ports)} serial ports",
+        'boards': boards,
+        'ports': results,
+        'elapsed': round(elapsed, 3)
+    }
+
+def observe_first_sample():
+    """Record the time from the last connect request to its first sample (once per connect)."""
+    global connect_started
+    
+    if connect_started is not None:
+        first_sample_time.observe(time.monotonic() - connect_started)
+        connect_started = None
+
+def use_generator(channel_count=16, sampling_rate=250):
+    """Use the synthetic EEG generator in place of a physical board."""
+    global board_source, generator_channels, generator_rate
+    
+    board_source = 'generator'
+    generator_channels = channel_count
+    generator_rate = sampling_rate
+    return init_board(None)
+
 def init_board(serial_port):
-    """Initialize connection to the OpenBCI board."""
+    """Initialize connection to the board of the selected board source."""
     global current_board, current_board_id, is_streaming
     
-    if not BRAINFLOW_AVAILABLE:
+    if not board_available():
         return {
             'status': 'error',
             'message': 'BrainFlow library not available'
         }
     
     try:
-        print(f"Attempting to connect to board on port: {serial_port}")
+        print(f"Attempting to connect to {board_source} board on port: {serial_port}")
         
-        # Wait a bit to ensure port is ready
-        time.sleep(3)
+        board, board_id, board_type = connect_board(serial_port)
         
-        # Set parameters for the board
-        params = BrainFlowInputParams()
-        params.serial_port = serial_port
+        # Store current board globally
+        # Do not release session so we can keep connection
+        current_board = board
+        current_board_id = board_id
+        is_streaming = False
         
-        # Try with Cyton + Daisy first (16 channels)
-        try:
-            print("Trying to connect to Cyton+Daisy board...")
-            board_id = BoardIds.CYTON_DAISY_BOARD
-            board = BoardShim(board_id, params)
-            
-            print("Preparing session...")
-            board.prepare_session()
-            print("Cyton+Daisy board connected successfully!")
-            
-            # Store current board globally
-            current_board = board
-            current_board_id = board_id
-            is_streaming = False
-            
-            # Do not release session so we can keep connection
-            # Just store a reference to the board
-            
-            return {
-                'status': 'success',
-                'message': 'Cyton+Daisy board connected successfully',
-                'board_type': 'cyton_daisy'
-            }
-        except Exception as e1:
-            print(f"Failed to connect to Cyton+Daisy: {e1}", file=sys.stderr)
-            print(traceback.format_exc(), file=sys.stderr)
-            
-            # Try with Cyton only (8 channels)
-            try:
-                print("Trying to connect to Cyton board...")
-                board_id = BoardIds.CYTON_BOARD
-                board = BoardShim(board_id, params)
-                
-                print("Preparing session...")
-                board.prepare_session()
-                print("Cyton board connected successfully!")
-                
-                # Store current board globally
-                current_board = board
-                current_board_id = board_id
-                is_streaming = False
-                
-                # Do not release session so we can keep connection
-                # Just store a reference to the board
-                
-                return {
-                    'status': 'success',
-                    'message': 'Cyton board connected successfully',
-                    'board_type': 'cyton'
-                }
-            except Exception as e2:
-                print(f"Failed to connect to Cyton: {e2}", file=sys.stderr)
-                print(traceback.format_exc(), file=sys.stderr)
-                raise Exception(f"Could not connect to either board type: {e1}, {e2}")
+        return {
+            'status': 'success',
+            'message': f'{BOARD_LABELS[board_type]} board connected successfully',
+            'board_type': board_type
+        }
     except Exception as e:
         # Print error to stderr to avoid contaminating JSON output
         print(f"Connection error: {e}", file=sys.stderr)
@@ -120,10 +535,10 @@ def init_board(serial_port):
         }
 
 def check_connection(serial_port):
-    """Check if the OpenBCI board is connected."""
+    """Check if the board is connected."""
     global current_board, current_board_id, is_streaming
     
-    if not BRAINFLOW_AVAILABLE:
+    if not board_available():
         return {
             'status': 'error',
             'connected': False,
@@ -131,6 +546,15 @@ def check_connection(serial_port):
         }
     
     try:
+        # The stream thread supervises a streaming board and reconnects it itself
+        if stream_running and is_streaming:
+            return {
+                'status': 'success',
+                'connected': not reconnecting,
+                'reconnecting': reconnecting,
+                'board_type': board_type_name(current_board_id)
+            }
+        
         # Check if we already have a board object
         if current_board is not None:
             try:
@@ -141,7 +565,7 @@ def check_connection(serial_port):
                 return {
                     'status': 'success',
                     'connected': True,
-                    'board_type': 'cyton_daisy' if current_board_id == BoardIds.CYTON_DAISY_BOARD else 'cyton'
+                    'board_type': board_type_name(current_board_id)
                 }
             except Exception as e:
                 print(f"Error with existing board: {e}")
@@ -152,62 +576,33 @@ def check_connection(serial_port):
                 current_board_id = None
                 is_streaming = False
         
-        # Try Cyton + Daisy first
+        print(f"Checking connection for {board_source} board on port: {serial_port}")
         try:
-            print(f"Checking connection for Cyton+Daisy on port: {serial_port}")
-            params = BrainFlowInputParams()
-            params.serial_port = serial_port
-            board_id = BoardIds.CYTON_DAISY_BOARD
-            board = BoardShim(board_id, params)
-            
-            board.prepare_session()
+            board, board_id, board_type = open_board(serial_port)
+        except Exception as e:
+            print(f"Failed to connect during check: {e}", file=sys.stderr)
             
-            # Store reference
-            current_board = board
-            current_board_id = board_id
+            # Reset global variables
+            current_board = None
+            current_board_id = None
             is_streaming = False
             
             return {
-                'status': 'success',
-                'connected': True,
-                'board_type': 'cyton_daisy'
+                'status': 'error',
+                'connected': False,
+                'message': str(e)
             }
-        except Exception as e:
-            print(f"Failed to connect to Cyton+Daisy during check: {e}", file=sys.stderr)
-            
-            # Try Cyton only
-            try:
-                print(f"Checking connection for Cyton on port: {serial_port}")
-                params = BrainFlowInputParams()
-                params.serial_port = serial_port
-                board_id = BoardIds.CYTON_BOARD
-                board = BoardShim(board_id, params)
-                
-                board.prepare_session()
-                
-                # Store reference
-                current_board = board
-                current_board_id = board_id
-                is_streaming = False
-                
-                return {
-                    'status': 'success',
-                    'connected': True,
-                    'board_type': 'cyton'
-                }
-            except Exception as e2:
-                print(f"Failed to connect to Cyton during check: {e2}", file=sys.stderr)
-                
-                # Reset global variables
-                current_board = None
-                current_board_id = None
-                is_streaming = False
-                
-                return {
-                    'status': 'error',
-                    'connected': False,
-                    'message': str(e2)
-                }
+        
+        # Store reference
+        current_board = board
+        current_board_id = board_id
+        is_streaming = False
+        
+        return {
+            'status': 'success',
+            'connected': True,
+            'board_type': board_type
+        }
     except Exception as e:
         print(f"Connection check error: {e}")
         print(traceback.format_exc(), file=sys.stderr)
@@ -225,14 +620,15 @@ def check_connection(serial_port):
 
 def start_recording(serial_port, experiment_name=''):
     """Start recording EEG data from the OpenBCI board."""
-    global current_board, current_board_id, is_streaming
+    global current_board, current_board_id, is_streaming, stream_serial_port
     
-    if not BRAINFLOW_AVAILABLE:
+    if not board_available():
         return {
             'status': 'error',
             'message': 'BrainFlow library not available'
         }
     
+    stream_serial_port = serial_port
     try:
         # Check if we already have a board object
         if current_board is not None and not is_streaming:
@@ -251,7 +647,7 @@ def start_recording(serial_port, experiment_name=''):
                     'status': 'success',
                     'message': f"Recording started with existing board connection",
                     'timestamp': datetime.now().isoformat(),
-                    'board_type': 'cyton_daisy' if current_board_id == BoardIds.CYTON_DAISY_BOARD else 'cyton'
+                    'board_type': board_type_name(current_board_id)
                 }
             except Exception as e:
                 print(f"Error starting stream with existing board: {e}")
@@ -275,75 +671,31 @@ def start_recording(serial_port, experiment_name=''):
                 'status': 'success',
                 'message': 'Already recording',
                 'timestamp': datetime.now().isoformat(),
-                'board_type': 'cyton_daisy' if current_board_id == BoardIds.CYTON_DAISY_BOARD else 'cyton'
+                'board_type': board_type_name(current_board_id)
             }
         
         # Try to set up a new connection
-        print(f"Starting recording on port: {serial_port}")
-        params = BrainFlowInputParams()
-        params.serial_port = serial_port
+        print(f"Starting recording with {board_source} board on port: {serial_port}")
+        board, board_id, board_type = connect_board(serial_port, start=True)
         
-        # Try Cyton + Daisy first
-        try:
-            print("Trying to start recording with Cyton+Daisy...")
-            board_id = BoardIds.CYTON_DAISY_BOARD
-            board = BoardShim(board_id, params)
-            
-            board.prepare_session()
-            board.start_stream()
-            
-            # Update global variables
-            current_board = board
-            current_board_id = board_id
-            is_streaming = True
-            
-            # Start visualizer with experiment name
-            if experiment_name:
-                start_visualizer(experiment_name)
-            else:
-                start_visualizer("OpenBCI Recording")
-            
-            print("Recording started with Cyton+Daisy board!")
-            return {
-                'status': 'success',
-                'message': 'Recording started with Cyton+Daisy board',
-                'timestamp': datetime.now().isoformat(),
-                'board_type': 'cyton_daisy'
-            }
-        except Exception as e1:
-            print(f"Failed to start recording with Cyton+Daisy: {e1}")
-            print(traceback.format_exc(), file=sys.stderr)
-            # Try Cyton only
-            try:
-                print("Trying to start recording with Cyton...")
-                board_id = BoardIds.CYTON_BOARD
-                board = BoardShim(board_id, params)
-                
-                board.prepare_session()
-                board.start_stream()
-                
-                # Update global variables
-                current_board = board
-                current_board_id = board_id
-                is_streaming = True
-                
-                # Start visualizer with experiment name
-                if experiment_name:
-                    start_visualizer(experiment_name)
-                else:
-                    start_visualizer("OpenBCI Recording")
-                
-                print("Recording started with Cyton board!")
-                return {
-                    'status': 'success',
-                    'message': 'Recording started with Cyton board',
-                    'timestamp': datetime.now().isoformat(),
-                    'board_type': 'cyton'
-                }
-            except Exception as e2:
-                print(f"Failed to start recording with Cyton: {e2}")
-                print(traceback.format_exc(), file=sys.stderr)
-                raise Exception(f"Could not start recording with either board type: {e1}, {e2}")
+        # Update global variables
+        current_board = board
+        current_board_id = board_id
+        is_streaming = True
+        
+        # Start visualizer with experiment name
+        if experiment_name:
+            start_visualizer(experiment_name)
+        else:
+            start_visualizer("OpenBCI Recording")
+        
+        print(f"Recording started with {BOARD_LABELS[board_type]} board!")
+        return {
+            'status': 'success',
+            'message': f'Recording started with {BOARD_LABELS[board_type]} board',
+            'timestamp': datetime.now().isoformat(),
+            'board_type': board_type
+        }
     except Exception as e:
         print(f"Start recording error: {e}")
         print(traceback.format_exc(), file=sys.stderr)
@@ -352,11 +704,20 @@ def start_recording(serial_port, experiment_name=''):
             'message': str(e)
         }
 
-def stop_recording(serial_port, experiment_id, duration=5, output_file=None, experiment_name=''):
-    """Stop recording and save the data."""
-    global current_board, current_board_id, is_streaming
+def stop_recording(serial_port, experiment_id, output_file=None, experiment_name='', finalize_async=False):
+    """Stop recording and save the data.
     
-    if not BRAINFLOW_AVAILABLE:
+    A streaming session returns as soon as its last samples are flushed and
+    the recording is finalized; with `finalize_async` its EDF+/BDF+ export
+    is finished in the background and announced with a recording_finalized
+    EEG_STREAM packet. A session running in a stream process is asked to
+    stop and its result returned. Without any session there is nothing to
+    save, and an error is returned at once.
+    """
+    global current_board, current_board_id, is_streaming, recording_export
+    
+    stop_started = time.monotonic()
+    if not board_available():
         return {
             'status': 'error',
             'message': 'BrainFlow library not available'
@@ -366,24 +727,27 @@ def stop_recording(serial_port, experiment_id, duration=5, output_file=None, exp
         # Check if we have a current board and it's streaming
         if current_board is not None and is_streaming:
             try:
-                print("Using existing board connection to stop streaming")
+                print("Using existing board connection to stop streaming", file=sys.stderr)
                 
-                # Wait for data to be collected
-                print(f"Waiting {duration} seconds to collect data...")
-                time.sleep(duration)
-                
-                # Get data
-                data = current_board.get_board_data()
+                # Stop the stream thread first so it has written everything it polled
+                stop_visualizer()
                 
-                # Stop stream
-                current_board.stop_stream()
+                try:
+                    # Get the samples it has not taken yet
+                    data = current_board.get_board_data()
+                    
+                    # Stop stream
+                    current_board.stop_stream()
+                except Exception as e:
+                    if recording_writer is None:
+                        raise
+                    # The board failed or was being reconnected; what was streamed is already saved
+                    print(f"Could not read the last samples from the board: {e}", file=sys.stderr)
+                    data = np.empty((0, 0))
                 is_streaming = False
                 
                 # Process and save the data
                 board_id = current_board_id
-                
-                # Stop visualizer
-                stop_visualizer()
             except Exception as e:
                 print(f"Error with existing board: {e}")
                 print(traceback.format_exc(), file=sys.stderr)
@@ -396,118 +760,72 @@ def stop_recording(serial_port, experiment_id, duration=5, output_file=None, exp
                     'message': f"Error getting data from board: {str(e)}"
                 }
         else:
-            # No current board or not streaming
-            print("No active streaming session to stop")
+            session = read_session()
+            if session is not None:
+                # A stream process owns the board; it saves the recording itself
+                return request_session_stop(session, experiment_id, output_file, experiment_name, finalize_async)
             
-            # Try to establish a connection first
-            params = BrainFlowInputParams()
-            params.serial_port = serial_port
-            
-            # Try Cyton + Daisy first
-            try:
-                print("Trying to connect to Cyton+Daisy...")
-                board_id = BoardIds.CYTON_DAISY_BOARD
-                board = BoardShim(board_id, params)
-                
-                board.prepare_session()
-                board.start_stream()
-                
-                # Wait for data to be collected
-                print(f"Waiting {duration} seconds to collect data...")
-                time.sleep(duration)
-                
-                # Get data
-                data = board.get_board_data()
-                
-                # Stop stream
-                board.stop_stream()
-                board.release_session()
-                
-                # Stop visualizer if running
-                stop_visualizer()
-            except Exception as e1:
-                print(f"Failed with Cyton+Daisy: {e1}")
-                print(traceback.format_exc(), file=sys.stderr)
-                
-                # Try Cyton only
-                try:
-                    print("Trying to connect to Cyton...")
-                    board_id = BoardIds.CYTON_BOARD
-                    board = BoardShim(board_id, params)
-                    
-                    board.prepare_session()
-                    board.start_stream()
-                    
-                    # Wait for data to be collected
-                    print(f"Waiting {duration} seconds to collect data...")
-                    time.sleep(duration)
-                    
-                    # Get data
-                    data = board.get_board_data()
-                    
-                    # Stop stream
-                    board.stop_stream()
-                    board.release_session()
-                    
-                    # Stop visualizer if running
-                    stop_visualizer()
-                except Exception as e2:
-                    print(f"Failed with Cyton: {e2}")
-                    print(traceback.format_exc(), file=sys.stderr)
-                    
-                    # Stop visualizer if running anyway
-                    stop_visualizer()
-                    
-                    raise Exception(f"Could not connect to either board type: {e1}, {e2}")
+            # Nothing is recording; a stop must not open the board and record on its own
+            print("No active recording session to stop", file=sys.stderr)
+            return {
+                'status': 'error',
+                'message': 'No active recording session'
+            }
         
         # Create directory if it doesn't exist
-        os.makedirs('uploads/eeg', exist_ok=True)
+        os.makedirs(RECORDINGS_DIR, exist_ok=True)
         
         # Generate filename with timestamp if not provided
         if not output_file:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             output_file = f'eeg_{experiment_id}_{timestamp}.csv'
         
-        file_path = os.path.join('uploads/eeg', output_file)
+        file_path = os.path.join(RECORDINGS_DIR, output_file)
         
         # Save data to CSV file
-        print(f"Saving data to {file_path}")
+        print(f"Saving data to {file_path}", file=sys.stderr)
         
         # Get EEG channels
-        eeg_channels = BoardShim.get_eeg_channels(board_id)
+        eeg_channels = get_eeg_channels(board_id)
         
         # Check if data has content
-        if data.size == 0 or len(data) == 0:
-            print("No data was collected")
+        if (data.size == 0 or len(data) == 0) and recording_writer is None:
+            print("No data was collected", file=sys.stderr)
             return {
                 'status': 'error',
                 'message': 'No data was collected during recording'
             }
         
-        eeg_data = data[eeg_channels, :]
-        
-        # Create CSV header
-        header = 'timestamp,'
-        header += ','.join([f'channel_{i+1}' for i in range(len(eeg_channels))])
-        
-        # Create CSV content
-        csv_content = [header]
-        timestamps = data[BoardShim.get_timestamp_channel(board_id)]
+        if data.size:
+            samples_acquired.inc(data.shape[1])
         
-        for i in range(eeg_data.shape[1]):
-            row = f"{timestamps[i]},"
-            row += ','.join([str(eeg_data[j][i]) for j in range(eeg_data.shape[0])])
-            csv_content.append(row)
+        if recording_writer is not None:
+            # Samples streamed during the session are already on disk; append the rest
+            if data.size:
+                write_recording_samples(data[get_timestamp_channel(board_id)], data[eeg_channels, :],
+                                        get_sampling_rate(board_id), data[get_package_num_channel(board_id)])
+            summary = finish_recording_file(file_path)
+        else:
+            # Write timestamps and EEG channels to CSV
+            summary = export_csv(file_path, data[get_timestamp_channel(board_id)], data[eeg_channels, :],
+                                 get_sampling_rate(board_id), data[get_package_num_channel(board_id)])
         
-        # Write to file
-        with open(file_path, 'w') as f:
-            f.write('\n'.join(csv_content))
+        export_writer, recording_export = recording_export, None
+        export_pending = finalize_async and (export_writer is not None or bool(export_format))
+        if export_pending:
+            finish_export_later(file_path, export_writer)
+            export_path = None
+        else:
+            export_path = finish_export(file_path, export_writer)
         
-        print(f"Data saved successfully to {file_path}")
+        print(f"Data saved successfully to {file_path}", file=sys.stderr)
         
         # Stop visualizer
         stop_visualizer()
         
+        stop_seconds = time.monotonic() - stop_started
+        stop_time.observe(stop_seconds)
+        
         # Return success information
         return {
             'status': 'success',
@@ -516,12 +834,18 @@ def stop_recording(serial_port, experiment_id, duration=5, output_file=None, exp
             'file_path': file_path,
             'timestamp': datetime.now().isoformat(),
             'channels': len(eeg_channels),
-            'samples': eeg_data.shape[1],
-            'sampling_rate': BoardShim.get_sampling_rate(board_id),
-            'board_type': 'cyton_daisy' if board_id == BoardIds.CYTON_DAISY_BOARD else 'cyton'
+            'samples': summary['samples'],
+            'sampling_rate': get_sampling_rate(board_id),
+            'board_type': board_type_name(board_id),
+            'summary_file': summary_path(file_path),
+            'summary': summary,
+            'export_file': export_path,
+            'export_pending': export_pending,
+            'stop_seconds': round(stop_seconds, 6),
+            'stdout_stream': stdout_emitter.stats() if stdout_emitter is not None else None
         }
     except Exception as e:
-        print(f"Stop recording error: {e}")
+        print(f"Stop recording error: {e}", file=sys.stderr)
         print(traceback.format_exc(), file=sys.stderr)
         
         # Stop visualizer if there was an error
@@ -532,11 +856,115 @@ def stop_recording(serial_port, experiment_id, duration=5, output_file=None, exp
             'message': str(e)
         }
 
+def export_csv(file_path, timestamps, eeg_data, sampling_rate=250, package_numbers=None):
+    """Write timestamps and EEG channels (channels x samples) to a CSV file, its index, clock and summary.
+    
+    Returns the summary.
+    """
+    writer = RecordingWriter(file_path, eeg_data.shape[0], sampling_rate=sampling_rate)
+    writer.write(timestamps, eeg_data, package_numbers)
+    writer.close()
+    
+    # Without package numbers the writer's gaps are timestamp steps; read_clock finds them after a clock fit
+    summary = RecordingSummary(eeg_data.shape[0], sampling_rate, read_clock(file_path)['gaps'])
+    summary.update(np.asarray(timestamps), eeg_data.T)
+    summary.write(file_path)
+    
+    samples_written.inc(eeg_data.shape[1])
+    file_bytes_written.inc(writer.bytes_written)
+    return summary.result()
+
+def write_recording_samples(timestamps, eeg_data, sampling_rate, package_numbers=None):
+    """Append samples to the recording in progress and its summary, starting both on first use.
+    
+    The file is written under a temporary .part name until stop_recording
+    knows the final file name.
+    """
+    global recording_writer, recording_summary
+    
+    if recording_writer is None:
+        os.makedirs(RECORDINGS_DIR, exist_ok=True)
+        part_path = os.path.join(RECORDINGS_DIR,
+                                 f"recording_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}.csv.part")
+        recording_writer = RecordingWriter(part_path, eeg_data.shape[0], sampling_rate=sampling_rate)
+        recording_summary = RecordingSummary(eeg_data.shape[0], sampling_rate, recording_writer.clock.gaps)
+        if export_format:
+            start_recording_export(part_path, eeg_data.shape[0], sampling_rate)
+        counted = 0
+    else:
+        counted = recording_writer.bytes_written
+    
+    recording_writer.write(timestamps, eeg_data, package_numbers)
+    if recording_export is not None:
+        recording_export.write(timestamps, eeg_data)
+    recording_summary.update(np.asarray(timestamps), eeg_data.T)
+    samples_written.inc(eeg_data.shape[1])
+    file_bytes_written.inc(recording_writer.bytes_written - counted)
+
+def finish_recording_file(file_path):
+    """Close the recording in progress, move it to `file_path`, write its summary and return it."""
+    global recording_writer, recording_summary
+    
+    writer, summary = recording_writer, recording_summary
+    recording_writer = None
+    recording_summary = None
+    writer.move(file_path)
+    summary.write(file_path)
+    return summary.result()
+
+def start_recording_export(part_path, channel_count, sampling_rate):
+    """Start the EDF+/BDF+ copy of the recording in progress."""
+    global recording_export
+    
+    try:
+        recording_export = EDFWriter(part_path.replace('.csv.part', f'.{export_format}.part'),
+                                     [f'channel_{i + 1}' for i in range(channel_count)], sampling_rate,
+                                     export_format, gaps=recording_writer.clock.gaps)
+    except Exception as e:
+        # The CSV recording goes on without the copy
+        print(f"Could not start {export_format.upper()} export: {e}", file=sys.stderr)
+        recording_export = None
+
+def finish_export(file_path, writer):
+    """Finish the EDF+/BDF+ copy of the recording at `file_path` and return its path.
+    
+    The live copy `writer` is closed next to the recording; without one the
+    CSV is converted when an export format is set (None otherwise).
+    """
+    if writer is not None:
+        export_path = os.path.splitext(file_path)[0] + '.' + writer.fmt
+        writer.move(export_path)
+        return export_path
+    if export_format:
+        return convert_file(file_path, fmt=export_format)['output']
+    return None
+
+def finish_export_later(file_path, writer):
+    """Finish the export in a background thread, then emit a recording_finalized EEG_STREAM packet."""
+    def finish():
+        packet = {'type': 'recording_finalized', 'file_path': file_path}
+        try:
+            packet.update(status='success', export_file=finish_export(file_path, writer))
+        except Exception as e:
+            print(f"Export of {file_path} failed: {e}", file=sys.stderr)
+            packet.update(status='error', message=str(e))
+        packet['timestamp'] = time.time()
+        print_stdout(f"EEG_STREAM:{json.dumps(packet)}")
+    
+    thread = threading.Thread(target=finish, name='export-finalizer')
+    thread.start()
+    pending_finalizers.append(thread)
+
+def wait_for_finalizers():
+    """Wait for exports finishing in the background."""
+    while pending_finalizers:
+        pending_finalizers.pop().join()
+
 def disconnect(serial_port):
     """Disconnect from the OpenBCI board."""
     global current_board, current_board_id, is_streaming
     
-    if not BRAINFLOW_AVAILABLE:
+    if not board_available():
         return {
             'status': 'error',
             'message': 'BrainFlow library not available'
@@ -581,38 +1009,22 @@ def disconnect(serial_port):
         
         # Try to determine which board type is connected
         print(f"Disconnecting from board on port: {serial_port}")
-        params = BrainFlowInputParams()
-        params.serial_port = serial_port
         
-        # Try Cyton + Daisy first
-        try:
-            board = BoardShim(BoardIds.CYTON_DAISY_BOARD, params)
-            
-            # Try to stop any ongoing stream
-            try:
-                board.stop_stream()
-            except Exception as e:
-                print(f"Error stopping stream: {e}")
-            
-            # Release session
-            try:
-                board.release_session()
-            except Exception as e:
-                print(f"Error releasing session: {e}")
-            
-            # Stop visualizer if running
-            stop_visualizer()
-            
+        # Stop visualizer if running
+        stop_visualizer()
+        
+        if board_source != 'cyton':
+            # Synthetic, playback and generator sessions only live in the process that opened them
             return {
                 'status': 'success',
-                'message': 'Cyton+Daisy board disconnected'
+                'message': 'No board session to release'
             }
-        except Exception as e1:
-            print(f"Failed to disconnect from Cyton+Daisy: {e1}")
-            
-            # Try Cyton only
+        
+        errors = []
+        for board_type in board_type_order(serial_port)[0]:
+            label = BOARD_LABELS[board_type]
             try:
-                board = BoardShim(BoardIds.CYTON_BOARD, params)
+                board, _ = create_board(board_type, serial_port)
                 
                 # Try to stop any ongoing stream
                 try:
@@ -626,23 +1038,18 @@ def disconnect(serial_port):
                 except Exception as e:
                     print(f"Error releasing session: {e}")
                 
-                # Stop visualizer if running
-                stop_visualizer()
-                
                 return {
                     'status': 'success',
-                    'message': 'Cyton board disconnected'
-                }
-            except Exception as e2:
-                print(f"Failed to disconnect from Cyton: {e2}")
-                
-                # Stop visualizer if running anyway
-                stop_visualizer()
-                
-                return {
-                    'status': 'error',
-                    'message': f"Could not disconnect from either board type: {e1}, {e2}"
+                    'message': f'{label} board disconnected'
                 }
+            except Exception as e:
+                print(f"Failed to disconnect from {label}: {e}")
+                errors.append(f"{label}: {e}")
+        
+        return {
+            'status': 'error',
+            'message': f"Could not disconnect from any board type: {'; '.join(errors)}"
+        }
     except Exception as e:
         print(f"Disconnect error: {e}")
         print(traceback.format_exc(), file=sys.stderr)
@@ -660,20 +1067,315 @@ def disconnect(serial_port):
             'message': str(e)
         }
 
+def stop_request_path(pid):
+    return os.path.join(os.path.dirname(SESSION_FILE), f'stream_stop_{pid}.json')
+
+def stop_result_path(pid):
+    return os.path.join(os.path.dirname(SESSION_FILE), f'stream_result_{pid}.json')
+
+def write_json_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(data, f)
+    os.replace(path + '.tmp', path)
+
+def process_alive(pid):
+    """True unless the process is known to have exited (always True on Windows)."""
+    if os.name == 'nt':
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def read_session():
+    """The stream session of another process that is still running, or None."""
+    try:
+        with open(SESSION_FILE, 'r') as f:
+            session = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if session.get('pid') == os.getpid() or not process_alive(session.get('pid')):
+        return None
+    return session
+
+def request_session_stop(session, experiment_id, output_file=None, experiment_name='', finalize_async=False):
+    """Ask the stream process of `session` to stop and save, and return its stop_recording result."""
+    pid = session['pid']
+    result_path = stop_result_path(pid)
+    print(f"Stopping the stream session of process {pid}")
+    write_json_atomic(stop_request_path(pid), {
+        'experiment_id': experiment_id,
+        'output_file': output_file,
+        'experiment_name': experiment_name,
+        'finalize_async': finalize_async
+    })
+    try:
+        wait_until(lambda: os.path.exists(result_path), STOP_TIMEOUT, 'Stream session stop',
+                   initial_interval=STOP_POLL_INTERVAL, max_interval=STOP_POLL_INTERVAL)
+    except ReadinessTimeout as e:
+        return {
+            'status': 'error',
+            'message': str(e)
+        }
+    with open(result_path, 'r') as f:
+        result = json.load(f)
+    os.remove(result_path)
+    return result
+
+def stream_session(serial_port, experiment_id, duration=0, output_file=None, experiment_name=''):
+    """Record and stream in one process for `duration` seconds (0 = until stopped), then save.
+    
+    The session is stopped by SIGTERM/Ctrl+C or by stop_recording in another
+    process, which leaves a stop request naming the output file; the result
+    is written back for it. Used by Node for recordings and by long-running
+    consumers such as the soak test, which need the stream thread to outlive
+    the start_recording call.
+    """
+    stop_requested = threading.Event()
+    
+    def request_stop(sig, frame):
+        stop_requested.set()
+    
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, request_stop)
+    
+    result = start_recording(serial_port, experiment_name)
+    if result['status'] != 'success':
+        return result
+    
+    pid = os.getpid()
+    request_path = stop_request_path(pid)
+    write_json_atomic(SESSION_FILE, {'pid': pid, 'serial_port': serial_port, 'experiment_name': experiment_name,
+                                     'started': datetime.now().isoformat()})
+    # Tell the caller the session is up; the final result follows when it stops
+    print_stdout(json.dumps(result))
+    request = None
+    started = time.monotonic()
+    try:
+        while not stop_requested.is_set():
+            if duration > 0 and time.monotonic() - started >= duration:
+                break
+            if os.path.exists(request_path):
+                with open(request_path, 'r') as f:
+                    request = json.load(f)
+                os.remove(request_path)
+                break
+            stop_requested.wait(STOP_POLL_INTERVAL)
+    except KeyboardInterrupt:
+        print("Stream session interrupted", file=sys.stderr)
+    finally:
+        try:
+            os.remove(SESSION_FILE)
+        except OSError:
+            pass
+    
+    if request is None:
+        return stop_recording(serial_port, experiment_id, output_file, experiment_name)
+    result = stop_recording(serial_port, request.get('experiment_id') or experiment_id,
+                            request.get('output_file') or output_file,
+                            request.get('experiment_name') or experiment_name, request.get('finalize_async', False))
+    write_json_atomic(stop_result_path(pid), result)
+    return result
+
 def stream_data_to_visualizer():
     """Legacy function - now redirects to web streaming"""
-    stream_data_to_web()
+    start_visualizer()
 
-def stream_data_to_web(experiment_name=''):
-    """Stream EEG data to web interface via stdout"""
-    global stream_running, current_board, current_board_id, is_streaming
+def poll_board_data(board, eeg_channels, timestamp_channel, package_channel=None):
+    """Take the samples acquired since the last poll.
     
-    print(f"Web-based EEG data streaming started for experiment: {experiment_name}")
+    Returns the EEG channels, the board acquisition timestamps, the bridge read time
+    and the package numbers (None without a package channel).
+    """
+    started = time.perf_counter()
+    data = board.get_board_data()
+    read_time = time.time()
+    poll_time.observe(time.perf_counter() - started)
+    samples_acquired.inc(data.shape[1])
+    board_buffer_depth.set(data.shape[1])
+    package_numbers = data[package_channel, :] if package_channel is not None else None
+    return data[eeg_channels, :], data[timestamp_channel, :], read_time, package_numbers
+
+def build_stream_packets(eeg_data, first_sample, experiment_name, board_type, board_timestamps=None, read_time=None,
+                         emit_time=None, sample_step=1):
+    """Build one EEG_STREAM line per sample for Node.js to forward to the web interface.
+    
+    Packets carry the board acquisition timestamp, the bridge read time and the
+    emit time so consumers can measure latency per hop. For decimated data,
+    `sample_step` keeps the sample numbers those of the board.
+    """
+    packets = []
+    emit_time = time.time() if emit_time is None else emit_time
+    board_timestamps = board_timestamps.tolist() if board_timestamps is not None else None
+    
+    # Convert once; tolist() yields plain floats for JSON
+    for i, sample in enumerate(eeg_data.T.tolist()):
+        # Create data packet for web interface
+        data_packet = {
+            'type': 'eeg_data',
+            'timestamp': emit_time,
+            'experiment_name': experiment_name,
+            'channels': sample,
+            'sample_number': first_sample + i * sample_step,
+            'board_type': board_type,
+            'emit_time': emit_time
+        }
+        if board_timestamps is not None:
+            data_packet['board_timestamp'] = board_timestamps[i]
+        if read_time is not None:
+            data_packet['read_time'] = read_time
+        packets.append(f"EEG_STREAM:{json.dumps(data_packet)}")
+    
+    return packets
+
+def build_discontinuity_packet(next_sample, experiment_name, board_type, gap_seconds, missing_samples, reason):
+    """Build the EEG_STREAM line that tells consumers the samples after it do not follow the ones before.
+    
+    Sample numbers stay consecutive across the gap; the packet carries the
+    gap's duration and the samples the board is estimated to have taken in it.
+    """
+    packet = {
+        'type': 'discontinuity',
+        'timestamp': time.time(),
+        'experiment_name': experiment_name,
+        'board_type': board_type,
+        'sample_number': next_sample,
+        'gap_seconds': gap_seconds,
+        'missing_samples': missing_samples,
+        'reason': reason
+    }
+    return f"EEG_STREAM:{json.dumps(packet)}"
+
+def record_stream_latency(board_timestamps, read_time, emit_time, flushed_time):
+    """Record the bridge-side hops for one emitted chunk."""
+    latency_tracker.record('board->read', read_time - board_timestamps)
+    latency_tracker.record('read->emit', emit_time - read_time)
+    latency_tracker.record('emit->flush', flushed_time - emit_time)
+    latency_tracker.record('board->flush', flushed_time - board_timestamps)
+
+def session_uptime():
+    """Seconds since the current streaming session started (0 when not streaming)."""
+    if session_started is None:
+        return 0
+    return round(time.monotonic() - session_started, 3)
+
+def get_status():
+    """Report board state, latency statistics and runtime metrics."""
+    return {
+        'status': 'success',
+        'connected': current_board is not None,
+        'streaming': is_streaming,
+        'board_id': current_board_id,
+        'board_type': board_type_name(current_board_id) if current_board_id is not None else None,
+        'reconnecting': reconnecting,
+        'subscribers': acquisition_bus.stats()['subscriptions'] if acquisition_bus is not None else [],
+        'stdout_stream': stdout_emitter.stats() if stdout_emitter is not None else None,
+        'shm': shm_writer.stats() if shm_writer is not None else None,
+        'latency': latency_tracker.summary(),
+        'metrics': metrics.snapshot()
+    }
+
+def publish_status():
+    """Log the latency summary and save the status for the status action of other processes."""
+    print(latency_tracker.format_summary(), file=sys.stderr)
+    try:
+        os.makedirs(os.path.dirname(STATUS_FILE), exist_ok=True)
+        status = get_status()
+        status['updated'] = datetime.now().isoformat()
+        with open(STATUS_FILE, 'w') as f:
+            json.dump(status, f)
+    except Exception as e:
+        print(f"Could not save status file: {e}", file=sys.stderr)
+
+def read_status_file():
+    """Return the status last published by a streaming process, if any."""
+    try:
+        with open(STATUS_FILE, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def wait_while_streaming(seconds):
+    """Sleep up to `seconds`, returning early when the stream is stopped."""
+    deadline = time.monotonic() + seconds
+    while stream_running and time.monotonic() < deadline:
+        stream_wakeup.wait(max(deadline - time.monotonic(), 0))
+
+def reconnect_board(serial_port, reason):
+    """Reopen the board after the stream stalled or failed, retrying with backoff.
+    
+    Runs in the stream thread until the board streams again with the same
+    channel count (True) or the stream is stopped (False). The recording in
+    progress stays open so it continues in the same file.
+    """
+    global current_board, current_board_id, reconnecting
+    
+    stream_faults.inc()
+    reconnecting = True
+    started = time.monotonic()
+    channel_count = len(get_eeg_channels(current_board_id))
+    print(f"Board stream {reason}; reconnecting", file=sys.stderr)
+    publish_status()
+    
+    # Free the serial port for the new session
+    for release in (current_board.stop_stream, current_board.release_session):
+        try:
+            release()
+        except Exception:
+            pass
+    
+    interval = INITIAL_INTERVAL
+    attempts = 0
+    try:
+        while stream_running:
+            attempts += 1
+            try:
+                if board_source == 'cyton' and port_can_be_probed(serial_port) and not serial_port_ready(serial_port):
+                    raise Exception(f"Serial port {serial_port} not available")
+                connect_attempts.inc()
+                board, board_id, board_type = open_board(serial_port, start=True)
+                if len(get_eeg_channels(board_id)) != channel_count:
+                    board.stop_stream()
+                    board.release_session()
+                    raise Exception(f"{BOARD_LABELS[board_type]} board does not have the recording's "
+                                    f"{channel_count} channels")
+            except Exception as e:
+                print(f"Reconnect attempt {attempts} failed: {e}", file=sys.stderr)
+                wait_while_streaming(interval)
+                interval = min(interval * BACKOFF_FACTOR, RECONNECT_MAX_INTERVAL)
+                continue
+            
+            current_board = board
+            current_board_id = board_id
+            reconnects.inc()
+            reconnect_time.observe(time.monotonic() - started)
+            print(f"Board reconnected after {time.monotonic() - started:.3f} s ({attempts} attempts)",
+                  file=sys.stderr)
+            return True
+        return False
+    finally:
+        reconnecting = False
+
+def acquire_board_data():
+    """Poll the board and publish its samples on the acquisition bus.
+    
+    Runs on the acquisition thread, which does nothing but poll, supervise
+    the board and publish, so consumers never add board reads. A fault is
+    published as an event-only chunk before reconnecting, and the first
+    chunk after the reconnect carries a discontinuity event.
+    """
+    global current_board, current_board_id, is_streaming, session_started
     
     # Get sampling rate and channel list
     if current_board_id is not None:
-        sampling_rate = BoardShim.get_sampling_rate(current_board_id)
-        eeg_channels = BoardShim.get_eeg_channels(current_board_id)
+        sampling_rate = get_sampling_rate(current_board_id)
+        eeg_channels = get_eeg_channels(current_board_id)
+        timestamp_channel = get_timestamp_channel(current_board_id)
+        package_channel = get_package_num_channel(current_board_id)
     else:
         print("Error: No board connected", file=sys.stderr)
         return
@@ -681,55 +1383,210 @@ def stream_data_to_web(experiment_name=''):
     # Calculate sleep time based on sampling rate
     sleep_time = 1.0 / (sampling_rate / 10)  # Process data in small batches
     
-    # Keep track of last processed data point
-    last_idx = 0
+    # Running count of samples published; get_board_data() only returns new samples
+    sample_number = 0
+    sequence = 0
+    session_started = time.monotonic()
+    
+    # Supervision state: when samples last arrived, failed reads in a row, the last board
+    # timestamp published and, after a reconnect, the reason to report with the first new samples
+    last_data_time = time.monotonic()
+    seen_data = False
+    poll_errors = 0
+    last_board_timestamp = None
+    resumed_after = None
     
     while stream_running and current_board is not None:
+        # Samples polled but not yet published, counted as a dropped chunk on error
+        pending = 0
         try:
-            # Sleep to match approximate sampling rate
-            time.sleep(sleep_time)
+            # Sleep to match approximate sampling rate (stop_visualizer wakes it early)
+            stream_wakeup.wait(sleep_time)
             
             # Get latest data if streaming
             if is_streaming:
-                # Get only new data since last read
-                data = current_board.get_board_data()
+                poll_errors += 1
+                eeg_data, board_timestamps, read_time, package_numbers = poll_board_data(
+                    current_board, eeg_channels, timestamp_channel, package_channel)
+                poll_errors = 0
+                
+                pending = eeg_data.shape[1]
                 
                 # Check if we have new data
-                if data.shape[1] > last_idx:
-                    # Extract EEG channels
-                    eeg_data = data[eeg_channels, last_idx:]
-                    
-                    # Update last index
-                    last_idx = data.shape[1]
-                    
-                    # For each new sample
-                    for i in range(eeg_data.shape[1]):
-                        # Extract single sample across all channels
-                        sample = [float(eeg_data[j][i]) for j in range(eeg_data.shape[0])]
-                        
-                        # Create data packet for web interface
-                        data_packet = {
-                            'type': 'eeg_data',
-                            'timestamp': time.time(),
-                            'experiment_name': experiment_name,
-                            'channels': sample,
-                            'sample_number': i + last_idx,
-                            'board_type': 'cyton_daisy' if current_board_id == BoardIds.CYTON_DAISY_BOARD else 'cyton'
-                        }
-                        
-                        # Output to stdout with special prefix for Node.js to capture
-                        print(f"EEG_STREAM:{json.dumps(data_packet)}")
-                        sys.stdout.flush()
+                if eeg_data.shape[1] > 0:
+                    observe_first_sample()
+                    last_data_time = time.monotonic()
+                    seen_data = True
+                    events = ()
+                    if resumed_after is not None:
+                        # Consumers see where the stream was interrupted and for how long
+                        gap = float(board_timestamps[0] - last_board_timestamp) \
+                            if last_board_timestamp is not None else 0.0
+                        events = ({'type': 'discontinuity', 'reason': resumed_after, 'gap_seconds': round(gap, 6),
+                                   'missing_samples': max(int(round(gap * sampling_rate)) - 1, 0)},)
+                        resumed_after = None
+                    last_board_timestamp = float(board_timestamps[-1])
+                    acquisition_bus.publish(make_chunk(sequence, sample_number, eeg_data, board_timestamps,
+                                                       package_numbers, read_time, sampling_rate, events))
+                    sequence += 1
+                    sample_number += pending
+                    pending = 0
+            
+            # Periodic latency summary log
+            if latency_tracker.summary_due():
+                publish_status()
                         
         except Exception as e:
-            print(f"Error in web streaming: {e}", file=sys.stderr)
+            print(f"Error in board acquisition: {e}", file=sys.stderr)
+            if pending:
+                dropped_chunks.inc()
             time.sleep(0.1)  # Prevent tight loop if error
+        
+        # Reopen a board that stopped sending samples or keeps failing
+        if is_streaming and stream_running:
+            stall_timeout = STALL_TIMEOUT if seen_data else FIRST_SAMPLE_TIMEOUT
+            if poll_errors >= MAX_POLL_ERRORS:
+                reason = 'failed'
+            elif time.monotonic() - last_data_time > stall_timeout:
+                reason = 'stalled'
+            else:
+                continue
+            # The recorder marks the gap in the recording even if the board never comes back
+            acquisition_bus.publish(make_chunk(sequence, sample_number, np.empty((len(eeg_channels), 0)),
+                                               np.empty(0), None, time.time(), sampling_rate,
+                                               ({'type': 'fault', 'reason': reason},)))
+            sequence += 1
+            if not reconnect_board(stream_serial_port, reason):
+                break
+            sampling_rate = get_sampling_rate(current_board_id)
+            eeg_channels = get_eeg_channels(current_board_id)
+            timestamp_channel = get_timestamp_channel(current_board_id)
+            package_channel = get_package_num_channel(current_board_id)
+            resumed_after = reason
+            last_data_time = time.monotonic()
+            poll_errors = 0
     
+    publish_status()
+    session_started = None
+
+def format_stream_chunk(chunk, step, emit_time, experiment_name=''):
+    """EEG_STREAM lines for a chunk (every `step`-th sample), after any discontinuity it carries."""
+    board_type = board_type_name(current_board_id)
+    lines = []
+    for event in chunk.events:
+        if event['type'] == 'discontinuity':
+            lines.append(build_discontinuity_packet(chunk.first_sample, experiment_name, board_type,
+                                                    event['gap_seconds'], event['missing_samples'], event['reason']))
+    if chunk.eeg.shape[1]:
+        started = time.time()
+        lines.extend(build_stream_packets(chunk.eeg[:, ::step], chunk.first_sample, experiment_name, board_type,
+                                          chunk.timestamps[::step], chunk.read_time, emit_time, step))
+        serialization_time.observe(time.time() - started)
+    return ''.join(line + '\n' for line in lines)
+
+def record_emitted_chunk(chunk, samples, emit_time, flushed_time):
+    """Count a chunk the stdout emitter has flushed and record its latency."""
+    if samples:
+        record_stream_latency(chunk.timestamps, chunk.read_time, emit_time, flushed_time)
+        samples_emitted.inc(samples)
+
+def print_stdout(line):
+    """Print a line for Node.js, never in the middle of a write of the stdout emitter."""
+    with stdout_lock:
+        print(line)
+        sys.stdout.flush()
+
+def stream_data_to_web(emitter, experiment_name=''):
+    """Stream EEG data to web interface via stdout"""
+    print(f"Web-based EEG data streaming started for experiment: {experiment_name}", file=sys.stderr)
+    emitter.run()
     print("Web-based EEG data streaming stopped", file=sys.stderr)
 
+def write_shared_memory(subscription, writer):
+    """Copy every published chunk into the shared-memory ring for local readers."""
+    while True:
+        chunk = subscription.get()
+        if chunk is None:
+            break
+        try:
+            writer.write(chunk.timestamps, chunk.eeg)
+        except Exception as e:
+            print(f"Error writing shared memory: {e}", file=sys.stderr)
+
+def start_shared_memory(board_type):
+    """Create the shared-memory ring for the session and subscribe its writer, if enabled."""
+    global shm_writer, shm_thread
+    
+    if not shm_name:
+        return
+    try:
+        shm_writer = RingWriter(shm_name, len(get_eeg_channels(current_board_id)),
+                                get_sampling_rate(current_board_id), layout={'board_type': board_type})
+    except Exception as e:
+        print(f"Could not create shared memory {shm_name}: {e}", file=sys.stderr)
+        return
+    shm_thread = threading.Thread(target=write_shared_memory, name='shared-memory', daemon=True,
+                                  args=(acquisition_bus.subscribe('shm', SHM_QUEUE_CHUNKS, 'drop_oldest'),
+                                        shm_writer))
+    shm_thread.start()
+    print(f"Streaming to shared memory {shm_name}", file=sys.stderr)
+
+def join_consumer(thread):
+    """Wait until a consumer thread has drained its queue.
+    
+    Whatever it still writes must be complete before its file is finalized or
+    closed, so after CONSUMER_JOIN_TIMEOUT this says so and waits on.
+    """
+    thread.join(timeout=CONSUMER_JOIN_TIMEOUT)
+    if thread.is_alive():
+        print(f"The {thread.name} thread is still writing queued chunks after {CONSUMER_JOIN_TIMEOUT:g} s; "
+              "waiting for it", file=sys.stderr)
+        thread.join()
+
+def stop_shared_memory():
+    """Let the ring writer drain, then close and remove the ring."""
+    global shm_writer, shm_thread
+    
+    if shm_thread is not None:
+        join_consumer(shm_thread)
+        shm_thread = None
+    if shm_writer is not None:
+        shm_writer.close()
+        shm_writer = None
+
+def record_board_data(subscription):
+    """Save every published chunk to the recording in progress, marking board faults as gaps.
+    
+    Chunks dropped while the queue was full (the disk fell behind) show as a
+    jump in the sample numbers; they are counted and marked as a gap too,
+    so the publisher never waits on the disk.
+    """
+    next_sample = None
+    while True:
+        chunk = subscription.get()
+        if chunk is None:
+            break
+        try:
+            for event in chunk.events:
+                if event['type'] == 'fault' and recording_writer is not None:
+                    recording_writer.mark_discontinuity(f"Board reconnected after it {event['reason']}")
+            lost = chunk.first_sample - next_sample if next_sample is not None else 0
+            next_sample = chunk.first_sample + chunk.eeg.shape[1]
+            if lost > 0:
+                recorder_dropped_samples.inc(lost)
+                print(f"Recorder queue full; {lost} samples left out of the recording", file=sys.stderr)
+                if recording_writer is not None:
+                    recording_writer.mark_dropped(lost, f"{lost} samples dropped while writing fell behind")
+            if chunk.eeg.shape[1]:
+                # The board buffer no longer holds these samples, so save them now
+                write_recording_samples(chunk.timestamps, chunk.eeg, chunk.sampling_rate, chunk.package_numbers)
+        except Exception as e:
+            print(f"Error recording samples: {e}", file=sys.stderr)
+            dropped_chunks.inc()
+
 def start_visualizer(experiment_name=''):
     """Start web-based EEG streaming instead of GUI visualizer"""
-    global stream_running, data_thread, current_board_id
+    global stream_running, data_thread, current_board_id, acquisition_bus, stdout_emitter, recorder_thread
     
     # Check if already streaming
     if stream_running:
@@ -738,13 +1595,29 @@ def start_visualizer(experiment_name=''):
     
     try:
         # Determine board type
-        board_type = 'cyton_daisy' if current_board_id == BoardIds.CYTON_DAISY_BOARD else 'cyton'
+        board_type = board_type_name(current_board_id)
         
         print(f"Starting web-based EEG streaming for {board_type}, experiment: {experiment_name}")
         
-        # Start data streaming thread for web interface
+        # Subscribe the consumers before the acquisition thread publishes anything
+        acquisition_bus = AcquisitionBus()
+        stdout_emitter = StreamEmitter(
+            acquisition_bus.subscribe('web', WEB_QUEUE_CHUNKS, 'drop_oldest'),
+            lambda chunk, step, emit_time: format_stream_chunk(chunk, step, emit_time, experiment_name),
+            policy=stdout_policy, decimate_factor=decimate_factor, on_written=record_emitted_chunk)
+        stdout_emitter.thread = threading.Thread(target=stream_data_to_web, name='web-stream', daemon=True,
+                                                 args=(stdout_emitter, experiment_name))
+        recorder_thread = threading.Thread(target=record_board_data, name='recorder', daemon=True,
+                                           args=(acquisition_bus.subscribe('recorder', RECORDER_QUEUE_CHUNKS,
+                                                                           'drop_newest'),))
+        stdout_emitter.thread.start()
+        recorder_thread.start()
+        start_shared_memory(board_type)
+        
+        # Start the acquisition thread that feeds them
         stream_running = True
-        data_thread = threading.Thread(target=stream_data_to_web, args=(experiment_name,))
+        stream_wakeup.clear()
+        data_thread = threading.Thread(target=acquire_board_data, name='acquisition')
         data_thread.daemon = True
         data_thread.start()
         
@@ -756,10 +1629,11 @@ def start_visualizer(experiment_name=''):
 
 def stop_visualizer():
     """Stop the visualizer process"""
-    global visualizer_process, stream_running, data_thread
+    global visualizer_process, stream_running, data_thread, recorder_thread
     
     # Stop streaming thread
     stream_running = False
+    stream_wakeup.set()
     
     # Wait for thread to finish
     if data_thread and data_thread.is_alive():
@@ -768,6 +1642,20 @@ def stop_visualizer():
         except:
             pass
     
+    # Let the recorder drain what was published, so the recording is complete; the stdout
+    # emitter gets a moment to catch up but is left behind if Node is not reading
+    if acquisition_bus is not None:
+        acquisition_bus.close()
+    if recorder_thread is not None:
+        join_consumer(recorder_thread)
+        recorder_thread = None
+    stop_shared_memory()
+    if stdout_emitter is not None:
+        stdout_emitter.thread.join(timeout=STDOUT_DRAIN_TIMEOUT)
+        if stdout_emitter.thread.is_alive():
+            discarded = stdout_emitter.close()
+            print(f"Node is not reading the stream; {discarded} queued chunks dropped", file=sys.stderr)
+    
     # Terminate visualizer process
     if visualizer_process is not None:
         try:
@@ -804,23 +1692,82 @@ if __name__ == '__main__':
     
     parser = argparse.ArgumentParser()
     parser.add_argument('--action', type=str, required=True, 
-                        help='Action to perform: connect, check_connection, start_recording, stop_recording, disconnect')
-    parser.add_argument('--serial_port', type=str, required=True, 
-                        help='Serial port for OpenBCI board (e.g., COM3, /dev/ttyUSB0)')
+                        help='Action to perform: connect, check_connection, start_recording, stop_recording, disconnect, '
+                             'stream, status, discover')
+    parser.add_argument('--serial_port', type=str, required=False,
+                        help='Serial port for OpenBCI board (e.g., COM3, /dev/ttyUSB0); for discover, a '
+                             'comma-separated list of ports to probe (default: every candidate serial port)')
     parser.add_argument('--experiment_id', type=str, required=False, default='test',
                         help='Experiment ID for saving data')
     parser.add_argument('--duration', type=int, required=False, default=5,
-                        help='Duration to record in seconds')
+                        help='Seconds the stream action records for (0 runs until terminated)')
     parser.add_argument('--output_file', type=str, required=False,
                         help='Output filename for saving data')
     parser.add_argument('--experiment_name', type=str, required=False, default='',
                         help='Experiment name for visualization')
+    parser.add_argument('--board', type=str, required=False, default='cyton', choices=list(BOARD_SOURCES),
+                        help='Board source: cyton (Cyton+Daisy, then Cyton on the serial port), synthetic '
+                             '(BrainFlow synthetic board), playback (replay --playback_file through BrainFlow) '
+                             'or generator (built-in synthetic EEG, no BrainFlow needed)')
+    parser.add_argument('--playback_file', type=str, required=False,
+                        help='Recording to replay with --board playback (a CSV in uploads/eeg or a path)')
+    parser.add_argument('--generator_channels', type=int, required=False, default=16,
+                        help='Channel count for the synthetic generator (1-256)')
+    parser.add_argument('--generator_rate', type=int, required=False, default=250,
+                        help='Sampling rate in Hz for the synthetic generator (up to 16000)')
+    parser.add_argument('--metrics_port', type=int, required=False,
+                        help='Serve Prometheus text metrics on this local port while the bridge runs')
+    parser.add_argument('--connect_timeout', type=float, required=False, default=CONNECT_TIMEOUT,
+                        help='Seconds to wait for the serial device and board session to get ready')
+    parser.add_argument('--probe_timeout', type=float, required=False, default=PROBE_TIMEOUT,
+                        help='Seconds each serial port may take to answer during discover')
+    parser.add_argument('--export_format', type=str, required=False, choices=['edf', 'bdf'],
+                        help='Also write the recording as EDF+ (16-bit) or BDF+ (24-bit) while it is recorded')
+    parser.add_argument('--async_finalize', type=str, nargs='?', const='true', default='false',
+                        choices=['true', 'false'],
+                        help='stop_recording: return once the recording is saved and finish its EDF+/BDF+ export '
+                             'in the stream process, which announces it with a recording_finalized packet')
+    parser.add_argument('--stdout_policy', type=str, required=False, default=DEFAULT_EMIT_POLICY,
+                        choices=list(EMIT_POLICIES),
+                        help='How the EEG_STREAM output catches up when Node reads too slowly: drop the oldest '
+                             'chunks, decimate them or coalesce them into larger writes (the recording is '
+                             'never affected)')
+    parser.add_argument('--decimate_factor', type=int, required=False, default=DECIMATE_FACTOR,
+                        help='Keep every n-th sample while behind with --stdout_policy decimate')
+    parser.add_argument('--shm', type=str, nargs='?', const=DEFAULT_SHM_NAME, required=False,
+                        help='Also publish the samples in a shared-memory ring buffer with this name for local '
+                             f'readers such as brainwave_visualizer.py --shm (default name: {DEFAULT_SHM_NAME})')
+    parser.add_argument('--profile', type=str, nargs='?', const='', required=False,
+                        help='Profile the run (cProfile, tracemalloc, GC pauses) and write a report at exit '
+                             '(default: uploads/profiles/openbci_bridge_<time>.txt)')
     
     args = parser.parse_args()
+    if args.serial_port is None and args.action != 'discover':
+        parser.error(f'--serial_port is required for the {args.action} action')
+    
+    if args.profile is not None:
+        start_profiling(args.profile or default_report_path(f'openbci_bridge_{args.action}'))
     
     print(f"Executing action: {args.action} on port: {args.serial_port}")
     
+    if args.metrics_port:
+        try:
+            serve_metrics(metrics, args.metrics_port)
+            print(f"Serving metrics on http://127.0.0.1:{args.metrics_port}/metrics", file=sys.stderr)
+        except OSError as e:
+            print(f"Could not serve metrics on port {args.metrics_port}: {e}", file=sys.stderr)
+    
     try:
+        board_source = args.board
+        playback_file = args.playback_file
+        generator_channels = args.generator_channels
+        generator_rate = args.generator_rate
+        export_format = args.export_format
+        connect_timeout = args.connect_timeout
+        stdout_policy = args.stdout_policy
+        shm_name = args.shm
+        decimate_factor = args.decimate_factor
+        
         if args.action == 'connect':
             result = init_board(args.serial_port)
         elif args.action == 'check_connection':
@@ -828,9 +1775,20 @@ if __name__ == '__main__':
         elif args.action == 'start_recording':
             result = start_recording(args.serial_port, args.experiment_name)
         elif args.action == 'stop_recording':
-            result = stop_recording(args.serial_port, args.experiment_id, args.duration, args.output_file, args.experiment_name)
+            result = stop_recording(args.serial_port, args.experiment_id, args.output_file, args.experiment_name,
+                                    args.async_finalize == 'true')
         elif args.action == 'disconnect':
             result = disconnect(args.serial_port)
+        elif args.action == 'stream':
+            result = stream_session(args.serial_port, args.experiment_id, args.duration, args.output_file,
+                                    args.experiment_name)
+        elif args.action == 'status':
+            result = get_status()
+            # Latency statistics of the streaming process, if one has published them
+            result['stream_status'] = read_status_file()
+        elif args.action == 'discover':
+            ports = [port.strip() for port in args.serial_port.split(',') if port.strip()] if args.serial_port else None
+            result = discover_boards(ports, args.probe_timeout)
         else:
             result = {'status': 'error', 'message': f'Unknown action: {args.action}'}
     except Exception as e:
@@ -839,4 +1797,5 @@ if __name__ == '__main__':
         result = {'status': 'error', 'message': str(e)}
     
     # Output JSON result for Node.js to parse
-    print(json.dumps(result))
\ No newline at end of file
+    print_stdout(json.dumps(result))
+    wait_for_finalizers()
\ No newline at end of file
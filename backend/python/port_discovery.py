@@ -0,0 +1,108 @@
+"""
+Serial port discovery.
+
+Lists the serial ports an OpenBCI dongle may be on and probes them in
+parallel on a small pool of worker threads, each probe with its own
+timeout, so discovery takes about as long as the slowest probe rather than
+the sum of all of them.
+"""
+import glob
+import os
+import queue
+import threading
+import time
+
+PROBE_TIMEOUT = 5.0         # Seconds one port may take to answer
+MAX_WORKERS = 8             # Ports probed at the same time
+
+# Device names of USB serial adapters (the OpenBCI dongle is an FTDI adapter)
+SERIAL_PORT_PATTERNS = ['/dev/ttyUSB*', '/dev/ttyACM*', '/dev/cu.usbserial*', '/dev/tty.usbserial*']
+WINDOWS_COM_PORTS = 32      # COM1..COMn are checked on Windows without pyserial
+
+
+def candidate_ports(patterns=None):
+    """Serial ports that may have a board attached, sorted by name.
+
+    pyserial's port list is used when it is installed; otherwise USB
+    serial device names are globbed (COM ports that can be opened on
+    Windows).
+    """
+    if patterns is None:
+        try:
+            from serial.tools import list_ports
+            return sorted(port.device for port in list_ports.comports())
+        except ImportError:
+            pass
+        if os.name == 'nt':
+            from readiness import serial_port_ready
+            return [f'COM{i}' for i in range(1, WINDOWS_COM_PORTS + 1) if serial_port_ready(f'COM{i}')]
+        patterns = SERIAL_PORT_PATTERNS
+    ports = set()
+    for pattern in patterns:
+        ports.update(glob.glob(pattern))
+    return sorted(ports)
+
+
+def probe_concurrently(ports, probe, timeout=PROBE_TIMEOUT, workers=MAX_WORKERS):
+    """Run `probe(port)` for every port on a pool of worker threads.
+
+    Returns one result dict per port, in the order of `ports`. A probe
+    that raises gives {'port', 'status': 'error', 'message'}; one that
+    runs longer than `timeout` seconds from its own start gives
+    'status': 'timeout'. A timed-out probe cannot be interrupted, so its
+    daemon thread is left to finish on its own and another worker takes
+    over the remaining ports.
+    """
+    ports = list(dict.fromkeys(ports))
+    if not ports:
+        return []
+    pending = queue.Queue()
+    for port in ports:
+        pending.put(port)
+    finished = queue.Queue()
+    started = {}
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            try:
+                port = pending.get_nowait()
+            except queue.Empty:
+                return
+            with lock:
+                started[port] = time.monotonic()
+            try:
+                result = probe(port)
+            except Exception as e:
+                result = {'port': port, 'status': 'error', 'message': str(e)}
+            finished.put((port, result))
+
+    def start_worker():
+        threading.Thread(target=worker, daemon=True, name='port-probe').start()
+
+    for _ in range(min(workers or len(ports), len(ports))):
+        start_worker()
+
+    results = {}
+    while len(results) < len(ports):
+        now = time.monotonic()
+        with lock:
+            running = {port: at for port, at in started.items() if port not in results}
+        for port, at in running.items():
+            if now - at >= timeout:
+                results[port] = {'port': port, 'status': 'timeout',
+                                 'message': f'No answer within {timeout:.1f} s'}
+                # The stuck worker keeps its thread; replace it for the ports still queued
+                if not pending.empty():
+                    start_worker()
+        if len(results) == len(ports):
+            break
+        deadlines = [at + timeout for port, at in running.items() if port not in results]
+        wait = min(deadlines) - now if deadlines else timeout
+        try:
+            port, result = finished.get(timeout=max(wait, 0.001))
+        except queue.Empty:
+            continue
+        # A result arriving after its port timed out is dropped
+        results.setdefault(port, result)
+    return [results[port] for port in ports]
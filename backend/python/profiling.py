@@ -0,0 +1,192 @@
+import atexit
+import cProfile
+import gc
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+PROFILE_DIR = os.path.join('uploads', 'profiles')
+TOP_FUNCTIONS = 30          # Hot functions listed in the report
+TOP_THREAD_FUNCTIONS = 10   # Hot functions listed per thread
+TOP_ALLOCATIONS = 25        # Call sites listed by allocation growth
+TRACEMALLOC_FRAMES = 5
+
+
+def default_report_path(name):
+    """Report path under uploads/profiles named after the script and start time."""
+    return os.path.join(PROFILE_DIR, f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
+
+
+class RunProfiler:
+    """cProfile, tracemalloc and GC pause profiling for a whole run.
+
+    Every thread started after start() gets its own cProfile profile (the
+    hook is installed with threading.setprofile), so background threads such
+    as the stream and stdin readers show up next to the main thread. The
+    report lists hot functions overall and per thread, allocation growth
+    per call site between start and finish, and GC pause statistics.
+    """
+
+    def __init__(self, report_path, tracemalloc_frames=TRACEMALLOC_FRAMES):
+        self.report_path = report_path
+        self.tracemalloc_frames = tracemalloc_frames
+        self.profiles = []
+        self.gc_pauses = []
+        self.started = None
+        self.finished = False
+        self._gc_started = None
+        self._baseline = None
+        self._final = None
+        self._lock = threading.Lock()
+
+    def _add_profile(self):
+        """Create, register and enable a profile for the calling thread."""
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ profiles every thread from the first enabled profile
+            return
+        with self._lock:
+            self.profiles.append((threading.current_thread().name, profile))
+
+    def _thread_bootstrap(self, frame, event, arg):
+        """Profile hook run once in each new thread; replaced by the thread's own profile."""
+        sys.setprofile(None)
+        self._add_profile()
+
+    def _gc_callback(self, phase, info):
+        if phase == 'start':
+            self._gc_started = time.perf_counter()
+        elif self._gc_started is not None:
+            self.gc_pauses.append((info.get('generation', -1), time.perf_counter() - self._gc_started))
+            self._gc_started = None
+
+    def start(self):
+        """Start profiling the calling thread and every thread started from now on."""
+        self.started = time.time()
+        tracemalloc.start(self.tracemalloc_frames)
+        self._baseline = tracemalloc.take_snapshot()
+        gc.callbacks.append(self._gc_callback)
+        threading.setprofile(self._thread_bootstrap)
+        self._add_profile()
+        return self
+
+    def stop(self):
+        """Stop collecting; safe to call more than once."""
+        if self.finished:
+            return
+        self.finished = True
+        threading.setprofile(None)
+        for _, profile in self.profiles:
+            profile.disable()
+        if self._gc_callback in gc.callbacks:
+            gc.callbacks.remove(self._gc_callback)
+        if tracemalloc.is_tracing():
+            self._final = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+
+    def _stats(self, profiles, stream):
+        stats = None
+        for _, profile in profiles:
+            try:
+                if stats is None:
+                    stats = pstats.Stats(profile, stream=stream)
+                else:
+                    stats.add(profile)
+            except TypeError:
+                # A thread that never made a call has no stats
+                continue
+        return stats
+
+    def hot_functions(self, limit=TOP_FUNCTIONS):
+        """Merged cProfile statistics of every thread, sorted by cumulative time."""
+        stream = io.StringIO()
+        stats = self._stats(self.profiles, stream)
+        if stats is None:
+            return "No profile data\n"
+        stats.sort_stats('cumulative').print_stats(limit)
+        return stream.getvalue()
+
+    def thread_functions(self, limit=TOP_THREAD_FUNCTIONS):
+        """Per-thread statistics sorted by own (internal) time."""
+        sections = []
+        for name, profile in self.profiles:
+            stream = io.StringIO()
+            stats = self._stats([(name, profile)], stream)
+            if stats is None:
+                continue
+            stats.sort_stats('tottime').print_stats(limit)
+            sections.append(f"--- Thread {name} ---\n{stream.getvalue()}")
+        return '\n'.join(sections)
+
+    def allocation_growth(self, limit=TOP_ALLOCATIONS):
+        """Call sites whose allocated memory grew the most between start and finish."""
+        if self._baseline is None or self._final is None:
+            return "No allocation snapshots\n"
+        lines = []
+        for diff in self._final.compare_to(self._baseline, 'lineno')[:limit]:
+            frame = diff.traceback[0]
+            lines.append(f"{diff.size_diff / 1024:+10.1f} KiB {diff.count_diff:+8d} blocks  "
+                         f"{frame.filename}:{frame.lineno}")
+        current = sum(stat.size for stat in self._final.statistics('filename'))
+        lines.append(f"Traced memory at finish: {current / 1024 / 1024:.1f} MiB")
+        return '\n'.join(lines) + '\n'
+
+    def gc_summary(self):
+        """GC pause count, total, p95 and max per generation."""
+        if not self.gc_pauses:
+            return "No garbage collections\n"
+        lines = []
+        for generation in sorted({generation for generation, _ in self.gc_pauses}):
+            pauses = np.array([pause for g, pause in self.gc_pauses if g == generation]) * 1000
+            lines.append(f"generation {generation}: {len(pauses)} collections, total {pauses.sum():.2f} ms, "
+                         f"p95 {np.percentile(pauses, 95):.3f} ms, max {pauses.max():.3f} ms")
+        return '\n'.join(lines) + '\n'
+
+    def report(self):
+        """Full text report."""
+        duration = time.time() - self.started if self.started else 0
+        threads = ', '.join(name for name, _ in self.profiles)
+        return '\n'.join([
+            f"Profile report ({duration:.1f} s, threads: {threads})",
+            "",
+            "=== Hot functions (all threads, by cumulative time) ===",
+            self.hot_functions(),
+            "=== Hot functions per thread (by own time) ===",
+            self.thread_functions(),
+            "=== Allocation growth per call site ===",
+            self.allocation_growth(),
+            "=== GC pauses ===",
+            self.gc_summary(),
+        ])
+
+    def finish(self):
+        """Stop profiling and write the text report plus a merged .prof file for pstats viewers."""
+        self.stop()
+        try:
+            directory = os.path.dirname(self.report_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.report_path, 'w') as f:
+                f.write(self.report())
+            stats = self._stats(self.profiles, io.StringIO())
+            if stats is not None:
+                stats.dump_stats(os.path.splitext(self.report_path)[0] + '.prof')
+            print(f"Profile report written to {self.report_path}", file=sys.stderr)
+        except Exception as e:
+            print(f"Could not write profile report: {e}", file=sys.stderr)
+
+
+def start_profiling(report_path):
+    """Start a RunProfiler that writes its report when the process exits."""
+    profiler = RunProfiler(report_path).start()
+    atexit.register(profiler.finish)
+    return profiler
@@ -0,0 +1,76 @@
+"""
+Readiness probing with exponential backoff.
+
+Board connection waits for the serial device, the BrainFlow session and the
+first samples by polling them, starting with short intervals that double up
+to a cap, until they respond or a deadline passes. A board that is ready at
+once costs one probe instead of a fixed sleep.
+"""
+import os
+import time
+
+INITIAL_INTERVAL = 0.01     # First wait between probes in seconds
+MAX_INTERVAL = 0.25         # Longest wait between probes in seconds
+BACKOFF_FACTOR = 2.0
+
+
+class ReadinessTimeout(Exception):
+    """Raised when a probe has not succeeded by its deadline."""
+
+    def __init__(self, what, timeout, attempts, last_error=None):
+        message = f"{what} not ready after {timeout:.2f} s ({attempts} attempts)"
+        if last_error is not None:
+            message += f": {last_error}"
+        super().__init__(message)
+        self.attempts = attempts
+        self.last_error = last_error
+
+
+def wait_until(probe, timeout, what='Device', initial_interval=INITIAL_INTERVAL, max_interval=MAX_INTERVAL,
+               clock=time.monotonic, sleep=time.sleep):
+    """Call `probe` until it returns a true value, backing off exponentially between calls.
+
+    An exception from the probe counts as not ready. Returns (result,
+    attempts, elapsed seconds); raises ReadinessTimeout when `timeout`
+    seconds pass first. The probe always runs at least once.
+    """
+    started = clock()
+    deadline = started + timeout
+    interval = initial_interval
+    attempts = 0
+    last_error = None
+    while True:
+        attempts += 1
+        try:
+            result = probe()
+            if result:
+                return result, attempts, clock() - started
+        except Exception as e:
+            last_error = e
+        remaining = deadline - clock()
+        if remaining <= 0:
+            raise ReadinessTimeout(what, timeout, attempts, last_error)
+        sleep(min(interval, remaining))
+        interval = min(interval * BACKOFF_FACTOR, max_interval)
+
+
+def serial_device_path(serial_port):
+    """Filesystem path of a serial port name (COM ports use the Windows device namespace)."""
+    if os.name == 'nt' and not serial_port.startswith('\\\\'):
+        return '\\\\.\\' + serial_port
+    return serial_port
+
+
+def serial_port_ready(serial_port):
+    """True when the serial device exists and can be opened.
+
+    The device is opened without becoming the controlling terminal and
+    closed again at once, so BrainFlow can open it right after.
+    """
+    flags = os.O_RDWR | getattr(os, 'O_NONBLOCK', 0) | getattr(os, 'O_NOCTTY', 0)
+    try:
+        fd = os.open(serial_device_path(serial_port), flags)
+    except OSError:
+        return False
+    os.close(fd)
+    return True
@@ -0,0 +1,256 @@
+"""
+Chunked export of EEG recordings.
+
+Yields a recording, or a time range of it, as a stream of fixed-size byte
+chunks with optional channel selection, filtering and decimation applied on
+the fly. Memory stays bounded however large the recording is, and an
+interrupted transfer can be resumed from a byte offset.
+
+Formats:
+    csv     timestamp,channel_N,... rows
+    binary  one JSON header line, then little-endian float64 rows
+            (timestamp followed by the selected channels)
+Either can be gzip-compressed.
+
+    python recording_export.py uploads/eeg/rec.csv --start 60 --end 120 --channels 1 2 --decimate 2 -o out.csv
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import zlib
+
+import numpy as np
+
+from recordings import iter_chunks, read_header, recording_sampling_rate
+
+try:
+    from scipy import signal as sig_processing
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+EXPORT_FORMATS = ('csv', 'binary')
+BINARY_FORMAT = 'eeg-float64-v1'
+CHUNK_BYTES = 64 * 1024     # Size of each yielded chunk
+EXPORT_ROWS = 4096          # Rows read and encoded at a time
+FILTER_ORDER = 4
+ANTIALIAS_ORDER = 8
+ANTIALIAS_FRACTION = 0.8    # Anti-alias cutoff as a fraction of the decimated Nyquist frequency
+
+
+class StreamingFilter:
+    """Butterworth filter (second-order sections) applied chunk by chunk, carrying its state."""
+
+    def __init__(self, sampling_rate, lowcut=None, highcut=None, order=FILTER_ORDER):
+        if not SCIPY_AVAILABLE:
+            raise RuntimeError("scipy is required for filtering")
+        if lowcut and highcut:
+            cutoff, btype = [lowcut, highcut], 'band'
+        elif lowcut:
+            cutoff, btype = lowcut, 'highpass'
+        else:
+            cutoff, btype = highcut, 'lowpass'
+        self.sos = sig_processing.butter(order, cutoff, btype=btype, fs=sampling_rate, output='sos')
+        self.zi = None
+
+    def process(self, values):
+        """Filter the next rows (samples x channels)."""
+        if len(values) == 0:
+            return values
+        if self.zi is None:
+            # Start settled on the first sample to avoid an onset transient
+            self.zi = sig_processing.sosfilt_zi(self.sos)[:, :, None] * values[0][None, None, :]
+        filtered, self.zi = sig_processing.sosfilt(self.sos, values, axis=0, zi=self.zi)
+        return filtered
+
+
+def _header(fmt, columns, sampling_rate):
+    if fmt == 'csv':
+        return (','.join(columns) + '\n').encode('utf-8')
+    return (json.dumps({'format': BINARY_FORMAT, 'columns': columns, 'dtype': '<f8',
+                        'sampling_rate': sampling_rate}) + '\n').encode('utf-8')
+
+
+def _encode(rows, fmt):
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        np.savetxt(buffer, rows, delimiter=',', fmt='%.6f')
+        return buffer.getvalue().encode('utf-8')
+    return rows.astype('<f8').tobytes()
+
+
+def _encoded_pieces(file_path, header, fmt, selected, start_time, end_time, decimate, signal_filter,
+                    skip_rows, cache_dir):
+    """Header and encoded rows after channel selection, filtering and decimation."""
+    yield header
+    seen = 0
+    for timestamps, values in iter_chunks(file_path, EXPORT_ROWS, cache_dir, start_time, end_time):
+        values = values[:, selected]
+        if signal_filter is not None:
+            values = signal_filter.process(values)
+        if decimate > 1:
+            keep = (seen + np.arange(len(values))) % decimate == 0
+            seen += len(values)
+            timestamps, values = timestamps[keep], values[keep]
+        rows = np.column_stack((timestamps, values))
+        if skip_rows:
+            # Rows before a resume offset are dropped without being encoded
+            dropped = min(skip_rows, len(rows))
+            rows = rows[dropped:]
+            skip_rows -= dropped
+        if len(rows):
+            yield _encode(rows, fmt)
+
+
+def _gzip(pieces):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for piece in pieces:
+        data = compressor.compress(piece)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _fixed_chunks(pieces, chunk_bytes, offset):
+    """Re-cut a byte stream into chunk_bytes chunks, starting `offset` bytes in."""
+    buffer = bytearray()
+    for piece in pieces:
+        if offset:
+            dropped = min(offset, len(piece))
+            piece = piece[dropped:]
+            offset -= dropped
+        buffer += piece
+        while len(buffer) >= chunk_bytes:
+            yield bytes(buffer[:chunk_bytes])
+            del buffer[:chunk_bytes]
+    if buffer:
+        yield bytes(buffer)
+
+
+def export_chunks(file_path, start_time=None, end_time=None, channels=None, decimate=1, lowcut=None, highcut=None,
+                  fmt='csv', compress=False, chunk_bytes=CHUNK_BYTES, offset=0, sampling_rate=None,
+                  cache_dir=None):
+    """Yield an export of a recording as byte chunks of `chunk_bytes` (the last one may be shorter).
+
+    start_time/end_time are timestamps bounding the exported range [start, end).
+    channels selects 1-based channel numbers. Filtering (lowcut/highcut in Hz)
+    runs before decimation, which keeps every `decimate`-th sample behind an
+    anti-alias lowpass. The output for the same arguments is always the same
+    bytes, so a transfer that stopped after N bytes resumes with offset=N.
+    Uncompressed binary exports skip whole rows before the offset without
+    encoding them; other formats regenerate and discard the skipped bytes.
+    The sampling rate, unless given, is that of the recording's sample clock
+    (see recordings.recording_sampling_rate); filtering and decimation need
+    one.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}; expected one of {', '.join(EXPORT_FORMATS)}")
+    decimate = max(1, int(decimate))
+
+    header_columns = read_header(file_path)
+    channel_count = len(header_columns) - 1
+    channels = list(channels) if channels else list(range(1, channel_count + 1))
+    invalid = [channel for channel in channels if not 1 <= channel <= channel_count]
+    if invalid:
+        raise ValueError(f"Channels {invalid} are outside 1-{channel_count}")
+    selected = [channel - 1 for channel in channels]
+
+    try:
+        rate = recording_sampling_rate(file_path, sampling_rate, cache_dir)
+    except ValueError:
+        if decimate > 1 or lowcut or highcut:
+            raise
+        rate = None
+    signal_filter = None
+    if decimate > 1:
+        antialias = ANTIALIAS_FRACTION * rate / decimate / 2
+        signal_filter = StreamingFilter(rate, lowcut, min(highcut or antialias, antialias), ANTIALIAS_ORDER)
+    elif lowcut or highcut:
+        signal_filter = StreamingFilter(rate, lowcut, highcut)
+
+    columns = ['timestamp'] + [header_columns[channel] for channel in channels]
+    header = _header(fmt, columns, rate / decimate if rate else None)
+    skip_rows = 0
+    if fmt == 'binary' and not compress and offset > len(header):
+        row_bytes = 8 * len(columns)
+        skip_rows = (offset - len(header)) // row_bytes
+        offset -= skip_rows * row_bytes
+
+    pieces = _encoded_pieces(file_path, header, fmt, selected, start_time, end_time, decimate, signal_filter,
+                             skip_rows, cache_dir)
+    if compress:
+        pieces = _gzip(pieces)
+    yield from _fixed_chunks(pieces, chunk_bytes, offset)
+
+
+def export_to_file(file_path, output_path, resume=False, **options):
+    """Write an export to `output_path`; with `resume`, continue a partial file where it stopped.
+
+    Returns the size of the finished file.
+    """
+    offset = os.path.getsize(output_path) if resume and os.path.exists(output_path) else 0
+    with open(output_path, 'ab' if offset else 'wb') as f:
+        for chunk in export_chunks(file_path, offset=offset, **options):
+            f.write(chunk)
+    return os.path.getsize(output_path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Export an EEG recording, or part of it, in chunks')
+    parser.add_argument('file', help='CSV recording to export')
+    parser.add_argument('--start', type=float, default=None,
+                        help='Start of the exported range in seconds from the first sample')
+    parser.add_argument('--end', type=float, default=None,
+                        help='End of the exported range in seconds from the first sample')
+    parser.add_argument('--channels', type=int, nargs='+', default=None,
+                        help='1-based channel numbers to export (default: all)')
+    parser.add_argument('--decimate', type=int, default=1,
+                        help='Keep every Nth sample after an anti-alias lowpass')
+    parser.add_argument('--lowcut', type=float, default=None, help='Highpass / bandpass low cutoff in Hz')
+    parser.add_argument('--highcut', type=float, default=None, help='Lowpass / bandpass high cutoff in Hz')
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv', help='Output format')
+    parser.add_argument('--compress', action='store_true', help='gzip-compress the output')
+    parser.add_argument('--sampling_rate', type=float, default=None,
+                        help="Sampling rate in Hz (default: the rate of the recording's sample clock)")
+    parser.add_argument('--offset', type=int, default=0,
+                        help='Skip this many bytes of the output (resume a byte range)')
+    parser.add_argument('--chunk_bytes', type=int, default=CHUNK_BYTES, help='Size of each written chunk')
+    parser.add_argument('-o', '--output', default='-',
+                        help="Output file, or '-' for stdout (default)")
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue a partially written output file instead of overwriting it')
+
+    args = parser.parse_args()
+
+    try:
+        # Times on the command line are relative to the first sample
+        start_time = end_time = None
+        for timestamps, _ in iter_chunks(args.file, chunk_rows=1):
+            start_time = timestamps[0] + args.start if args.start is not None else None
+            end_time = timestamps[0] + args.end if args.end is not None else None
+            break
+        options = {
+            'start_time': start_time,
+            'end_time': end_time,
+            'channels': args.channels,
+            'decimate': args.decimate,
+            'lowcut': args.lowcut,
+            'highcut': args.highcut,
+            'fmt': args.format,
+            'compress': args.compress,
+            'chunk_bytes': args.chunk_bytes,
+            'sampling_rate': args.sampling_rate,
+        }
+
+        if args.output == '-':
+            for chunk in export_chunks(args.file, offset=args.offset, **options):
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+        else:
+            size = export_to_file(args.file, args.output, resume=args.resume, **options)
+            print(json.dumps({'status': 'success', 'file_path': args.output, 'bytes': size}))
+    except Exception as e:
+        print(json.dumps({'status': 'error', 'message': str(e)}), file=sys.stderr if args.output == '-' else sys.stdout)
+        sys.exit(1)
@@ -0,0 +1,598 @@
+import csv
+import hashlib
+import json
+import os
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from eeg_replay import parse_csv_rows
+from timebase import ClockModel, ClockTracker, FILL_MODES, TimestampGapFinder, fill_samples, index_at, \
+    rows_to_samples, samples_to_rows, time_at
+
+# Recordings are CSV files written by openbci_bridge.export_csv:
+#   timestamp,channel_1,...,channel_N
+RECORDINGS_DIR = os.path.join('uploads', 'eeg')
+CACHE_DIR = os.path.join('uploads', 'cache')
+CHUNK_ROWS = 50000          # Rows parsed per chunk when streaming a recording
+INDEX_INTERVAL = 1000       # Rows between entries of a recording's time-range index
+INDEX_SUFFIX = '.idx'
+CLOCK_SUFFIX = '.clock.json'
+MARKERS_SUFFIX = '.markers.csv'    # timestamp,duration,text annotations of a recording
+CONVERT_BLOCK_BYTES = 8 * 1024 * 1024   # CSV bytes parsed per block when building the cache
+RATE_FITS = 4               # Most clock fits when estimating a sampling rate from timestamps
+
+# A recording loaded from the binary cache
+#   header:   CSV column names
+#   data:     read-only memory-mapped (rows, columns) float64 array, timestamps in column 0
+#   data_end: byte offset in the CSV just past the last cached row
+CachedRecording = namedtuple('CachedRecording', ['header', 'data', 'data_end'])
+
+
+def read_header(file_path):
+    """Column names of a CSV recording."""
+    with open(file_path, 'rb') as f:
+        return f.readline().decode('utf-8').strip().split(',')
+
+
+def iter_chunks(file_path, chunk_rows=CHUNK_ROWS, cache_dir=None, start_time=None, end_time=None):
+    """Yield a CSV recording as consecutive (timestamps, values[rows, channels]) chunks.
+
+    Only one chunk of text and parsed rows is held in memory at a time, so
+    recordings of any size can be processed. With `cache_dir` the chunks are
+    slices of the memory-mapped binary cache instead (see load_recording).
+    `start_time` and `end_time` limit the chunks to timestamps in
+    [start_time, end_time); reading starts at the time-range index entry
+    before start_time rather than at the top of the file.
+    """
+    if cache_dir:
+        data = load_recording(file_path, cache_dir).data
+        first, last = 0, len(data)
+        if start_time is not None:
+            first = int(np.searchsorted(data[:, 0], start_time, side='left'))
+        if end_time is not None:
+            last = int(np.searchsorted(data[:, 0], end_time, side='left'))
+        for start in range(first, last, chunk_rows):
+            rows = data[start:min(start + chunk_rows, last)]
+            yield rows[:, 0], rows[:, 1:]
+        return
+
+    columns = len(read_header(file_path))
+    with open(file_path, 'rb') as f:
+        f.readline()
+        if start_time is not None:
+            samples, timestamps, offsets = load_index(file_path)
+            position = index_entry(samples, timestamps, start_time, *load_clock(file_path))
+            if position >= 0:
+                f.seek(int(offsets[position]))
+        while True:
+            lines = f.readlines(chunk_rows * columns * 12)
+            if not lines:
+                return
+            rows = parse_csv_rows(b''.join(lines).decode('utf-8'), columns)
+            if start_time is not None:
+                rows = rows[rows[:, 0] >= start_time]
+            if end_time is not None and len(rows) and rows[-1, 0] >= end_time:
+                rows = rows[rows[:, 0] < end_time]
+                if len(rows):
+                    yield rows[:, 0], rows[:, 1:]
+                return
+            if len(rows):
+                yield rows[:, 0], rows[:, 1:]
+
+
+def list_recordings(directory=RECORDINGS_DIR, pattern_suffix='.csv'):
+    """CSV recordings in a directory, sorted by name."""
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.endswith(pattern_suffix) and not name.endswith(MARKERS_SUFFIX)
+                  and os.path.isfile(os.path.join(directory, name)))
+
+
+def estimate_sampling_rate(timestamps):
+    """Sampling rate of a least-squares fit of timestamps against sample numbers (None without one).
+
+    Host timestamps come in batches stamped microseconds apart, so single
+    steps say nothing about the rate; a fit over several batches does. The
+    fit is made again with the dropped samples it shows counted in, until
+    they stay the same.
+    """
+    tracker = ClockTracker()
+    tracker.update(timestamps)
+    gaps = None
+    for _ in range(RATE_FITS):
+        rate = tracker.fitted_rate()
+        if rate is None:
+            return None
+        finder = TimestampGapFinder(rate)
+        tracker = ClockTracker()
+        for settled, missing in (finder.update(timestamps), finder.finish()):
+            tracker.update(settled, missing=missing)
+        if tracker.gaps == gaps:
+            break
+        gaps = tracker.gaps
+    return tracker.fitted_rate()
+
+
+def recording_sampling_rate(file_path, sampling_rate=None, cache_dir=None):
+    """Sampling rate of a recording: `sampling_rate` when given, else the rate of its sample clock.
+
+    The clock (see read_clock) is fitted over the whole recording, by the
+    writer or from the timestamps; with too few samples for a fit, the
+    board's nominal rate saved with it is used. Raises ValueError when
+    neither is known.
+    """
+    if sampling_rate:
+        return float(sampling_rate)
+    info = read_clock(file_path, cache_dir)
+    rate = info['rate'] if info.get('fitted') else info.get('nominal_rate')
+    if not rate:
+        raise ValueError(f"Cannot determine the sampling rate of {file_path}; pass it explicitly")
+    return float(rate)
+
+
+def path_stem(file_path):
+    """File name of a recording without extension, with a hash of its absolute path appended.
+
+    Files derived from recordings are named after it, so that recordings
+    with the same name in different directories do not share them.
+    """
+    key = hashlib.sha1(os.path.abspath(file_path).encode('utf-8')).hexdigest()[:12]
+    return f"{os.path.splitext(os.path.basename(file_path))[0]}_{key}"
+
+
+def cache_paths(file_path, cache_dir=CACHE_DIR):
+    """(.npy data, .json metadata) cache paths for a recording, unique per absolute path."""
+    base = os.path.join(cache_dir, path_stem(file_path))
+    return base + '.npy', base + '.json'
+
+
+def _source_state(file_path):
+    stat = os.stat(file_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def read_cache_info(file_path, cache_dir=CACHE_DIR):
+    """Metadata of the cached conversion, or None when it is missing or the CSV has changed."""
+    data_path, info_path = cache_paths(file_path, cache_dir)
+    try:
+        with open(info_path, 'r') as f:
+            info = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if info.get('source') != _source_state(file_path) or not os.path.exists(data_path):
+        return None
+    return info
+
+
+def _parse_block(block, columns):
+    """Parse the complete rows of a block; returns (rows, bytes consumed)."""
+    end = block.rfind(b'\n') + 1
+    rows = parse_csv_rows(block[:end].decode('utf-8'), columns)
+    return rows, end
+
+
+def convert_to_cache(file_path, cache_dir=CACHE_DIR):
+    """Parse a CSV recording once into a .npy array in the cache and return its metadata.
+
+    The size and mtime of the CSV are recorded before it is read, so a file
+    that changes during or after the conversion is converted again on the
+    next load. A final row without a trailing newline is only cached when it
+    is complete (a live recording may be halfway through writing it).
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    data_path, info_path = cache_paths(file_path, cache_dir)
+    source = _source_state(file_path)
+    header = read_header(file_path)
+    columns = len(header)
+
+    # First pass: count rows so the array can be preallocated on disk
+    with open(file_path, 'rb') as f:
+        f.readline()
+        data_offset = f.tell()
+        size = data_offset
+        expected = 0
+        last = b'\n'
+        while True:
+            block = f.read(CONVERT_BLOCK_BYTES)
+            if not block:
+                break
+            expected += block.count(b'\n')
+            size += len(block)
+            last = block[-1:]
+        if last != b'\n':
+            expected += 1
+
+    tmp_path = f"{data_path}.{os.getpid()}.tmp"
+    row, data_end = 0, data_offset
+    if expected:
+        data = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float64, shape=(expected, columns))
+        with open(file_path, 'rb') as f:
+            f.seek(data_offset)
+            carry = b''
+            remaining = size - data_offset
+            while remaining > 0:
+                block = f.read(min(CONVERT_BLOCK_BYTES, remaining))
+                if not block:
+                    break
+                remaining -= len(block)
+                rows, end = _parse_block(carry + block, columns)
+                data[row:row + len(rows)] = rows
+                row += len(rows)
+                data_end += end
+                carry = (carry + block)[end:]
+            if carry.strip():
+                try:
+                    rows = parse_csv_rows(carry.decode('utf-8'), columns)
+                    data[row:row + len(rows)] = rows
+                    row += len(rows)
+                    data_end += len(carry)
+                except ValueError:
+                    pass
+        data.flush()
+        del data
+
+    if row != expected or not expected:
+        # Blank lines, an incomplete last row or no rows at all: store just the parsed rows
+        parsed = np.load(tmp_path, mmap_mode='r')[:row].copy() if expected else np.empty((0, columns))
+        with open(tmp_path, 'wb') as f:
+            np.save(f, parsed)
+
+    # Drop the old metadata first so a concurrent reader never pairs it with new data
+    if os.path.exists(info_path):
+        os.remove(info_path)
+    os.replace(tmp_path, data_path)
+    info = {'source': source, 'header': header, 'rows': row, 'data_end': data_end,
+            'converted': time.time()}
+    tmp_info = f"{info_path}.{os.getpid()}.tmp"
+    with open(tmp_info, 'w') as f:
+        json.dump(info, f)
+    os.replace(tmp_info, info_path)
+    return info
+
+
+def load_recording(file_path, cache_dir=CACHE_DIR):
+    """Load a CSV recording as a CachedRecording backed by a memory-mapped binary cache.
+
+    The first load parses the CSV and writes the cache; later loads map the
+    cached array directly until the CSV's size or mtime changes.
+    """
+    info = read_cache_info(file_path, cache_dir)
+    if info is None:
+        info = convert_to_cache(file_path, cache_dir)
+    if info['rows'] == 0:
+        # Zero-length files cannot be memory-mapped
+        data = np.empty((0, len(info['header'])))
+    else:
+        data = np.load(cache_paths(file_path, cache_dir)[0], mmap_mode='r')
+    return CachedRecording(info['header'], data, info['data_end'])
+
+
+def index_path(file_path):
+    """Path of the time-range index kept next to a CSV recording."""
+    return file_path + INDEX_SUFFIX
+
+
+def clock_path(file_path):
+    """Path of the sample clock (timebase.ClockTracker state) kept next to a CSV recording."""
+    return file_path + CLOCK_SUFFIX
+
+
+def write_clock(file_path, tracker):
+    """Write the sample clock of a recording, replacing the previous one atomically."""
+    path = clock_path(file_path)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(tracker.to_dict(), f)
+    os.replace(path + '.tmp', path)
+
+
+def markers_path(file_path):
+    """Path of the markers (annotations) kept next to a CSV recording."""
+    return file_path + MARKERS_SUFFIX
+
+
+def append_marker(file_path, timestamp, duration, text):
+    """Add a timestamp,duration,text marker to a recording's markers file (duration may be None)."""
+    path = markers_path(file_path)
+    new = not os.path.exists(path)
+    with open(path, 'a', newline='') as f:
+        writer = csv.writer(f)
+        if new:
+            writer.writerow(['timestamp', 'duration', 'text'])
+        writer.writerow([repr(float(timestamp)), '' if duration is None else repr(float(duration)), text])
+
+
+class RecordingWriter:
+    """Append EEG samples to a CSV recording and its time-range index as they arrive.
+
+    The index is a small CSV of `sample,timestamp,offset` lines, one every
+    `index_interval` rows, giving the byte offset of that row in the
+    recording. It is flushed with every write, so a recording in progress
+    can already be read by time range. The sample clock is refitted with
+    every write too, using the board's package numbers when given to find
+    dropped samples (and the nominal `sampling_rate` to find drops
+    from timestamps).
+
+    After mark_discontinuity() (the board was reconnected) or mark_dropped()
+    (samples were left out), the next write records the gap before it as a
+    marker with its duration, and in the clock as dropped samples.
+    """
+
+    def __init__(self, file_path, channel_count, index_interval=INDEX_INTERVAL, sampling_rate=None):
+        self.file_path = file_path
+        self.index_interval = index_interval
+        self.clock = ClockTracker(sampling_rate)
+        self.samples = 0
+        self.last_timestamp = None
+        self.pending_gap = None
+        header = ('timestamp,' + ','.join(f'channel_{i+1}' for i in range(channel_count)) + '\n').encode('utf-8')
+        self.file = open(file_path, 'wb')
+        self.file.write(header)
+        self.bytes_written = len(header)
+        self.index_file = open(index_path(file_path), 'w')
+        self.index_file.write('sample,timestamp,offset\n')
+
+    def write(self, timestamps, eeg_data, package_numbers=None):
+        """Append samples (eeg_data is channels x samples, as returned by the board)."""
+        count = eeg_data.shape[1]
+        if count == 0:
+            return
+        self.clock.update(timestamps, package_numbers)
+        timestamps = np.asarray(timestamps).tolist()
+        if self.pending_gap is not None and self.last_timestamp is not None:
+            append_marker(self.file_path, self.last_timestamp, timestamps[0] - self.last_timestamp,
+                          self.pending_gap)
+            self.pending_gap = None
+        self.last_timestamp = timestamps[-1]
+        lines = [f"{t}," + ','.join(map(str, row)) + '\n' for t, row in zip(timestamps, eeg_data.T.tolist())]
+
+        # Offsets of the rows that fall on the index interval
+        first = -self.samples % self.index_interval
+        if first < count:
+            starts = np.concatenate(([0], np.cumsum([len(line) for line in lines[:-1]])))
+            for i in range(first, count, self.index_interval):
+                self.index_file.write(f"{self.samples + i},{timestamps[i]!r},{self.bytes_written + int(starts[i])}\n")
+
+        data = ''.join(lines).encode('utf-8')
+        self.file.write(data)
+        self.file.flush()
+        self.index_file.flush()
+        # Keep the index and clock at least as new as the recording so readers trust them
+        os.utime(index_path(self.file_path))
+        write_clock(self.file_path, self.clock)
+        self.samples += count
+        self.bytes_written += len(data)
+
+    def mark_discontinuity(self, text='Discontinuity'):
+        """Note that the samples after this point do not continue the ones before (e.g. a reconnect)."""
+        self.clock.restart()
+        self.pending_gap = text
+
+    def mark_dropped(self, samples, text='Samples dropped'):
+        """Note that `samples` samples were left out before the next write."""
+        self.clock.skip(samples)
+        self.pending_gap = text
+
+    def close(self):
+        if self.pending_gap is not None and self.last_timestamp is not None:
+            # The recording ended before the board came back
+            append_marker(self.file_path, self.last_timestamp, None, self.pending_gap)
+            self.pending_gap = None
+        self.file.close()
+        self.index_file.close()
+        os.utime(index_path(self.file_path))
+        write_clock(self.file_path, self.clock)
+
+    def move(self, file_path):
+        """Close and rename the recording, its index, clock and markers to `file_path`."""
+        self.close()
+        os.replace(self.file_path, file_path)
+        os.replace(index_path(self.file_path), index_path(file_path))
+        os.replace(clock_path(self.file_path), clock_path(file_path))
+        if os.path.exists(markers_path(self.file_path)):
+            os.replace(markers_path(self.file_path), markers_path(file_path))
+        self.file_path = file_path
+
+
+def build_index(file_path, index_interval=INDEX_INTERVAL):
+    """Write the time-range index of an existing CSV recording with one pass over the file."""
+    entries = []
+    row = 0
+    with open(file_path, 'rb') as f:
+        f.readline()
+        offset = f.tell()
+        carry = b''
+        while True:
+            block = f.read(CONVERT_BLOCK_BYTES)
+            if not block:
+                break
+            block = carry + block
+            newlines = np.flatnonzero(np.frombuffer(block, dtype=np.uint8) == 10)
+            starts = np.concatenate(([0], newlines[:-1] + 1)) if len(newlines) else np.empty(0, dtype=np.int64)
+            for i in np.flatnonzero((row + np.arange(len(starts))) % index_interval == 0):
+                start = int(starts[i])
+                timestamp = block[start:block.index(b',', start)]
+                if timestamp.strip():
+                    entries.append((row + int(i), float(timestamp), offset + start))
+            row += len(starts)
+            end = int(newlines[-1]) + 1 if len(newlines) else 0
+            offset += end
+            carry = block[end:]
+        if carry.strip() and row % index_interval == 0:
+            entries.append((row, float(carry.split(b',', 1)[0]), offset))
+
+    with open(index_path(file_path), 'w') as f:
+        f.write('sample,timestamp,offset\n')
+        for sample, timestamp, offset in entries:
+            f.write(f"{sample},{timestamp!r},{offset}\n")
+    return entries
+
+
+def load_index(file_path):
+    """Time-range index of a recording as (samples, timestamps, offsets) arrays.
+
+    The index is built first when it is missing or older than the recording.
+    """
+    path = index_path(file_path)
+    if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(file_path):
+        build_index(file_path)
+    entries = np.loadtxt(path, delimiter=',', skiprows=1, ndmin=2)
+    if len(entries) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0), np.empty(0, dtype=np.int64)
+    return entries[:, 0].astype(np.int64), entries[:, 1], entries[:, 2].astype(np.int64)
+
+
+def build_clock(file_path, sampling_rate=None, cache_dir=None):
+    """Fit and write the sample clock of an existing CSV recording with one pass over the file.
+
+    Without package numbers in the file, dropped samples are found from
+    the timestamps by a timebase.TimestampGapFinder, at `sampling_rate` or
+    the rate estimated from the first chunk.
+    """
+    tracker = ClockTracker(sampling_rate)
+    finder = None
+    for timestamps, _ in iter_chunks(file_path, cache_dir=cache_dir):
+        if finder is None:
+            tracker.sampling_rate = tracker.sampling_rate or estimate_sampling_rate(timestamps)
+            finder = TimestampGapFinder(tracker.sampling_rate)
+        settled, missing = finder.update(timestamps)
+        tracker.update(settled, missing=missing)
+    if finder is not None:
+        settled, missing = finder.finish()
+        tracker.update(settled, missing=missing)
+    write_clock(file_path, tracker)
+    return tracker
+
+
+def read_clock(file_path, cache_dir=None):
+    """Saved sample clock of a recording (timebase.ClockTracker.to_dict()).
+
+    The clock is built first when it is missing or older than the recording.
+    It is rebuilt too when its gaps were taken from raw timestamp steps (by
+    a writer without package numbers, or by an earlier version), which
+    takes every host batch for a gap.
+    """
+    path = clock_path(file_path)
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(file_path):
+        with open(path, 'r') as f:
+            info = json.load(f)
+        if info.get('package_step') is not None or info.get('gap_source') in ('packages', 'timestamps'):
+            return info
+        # A writer's nominal rate still holds; an earlier version (no 'fitted' flag) saved a step estimate
+        return build_clock(file_path, info.get('nominal_rate') if 'fitted' in info else None, cache_dir).to_dict()
+    return build_clock(file_path, cache_dir=cache_dir).to_dict()
+
+
+def load_clock(file_path):
+    """Sample clock of a recording as (ClockModel or None, gaps).
+
+    The clock is built first when it is missing or older than the recording.
+    """
+    info = read_clock(file_path)
+    clock = ClockModel(info['t0'], info['rate']) if info['t0'] is not None else None
+    return clock, [tuple(gap) for gap in info['gaps']]
+
+
+def index_entry(samples, timestamps, t, clock=None, gaps=(), before=False):
+    """Position of the last index entry with timestamp <= t (< t with `before`), or -1.
+
+    The entry is computed from the sample clock, then corrected by the few
+    steps the timestamps' jitter may need, instead of searching the index.
+    """
+    if len(samples) == 0:
+        return -1
+    interval = int(samples[1] - samples[0]) if len(samples) > 1 else 1
+    position = 0
+    if clock is not None:
+        row = int(samples_to_rows(index_at(clock, t), gaps))
+        position = min(max(row // interval, 0), len(samples) - 1)
+
+    def after(p):
+        return timestamps[p] >= t if before else timestamps[p] > t
+
+    while position >= 0 and after(position):
+        position -= 1
+    while position + 1 < len(samples) and not after(position + 1):
+        position += 1
+    return position
+
+
+def read_window(file_path, t0, t1, cache_dir=None):
+    """Samples with t0 <= timestamp < t1 as (timestamps, values[rows, channels]).
+
+    Only the index entries around the window and the rows between them are
+    read, so the cost follows the window length, not the file size; the
+    entries are located from the sample clock (see load_clock). With
+    `cache_dir` the rows are sliced from the memory-mapped binary cache,
+    whose fixed-width rows are located by a binary search on the timestamps.
+    Timestamps are assumed to increase through the recording.
+    """
+    if cache_dir:
+        data = load_recording(file_path, cache_dir).data
+        start, end = np.searchsorted(data[:, 0], [t0, t1], side='left')
+        rows = np.array(data[start:end])
+        return rows[:, 0], rows[:, 1:]
+
+    columns = len(read_header(file_path))
+    samples, timestamps, offsets = load_index(file_path)
+    if len(offsets) == 0:
+        return np.empty(0), np.empty((0, columns - 1))
+    # Last indexed row at or before t0, first indexed row at or after t1
+    clock, gaps = load_clock(file_path)
+    first = max(0, index_entry(samples, timestamps, t0, clock, gaps))
+    last = index_entry(samples, timestamps, t1, clock, gaps, before=True) + 1
+    start = int(offsets[first])
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        chunk = f.read(int(offsets[last]) - start) if last < len(offsets) else f.read()
+    try:
+        rows = parse_csv_rows(chunk.decode('utf-8'), columns)
+    except ValueError:
+        # A live recording may end in a half-written row
+        rows = parse_csv_rows(chunk[:chunk.rfind(b'\n') + 1].decode('utf-8'), columns)
+    rows = rows[(rows[:, 0] >= t0) & (rows[:, 0] < t1)]
+    return rows[:, 0], rows[:, 1:]
+
+
+def read_samples(file_path, start, stop, fill=None, cache_dir=None):
+    """Samples start <= index < stop as (clock times, values[rows, channels]).
+
+    Sample indices count dropped samples (see timebase), so an index
+    computed from a time with timebase.index_at always names the same
+    moment. Without `fill` only the recorded samples are returned; with
+    fill ('nan', 'hold' or 'interpolate') every index in the range gets a
+    row. Rows are located through the index (or the binary cache with
+    `cache_dir`) without reading the rest of the file.
+    """
+    if fill is not None and fill not in FILL_MODES:
+        raise ValueError(f"Unknown fill mode {fill!r}; expected one of {', '.join(FILL_MODES)}")
+    clock, gaps = load_clock(file_path)
+    columns = len(read_header(file_path))
+    first_row, last_row = (int(row) for row in samples_to_rows([max(start, 0), max(stop, 0)], gaps))
+
+    if cache_dir:
+        rows = np.array(load_recording(file_path, cache_dir).data[first_row:last_row])
+    else:
+        samples, _, offsets = load_index(file_path)
+        rows = np.empty((0, columns))
+        if len(offsets) and last_row > first_row:
+            # Index entries are every `interval` rows, so the entries are found by position
+            interval = int(samples[1] - samples[0]) if len(samples) > 1 else INDEX_INTERVAL
+            first = min(first_row // interval, len(samples) - 1)
+            last = -(-last_row // interval)
+            with open(file_path, 'rb') as f:
+                f.seek(int(offsets[first]))
+                chunk = f.read(int(offsets[last]) - int(offsets[first])) if last < len(offsets) else f.read()
+            chunk = chunk[:chunk.rfind(b'\n') + 1]
+            rows = parse_csv_rows(chunk.decode('utf-8'), columns)
+            rows = rows[first_row - int(samples[first]):last_row - int(samples[first])]
+
+    if clock is None:
+        return np.empty(0), np.empty((0, columns - 1))
+    indices = rows_to_samples(np.arange(first_row, first_row + len(rows)), gaps)
+    if fill is None:
+        return time_at(clock, indices), rows[:, 1:]
+    if len(rows) < last_row - first_row:
+        # The recording ends inside the range
+        stop = int(indices[-1]) + 1 if len(indices) else start
+    return time_at(clock, np.arange(start, stop)), fill_samples(indices, rows[:, 1:], fill, start, stop)
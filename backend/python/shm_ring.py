@@ -0,0 +1,370 @@
+"""
+Shared-memory ring buffer for local consumers of the bridge.
+
+The bridge writes every acquired chunk once into a named
+multiprocessing.shared_memory segment; readers on the same host (such as
+brainwave_visualizer.py --shm) attach to it by name and get read-only
+NumPy views of the samples, with no serialization and no copies.
+
+Segment layout (little-endian):
+
+    0   magic 'EEGRING1'       32  sequence (u64, writes so far)
+    8   version (u32)          40  write_index (u64, samples written in total)
+    12  state (u32)            48  reserve_index (u64, write_index of the write in progress)
+    16  channel_count (u32)    56  layout_size (u32)
+    20  capacity (u32)         64  channel layout (JSON, LAYOUT_SIZE bytes)
+    24  sampling_rate (f64)    ..  timestamps: float64[capacity]
+                               ..  data: float64[capacity, channel_count], one row per sample
+
+Sample n is at row n % capacity. The single writer raises reserve_index
+before it overwrites rows and write_index after, so a reader knows which
+samples are complete ([write_index - capacity, write_index)) and, after
+using its views, whether the writer has since overwritten them (intact()).
+
+Run as a script to compare the ring with the stdin pipe the visualizer
+otherwise reads:
+
+    python shm_ring.py --channels 16 --rate 4000 --seconds 3
+"""
+import argparse
+import json
+import os
+import struct
+import subprocess
+import sys
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from latency import LatencyHistogram
+
+DEFAULT_SHM_NAME = 'openbci_eeg'
+MAGIC = b'EEGRING1'
+VERSION = 1
+HEADER_FORMAT = '<8sIIIId'     # magic, version, state, channel_count, capacity, sampling_rate
+HEADER_SIZE = 64
+COUNTERS_OFFSET = 32           # sequence, write_index, reserve_index as u64
+LAYOUT_SIZE = 4096
+RING_SECONDS = 10              # Default capacity in seconds of samples
+MIN_CAPACITY = 1024
+POLL_INTERVAL = 0.002          # Seconds between checks for new samples
+
+STATE_LIVE = 1
+STATE_CLOSED = 2
+
+# Segments created by a writer in this process (see _attach)
+_created = set()
+
+
+def segment_size(channel_count, capacity):
+    """Bytes of a ring segment with `capacity` samples of `channel_count` channels."""
+    return HEADER_SIZE + LAYOUT_SIZE + capacity * 8 * (1 + channel_count)
+
+
+def _views(buf, channel_count, capacity):
+    """Counters, timestamps and data arrays laid over a segment's buffer."""
+    counters = np.ndarray((3,), dtype='<u8', buffer=buf, offset=COUNTERS_OFFSET)
+    offset = HEADER_SIZE + LAYOUT_SIZE
+    timestamps = np.ndarray((capacity,), dtype='<f8', buffer=buf, offset=offset)
+    data = np.ndarray((capacity, channel_count), dtype='<f8', buffer=buf, offset=offset + capacity * 8)
+    return counters, timestamps, data
+
+
+def _attach(name):
+    """Attach to an existing segment without handing it to this process's resource tracker.
+
+    Before Python 3.13 every attach registers the segment with the tracker,
+    which unlinks it when the reader exits, taking it away from the bridge.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        segment = shared_memory.SharedMemory(name=name)
+        if os.name == 'posix' and segment._name not in _created:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(segment._name, 'shared_memory')
+        return segment
+
+
+class RingWriter:
+    """Creates the ring segment and writes chunks into it (one writer per segment)."""
+
+    def __init__(self, name=DEFAULT_SHM_NAME, channel_count=16, sampling_rate=250, capacity=None, layout=None):
+        capacity = capacity or max(int(sampling_rate * RING_SECONDS), MIN_CAPACITY)
+        layout = dict(layout or {})
+        layout.setdefault('channels', [f'channel_{i + 1}' for i in range(channel_count)])
+        layout.update(order='samples x channels', dtype='float64')
+        encoded = json.dumps(layout).encode('utf-8')
+        if len(encoded) > LAYOUT_SIZE:
+            raise ValueError(f"Channel layout takes {len(encoded)} bytes; at most {LAYOUT_SIZE} fit")
+
+        size = segment_size(channel_count, capacity)
+        try:
+            self.segment = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Left behind by a bridge that did not stop cleanly
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            self.segment = shared_memory.SharedMemory(name=name, create=True, size=size)
+        _created.add(self.segment._name)
+
+        self.name = name
+        self.channel_count = channel_count
+        self.capacity = capacity
+        self.sampling_rate = sampling_rate
+        buf = self.segment.buf
+        struct.pack_into(HEADER_FORMAT, buf, 0, MAGIC, VERSION, 0, channel_count, capacity, float(sampling_rate))
+        struct.pack_into('<I', buf, 56, len(encoded))
+        buf[HEADER_SIZE:HEADER_SIZE + len(encoded)] = encoded
+        self.counters, self.timestamps, self.data = _views(buf, channel_count, capacity)
+        self.counters[:] = 0
+        struct.pack_into('<I', buf, 12, STATE_LIVE)
+
+    @property
+    def write_index(self):
+        return int(self.counters[1])
+
+    def write(self, timestamps, eeg):
+        """Append samples (eeg is channels x samples, as returned by the board)."""
+        count = eeg.shape[1]
+        if count == 0:
+            return
+        if eeg.shape[0] != self.channel_count:
+            raise ValueError(f"Ring holds {self.channel_count} channels, got {eeg.shape[0]}")
+        start = self.write_index
+        if count > self.capacity:
+            # Only the newest samples fit
+            skipped = count - self.capacity
+            timestamps, eeg, start, count = timestamps[skipped:], eeg[:, skipped:], start + skipped, self.capacity
+        self.counters[2] = start + count
+        row = start % self.capacity
+        first = min(count, self.capacity - row)
+        self.timestamps[row:row + first] = timestamps[:first]
+        self.data[row:row + first] = eeg[:, :first].T
+        if first < count:
+            self.timestamps[:count - first] = timestamps[first:]
+            self.data[:count - first] = eeg[:, first:].T
+        self.counters[1] = start + count
+        self.counters[0] += 1
+
+    def close(self):
+        """Mark the ring closed, so readers stop following it, and remove the segment."""
+        struct.pack_into('<I', self.segment.buf, 12, STATE_CLOSED)
+        del self.counters, self.timestamps, self.data
+        self.segment.close()
+        try:
+            self.segment.unlink()
+        except FileNotFoundError:
+            pass
+        _created.discard(self.segment._name)
+
+    def stats(self):
+        return {
+            'name': self.name,
+            'channel_count': self.channel_count,
+            'capacity': self.capacity,
+            'write_index': self.write_index,
+            'sequence': int(self.counters[0]),
+        }
+
+
+class RingReader:
+    """Attaches to a ring by name and reads its samples as read-only views."""
+
+    def __init__(self, name=DEFAULT_SHM_NAME):
+        self.segment = _attach(name)
+        buf = self.segment.buf
+        magic, version, _, channel_count, capacity, sampling_rate = struct.unpack_from(HEADER_FORMAT, buf, 0)
+        if magic != MAGIC or version != VERSION:
+            self.segment.close()
+            raise ValueError(f"Shared memory segment {name} is not an EEG ring buffer (version {VERSION})")
+        layout_size, = struct.unpack_from('<I', buf, 56)
+        self.name = name
+        self.channel_count = channel_count
+        self.capacity = capacity
+        self.sampling_rate = sampling_rate
+        self.layout = json.loads(bytes(buf[HEADER_SIZE:HEADER_SIZE + layout_size]).decode('utf-8'))
+        self.counters, self.timestamps, self.data = _views(buf, channel_count, capacity)
+        for array in (self.counters, self.timestamps, self.data):
+            array.setflags(write=False)
+        self.lost_samples = 0
+        self.overwritten_reads = 0
+
+    @property
+    def write_index(self):
+        return int(self.counters[1])
+
+    @property
+    def sequence(self):
+        return int(self.counters[0])
+
+    @property
+    def closed(self):
+        return struct.unpack_from('<I', self.segment.buf, 12)[0] == STATE_CLOSED
+
+    def read(self, start, max_samples=None):
+        """Views of the complete samples from `start` on, as (segments, start, stop).
+
+        `segments` holds one (timestamps, data) pair, or two when the range
+        wraps around the end of the ring. `start` is moved up to the oldest
+        sample still in the ring if the requested one was overwritten.
+        """
+        stop = self.write_index
+        start = max(start, stop - self.capacity, 0)
+        if max_samples is not None:
+            stop = min(stop, start + max_samples)
+        segments = []
+        position = start
+        while position < stop:
+            row = position % self.capacity
+            count = min(stop - position, self.capacity - row)
+            segments.append((self.timestamps[row:row + count], self.data[row:row + count]))
+            position += count
+        return segments, start, stop
+
+    def intact(self, start):
+        """Whether samples from `start` on are still unchanged; check after using their views."""
+        return start >= int(self.counters[2]) - self.capacity
+
+    def follow(self, start=None, poll_interval=POLL_INTERVAL, should_continue=None):
+        """Yield (timestamps, data) views of samples as they are written, until the ring is closed.
+
+        Starts with the next write (or at sample `start`). Samples overwritten
+        before they were read are counted in lost_samples; views the writer
+        overwrote while they were in use are counted in overwritten_reads.
+        """
+        position = self.write_index if start is None else start
+        while should_continue is None or should_continue():
+            segments, begin, stop = self.read(position)
+            self.lost_samples += begin - position
+            for timestamps, data in segments:
+                yield timestamps, data
+            if segments and not self.intact(begin):
+                self.overwritten_reads += 1
+            if stop == begin:
+                if self.closed:
+                    return
+                time.sleep(poll_interval)
+            position = stop
+
+    def close(self):
+        """Detach from the ring (views still held by the caller keep it mapped)."""
+        del self.counters, self.timestamps, self.data
+        try:
+            self.segment.close()
+        except BufferError:
+            pass
+
+
+def _consume(transport, samples, name):
+    """Benchmark consumer run in its own process: read `samples` samples from stdin or the ring."""
+    latencies = LatencyHistogram()
+    received = 0
+    now = None
+    if transport == 'stdin':
+        print('ready', flush=True)
+        for line in sys.stdin:
+            packet = json.loads(line[len('EEG_STREAM:'):])
+            np.asarray(packet['channels'])
+            now = time.time()
+            received += 1
+            if received % 10 == 0:
+                latencies.record((now - packet['board_timestamp']) * 1000)
+            if received >= samples:
+                break
+        lost = 0
+    else:
+        reader = RingReader(name)
+        print('ready', flush=True)
+        for timestamps, data in reader.follow(start=0, poll_interval=0.0002):
+            data.sum()
+            now = time.time()
+            received += len(timestamps)
+            latencies.record((now - timestamps[-1]) * 1000)
+            if received + reader.lost_samples >= samples:
+                break
+        lost = reader.lost_samples
+        reader.close()
+    print(json.dumps({'samples': received, 'lost_samples': lost, 'finished': now, 'latency': latencies.summary()}),
+          flush=True)
+
+
+def _start_consumer(transport, samples, name):
+    consumer = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--consume', transport,
+                                 '--samples', str(samples), '--name', name],
+                                stdin=subprocess.PIPE if transport == 'stdin' else subprocess.DEVNULL,
+                                stdout=subprocess.PIPE, text=True)
+    assert consumer.stdout.readline().strip() == 'ready'
+    return consumer
+
+
+def compare_transports(channels=16, rate=4000, seconds=3.0, chunk_seconds=0.01, name='eeg_ring_bench',
+                       transports=('stdin', 'shm')):
+    """Stream `seconds` of synthetic samples to a consumer process over each transport.
+
+    Chunks are written at `rate` Hz (paced) for latency and, in a second
+    run, as fast as the transport takes them for throughput. The stdin
+    transport sends the bridge's EEG_STREAM lines through a pipe, as the
+    visualizer reads them; the ring writes into shared memory. Returns one
+    result per transport and run.
+    """
+    from openbci_bridge import build_stream_packets
+
+    chunk = max(int(rate * chunk_seconds), 1)
+    total = int(rate * seconds) // chunk * chunk
+    eeg = np.random.default_rng(0).normal(0, 10, (channels, chunk))
+    results = []
+    for paced in (True, False):
+        for transport in transports:
+            writer = RingWriter(name, channels, rate) if transport == 'shm' else None
+            consumer = _start_consumer(transport, total, name)
+            started_time = time.time()
+            started = time.perf_counter()
+            try:
+                for i in range(total // chunk):
+                    if paced:
+                        delay = started + i * chunk_seconds - time.perf_counter()
+                        if delay > 0:
+                            time.sleep(delay)
+                    now = time.time()
+                    timestamps = np.full(chunk, now)
+                    if writer is not None:
+                        writer.write(timestamps, eeg)
+                    else:
+                        lines = build_stream_packets(eeg, i * chunk, 'bench', 'generator', timestamps, now, now)
+                        consumer.stdin.write('\n'.join(lines) + '\n')
+                        consumer.stdin.flush()
+                write_seconds = time.perf_counter() - started
+                output, _ = consumer.communicate(timeout=60)
+            finally:
+                if consumer.poll() is None:
+                    consumer.kill()
+                if writer is not None:
+                    writer.close()
+            result = json.loads(output.strip().splitlines()[-1])
+            # From the first write until the consumer had the last sample
+            seconds = result.pop('finished') - started_time
+            result.update(transport=transport, mode='paced' if paced else 'throughput', channels=channels,
+                          write_seconds=round(write_seconds, 6), seconds=round(seconds, 6),
+                          samples_per_second=round(result['samples'] / seconds, 1))
+            results.append(result)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare the shared-memory ring with the stdin pipe')
+    parser.add_argument('--channels', type=int, default=16, help='Channels per sample')
+    parser.add_argument('--rate', type=int, default=4000, help='Sampling rate in Hz of the paced run')
+    parser.add_argument('--seconds', type=float, default=3.0, help='Seconds of samples per run')
+    parser.add_argument('--name', type=str, default='eeg_ring_bench', help='Shared memory name to use')
+    parser.add_argument('--consume', choices=['stdin', 'shm'], help=argparse.SUPPRESS)
+    parser.add_argument('--samples', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.consume:
+        _consume(args.consume, args.samples, args.name)
+    else:
+        for result in compare_transports(args.channels, args.rate, args.seconds, name=args.name):
+            print(json.dumps(result))
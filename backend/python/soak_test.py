@@ -0,0 +1,306 @@
+"""
+Soak test for the OpenBCI bridge.
+
+Runs the bridge's stream action against the synthetic EEG generator for a
+configurable time, at an accelerated sampling rate, while this script
+consumes its EEG_STREAM output like the Node service does. RSS, thread
+count, open file descriptors, queue depths and sample counters are
+sampled over time; the run fails (exit code 1) when memory, threads or
+descriptors keep growing, samples are lost, or acquisition drifts from
+the expected rate. Requires Linux (/proc).
+
+    python soak_test.py --hours 1 --acceleration 8 --output soak_report.json
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+import numpy as np
+
+from benchmarks import environment_info
+
+BRIDGE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'openbci_bridge.py')
+STREAM_PREFIX = 'EEG_STREAM:'
+BRIDGE_STDERR = 'bridge_stderr.log'  # The bridge's diagnostics, kept in the work directory
+
+# Default failure thresholds
+MAX_RSS_GROWTH_MB_PER_HOUR = 20.0
+MAX_THREAD_GROWTH = 2
+MAX_FD_GROWTH = 5
+MAX_LOSS_RATE = 0.001
+MAX_RATE_DRIFT = 0.02
+WARMUP_FRACTION = 0.1       # Leading part of the run ignored when fitting growth
+RSS_NOISE_MB = 5.0          # RSS growth below this is allocator noise, whatever the slope
+
+
+def free_port():
+    """Ask the OS for a free local TCP port."""
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def process_stats(pid):
+    """RSS (MB), thread count and open file descriptors of a process, from /proc."""
+    stats = {}
+    with open(f'/proc/{pid}/status', 'r') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                stats['rss_mb'] = int(line.split()[1]) / 1024
+            elif line.startswith('Threads:'):
+                stats['threads'] = int(line.split()[1])
+    stats['fds'] = len(os.listdir(f'/proc/{pid}/fd'))
+    return stats
+
+
+def parse_prometheus(text):
+    """Plain `name value` samples of a Prometheus text page (labelled samples are skipped)."""
+    values = {}
+    for line in text.splitlines():
+        if line.startswith('#') or '{' in line:
+            continue
+        parts = line.split()
+        if len(parts) == 2:
+            try:
+                values[parts[0]] = float(parts[1])
+            except ValueError:
+                continue
+    return values
+
+
+def scrape_metrics(port, prefix='openbci_bridge_'):
+    """Bridge metrics from its Prometheus endpoint, without the prefix; empty until it is up."""
+    try:
+        with urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics', timeout=2) as response:
+            values = parse_prometheus(response.read().decode('utf-8'))
+    except OSError:
+        return {}
+    return {name[len(prefix):]: value for name, value in values.items() if name.startswith(prefix)}
+
+
+class StreamConsumer:
+    """Reads the bridge's stdout like the Node service, checking sample numbers for gaps."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.received = 0
+        self.lost = 0
+        self.out_of_order = 0
+        self.discontinuities = 0
+        self.last_sample = None
+        self.result_line = None
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        for line in self.stream:
+            if not line.startswith(STREAM_PREFIX):
+                if line.startswith('{'):
+                    self.result_line = line
+                continue
+            packet = json.loads(line[len(STREAM_PREFIX):])
+            if packet['type'] != 'eeg_data':
+                if packet['type'] == 'discontinuity':
+                    # The bridge reconnected the board; sample numbers continue after it
+                    self.discontinuities += 1
+                continue
+            sample_number = packet['sample_number']
+            if self.last_sample is not None:
+                if sample_number > self.last_sample + 1:
+                    self.lost += sample_number - self.last_sample - 1
+                elif sample_number <= self.last_sample:
+                    self.out_of_order += 1
+            self.last_sample = sample_number
+            self.received += 1
+
+
+def run_soak(seconds, channels=16, rate=250, acceleration=4.0, interval=10.0, workdir=None, log=print):
+    """Run the bridge for `seconds` and return (samples, final, bridge_result, effective_rate).
+
+    The generator runs at `rate * acceleration` Hz so an hour of data at the
+    nominal rate passes in 1/acceleration hours. `final` holds the consumer's
+    counts once the bridge has exited. The bridge's stderr is written to
+    BRIDGE_STDERR in `workdir`; when it exits without a result line,
+    `bridge_result` is an error with its return code.
+    """
+    effective_rate = int(rate * acceleration)
+    port = free_port()
+    workdir = workdir or tempfile.mkdtemp(prefix='eeg_soak_')
+    command = [sys.executable, BRIDGE_SCRIPT, '--action', 'stream', '--serial_port', 'none',
+               '--board', 'generator', '--generator_channels', str(channels),
+               '--generator_rate', str(effective_rate), '--duration', str(int(round(seconds))),
+               '--experiment_id', 'soak', '--metrics_port', str(port)]
+    stderr = open(os.path.join(workdir, BRIDGE_STDERR), 'w')
+    bridge = subprocess.Popen(command, cwd=workdir, stdout=subprocess.PIPE, stderr=stderr, text=True, bufsize=1)
+    consumer = StreamConsumer(bridge.stdout)
+    consumer.thread.start()
+
+    samples = []
+    started = time.monotonic()
+    try:
+        while bridge.poll() is None:
+            time.sleep(interval)
+            if bridge.poll() is not None:
+                break
+            metrics = scrape_metrics(port)
+            if not metrics.get('session_uptime_seconds'):
+                continue  # Still starting up
+            sample = {'elapsed': time.monotonic() - started}
+            sample.update(process_stats(bridge.pid))
+            sample.update({
+                'session_uptime': metrics.get('session_uptime_seconds', 0),
+                'data_queue_depth': metrics.get('data_queue_depth', 0),
+                'board_buffer_samples': metrics.get('board_buffer_samples', 0),
+                'samples_acquired': metrics.get('samples_acquired_total', 0),
+                'samples_emitted': metrics.get('samples_emitted_total', 0),
+                'dropped_chunks': metrics.get('dropped_chunks_total', 0),
+                'received': consumer.received,
+                'lost': consumer.lost,
+            })
+            samples.append(sample)
+            log(f"{sample['elapsed']:8.0f} s  RSS {sample['rss_mb']:7.1f} MB  threads {sample['threads']:3d}  "
+                f"fds {sample['fds']:3d}  received {sample['received']:10d}  lost {sample['lost']}")
+    finally:
+        if bridge.poll() is None:
+            bridge.terminate()
+        bridge.wait(timeout=60)
+        consumer.thread.join(timeout=10)
+        stderr.close()
+
+    final = {'received': consumer.received, 'lost': consumer.lost, 'out_of_order': consumer.out_of_order,
+             'discontinuities': consumer.discontinuities}
+    if consumer.result_line:
+        bridge_result = json.loads(consumer.result_line)
+    else:
+        bridge_result = {'status': 'error', 'message': 'The bridge exited without a result line',
+                         'returncode': bridge.returncode, 'stderr_file': os.path.join(workdir, BRIDGE_STDERR)}
+    return samples, final, bridge_result, effective_rate
+
+
+def slope_per_hour(samples, key):
+    """Least-squares growth of `key` per hour over the samples."""
+    if len(samples) < 2:
+        return 0.0
+    elapsed = np.array([s['elapsed'] for s in samples])
+    values = np.array([s[key] for s in samples], dtype=float)
+    if np.ptp(elapsed) == 0:
+        return 0.0
+    return float(np.polyfit(elapsed, values, 1)[0] * 3600)
+
+
+def analyze(samples, final, effective_rate, max_rss_growth=MAX_RSS_GROWTH_MB_PER_HOUR,
+            max_thread_growth=MAX_THREAD_GROWTH, max_fd_growth=MAX_FD_GROWTH, max_loss_rate=MAX_LOSS_RATE,
+            max_rate_drift=MAX_RATE_DRIFT):
+    """Check the time series against the thresholds; returns (summary, failures)."""
+    if len(samples) < 2:
+        return {'samples': len(samples)}, ['Too few samples collected; run longer or sample more often']
+
+    steady = samples[int(len(samples) * WARMUP_FRACTION):]
+    if len(steady) < 2:
+        steady = samples
+    first, last = steady[0], samples[-1]
+
+    expected = effective_rate * last['session_uptime']
+    # Gaps in sample numbers, plus samples the bridge emitted that never arrived
+    loss = final['lost'] + max(0, last['samples_emitted'] - final['received'])
+    summary = {
+        'samples': len(samples),
+        'rss_mb_start': first['rss_mb'],
+        'rss_mb_end': last['rss_mb'],
+        'rss_growth_mb_per_hour': slope_per_hour(steady, 'rss_mb'),
+        'thread_growth': last['threads'] - first['threads'],
+        'fd_growth': last['fds'] - first['fds'],
+        'max_data_queue_depth': max(s['data_queue_depth'] for s in samples),
+        'max_board_buffer_samples': max(s['board_buffer_samples'] for s in samples),
+        'samples_received': final['received'],
+        'samples_lost': loss,
+        'loss_rate': loss / max(1, last['samples_emitted']),
+        'out_of_order': final['out_of_order'],
+        'discontinuities': final.get('discontinuities', 0),
+        'dropped_chunks': last['dropped_chunks'],
+        'rate_drift': (last['samples_acquired'] - expected) / expected if expected else 0.0,
+    }
+
+    failures = []
+    if summary['rss_growth_mb_per_hour'] > max_rss_growth and \
+            summary['rss_mb_end'] - summary['rss_mb_start'] > RSS_NOISE_MB:
+        failures.append(f"RSS grows {summary['rss_growth_mb_per_hour']:.1f} MB/h (limit {max_rss_growth})")
+    if summary['thread_growth'] > max_thread_growth:
+        failures.append(f"Thread count grew by {summary['thread_growth']} (limit {max_thread_growth})")
+    if summary['fd_growth'] > max_fd_growth:
+        failures.append(f"Open file descriptors grew by {summary['fd_growth']} (limit {max_fd_growth})")
+    if summary['loss_rate'] > max_loss_rate:
+        failures.append(f"Lost {summary['samples_lost']} samples ({summary['loss_rate']:.2%}, "
+                        f"limit {max_loss_rate:.2%})")
+    if summary['out_of_order']:
+        failures.append(f"{summary['out_of_order']} packets arrived out of order")
+    if summary['dropped_chunks']:
+        failures.append(f"Bridge dropped {summary['dropped_chunks']:.0f} chunks")
+    if abs(summary['rate_drift']) > max_rate_drift:
+        failures.append(f"Acquisition rate drifted {summary['rate_drift']:+.2%} (limit {max_rate_drift:.0%})")
+    return summary, failures
+
+
+def save_report(output_file, config, samples, summary, failures, bridge_result):
+    """Write the time series, summary and verdict as JSON."""
+    with open(output_file, 'w') as f:
+        json.dump({
+            'environment': environment_info(),
+            'config': config,
+            'passed': not failures,
+            'failures': failures,
+            'summary': summary,
+            'bridge_result': bridge_result,
+            'samples': samples,
+        }, f, indent=2)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Soak test the OpenBCI bridge with the synthetic EEG generator')
+    parser.add_argument('--hours', type=float, default=1.0,
+                        help='Wall-clock duration of the run in hours (default: 1)')
+    parser.add_argument('--acceleration', type=float, default=4.0,
+                        help='Generator rate multiplier; data volume per hour is this many nominal hours (default: 4)')
+    parser.add_argument('--channels', type=int, default=16,
+                        help='Generated channel count (default: 16)')
+    parser.add_argument('--rate', type=int, default=250,
+                        help='Nominal sampling rate in Hz (default: 250)')
+    parser.add_argument('--interval', type=float, default=10.0,
+                        help='Seconds between resource samples (default: 10)')
+    parser.add_argument('--output', type=str, default='soak_report.json',
+                        help='JSON report file (default: soak_report.json)')
+    parser.add_argument('--max_rss_growth', type=float, default=MAX_RSS_GROWTH_MB_PER_HOUR,
+                        help='Allowed RSS growth in MB per hour')
+    parser.add_argument('--max_thread_growth', type=int, default=MAX_THREAD_GROWTH,
+                        help='Allowed growth of the thread count')
+    parser.add_argument('--max_fd_growth', type=int, default=MAX_FD_GROWTH,
+                        help='Allowed growth of open file descriptors')
+    parser.add_argument('--max_loss_rate', type=float, default=MAX_LOSS_RATE,
+                        help='Allowed fraction of lost samples')
+    parser.add_argument('--max_rate_drift', type=float, default=MAX_RATE_DRIFT,
+                        help='Allowed relative drift of the acquisition rate')
+
+    args = parser.parse_args()
+
+    config = vars(args)
+    samples, final, bridge_result, effective_rate = run_soak(args.hours * 3600, args.channels, args.rate,
+                                                             args.acceleration, args.interval)
+    summary, failures = analyze(samples, final, effective_rate, args.max_rss_growth, args.max_thread_growth,
+                                args.max_fd_growth, args.max_loss_rate, args.max_rate_drift)
+    if bridge_result['status'] != 'success':
+        failures.append(f"Bridge failed: {bridge_result.get('message')} (exit code {bridge_result.get('returncode')})")
+    save_report(args.output, config, samples, summary, failures, bridge_result)
+
+    print(json.dumps(summary, indent=2))
+    print(f"Report saved to {args.output}")
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+    print("Soak test passed")
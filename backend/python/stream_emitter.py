@@ -0,0 +1,130 @@
+"""
+Writes streamed chunks to stdout for Node.js from a thread of its own.
+
+The emitter reads an acquisition bus subscription, whose bounded
+drop_oldest queue keeps a stalled pipe from blocking anything but the
+emitter. While it is behind (BEHIND_CHUNKS or more chunks queued) the
+emit policy decides how it catches up:
+
+    drop_oldest: write chunks as they come; the full queue drops the oldest
+    decimate:    write every `decimate_factor`-th sample of each chunk
+    coalesce:    take every queued chunk and write them with one write and flush
+
+Every sample left out or written coalesced is counted.
+
+Other writers of result lines on stdout hold `stdout_lock` so that their
+lines never land in the middle of the emitter's writes.
+"""
+import sys
+import threading
+import time
+
+EMIT_POLICIES = ('drop_oldest', 'decimate', 'coalesce')
+DEFAULT_EMIT_POLICY = 'drop_oldest'
+DECIMATE_FACTOR = 4
+BEHIND_CHUNKS = 8   # Queued chunks at which the emitter counts as behind
+
+stdout_lock = threading.Lock()
+
+
+class StreamEmitter:
+    """Write chunks from `subscription` as text produced by `format_chunk(chunk, step, emit_time)`.
+
+    `step` is the decimation step (1 for every sample). `on_written(chunk,
+    samples, emit_time, flushed_time)` is called for each chunk after the
+    write that carried it was flushed. `stream` defaults to the current
+    sys.stdout.
+    """
+
+    def __init__(self, subscription, format_chunk, stream=None, policy=DEFAULT_EMIT_POLICY,
+                 decimate_factor=DECIMATE_FACTOR, behind_chunks=BEHIND_CHUNKS, on_written=None):
+        if policy not in EMIT_POLICIES:
+            raise ValueError(f"Unknown emit policy {policy!r}; expected one of {', '.join(EMIT_POLICIES)}")
+        if decimate_factor < 2:
+            raise ValueError("The decimation factor must be at least 2")
+        self.subscription = subscription
+        self.format_chunk = format_chunk
+        self.stream = stream
+        self.policy = policy
+        self.decimate_factor = decimate_factor
+        self.behind_chunks = behind_chunks
+        self.on_written = on_written
+        self.writes = 0
+        self.emitted_samples = 0
+        self.decimated_samples = 0
+        self.coalesced_chunks = 0
+        self.coalesced_samples = 0
+        self.failed_samples = 0
+        self.write_seconds = 0.0
+        self.max_write_seconds = 0.0
+
+    @property
+    def dropped_samples(self):
+        """Samples the queue dropped while the emitter was behind, plus those lost to write errors."""
+        return self.subscription.dropped_samples + self.failed_samples
+
+    def run(self):
+        """Write chunks until the subscription is closed and drained."""
+        while True:
+            chunk = self.subscription.get()
+            if chunk is None:
+                return
+            chunks = [chunk]
+            behind = self.subscription.depth() >= self.behind_chunks
+            if self.policy == 'coalesce' and behind:
+                while True:
+                    queued = self.subscription.get(timeout=0)
+                    if queued is None:
+                        break
+                    chunks.append(queued)
+            step = self.decimate_factor if self.policy == 'decimate' and behind else 1
+            try:
+                self.write(chunks, step)
+            except Exception as e:
+                print(f"Error writing to the stream: {e}", file=sys.stderr)
+                self.failed_samples += sum(c.eeg.shape[1] for c in chunks)
+
+    def write(self, chunks, step=1):
+        """Format `chunks` (every `step`-th sample) and write them with a single write and flush."""
+        emit_time = time.time()
+        text = ''.join(self.format_chunk(chunk, step, emit_time) for chunk in chunks)
+        kept = [len(range(0, chunk.eeg.shape[1], step)) for chunk in chunks]
+
+        stream = self.stream if self.stream is not None else sys.stdout
+        with stdout_lock:
+            started = time.perf_counter()
+            stream.write(text)
+            stream.flush()
+            elapsed = time.perf_counter() - started
+        flushed_time = time.time()
+
+        self.writes += 1
+        self.write_seconds += elapsed
+        self.max_write_seconds = max(self.max_write_seconds, elapsed)
+        self.emitted_samples += sum(kept)
+        self.decimated_samples += sum(chunk.eeg.shape[1] for chunk in chunks) - sum(kept)
+        if len(chunks) > 1:
+            self.coalesced_chunks += len(chunks)
+            self.coalesced_samples += sum(kept)
+        if self.on_written is not None:
+            for chunk, samples in zip(chunks, kept):
+                self.on_written(chunk, samples, emit_time, flushed_time)
+
+    def close(self):
+        """Stop after the write in progress, dropping the chunks still queued; returns how many."""
+        self.subscription.close()
+        return self.subscription.discard()
+
+    def stats(self):
+        return {
+            'policy': self.policy,
+            'queued_chunks': self.subscription.depth(),
+            'writes': self.writes,
+            'emitted_samples': self.emitted_samples,
+            'dropped_samples': self.dropped_samples,
+            'decimated_samples': self.decimated_samples,
+            'coalesced_chunks': self.coalesced_chunks,
+            'coalesced_samples': self.coalesced_samples,
+            'write_seconds': round(self.write_seconds, 6),
+            'max_write_seconds': round(self.max_write_seconds, 6),
+        }
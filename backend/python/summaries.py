@@ -0,0 +1,234 @@
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+from recordings import CHUNK_ROWS, RECORDINGS_DIR, iter_chunks, list_recordings, read_clock, read_header, \
+    recording_sampling_rate
+from synthetic_eeg import RAIL_UV
+
+BANDS = (('delta', 1.0, 4.0), ('theta', 4.0, 8.0), ('alpha', 8.0, 13.0), ('beta', 13.0, 30.0), ('gamma', 30.0, 45.0))
+WELCH_SECONDS = 2.0         # Welch segment length
+FLAT_STD_UV = 0.01          # Channels with a smaller standard deviation are flat
+SUMMARY_SUFFIX = '.summary.json'
+SUMMARY_VERSION = 2         # 2: gaps from the sample clock instead of timestamp steps
+
+
+class QualityAccumulator:
+    """Per-channel signal quality statistics accumulated chunk by chunk.
+
+    Gaps are not found from timestamp steps, which host batching makes
+    unreliable, but taken from the recording's sample clock: `gaps` is its
+    (row, missing) list, such as ClockTracker.gaps, read when the result is
+    made.
+    """
+
+    def __init__(self, channels, sampling_rate, gaps=None):
+        self.sampling_rate = sampling_rate
+        self.gap_list = gaps if gaps is not None else []
+        self.count = 0
+        self.minimum = np.full(channels, np.inf)
+        self.maximum = np.full(channels, -np.inf)
+        self.total = np.zeros(channels)
+        self.total_squares = np.zeros(channels)
+        self.railed = np.zeros(channels, dtype=np.int64)
+        self.first_timestamp = None
+        self.last_timestamp = None
+
+    def update(self, timestamps, values):
+        self.count += len(values)
+        self.minimum = np.minimum(self.minimum, values.min(axis=0))
+        self.maximum = np.maximum(self.maximum, values.max(axis=0))
+        self.total += values.sum(axis=0)
+        self.total_squares += np.square(values).sum(axis=0)
+        self.railed += (np.abs(values) >= RAIL_UV).sum(axis=0)
+
+        if self.first_timestamp is None:
+            self.first_timestamp = float(timestamps[0])
+        self.last_timestamp = float(timestamps[-1])
+
+    def result(self):
+        count = max(1, self.count)
+        mean = self.total / count
+        rms = np.sqrt(self.total_squares / count)
+        std = np.sqrt(np.maximum(self.total_squares / count - mean ** 2, 0.0))
+        missing = sum(gap[1] for gap in self.gap_list)
+        return {
+            'samples': self.count,
+            'duration_s': (self.last_timestamp - self.first_timestamp) if self.count else 0.0,
+            'gaps': len(self.gap_list),
+            'gap_seconds': round(missing / self.sampling_rate, 6) if self.sampling_rate else 0.0,
+            'min_uv': self.minimum.tolist(),
+            'max_uv': self.maximum.tolist(),
+            'mean_uv': mean.tolist(),
+            'rms_uv': rms.tolist(),
+            'rail_pct': (100.0 * self.railed / count).tolist(),
+            'flat_channels': [int(i) + 1 for i in np.flatnonzero(std < FLAT_STD_UV)],
+        }
+
+
+class BandPowerAccumulator:
+    """Welch power spectrum (Hann window, 50% overlap) accumulated across chunks."""
+
+    def __init__(self, channels, sampling_rate, segment_seconds=WELCH_SECONDS):
+        self.sampling_rate = sampling_rate
+        self.nperseg = max(8, int(round(segment_seconds * sampling_rate)))
+        self.step = self.nperseg // 2
+        self.window = np.hanning(self.nperseg)
+        self.freqs = np.fft.rfftfreq(self.nperseg, 1.0 / sampling_rate)
+        self.power_sum = np.zeros((len(self.freqs), channels))
+        self.segments = 0
+        self._carry = None
+
+    def update(self, values):
+        data = values if self._carry is None else np.concatenate((self._carry, values))
+        if len(data) >= self.nperseg:
+            starts = np.arange(0, len(data) - self.nperseg + 1, self.step)
+            segments = data[starts[:, None] + np.arange(self.nperseg)]
+            segments = segments - segments.mean(axis=1, keepdims=True)
+            spectra = np.abs(np.fft.rfft(segments * self.window[None, :, None], axis=1)) ** 2
+            self.power_sum += spectra.sum(axis=0)
+            self.segments += len(starts)
+            data = data[starts[-1] + self.step:]
+        # Keep the unprocessed tail (and the overlap) for the next chunk
+        self._carry = data.copy()
+
+    def result(self):
+        if self.segments == 0:
+            return {'segments': 0}
+        # One-sided power spectral density in uV^2/Hz
+        psd = self.power_sum / self.segments * 2.0 / (self.sampling_rate * np.sum(self.window ** 2))
+        df = self.freqs[1] - self.freqs[0]
+        in_range = (self.freqs >= BANDS[0][1]) & (self.freqs < BANDS[-1][2])
+        total = psd[in_range].sum(axis=0) * df
+        result = {'segments': self.segments}
+        for name, low, high in BANDS:
+            band = psd[(self.freqs >= low) & (self.freqs < high)].sum(axis=0) * df
+            result[f'{name}_uv2'] = band.tolist()
+            result[f'{name}_rel'] = np.divide(band, total, out=np.zeros_like(band), where=total > 0).tolist()
+        return result
+
+
+def summary_path(file_path):
+    """Path of the summary kept next to a CSV recording."""
+    return file_path + SUMMARY_SUFFIX
+
+
+class RecordingSummary:
+    """Per-channel quality and band power summary of a recording, updated as samples arrive.
+
+    The bridge feeds it every chunk it writes, so the summary is ready when
+    the recording stops without reading the file back. Its gaps are those
+    of the recording's sample clock (see QualityAccumulator).
+    """
+
+    def __init__(self, channels, sampling_rate, gaps=None):
+        self.channels = channels
+        self.sampling_rate = sampling_rate
+        self.quality = QualityAccumulator(channels, sampling_rate, gaps)
+        self.bands = BandPowerAccumulator(channels, sampling_rate)
+
+    def update(self, timestamps, values):
+        """Add samples (values is samples x channels)."""
+        if len(values) == 0:
+            return
+        self.quality.update(timestamps, values)
+        self.bands.update(values)
+
+    def result(self):
+        """Compact summary: recording-level figures plus one entry per channel."""
+        quality = self.quality.result()
+        bands = self.bands.result()
+        channel_stats = []
+        for i in range(self.channels):
+            stats = {
+                'channel': i + 1,
+                'min_uv': round(quality['min_uv'][i], 3) if quality['samples'] else None,
+                'max_uv': round(quality['max_uv'][i], 3) if quality['samples'] else None,
+                'rms_uv': round(quality['rms_uv'][i], 3),
+                'rail_pct': round(quality['rail_pct'][i], 3),
+            }
+            if bands['segments']:
+                stats['band_power_uv2'] = {name: round(bands[f'{name}_uv2'][i], 4) for name, _, _ in BANDS}
+                stats['band_relative'] = {name: round(bands[f'{name}_rel'][i], 4) for name, _, _ in BANDS}
+            channel_stats.append(stats)
+        return {
+            'version': SUMMARY_VERSION,
+            'sampling_rate': self.sampling_rate,
+            'channels': self.channels,
+            'samples': quality['samples'],
+            'start_time': self.quality.first_timestamp,
+            'end_time': self.quality.last_timestamp,
+            'duration_s': round(quality['duration_s'], 3),
+            'gaps': quality['gaps'],
+            'gap_seconds': round(quality['gap_seconds'], 3),
+            'flat_channels': quality['flat_channels'],
+            'channel_stats': channel_stats,
+        }
+
+    def write(self, file_path):
+        """Write the summary next to the recording at `file_path`; returns the summary path."""
+        path = summary_path(file_path)
+        with open(path, 'w') as f:
+            json.dump(self.result(), f, separators=(',', ':'))
+        return path
+
+
+def summarize_file(file_path, sampling_rate=None, chunk_rows=CHUNK_ROWS, cache_dir=None):
+    """Build and write the summary of an existing recording in one streaming pass.
+
+    The sampling rate (unless given) and the gaps come from the recording's
+    sample clock (see recordings.read_clock).
+    """
+    clock = read_clock(file_path, cache_dir)
+    if clock['rows']:
+        sampling_rate = recording_sampling_rate(file_path, sampling_rate, cache_dir)
+    summary = RecordingSummary(len(read_header(file_path)) - 1, sampling_rate or 0, clock['gaps'])
+    for timestamps, values in iter_chunks(file_path, chunk_rows, cache_dir):
+        summary.update(timestamps, values)
+    summary.write(file_path)
+    return summary.result()
+
+
+def read_summary(file_path):
+    """Saved summary of a recording, or None when it is missing, older than the recording or of an earlier version."""
+    path = summary_path(file_path)
+    try:
+        if os.path.getmtime(path) < os.path.getmtime(file_path):
+            return None
+        with open(path, 'r') as f:
+            summary = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return summary if summary.get('version') == SUMMARY_VERSION else None
+
+
+def list_summaries(directory=RECORDINGS_DIR, build_missing=False):
+    """Recordings in `directory` with their summaries, reading only the summary files.
+
+    Recordings without an up-to-date summary get None, or are summarized
+    first with `build_missing`.
+    """
+    listing = []
+    for file_path in list_recordings(directory):
+        summary = read_summary(file_path)
+        if summary is None and build_missing:
+            try:
+                summary = summarize_file(file_path)
+            except Exception as e:
+                print(f"Could not summarize {file_path}: {e}", file=sys.stderr)
+        listing.append({'file': os.path.basename(file_path), 'file_path': file_path, 'summary': summary})
+    return listing
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='List EEG recordings with their precomputed summaries')
+    parser.add_argument('directory', nargs='?', default=RECORDINGS_DIR,
+                        help='Directory of CSV recordings (default: uploads/eeg)')
+    parser.add_argument('--build_missing', action='store_true',
+                        help='Summarize recordings that have no up-to-date summary')
+
+    args = parser.parse_args()
+    print(json.dumps({'status': 'success', 'recordings': list_summaries(args.directory, args.build_missing)}))
@@ -0,0 +1,265 @@
+import time
+
+import numpy as np
+
+try:
+    from scipy import signal as sig_processing
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+# Generator limits
+MAX_CHANNELS = 256
+MAX_SAMPLING_RATE = 16000
+RAIL_UV = 187500.0          # Cyton full scale at gain 24 (4.5 V / 24) in microvolts
+PACKAGE_MODULO = 256        # Cyton package counter wraps at 256
+
+# Pink (1/f) noise IIR approximation (Paul Kellet's economy filter)
+PINK_B = np.array([0.049922035, -0.095993537, 0.050612699, -0.004408786])
+PINK_A = np.array([1.0, -2.494956002, 2.017265875, -0.522189400])
+
+# Event shapes
+BLINK_SECONDS = 0.3
+RAIL_SECONDS = (0.2, 2.0)
+
+
+class SyntheticEEGGenerator:
+    """Block-based generator of realistic multi-channel EEG-like signals.
+
+    Every block is computed with whole-array NumPy operations: a 1/f
+    background, per-channel alpha bursts, mains line noise, eye blinks on
+    the frontal channels and occasional rail (saturation) events. Filter
+    state, oscillator phases and events spanning block boundaries carry
+    over, so consecutive blocks form one continuous signal.
+    """
+
+    def __init__(self, channel_count=8, sampling_rate=250, seed=None, line_frequency=60.0,
+                 background_amplitude=10.0, alpha_amplitude=20.0, line_noise_amplitude=2.0,
+                 blink_rate=0.2, blink_amplitude=150.0, rail_rate=0.01, dc_offset=0.0,
+                 start_time=None):
+        if not 1 <= channel_count <= MAX_CHANNELS:
+            raise ValueError(f"channel_count must be between 1 and {MAX_CHANNELS}")
+        if not 1 <= sampling_rate <= MAX_SAMPLING_RATE:
+            raise ValueError(f"sampling_rate must be between 1 and {MAX_SAMPLING_RATE} Hz")
+
+        self.channel_count = int(channel_count)
+        self.sampling_rate = int(sampling_rate)
+        self.line_frequency = line_frequency
+        self.background_amplitude = background_amplitude
+        self.alpha_amplitude = alpha_amplitude
+        self.line_noise_amplitude = line_noise_amplitude
+        self.blink_rate = blink_rate
+        self.blink_amplitude = blink_amplitude
+        self.rail_rate = rail_rate
+        self.dc_offset = dc_offset
+        self.start_time = time.time() if start_time is None else start_time
+        self.sample_index = 0
+
+        rng = self._rng = np.random.default_rng(seed)
+        channels = self.channel_count
+
+        # Per-channel oscillator parameters
+        self._alpha_freq = rng.uniform(8.5, 11.5, channels)[:, None]
+        self._alpha_phase = rng.uniform(0, 2 * np.pi, channels)[:, None]
+        self._burst_freq = rng.uniform(0.05, 0.2, channels)[:, None]
+        self._burst_phase = rng.uniform(0, 2 * np.pi, channels)[:, None]
+        self._line_gain = rng.uniform(0.5, 1.5, channels)[:, None]
+
+        # Frontal channels (about the first eighth of the montage) see blinks, fading with distance
+        frontal = max(1, channels // 8)
+        self._blink_weights = np.zeros(channels)
+        self._blink_weights[:frontal] = np.linspace(1.0, 0.5, frontal)
+
+        # 1/f background filter state, normalized to unit standard deviation
+        self._pink_zi = None
+        self._pink_scale = 1.0
+        if SCIPY_AVAILABLE:
+            self._pink_zi = np.zeros((channels, len(PINK_A) - 1))
+            probe = sig_processing.lfilter(PINK_B, PINK_A, rng.standard_normal(8192))
+            self._pink_scale = 1.0 / np.std(probe[1024:])
+
+        # Pending events as (start_sample, end_sample, kind, channel, amplitude)
+        self._events = []
+
+    def _schedule_events(self, first, count):
+        """Draw blink and rail events starting within the next block."""
+        rng = self._rng
+        seconds = count / self.sampling_rate
+
+        for start in rng.integers(first, first + count, rng.poisson(self.blink_rate * seconds)):
+            length = int(BLINK_SECONDS * self.sampling_rate)
+            self._events.append((int(start), int(start) + length, 'blink', None,
+                                 self.blink_amplitude * rng.uniform(0.7, 1.3)))
+
+        for start in rng.integers(first, first + count, rng.poisson(self.rail_rate * seconds * self.channel_count)):
+            length = int(rng.uniform(*RAIL_SECONDS) * self.sampling_rate)
+            self._events.append((int(start), int(start) + length, 'rail',
+                                 int(rng.integers(self.channel_count)), RAIL_UV * rng.choice([-1.0, 1.0])))
+
+    def _apply_events(self, data, first, count):
+        """Render every event overlapping [first, first + count) into the block."""
+        last = first + count
+        remaining = []
+        for start, end, kind, channel, amplitude in self._events:
+            if start < last and end > first:
+                lo, hi = max(start, first), min(end, last)
+                if kind == 'blink':
+                    phase = (np.arange(lo, hi) - start) / (end - start)
+                    shape = amplitude * np.sin(np.pi * phase) ** 2
+                    data[:, lo - first:hi - first] += self._blink_weights[:, None] * shape
+                else:
+                    data[channel, lo - first:hi - first] = amplitude
+            if end > last:
+                remaining.append((start, end, kind, channel, amplitude))
+        self._events = remaining
+
+    def generate(self, count):
+        """Generate the next `count` samples as (timestamps, data[channels, count])."""
+        count = int(count)
+        first = self.sample_index
+        t = (first + np.arange(count)) / self.sampling_rate
+        rng = self._rng
+
+        # 1/f background (white noise when scipy is not available)
+        white = rng.standard_normal((self.channel_count, count))
+        if self._pink_zi is not None:
+            background, self._pink_zi = sig_processing.lfilter(PINK_B, PINK_A, white, axis=1, zi=self._pink_zi)
+            background *= self._pink_scale * self.background_amplitude
+        else:
+            background = white * self.background_amplitude
+
+        # Alpha bursts: 8.5-11.5 Hz oscillation under a slow half-wave envelope
+        envelope = np.clip(np.sin(2 * np.pi * self._burst_freq * t + self._burst_phase), 0, None) ** 2
+        alpha = self.alpha_amplitude * envelope * np.sin(2 * np.pi * self._alpha_freq * t + self._alpha_phase)
+
+        # Mains interference, common phase with per-channel coupling
+        line = self.line_noise_amplitude * self._line_gain * np.sin(2 * np.pi * self.line_frequency * t)
+
+        data = background + alpha + line + self.dc_offset
+
+        self._schedule_events(first, count)
+        self._apply_events(data, first, count)
+
+        self.sample_index += count
+        return self.start_time + t, data
+
+    def stream(self, block_seconds=0.01, realtime=True, should_continue=None):
+        """Yield consecutive (timestamps, data) blocks, paced to real time unless realtime=False."""
+        block = max(1, int(round(block_seconds * self.sampling_rate)))
+        started = time.monotonic()
+        first = self.sample_index
+
+        while should_continue is None or should_continue():
+            if realtime:
+                # Pace against a monotonic clock so sleep jitter does not accumulate
+                due = started + (self.sample_index + block - first) / self.sampling_rate
+                delay = due - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            yield self.generate(block)
+
+
+class GeneratorBoard:
+    """BoardShim-like wrapper that streams from a SyntheticEEGGenerator.
+
+    Rows follow BrainFlow's layout: package number, EEG channels, timestamp.
+    Samples become available in real time while streaming and are kept in
+    a bounded buffer that drops the oldest samples, like BrainFlow's ring
+    buffer. `clock` can be replaced to drive the board faster than real time.
+    """
+
+    def __init__(self, generator, buffer_size=450000, clock=time.monotonic):
+        self.generator = generator
+        self.buffer_size = buffer_size
+        self.clock = clock
+        self.eeg_channels = list(range(1, generator.channel_count + 1))
+        self.package_num_channel = 0
+        self.timestamp_channel = generator.channel_count + 1
+        self.num_rows = generator.channel_count + 2
+        self.sampling_rate = generator.sampling_rate
+        self.prepared = False
+        self.streaming = False
+        self._stream_started = None
+        self._chunks = []
+        self._buffered = 0
+
+    def prepare_session(self):
+        self.prepared = True
+
+    def is_prepared(self):
+        return self.prepared
+
+    def start_stream(self, buffer_size=None, streamer_params=None):
+        if not self.prepared:
+            raise RuntimeError("Board session is not prepared")
+        if buffer_size:
+            self.buffer_size = buffer_size
+        self._stream_started = self.clock()
+        self._stream_first = self.generator.sample_index
+        self.streaming = True
+
+    def _produce(self):
+        """Generate every sample that is due since the stream started."""
+        if not self.streaming:
+            return
+        due = int((self.clock() - self._stream_started) * self.sampling_rate)
+        count = self._stream_first + due - self.generator.sample_index
+        if count <= 0:
+            return
+        if count > self.buffer_size:
+            # Samples that would be dropped by the ring buffer anyway are skipped, not generated
+            self.generator.sample_index += count - self.buffer_size
+            count = self.buffer_size
+        first = self.generator.sample_index
+        timestamps, data = self.generator.generate(count)
+
+        rows = np.empty((self.num_rows, count))
+        rows[self.package_num_channel] = (first + np.arange(count)) % PACKAGE_MODULO
+        rows[1:self.timestamp_channel] = data
+        rows[self.timestamp_channel] = timestamps
+        self._chunks.append(rows)
+        self._buffered += count
+
+        # Drop the oldest samples beyond the buffer size
+        while self._buffered > self.buffer_size:
+            excess = self._buffered - self.buffer_size
+            if self._chunks[0].shape[1] <= excess:
+                self._buffered -= self._chunks.pop(0).shape[1]
+            else:
+                self._chunks[0] = self._chunks[0][:, excess:]
+                self._buffered -= excess
+
+    def get_board_data_count(self):
+        self._produce()
+        return self._buffered
+
+    def get_current_board_data(self, num_samples):
+        """Return up to the latest `num_samples` samples without removing them."""
+        self._produce()
+        if not self._chunks:
+            return np.empty((self.num_rows, 0))
+        return np.concatenate(self._chunks, axis=1)[:, -num_samples:]
+
+    def get_board_data(self, num_samples=None):
+        """Return and remove buffered samples (all of them by default, oldest first)."""
+        self._produce()
+        if not self._chunks:
+            return np.empty((self.num_rows, 0))
+        data = np.concatenate(self._chunks, axis=1)
+        if num_samples is not None and num_samples < data.shape[1]:
+            self._chunks = [data[:, num_samples:]]
+            self._buffered = data.shape[1] - num_samples
+            return data[:, :num_samples]
+        self._chunks = []
+        self._buffered = 0
+        return data
+
+    def stop_stream(self):
+        self._produce()
+        self.streaming = False
+
+    def release_session(self):
+        self.streaming = False
+        self.prepared = False
+        self._chunks = []
+        self._buffered = 0
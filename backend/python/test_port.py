@@ -1,16 +1,23 @@
-import time
+import sys
 from brainflow.board_shim import BoardShim, BrainFlowInputParams, BoardIds, LogLevels
 
+from port_discovery import candidate_ports
+from readiness import ReadinessTimeout, serial_port_ready, wait_until
+
 # Enable verbose logging
 BoardShim.enable_dev_board_logger()
 BoardShim.set_log_level(LogLevels.LEVEL_DEBUG)
 
-def test_connection(port='COM3'):
+def test_connection(port):
     print(f"Testing OpenBCI connection on {port}")
     print("Initializing...")
     
-    # Give the board time to initialize
-    time.sleep(3)
+    # Wait until the serial device can be opened
+    try:
+        wait_until(lambda: serial_port_ready(port), 3, f'Serial port {port}')
+    except ReadinessTimeout as e:
+        print(f"Error during test: {e}")
+        return False
     
     params = BrainFlowInputParams()
     params.serial_port = port
@@ -33,4 +40,9 @@ def test_connection(port='COM3'):
         return False
 
 if __name__ == "__main__":
-    test_connection('COM3')
\ No newline at end of file
+    # Test the port given on the command line, or every candidate serial port
+    ports = sys.argv[1:] or candidate_ports()
+    if not ports:
+        print("No serial ports found; pass the port to test (e.g. COM3 or /dev/ttyUSB0)")
+    for port in ports:
+        test_connection(port)
@@ -0,0 +1,340 @@
+"""
+Sample clock of EEG recordings.
+
+Board timestamps are host arrival times, so they come in irregular
+batches. A recording's clock is a linear model, sample index -> time,
+fitted to those timestamps, with dropped samples found from the board's
+package counter (or, without one, by a TimestampGapFinder). Sample
+indices count dropped samples too, so an index computed from a time
+always refers to the same moment, and a row of the recording is found
+without searching its timestamps.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from synthetic_eeg import PACKAGE_MODULO
+
+GAP_FACTOR = 1.5            # Timestamp steps this many sample periods long are gaps
+BATCH_FRACTION = 0.5        # Timestamp steps shorter than this many sample periods continue a host batch
+FILL_MODES = ('nan', 'hold', 'interpolate')
+
+# t0: time of sample 0; rate: samples per second
+ClockModel = namedtuple('ClockModel', ['t0', 'rate'])
+
+# Output of regularize()
+#   timestamps: clock times of the returned samples
+#   values:     (samples, channels), with dropped samples filled when asked to
+#   indices:    sample index of every input row
+#   clock:      the fitted ClockModel
+Regularized = namedtuple('Regularized', ['timestamps', 'values', 'indices', 'clock'])
+
+
+def time_at(clock, indices):
+    """Clock times of sample indices."""
+    return clock.t0 + np.asarray(indices, dtype=float) / clock.rate
+
+
+def index_at(clock, times):
+    """Index of the first sample at or after each time."""
+    # A tolerance of 1% of a period absorbs float rounding of epoch-second times
+    return np.ceil((np.asarray(times, dtype=float) - clock.t0) * clock.rate - 0.01).astype(np.int64)
+
+
+def package_step(package_numbers, modulo=PACKAGE_MODULO):
+    """Most common package counter increment (1 for Cyton, 2 for Cyton+Daisy)."""
+    steps = np.diff(np.asarray(package_numbers, dtype=np.int64)) % modulo
+    steps = steps[steps > 0]
+    return int(np.bincount(steps).argmax()) if len(steps) else 1
+
+
+def dropped_samples(package_numbers=None, timestamps=None, sampling_rate=None, previous_package=None,
+                    previous_timestamp=None, step=1, modulo=PACKAGE_MODULO):
+    """Number of samples missing just before each sample.
+
+    Package numbers give exact counts of drops shorter than the counter
+    period; timestamps, when the sampling rate is known, add whole counter
+    periods for longer drops, or find gaps on their own when there are no
+    package numbers. Host timestamps jitter by whole batches, so timestamps
+    alone are only reliable for regularly stamped recordings. previous_*
+    are the values of the sample before the first one, if any.
+    """
+    count = len(package_numbers) if package_numbers is not None else len(timestamps)
+    missing = np.zeros(count, dtype=np.int64)
+    from_time = None
+    if timestamps is not None and sampling_rate:
+        timestamps = np.asarray(timestamps, dtype=float)
+        previous = timestamps[0] - 1.0 / sampling_rate if previous_timestamp is None else previous_timestamp
+        periods = np.diff(np.concatenate(([previous], timestamps))) * sampling_rate
+        from_time = np.where(periods > GAP_FACTOR, np.rint(periods) - 1, 0).astype(np.int64)
+
+    if package_numbers is not None:
+        package_numbers = np.asarray(package_numbers, dtype=np.int64)
+        previous = package_numbers[0] - step if previous_package is None else previous_package
+        steps = np.diff(np.concatenate(([previous], package_numbers))) % modulo
+        missing = np.maximum(steps // step - 1, 0)
+        if from_time is not None:
+            # The counter wraps; a drop of whole counter periods shows only in the timestamps
+            period = modulo // step
+            wraps = np.maximum(np.rint((from_time - missing) / period), 0).astype(np.int64)
+            missing = missing + wraps * period
+    elif from_time is not None:
+        missing = from_time
+    return missing
+
+
+class ClockTracker:
+    """Clock fit and dropped-sample log updated block by block as samples arrive.
+
+    The fit is an incremental least-squares line of timestamps against
+    sample indices, so the cost per block does not grow with the recording.
+    `gaps` lists (row, missing) pairs: `missing` samples were dropped just
+    before row `row` of the recording. `gap_source` tells how they were
+    found: from 'packages' numbers, given by a 'timestamps' gap finder, or
+    from raw timestamp 'steps', which host batching makes unreliable.
+    """
+
+    def __init__(self, sampling_rate=None, modulo=PACKAGE_MODULO):
+        self.sampling_rate = sampling_rate
+        self.modulo = modulo
+        self.rows = 0
+        self.samples = 0
+        self.gaps = []
+        self.gap_source = None
+        self.step = None
+        self._last_package = None
+        self._last_timestamp = None
+        self._restarted = False
+        self._skipped = 0
+        self._reference = None
+        self._sums = np.zeros(5)    # n, sum i, sum t, sum i*i, sum i*t (t relative to the first timestamp)
+
+    def update(self, timestamps, package_numbers=None, missing=None):
+        """Add a block of samples; returns their sample indices.
+
+        `missing`, when given, is the number of samples dropped just before
+        each one (as from a TimestampGapFinder), used instead of finding them.
+        """
+        timestamps = np.asarray(timestamps, dtype=float)
+        count = len(timestamps)
+        if count == 0:
+            return np.empty(0, dtype=np.int64)
+        if package_numbers is not None and self.step is None and (count > 1 or self._last_package is not None):
+            numbers = package_numbers if self._last_package is None else \
+                np.concatenate(([self._last_package], package_numbers))
+            self.step = package_step(numbers, self.modulo)
+        restarted = self._restarted and self._last_timestamp is not None
+        self._restarted = False
+        skipped, self._skipped = self._skipped, 0
+        if self.gap_source != 'steps':
+            self.gap_source = 'packages' if package_numbers is not None else \
+                'timestamps' if missing is not None else 'steps'
+        if missing is not None:
+            missing = np.asarray(missing, dtype=np.int64)
+        elif restarted:
+            # The package counter started over; the gap before this block is measured in time
+            missing = dropped_samples(package_numbers, timestamps, self.sampling_rate, step=self.step or 1,
+                                      modulo=self.modulo)
+            missing[0] = max(int(round((timestamps[0] - self._last_timestamp) * self.sampling_rate)) - 1, 0) \
+                if self.sampling_rate else 0
+        elif skipped:
+            # Whole blocks were left out; their count, not the wrapped package counter, gives the gap
+            missing = dropped_samples(package_numbers, timestamps, self.sampling_rate, step=self.step or 1,
+                                      modulo=self.modulo)
+            missing[0] = skipped
+        else:
+            missing = dropped_samples(package_numbers, timestamps, self.sampling_rate, self._last_package,
+                                      self._last_timestamp, self.step or 1, self.modulo)
+        indices = self.samples + np.arange(count) + np.cumsum(missing)
+        for row in np.flatnonzero(missing):
+            self.gaps.append((self.rows + int(row), int(missing[row])))
+
+        if self._reference is None:
+            self._reference = float(timestamps[0])
+        t = timestamps - self._reference
+        i = indices.astype(float)
+        self._sums += (count, i.sum(), t.sum(), (i * i).sum(), (i * t).sum())
+
+        self.rows += count
+        self.samples = int(indices[-1]) + 1
+        self._last_timestamp = float(timestamps[-1])
+        if package_numbers is not None:
+            self._last_package = int(package_numbers[-1])
+        return indices
+
+    def restart(self):
+        """Note that the board was reopened, so its package counter does not continue.
+
+        The samples missing before the next block are then counted from the
+        time between the blocks and the nominal sampling rate.
+        """
+        self._restarted = True
+
+    def skip(self, samples):
+        """Note that `samples` samples were left out just before the next block (e.g. a full queue)."""
+        self._skipped += samples
+
+    def fitted_rate(self):
+        """Rate of the least-squares fit, or None with too little data for a slope."""
+        n, si, st, sii, sit = self._sums
+        denominator = n * sii - si * si
+        if n < 2 or denominator <= 0 or n * sit - si * st <= 0:
+            return None
+        return float(denominator / (n * sit - si * st))
+
+    def model(self):
+        """The fitted ClockModel (None before any sample)."""
+        n, si, st, sii, sit = self._sums
+        if n == 0:
+            return None
+        # Without a slope yet, fall back to the nominal rate
+        rate = self.fitted_rate() or self.sampling_rate or 1.0
+        return ClockModel(self._reference + (st - si / rate) / n, rate)
+
+    def to_dict(self):
+        clock = self.model()
+        return {
+            't0': float(clock.t0) if clock else None,
+            'rate': float(clock.rate) if clock else self.sampling_rate,
+            'fitted': self.fitted_rate() is not None,
+            'nominal_rate': self.sampling_rate,
+            'rows': self.rows,
+            'samples': self.samples,
+            'dropped': self.samples - self.rows,
+            'package_step': self.step,
+            'gap_source': self.gap_source,
+            'gaps': [list(gap) for gap in self.gaps],
+        }
+
+
+class TimestampGapFinder:
+    """Finds dropped samples from the timestamps of a recording without package numbers.
+
+    Host timestamps come in batches of samples stamped at almost the same
+    moment, so one step between timestamps says little. A batch follows a
+    gap when the time since the previous batch holds more than GAP_FACTOR
+    sample periods beyond the previous batch's samples, and the batch after
+    it shows the same shift (one late batch is not a gap). Drops shorter
+    than the timestamps' jitter cannot be told apart from it.
+
+    Rows come back from update() once the batch after theirs has started,
+    with the samples missing before each; finish() returns the rest.
+    """
+
+    def __init__(self, sampling_rate):
+        self.sampling_rate = sampling_rate
+        self.held = np.empty(0)
+        self.previous = None        # (start time, rows) of the last batch handed back
+
+    def update(self, timestamps):
+        """Add a block of timestamps; returns (timestamps, missing) of the rows now settled."""
+        held = np.concatenate((self.held, np.asarray(timestamps, dtype=float)))
+        if not self.sampling_rate or len(held) == 0:
+            self.held = np.empty(0)
+            return held, np.zeros(len(held), dtype=np.int64)
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(held) * self.sampling_rate > BATCH_FRACTION) + 1))
+        if len(starts) == 1:
+            # The batch may go on in the next block
+            self.held = held
+            return np.empty(0), np.empty(0, dtype=np.int64)
+
+        # Start times and rows of the batches, with the previous batch first
+        times = held[starts]
+        counts = np.diff(starts)
+        if self.previous is not None:
+            times = np.concatenate(([self.previous[0]], times))
+            counts = np.concatenate(([self.previous[1]], counts))
+        # Samples beyond the previous batch's rows in the time since it, up to each batch and the one after
+        lead = (times[1:] - times[:-1]) * self.sampling_rate - counts
+        confirmed = (times[2:] - times[:-2]) * self.sampling_rate - counts[:-1] - counts[1:]
+        shift = np.minimum(lead[:-1], confirmed)
+        if self.previous is None:
+            # The first batch of the recording has nothing before it
+            shift = np.concatenate(([0.0], shift))
+
+        settled = starts[-1]
+        missing = np.zeros(settled, dtype=np.int64)
+        missing[starts[:-1]] = np.where(shift > GAP_FACTOR, np.rint(shift), 0)
+        self.previous = (held[starts[-2]], int(settled - starts[-2]))
+        self.held = held[settled:]
+        return held[:settled], missing
+
+    def finish(self):
+        """(timestamps, missing) of the last batch, with nothing after it to confirm a gap."""
+        held, self.held = self.held, np.empty(0)
+        missing = np.zeros(len(held), dtype=np.int64)
+        if len(held) and self.sampling_rate and self.previous is not None:
+            lead = (held[0] - self.previous[0]) * self.sampling_rate - self.previous[1]
+            missing[0] = np.rint(lead) if lead > GAP_FACTOR else 0
+        return held, missing
+
+
+def rows_to_samples(rows, gaps):
+    """Sample indices of recording rows, given the (row, missing) gap list."""
+    rows = np.asarray(rows, dtype=np.int64)
+    if not gaps:
+        return rows
+    gap_rows, missing = np.asarray(gaps, dtype=np.int64).T
+    dropped_before = np.concatenate(([0], np.cumsum(missing)))
+    return rows + dropped_before[np.searchsorted(gap_rows, rows, side='right')]
+
+
+def samples_to_rows(samples, gaps):
+    """Row holding each sample index, or the next row when the sample was dropped."""
+    samples = np.asarray(samples, dtype=np.int64)
+    if not gaps:
+        return samples
+    gap_rows, missing = np.asarray(gaps, dtype=np.int64).T
+    cumulative = np.cumsum(missing)
+    # Gaps that end at or before each sample, and the samples they dropped
+    position = np.searchsorted(gap_rows + cumulative, samples, side='right')
+    rows = samples - np.concatenate(([0], cumulative))[position]
+    # A sample inside the next gap maps to the row after that gap
+    next_row = np.concatenate((gap_rows, [np.iinfo(np.int64).max]))[position]
+    return np.minimum(rows, next_row)
+
+
+def regularize(timestamps, values, package_numbers=None, sampling_rate=None, fill=None):
+    """Put samples on a regular clock, optionally filling dropped samples.
+
+    values is (samples, channels). Without `fill` the rows are returned
+    unchanged with their clock times. With fill='nan' dropped samples are
+    inserted as NaN rows (marked), 'hold' repeats the previous sample and
+    'interpolate' joins the neighbours linearly, so row k of the result is
+    sample k of the recording.
+    """
+    if fill is not None and fill not in FILL_MODES:
+        raise ValueError(f"Unknown fill mode {fill!r}; expected one of {', '.join(FILL_MODES)}")
+    values = np.asarray(values, dtype=float)
+    tracker = ClockTracker(sampling_rate)
+    indices = tracker.update(timestamps, package_numbers)
+    clock = tracker.model()
+    if clock is None:
+        return Regularized(np.empty(0), values, indices, clock)
+    if fill is None:
+        return Regularized(time_at(clock, indices), values, indices, clock)
+
+    all_indices = np.arange(indices[-1] + 1)
+    return Regularized(time_at(clock, all_indices), fill_samples(indices, values, fill, 0, len(all_indices)),
+                       indices, clock)
+
+
+def fill_samples(indices, values, fill, start, stop):
+    """Values of every sample in [start, stop) from the rows at `indices`, filling the dropped ones.
+
+    fill is 'nan', 'hold' (NaN before the first known sample) or 'interpolate'.
+    """
+    indices = np.asarray(indices, dtype=np.int64)
+    positions = np.arange(start, stop)
+    if fill == 'interpolate' and len(indices):
+        return np.column_stack([np.interp(positions, indices, column) for column in values.T]) \
+            if values.shape[1] else np.empty((len(positions), 0))
+    filled = np.full((len(positions) + 1, values.shape[1]), np.nan)
+    inside = (indices >= start) & (indices < stop)
+    filled[indices[inside] - start + 1] = values[inside]
+    if fill == 'hold':
+        # Row of the last known sample at or before each position (row 0 is the NaN row)
+        last = np.zeros(len(positions) + 1, dtype=np.int64)
+        last[indices[inside] - start + 1] = indices[inside] - start + 1
+        filled = filled[np.maximum.accumulate(last)]
+    return filled[1:]
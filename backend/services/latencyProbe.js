@@ -0,0 +1,127 @@
+// latencyProbe.js
+// Consumer-side latency probe for EEG_STREAM packets from openbci_bridge.py.
+// Mirrors python/latency.py: log-spaced buckets (20 per decade, 10 us to 100 s).
+
+const BUCKETS_PER_DECADE = 20;
+const MIN_EXPONENT = -2; // 0.01 ms
+const BUCKET_COUNT = 7 * BUCKETS_PER_DECADE + 2;
+const SUMMARY_INTERVAL_MS = 10000;
+
+class LatencyHistogram {
+    constructor() {
+        this.counts = new Array(BUCKET_COUNT).fill(0);
+        this.count = 0;
+        this.totalMs = 0;
+        this.maxMs = 0;
+    }
+
+    /**
+     * Record one latency in milliseconds (negative values count as zero)
+     * @param {number} latencyMs - Latency in milliseconds
+     */
+    record(latencyMs) {
+        const value = Math.max(0, latencyMs);
+        const position = Math.ceil((Math.log10(Math.max(value, 1e-9)) - MIN_EXPONENT) * BUCKETS_PER_DECADE);
+        const bucket = Math.min(BUCKET_COUNT - 1, Math.max(0, position));
+        this.counts[bucket] += 1;
+        this.count += 1;
+        this.totalMs += value;
+        this.maxMs = Math.max(this.maxMs, value);
+    }
+
+    /**
+     * Approximate percentile in milliseconds
+     * @param {number} q - Percentile between 0 and 100
+     * @returns {number|null} - Upper edge of the bucket holding the percentile
+     */
+    percentile(q) {
+        if (this.count === 0) {
+            return null;
+        }
+        const target = (q / 100) * this.count;
+        let cumulative = 0;
+        for (let bucket = 0; bucket < BUCKET_COUNT; bucket++) {
+            cumulative += this.counts[bucket];
+            if (cumulative >= target) {
+                const edge = Math.pow(10, MIN_EXPONENT + bucket / BUCKETS_PER_DECADE);
+                return Math.min(edge, this.maxMs);
+            }
+        }
+        return this.maxMs;
+    }
+
+    summary() {
+        if (this.count === 0) {
+            return { count: 0 };
+        }
+        const round = value => Math.round(value * 1000) / 1000;
+        return {
+            count: this.count,
+            mean_ms: round(this.totalMs / this.count),
+            p50_ms: round(this.percentile(50)),
+            p95_ms: round(this.percentile(95)),
+            p99_ms: round(this.percentile(99)),
+            max_ms: round(this.maxMs)
+        };
+    }
+}
+
+class LatencyProbe {
+    constructor(summaryIntervalMs = SUMMARY_INTERVAL_MS) {
+        this.hops = {};
+        this.summaryIntervalMs = summaryIntervalMs;
+        this.lastSummary = Date.now();
+    }
+
+    /**
+     * Record a latency for a named hop
+     * @param {string} hop - Hop name (e.g. 'emit->node')
+     * @param {number} latencyMs - Latency in milliseconds
+     */
+    record(hop, latencyMs) {
+        if (!this.hops[hop]) {
+            this.hops[hop] = new LatencyHistogram();
+        }
+        this.hops[hop].record(latencyMs);
+    }
+
+    /**
+     * Record the hops ending at Node for one EEG_STREAM packet
+     * @param {Object} packet - Parsed EEG_STREAM packet
+     * @param {number} receivedMs - Receive time in epoch milliseconds
+     */
+    probePacket(packet, receivedMs = Date.now()) {
+        if (typeof packet.emit_time === 'number') {
+            this.record('emit->node', receivedMs - packet.emit_time * 1000);
+        }
+        if (typeof packet.board_timestamp === 'number') {
+            this.record('board->node', receivedMs - packet.board_timestamp * 1000);
+        }
+        if (receivedMs - this.lastSummary >= this.summaryIntervalMs) {
+            this.lastSummary = receivedMs;
+            console.log(this.formatSummary());
+        }
+    }
+
+    summary() {
+        const result = {};
+        Object.keys(this.hops).forEach(hop => {
+            result[hop] = this.hops[hop].summary();
+        });
+        return result;
+    }
+
+    formatSummary() {
+        const parts = Object.entries(this.summary())
+            .filter(([, stats]) => stats.count > 0)
+            .map(([hop, stats]) => `${hop} p50 ${stats.p50_ms.toFixed(1)} p95 ${stats.p95_ms.toFixed(1)} ` +
+                `p99 ${stats.p99_ms.toFixed(1)} ms (n=${stats.count})`);
+        return `EEG stream latency: ${parts.length > 0 ? parts.join(' | ') : 'no samples'}`;
+    }
+
+    reset() {
+        this.hops = {};
+    }
+}
+
+module.exports = { LatencyProbe, LatencyHistogram };
@@ -2,6 +2,7 @@
 const { spawn } = require('child_process');
 const path = require('path');
 const fs = require('fs');
+const { LatencyProbe } = require('./latencyProbe');
 
 /**
  * Robust JSON extraction from Python output
@@ -73,6 +74,9 @@ class OpenBCIService {
         this.serialPort = null;
         this.isConnected = false;
         this.boardType = null;
+        
+        // Per-hop latency of streamed EEG packets arriving at Node
+        this.latencyProbe = new LatencyProbe();
     }
 
     /**
@@ -575,10 +579,11 @@ print(json.dumps(result))
             
             console.log(`Starting recording on port: ${this.serialPort}, experiment: ${experimentName}`);
             
-            // Start recording with streaming
+            // Start a stream session that records until stopRecording asks it to save
             const result = await this.startRecordingWithStreaming({
-                action: 'start_recording',
+                action: 'stream',
                 serial_port: this.serialPort,
+                duration: 0,
                 experiment_name: experimentName || 'OpenBCI Recording'
             });
             
@@ -634,6 +639,37 @@ print(json.dumps(result))
                         try {
                             const eegData = JSON.parse(line.substring(11)); // Remove "EEG_STREAM:" prefix
                             
+                            // The recording's EDF+/BDF+ export finished after an asynchronous stop
+                            if (eegData.type === 'recording_finalized') {
+                                if (io) {
+                                    io.emit('eeg-recording-finalized', {
+                                        status: eegData.status,
+                                        filePath: eegData.file_path,
+                                        exportFile: eegData.export_file,
+                                        message: eegData.message
+                                    });
+                                }
+                                return;
+                            }
+                            
+                            // The board was reconnected: tell clients where the stream was interrupted
+                            if (eegData.type === 'discontinuity') {
+                                if (io) {
+                                    io.emit('eeg-stream-gap', {
+                                        timestamp: eegData.timestamp,
+                                        experimentName: eegData.experiment_name,
+                                        sampleNumber: eegData.sample_number,
+                                        gapSeconds: eegData.gap_seconds,
+                                        missingSamples: eegData.missing_samples,
+                                        reason: eegData.reason
+                                    });
+                                }
+                                console.warn(`EEG stream resumed after a ${eegData.gap_seconds}s gap (board ${eegData.reason})`);
+                                return;
+                            }
+                            
+                            this.latencyProbe.probePacket(eegData);
+                            
                             // Forward to WebSocket clients
                             if (io) {
                                 io.emit('eeg-realtime-data', {
@@ -652,6 +688,18 @@ print(json.dumps(result))
                         // Regular output
                         console.log(`Python stdout: ${line}`);
                         outputData += line + '\n';
+                        
+                        // The stream session prints its start result as soon as it is streaming
+                        if (!hasReturned && line.startsWith('{')) {
+                            try {
+                                const result = JSON.parse(line);
+                                hasReturned = true;
+                                clearTimeout(setupTimeout);
+                                resolve(result);
+                            } catch (e) {
+                                // Not the result line
+                            }
+                        }
                     }
                 });
             });
@@ -725,22 +773,18 @@ print(json.dumps(result))
     /**
      * Stop recording and save the data
      * @param {string} experimentId - Experiment ID for saving data
-     * @param {number} duration - Duration to record in seconds
      * @param {string} experimentName - Name of the experiment
      * @returns {Promise<Object>} - Recording result with file path
      */
-    async stopRecording(experimentId, duration = 5, experimentName = '') {
+    async stopRecording(experimentId, experimentName = '') {
         try {
             if (!this.serialPort) {
                 throw new Error('OpenBCI device not connected (no serial port)');
             }
             
-            // Verify connection before stopping
-            const connectionStatus = await this.checkConnection();
-            
-            if (!connectionStatus.connected && !this.isConnected) {
-                throw new Error('OpenBCI device not connected (failed check)');
-            }
+            // A running stream session owns the board and saves the recording itself; without
+            // one the bridge reports that there is no recording to stop
+            const sessionRunning = this.recordingProcess !== null && this.recordingProcess !== undefined;
             
             // Prepare filename with experiment name
             const timestamp = new Date().toISOString().replace(/:/g, '-');
@@ -751,9 +795,10 @@ print(json.dumps(result))
                 action: 'stop_recording',
                 serial_port: this.serialPort,
                 experiment_id: experimentId,
-                duration: duration,
                 output_file: filename,
-                experiment_name: experimentName
+                experiment_name: experimentName,
+                // Return once the CSV is saved; the stream session announces the finished export
+                async_finalize: sessionRunning
             });
             
             console.log(`Stop recording result: ${JSON.stringify(result)}`);
@@ -808,6 +853,14 @@ print(json.dumps(result))
         return this.isConnected;
     }
     
+    /**
+     * Get latency statistics for streamed EEG packets received by Node
+     * @returns {Object} - Per-hop count, mean, p50/p95/p99 and max in milliseconds
+     */
+    getLatencySummary() {
+        return this.latencyProbe.summary();
+    }
+    
     /**
      * Get board type
      * @returns {string|null} - Board type (cyton, cyton_daisy, or null if not connected)
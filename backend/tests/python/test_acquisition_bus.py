@@ -0,0 +1,178 @@
+"""
+Tests for the acquisition bus.
+"""
+import pytest
+import sys
+import os
+import threading
+import numpy as np
+
+# Add the python directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'python'))
+
+# Import the module under test
+import acquisition_bus
+from acquisition_bus import AcquisitionBus, Subscription, make_chunk
+
+
+def chunk(sequence, samples=10, events=()):
+    """A chunk of `samples` samples on 4 channels."""
+    first = sequence * samples
+    return make_chunk(sequence, first, np.ones((4, samples)) * sequence, np.arange(first, first + samples) / 250.0,
+                      events=events)
+
+
+class TestChunk:
+    """Tests for published chunks."""
+
+    def test_arrays_are_read_only(self):
+        """Subscribers share the arrays, so none of them can change what the others see."""
+        published = chunk(0)
+        with pytest.raises(ValueError):
+            published.eeg[0, 0] = 1
+        with pytest.raises(ValueError):
+            published.timestamps[0] = 1
+
+
+class TestSubscription:
+    """Tests for the overflow policies of a subscription queue."""
+
+    def test_rejects_unknown_policy(self):
+        """Only the documented overflow policies are accepted."""
+        with pytest.raises(ValueError):
+            Subscription('web', policy='drop_all')
+
+    def test_drop_oldest_keeps_latest(self):
+        """A full drop_oldest queue discards its oldest chunks and counts them."""
+        subscription = Subscription('web', maxsize=3, policy='drop_oldest')
+        for sequence in range(5):
+            subscription.offer(chunk(sequence))
+        assert [subscription.get(0).sequence for _ in range(3)] == [2, 3, 4]
+        assert subscription.dropped_chunks == 2
+        assert subscription.dropped_samples == 20
+
+    def test_drop_newest_keeps_earliest(self):
+        """A full drop_newest queue discards the incoming chunks."""
+        subscription = Subscription('dsp', maxsize=3, policy='drop_newest')
+        accepted = [subscription.offer(chunk(sequence)) for sequence in range(5)]
+        assert accepted == [True, True, True, False, False]
+        assert [subscription.get(0).sequence for _ in range(3)] == [0, 1, 2]
+
+    def test_events_of_dropped_chunks_are_kept(self):
+        """Events ride on the next chunk the consumer gets when their own chunk is dropped."""
+        gap = {'type': 'discontinuity', 'reason': 'stalled'}
+        oldest = Subscription('web', maxsize=2, policy='drop_oldest')
+        oldest.offer(chunk(0, events=(gap,)))
+        oldest.offer(chunk(1))
+        oldest.offer(chunk(2))
+        head = oldest.get(0)
+        assert (head.sequence, head.events) == (1, (gap,))
+        
+        newest = Subscription('dsp', maxsize=1, policy='drop_newest')
+        newest.offer(chunk(0))
+        newest.offer(chunk(1, events=(gap,)))
+        assert newest.get(0).events == ()
+        newest.offer(chunk(2))
+        following = newest.get(0)
+        assert (following.sequence, following.events) == (2, (gap,))
+
+    def test_block_waits_for_consumer(self):
+        """A full blocking queue holds the publisher until the consumer takes a chunk."""
+        subscription = Subscription('recorder', maxsize=1, policy='block')
+        subscription.offer(chunk(0))
+        offered = threading.Event()
+        thread = threading.Thread(target=lambda: (subscription.offer(chunk(1)), offered.set()))
+        thread.start()
+        assert not offered.wait(0.1)
+        assert subscription.get(0).sequence == 0
+        assert offered.wait(1)
+        assert subscription.get(0).sequence == 1
+        assert subscription.dropped_chunks == 0
+        assert subscription.blocked_seconds > 0
+
+    def test_close_drains_then_ends(self):
+        """After close the queued chunks are still delivered, then get() returns None."""
+        subscription = Subscription('recorder')
+        subscription.offer(chunk(0))
+        subscription.close()
+        assert subscription.offer(chunk(1)) is False
+        assert subscription.get().sequence == 0
+        assert subscription.get() is None
+
+    def test_discard_counts_dropped(self):
+        """Discarded chunks are counted as dropped."""
+        subscription = Subscription('web')
+        for sequence in range(3):
+            subscription.offer(chunk(sequence))
+        assert subscription.discard() == 3
+        assert subscription.depth() == 0
+        assert subscription.dropped_samples == 30
+
+    def test_get_times_out(self):
+        """get() with a timeout returns None when nothing arrives."""
+        assert Subscription('web').get(timeout=0.01) is None
+
+
+class TestAcquisitionBus:
+    """Tests for fan-out to subscribers."""
+
+    def test_every_subscriber_gets_the_same_chunk(self):
+        """Each chunk is published once and shared, not copied, between subscribers."""
+        bus = AcquisitionBus()
+        web = bus.subscribe('web')
+        recorder = bus.subscribe('recorder', policy='block')
+        published = chunk(0)
+        bus.publish(published)
+        assert web.get(0) is published
+        assert recorder.get(0) is published
+        assert bus.published_samples == 10
+
+    def test_slow_subscriber_does_not_hold_back_others(self):
+        """A subscriber that never reads only drops its own chunks."""
+        bus = AcquisitionBus()
+        stuck = bus.subscribe('stuck', maxsize=2)
+        live = bus.subscribe('live', maxsize=100)
+        for sequence in range(50):
+            bus.publish(chunk(sequence))
+        assert live.depth() == 50
+        assert live.dropped_chunks == 0
+        assert stuck.depth() == 2
+        assert stuck.dropped_chunks == 48
+
+    def test_unsubscribe_closes_queue(self):
+        """An unsubscribed consumer gets no more chunks and its get() ends."""
+        bus = AcquisitionBus()
+        web = bus.subscribe('web')
+        bus.unsubscribe(web)
+        bus.publish(chunk(0))
+        assert web.get() is None
+        assert bus.subscriptions == ()
+
+    def test_stats(self):
+        """Stats report every subscription's queue and counters."""
+        bus = AcquisitionBus()
+        bus.subscribe('web', maxsize=1)
+        bus.publish(chunk(0))
+        bus.publish(chunk(1))
+        stats = bus.stats()
+        assert stats['published_chunks'] == 2
+        assert stats['subscriptions'][0]['name'] == 'web'
+        assert stats['subscriptions'][0]['dropped_samples'] == 10
+        assert bus.depth() == 1
+
+
+class TestBenchFanout:
+    """Tests for the fan-out benchmark."""
+
+    @pytest.mark.slow
+    def test_consumers_add_no_board_load(self):
+        """Adding and removing consumers changes neither the poll rate nor the reference consumer's intake."""
+        stages = acquisition_bus.bench_fanout(consumer_counts=(1, 8), seconds=0.5, channels=8, rate=2000)
+        assert [stage['consumers'] for stage in stages] == [3, 10, 3]
+        polls = [stage['polls_per_second'] for stage in stages]
+        intake = [stage['reference_samples_per_second'] for stage in stages]
+        assert max(polls) < min(polls) * 1.5
+        for samples_per_second in intake:
+            assert samples_per_second == pytest.approx(2000, rel=0.3)
+        # The slow consumer falls behind on its own queue only
+        assert all(stage['slow_dropped_samples'] > 0 for stage in stages)
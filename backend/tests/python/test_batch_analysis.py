@@ -0,0 +1,163 @@
+"""
+Tests for the batch analysis CLI.
+"""
+import pytest
+import sys
+import os
+import csv
+import json
+import shutil
+import numpy as np
+
+# Add the python directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'python'))
+
+# Import the module under test
+import batch_analysis
+
+RATE = 250.0
+
+
+def write_recording(path, seconds=20, channels=3, alpha_uv=20.0, gap_at=None):
+    """CSV recording with a 10 Hz alpha rhythm on every channel and a little noise."""
+    samples = int(seconds * RATE)
+    timestamps = 1700000000.0 + np.arange(samples) / RATE
+    if gap_at is not None:
+        timestamps[gap_at:] += 1.0
+    t = np.arange(samples) / RATE
+    rng = np.random.default_rng(1)
+    values = alpha_uv * np.sin(2 * np.pi * 10 * t)[:, None] + rng.normal(0, 1, (samples, channels))
+    header = 'timestamp,' + ','.join(f'channel_{i + 1}' for i in range(channels))
+    np.savetxt(path, np.column_stack((timestamps, values)), delimiter=',', header=header, comments='', fmt='%.6f')
+    return values
+
+
+def config(*analyses):
+    return {'analyses': list(analyses), 'chunk_rows': 700, 'sampling_rate': None,
+            'lowcut': 1.0, 'highcut': 40.0, 'epoch_seconds': 2.0}
+
+
+class TestAnalyses:
+    """Test the streaming analyses"""
+
+    def test_quality_matches_whole_file(self, tmp_path):
+        """Test chunked quality statistics against NumPy on the whole recording"""
+        path = str(tmp_path / 'rec.csv')
+        values = write_recording(path, gap_at=2000)
+        result = batch_analysis.analyze_recording(path, str(tmp_path), config('quality'))
+        quality = result['details']['quality']
+        assert quality['samples'] == len(values)
+        np.testing.assert_allclose(quality['rms_uv'], np.sqrt(np.mean(values ** 2, axis=0)), rtol=1e-6)
+        np.testing.assert_allclose(quality['max_uv'], values.max(axis=0), atol=1e-5)
+        assert quality['gaps'] == 1
+        assert quality['gap_seconds'] == pytest.approx(1.0, abs=1e-3)
+        assert result['sampling_rate'] == pytest.approx(RATE, rel=1e-3)
+
+    def test_rate_of_host_stamped_recording(self, tmp_path):
+        """Test that a bridge recording with batched host timestamps is analyzed at its real rate"""
+        # 601 rows in batches of 60 arriving every 0.48 s: 125 Hz, not 1 / (the 9 us step inside a batch)
+        sample = os.path.join(os.path.dirname(__file__), '..', '..', 'python', 'uploads', 'eeg',
+                              'eeg_test_20250415_145522.csv')
+        path = str(tmp_path / 'sample.csv')
+        shutil.copy(sample, path)
+        result = batch_analysis.analyze_recording(path, str(tmp_path), config('quality', 'bands'))
+        assert result['sampling_rate'] == pytest.approx(125.0, rel=0.03)
+
+    def test_band_powers_find_alpha(self, tmp_path):
+        """Test that a 10 Hz rhythm dominates the alpha band"""
+        path = str(tmp_path / 'rec.csv')
+        write_recording(path)
+        bands = batch_analysis.analyze_recording(path, str(tmp_path), config('bands'))['details']['bands']
+        assert min(bands['alpha_rel']) > 0.9
+        # A 20 uV amplitude sine carries 200 uV^2 of power
+        assert np.mean(bands['alpha_uv2']) == pytest.approx(200.0, rel=0.1)
+
+    def test_band_powers_independent_of_chunking(self):
+        """Test that chunk boundaries do not change the Welch estimate"""
+        values = np.random.default_rng(2).normal(0, 5, (5000, 2))
+        whole = batch_analysis.BandPowerAccumulator(2, RATE)
+        whole.update(values)
+        chunked = batch_analysis.BandPowerAccumulator(2, RATE)
+        for start in range(0, len(values), 333):
+            chunked.update(values[start:start + 333])
+        assert chunked.segments == whole.segments
+        np.testing.assert_allclose(chunked.result()['beta_uv2'], whole.result()['beta_uv2'])
+
+    def test_filtered_and_epochs_outputs(self, tmp_path):
+        """Test the filtered export and epoch table"""
+        pytest.importorskip('scipy')
+        path = str(tmp_path / 'rec.csv')
+        write_recording(path, seconds=9)
+        result = batch_analysis.analyze_recording(path, str(tmp_path), config('filtered', 'epochs'))
+        filtered = np.loadtxt(result['details']['filtered']['file'], delimiter=',', skiprows=1)
+        assert filtered.shape == (int(9 * RATE), 4)
+        # The bandpass removes the DC offset of the 10 Hz rhythm
+        assert abs(filtered[500:, 1].mean()) < 1.0
+        epochs = np.loadtxt(result['details']['epochs']['file'], delimiter=',', skiprows=1)
+        assert len(epochs) == 4
+        assert epochs[1, 0] == 1
+        assert epochs[0, 3] == pytest.approx(20.0 / np.sqrt(2), rel=0.05)
+
+
+class TestBatch:
+    """Test batch runs, caching and the results table"""
+
+    def test_batch_table_and_skipping(self, tmp_path):
+        """Test the consolidated table, up-to-date skipping and re-analysis on change"""
+        recordings_dir = tmp_path / 'eeg'
+        recordings_dir.mkdir()
+        for name in ('a', 'b', 'c'):
+            write_recording(str(recordings_dir / f'{name}.csv'), seconds=5)
+        (recordings_dir / 'broken.csv').write_text('timestamp,channel_1\nnot,a number\n')
+        output = str(tmp_path / 'out')
+        files = batch_analysis.collect_files([str(recordings_dir)])
+
+        results = batch_analysis.run_batch(files, output, config('quality', 'bands'), workers=2, log=lambda *a: None)
+        assert [r['cached'] for r in results] == [False] * 4
+        with open(os.path.join(output, batch_analysis.RESULTS_TABLE)) as f:
+            rows = list(csv.DictReader(f))
+        assert [row['file'] for row in rows] == ['a.csv', 'b.csv', 'broken.csv', 'c.csv']
+        assert rows[2]['error']
+        assert float(rows[0]['alpha_rel']) > 0.9
+
+        results = batch_analysis.run_batch(files, output, config('quality', 'bands'), workers=1)
+        assert [r['cached'] for r in results] == [True, True, False, True]
+
+        # Changed settings or a changed source invalidate saved results
+        results = batch_analysis.run_batch(files[:1], output, config('quality'), workers=1)
+        assert results[0]['cached'] is False
+        write_recording(files[1], seconds=6)
+        results = batch_analysis.run_batch(files[:2], output, config('quality'), workers=1)
+        assert [r['cached'] for r in results] == [True, False]
+        with open(batch_analysis.result_path(files[1], output)) as f:
+            assert json.load(f)['details']['quality']['samples'] == int(6 * RATE)
+
+    def test_same_names_in_different_directories(self, tmp_path):
+        """Test that recordings with the same file name keep separate results and outputs"""
+        pytest.importorskip('scipy')
+        files = []
+        for name, seconds in (('a', 5), ('b', 6)):
+            (tmp_path / name).mkdir()
+            files.append(str(tmp_path / name / 'session.csv'))
+            write_recording(files[-1], seconds=seconds)
+        output = str(tmp_path / 'out')
+
+        results = batch_analysis.run_batch(files, output, config('quality', 'filtered', 'epochs'), workers=1)
+        assert batch_analysis.result_path(files[0], output) != batch_analysis.result_path(files[1], output)
+        assert len(set(results[0]['outputs']) | set(results[1]['outputs'])) == 4
+        results = batch_analysis.run_batch(files, output, config('quality', 'filtered', 'epochs'), workers=1)
+        assert [r['cached'] for r in results] == [True, True]
+        assert [r['details']['quality']['samples'] for r in results] == [int(5 * RATE), int(6 * RATE)]
+        assert np.loadtxt(results[1]['details']['filtered']['file'], delimiter=',', skiprows=1).shape[0] == \
+            int(6 * RATE)
+
+    def test_cached_input_gives_same_results(self, tmp_path):
+        """Test that reading through the binary cache does not change the results"""
+        path = str(tmp_path / 'rec.csv')
+        write_recording(path, seconds=10)
+        parsed = batch_analysis.analyze_recording(path, str(tmp_path / 'a'), config('quality', 'bands'))
+        cached = batch_analysis.analyze_recording(path, str(tmp_path / 'b'), config('quality', 'bands'),
+                                                  cache_dir=str(tmp_path / 'cache'))
+        for analysis, key in (('quality', 'rms_uv'), ('quality', 'max_uv'), ('bands', 'alpha_uv2')):
+            np.testing.assert_allclose(cached['details'][analysis][key], parsed['details'][analysis][key])
+        assert cached['details']['quality']['samples'] == parsed['details']['quality']['samples']
@@ -0,0 +1,60 @@
+"""
+Tests for the hot path benchmark suite.
+"""
+import pytest
+import sys
+import os
+import json
+
+# Add the python directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'python'))
+
+# Import the module under test
+import benchmarks
+
+
+class TestBenchmarks:
+    """Test suite for the benchmark runner."""
+
+    def test_every_benchmark_runs(self):
+        """Each registered benchmark completes at a small channel count."""
+        results = benchmarks.run_benchmarks(channels=[8], repeat=1)
+
+        assert {r['name'] for r in results} == set(benchmarks.BENCHMARKS)
+        for result in results:
+            assert result['median_ms'] >= 0
+            assert result['samples'] > 0
+
+    def test_export_files_are_removed(self, tmp_path, monkeypatch):
+        """The CSV export benchmark leaves nothing behind in the temporary directory."""
+        monkeypatch.setattr(benchmarks.tempfile, 'tempdir', str(tmp_path))
+        results = benchmarks.run_benchmarks(channels=[8], repeat=1, only=['export_csv'])
+
+        assert results[0]['name'] == 'bridge.export_csv'
+        assert os.listdir(tmp_path) == []
+        assert benchmarks.scratch_dir is None
+
+    def test_save_results(self, tmp_path):
+        """Results are saved as JSON with environment metadata."""
+        results = benchmarks.run_benchmarks(channels=[8], repeat=1, only=['analyze_signal'])
+        output = tmp_path / 'results.json'
+
+        benchmarks.save_results(results, str(output))
+        saved = json.loads(output.read_text())
+
+        assert saved['results'] == results
+        assert 'numpy' in saved['environment']
+
+    def test_compare_results_flags_regressions(self):
+        """Slowdowns beyond the threshold are reported as regressions."""
+        baseline = [{'name': 'a', 'channels': 8, 'median_ms': 1.0},
+                    {'name': 'b', 'channels': 8, 'median_ms': 1.0}]
+        current = [{'name': 'a', 'channels': 8, 'median_ms': 1.1},
+                   {'name': 'b', 'channels': 8, 'median_ms': 2.0},
+                   {'name': 'c', 'channels': 8, 'median_ms': 5.0}]
+
+        rows, regressions = benchmarks.compare_results(current, baseline, threshold=0.25)
+
+        assert len(rows) == 2
+        assert [r['name'] for r in regressions] == ['b']
+        assert regressions[0]['ratio'] == pytest.approx(2.0)
@@ -0,0 +1,210 @@
+"""
+Tests for the brainwave visualizer processing pipeline.
+"""
+import pytest
+import sys
+import os
+import json
+import time
+import numpy as np
+from collections import deque
+from unittest.mock import Mock
+
+# Add the python directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'python'))
+
+# Import the module under test
+import brainwave_visualizer
+
+
+def make_buffer(now, seconds=2.0, channels=8, rate=250):
+    """Build (timestamp, values) buffer entries ending at `now`."""
+    count = int(seconds * rate)
+    times = now - seconds + np.arange(count) / rate
+    return [(t, list(np.random.normal(0, 10, channels))) for t in times]
+
+
+class TestProcessingWorker:
+    """Test suite for the off-GUI-thread processing worker."""
+
+    def setup_method(self):
+        """Setup for each test method."""
+        brainwave_visualizer.channel_count = 8
+        brainwave_visualizer.railed_percentages = [0] * 16
+        brainwave_visualizer.head_map_data = [0] * 16
+        brainwave_visualizer.fft_data = {}
+        brainwave_visualizer.latest_snapshot = None
+        brainwave_visualizer.drawn_snapshot = None
+        brainwave_visualizer.data_buffer = deque(maxlen=10000)
+
+    def test_compute_snapshot_is_immutable(self):
+        """Snapshot arrays are read-only once computed."""
+        now = time.time()
+        snapshot = brainwave_visualizer.compute_display_snapshot(make_buffer(now), now)
+
+        assert len(snapshot.channels) == 8
+        channel = snapshot.channels[0]
+        assert len(channel.times) == len(channel.values) == 500
+        assert channel.fft_freqs is not None
+        with pytest.raises(ValueError):
+            channel.values[0] = 1.0
+        assert snapshot.processing_ms >= 0
+
+    def test_compute_snapshot_empty_buffer(self):
+        """Channels without data in the window are reported as None."""
+        snapshot = brainwave_visualizer.compute_display_snapshot([], time.time())
+
+        assert snapshot.channels == (None,) * 8
+
+    def test_publish_and_get_latest(self):
+        """The latest published snapshot replaces the previous one."""
+        first = brainwave_visualizer.compute_display_snapshot([], time.time())
+        second = brainwave_visualizer.compute_display_snapshot([], time.time())
+
+        brainwave_visualizer.publish_snapshot(first)
+        brainwave_visualizer.publish_snapshot(second)
+
+        assert brainwave_visualizer.get_latest_snapshot() is second
+
+    def test_update_plot_only_swaps_snapshot(self, monkeypatch):
+        """update_plot draws the published snapshot without processing data."""
+        now = time.time()
+        snapshot = brainwave_visualizer.compute_display_snapshot(make_buffer(now), now)
+        brainwave_visualizer.publish_snapshot(snapshot)
+
+        # Any processing on the GUI thread would call these
+        monkeypatch.setattr(brainwave_visualizer, 'apply_bandpass', Mock(side_effect=AssertionError))
+        monkeypatch.setattr(brainwave_visualizer, 'calculate_fft', Mock(side_effect=AssertionError))
+
+        brainwave_visualizer.lines = [Mock() for _ in range(8)]
+        brainwave_visualizer.rms_texts = [Mock() for _ in range(8)]
+        brainwave_visualizer.signal_indicators = [Mock() for _ in range(8)]
+        brainwave_visualizer.fft_ax = Mock()
+        brainwave_visualizer.fft_lines = [Mock() for _ in range(8)]
+        brainwave_visualizer.head_circles = []
+        brainwave_visualizer.status_time_text = Mock()
+        brainwave_visualizer.status_info_text = Mock()
+        brainwave_visualizer.status_fps_text = Mock()
+
+        artists = brainwave_visualizer.update_plot(0)
+
+        brainwave_visualizer.lines[0].set_data.assert_called_once()
+        assert brainwave_visualizer.lines[0] in artists
+        assert brainwave_visualizer.drawn_snapshot is snapshot
+
+        # A second frame with no new snapshot does not touch the lines again
+        brainwave_visualizer.update_plot(1)
+        brainwave_visualizer.lines[0].set_data.assert_called_once()
+
+
+class TestFrameTimings:
+    """Test suite for per-stage frame timing."""
+
+    def setup_method(self):
+        """Setup for each test method."""
+        brainwave_visualizer.channel_count = 8
+        brainwave_visualizer.railed_percentages = [0] * 16
+        brainwave_visualizer.head_map_data = [0] * 16
+        brainwave_visualizer.fft_data = {}
+        brainwave_visualizer.latest_snapshot = None
+        brainwave_visualizer.drawn_snapshot = None
+        brainwave_visualizer.frame_timer.reset()
+
+    def test_processing_and_artist_stages_recorded(self):
+        """Computing and drawing a snapshot records every stage but the matplotlib draw."""
+        now = time.time()
+        brainwave_visualizer.publish_snapshot(brainwave_visualizer.compute_display_snapshot(make_buffer(now), now))
+        brainwave_visualizer.lines = [Mock() for _ in range(8)]
+        brainwave_visualizer.rms_texts = [Mock() for _ in range(8)]
+        brainwave_visualizer.signal_indicators = [Mock() for _ in range(8)]
+        brainwave_visualizer.fft_ax = Mock()
+        brainwave_visualizer.fft_lines = [Mock() for _ in range(8)]
+        brainwave_visualizer.head_circles = [Mock() for _ in range(8)]
+        brainwave_visualizer.status_time_text = Mock()
+        brainwave_visualizer.status_info_text = Mock()
+        brainwave_visualizer.status_fps_text = Mock()
+
+        brainwave_visualizer.update_plot(0)
+        stats = brainwave_visualizer.frame_timer.summary()
+
+        for stage in ('buffer', 'filter', 'smooth', 'metrics', 'fft', 'artists', 'head_map'):
+            assert stats[stage]['count'] == 1
+        assert 'filter' in brainwave_visualizer.format_frame_stats()
+
+    def test_draw_stage_timed_by_blitting(self):
+        """Frames are blitted through the public canvas API and their draw is timed."""
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        fig = Figure()
+        FigureCanvasAgg(fig)
+        line, = fig.add_subplot().plot([0, 1], [0, 1])
+        animation = brainwave_visualizer.FrameTimedAnimation(fig, lambda frame: [line], interval=1000)
+
+        # The first frame takes the artist out of the background, which a full redraw captures
+        animation.step()
+        assert line.get_animated()
+        fig.canvas.draw()
+        assert animation.background is not None
+        animation.step()
+        animation.step()
+        animation.stop()
+
+        assert animation.frame == 3
+        assert brainwave_visualizer.frame_timer.summary()['draw']['count'] == 2
+
+    def test_save_frame_stats(self, tmp_path):
+        """Recent and whole-session timings are saved as JSON."""
+        brainwave_visualizer.frame_timer.record('draw', 0.004)
+        output = tmp_path / 'frames.json'
+
+        brainwave_visualizer.save_frame_stats(str(output))
+        saved = json.loads(output.read_text())
+
+        assert saved['recent']['draw']['count'] == 1
+        assert saved['session']['draw']['max_ms'] == pytest.approx(4.0)
+
+
+class TestSharedMemoryInput:
+    """Test suite for reading the bridge's shared-memory ring."""
+
+    def setup_method(self):
+        """Setup for each test method."""
+        brainwave_visualizer.data_buffer = deque(maxlen=10000)
+        brainwave_visualizer.sample_count = 0
+        brainwave_visualizer.stream_active = True
+        brainwave_visualizer.running = True
+
+    def teardown_method(self):
+        """Restore the module flags."""
+        brainwave_visualizer.stream_active = False
+        brainwave_visualizer.running = True
+
+    def test_read_data_from_shm(self, monkeypatch):
+        """Samples written to the ring reach the display buffer, also after the bridge recreates it."""
+        import threading
+        import uuid
+        from shm_ring import RingWriter
+        monkeypatch.setattr(brainwave_visualizer, 'SHM_ATTACH_INTERVAL', 0.01)
+        name = f'eeg_test_{uuid.uuid4().hex[:12]}'
+        reader = threading.Thread(target=brainwave_visualizer.read_data_from_shm, args=(name,))
+        reader.start()
+        try:
+            for session in range(2):
+                # The reader starts with the first write after it attached
+                writer = RingWriter(name, 8, 250, capacity=4096)
+                received = brainwave_visualizer.sample_count
+                deadline = time.time() + 2
+                while brainwave_visualizer.sample_count == received and time.time() < deadline:
+                    writer.write(time.time() + np.arange(10) / 250.0, np.ones((8, 10)) * session)
+                    time.sleep(0.02)
+                writer.close()
+        finally:
+            brainwave_visualizer.running = False
+            reader.join(2)
+
+        assert not reader.is_alive()
+        assert brainwave_visualizer.sample_count == len(brainwave_visualizer.data_buffer) > 0
+        assert brainwave_visualizer.sample_count % 10 == 0
+        timestamp, values = brainwave_visualizer.data_buffer[-1]
+        assert values == [1.0] * 8
+        assert brainwave_visualizer.latency_tracker.summary()['board->consumer']['count'] >= 10
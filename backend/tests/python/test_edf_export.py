@@ -0,0 +1,212 @@
+"""
+Tests for the EDF+/BDF+ exporter.
+"""
+import pytest
+import sys
+import os
+import shutil
+import numpy as np
+
+# Add the python directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'python'))
+
+# Import the module under test
+import edf_export
+from recordings import RecordingWriter
+from summaries import summarize_file
+
+RATE = 250.0
+START = 1700000000.0
+# One Cyton count in microvolts
+COUNT_UV = 187500.0 / 8388607
+
+
+def write_recording(path, data, timestamps, block=100):
+    writer = RecordingWriter(path, data.shape[0])
+    for start in range(0, data.shape[1], block):
+        writer.write(timestamps[start:start + block], data[:, start:start + block])
+    writer.close()
+
+
+class TestEDFWriter:
+    """Tests for incremental EDF+/BDF+ writing."""
+
+    def test_bdf_round_trip_is_lossless_for_cyton_counts(self, tmp_path):
+        """Cyton counts written block by block to BDF+ read back exactly."""
+        counts = np.random.default_rng(1).integers(-8388607, 8388607, size=(3, 1100))
+        data = counts * COUNT_UV
+        timestamps = START + np.arange(1100) / RATE
+        path = str(tmp_path / 'rec.bdf')
+
+        writer = edf_export.EDFWriter(path, ['Fp1', 'Fp2', 'Cz'], RATE, 'bdf')
+        for start in range(0, 1100, 37):
+            writer.write(timestamps[start:start + 37], data[:, start:start + 37])
+        writer.close()
+
+        header, signals, annotations = edf_export.read_edf(path)
+        assert header['version'] == '\xffBIOSEMI'
+        assert header['reserved'].startswith('BDF+C')
+        assert header['records'] == 5
+        assert header['labels'] == ['EEG Fp1', 'EEG Fp2', 'EEG Cz', 'BDF Annotations']
+        assert os.path.getsize(path) == 256 * 5 + 5 * (3 * 250 + 80) * 3
+        assert np.array_equal(np.rint(signals[:, :1100] / COUNT_UV), counts)
+        # The last record is padded and the end of the data is annotated
+        assert (4.4, None, 'Recording end') in annotations
+
+    def test_edf_uses_given_ranges(self, tmp_path):
+        """EDF+ scales 16-bit samples to the physical range of each channel."""
+        t = np.arange(500) / RATE
+        data = np.vstack([50 * np.sin(2 * np.pi * 10 * t), 500 * np.cos(2 * np.pi * 3 * t)])
+        path = str(tmp_path / 'rec.edf')
+
+        writer = edf_export.EDFWriter(path, ['a', 'b'], RATE, 'edf', [(-50, 50), (-500, 500)])
+        writer.write(START + t, data)
+        writer.close()
+
+        header, signals, annotations = edf_export.read_edf(path)
+        assert header['version'] == '0'
+        assert header['reserved'].startswith('EDF+C')
+        assert header['physical_min'][:2] == [-50.0, -500.0]
+        assert header['records'] == 2
+        assert np.allclose(signals, data, atol=np.array([[100 / 65534], [1000 / 65534]]))
+        assert annotations == []
+
+    def test_gaps_and_markers_are_annotated(self, tmp_path):
+        """Clock gaps and queued markers become annotations."""
+        timestamps = START + np.concatenate((np.arange(300), np.arange(400, 600))) / RATE
+        path = str(tmp_path / 'rec.bdf')
+        gaps = []
+
+        writer = edf_export.EDFWriter(path, ['a'], RATE, gaps=gaps)
+        writer.write(timestamps[:250], np.zeros((1, 250)))
+        assert writer.gaps == 0
+        # The writer's clock finds the gap with the next block
+        gaps.append((300, 100))
+        writer.write(timestamps[250:], np.zeros((1, 250)))
+        writer.annotate_at(START + 1.5, 'Stimulus', 0.25)
+        writer.close()
+
+        _, _, annotations = edf_export.read_edf(path)
+        assert writer.gaps == 1
+        assert (1.2, 0.4, 'Gap') in annotations
+        assert (1.5, 0.25, 'Stimulus') in annotations
+
+    def test_timestamp_steps_are_not_gaps(self, tmp_path):
+        """Steps between host-stamped batches are not annotated without clock gaps."""
+        timestamps = START + np.repeat(np.arange(10) * 0.48, 60) + np.tile(np.arange(60) * 1e-5, 10)
+        path = str(tmp_path / 'rec.bdf')
+
+        writer = edf_export.EDFWriter(path, ['a'], 125.0)
+        writer.write(timestamps[:250], np.zeros((1, 250)))
+        writer.write(timestamps[250:], np.zeros((1, 350)))
+        writer.close()
+
+        _, _, annotations = edf_export.read_edf(path)
+        assert writer.gaps == 0
+        assert all(text != 'Gap' for _, _, text in annotations)
+
+    def test_rejects_unknown_format(self, tmp_path):
+        """Only edf and bdf are accepted."""
+        with pytest.raises(ValueError):
+            edf_export.EDFWriter(str(tmp_path / 'rec.gdf'), ['a'], RATE, 'gdf')
+
+
+class TestConvertFiles:
+    """Tests for offline conversion of CSV recordings."""
+
+    def test_convert_edf_uses_summary_ranges(self, tmp_path):
+        """EDF+ conversion takes each channel's range from the recording summary."""
+        t = np.arange(1000) / RATE
+        data = np.vstack([20 * np.sin(2 * np.pi * 10 * t), 200 * np.sin(2 * np.pi * 5 * t)])
+        path = str(tmp_path / 'rec.csv')
+        write_recording(path, data, START + t)
+        summarize_file(path)
+
+        result = edf_export.convert_file(path, fmt='edf')
+
+        assert result['status'] == 'success'
+        assert result['output'] == str(tmp_path / 'rec.edf')
+        header, signals, _ = edf_export.read_edf(result['output'])
+        assert header['physical_max'][:2] == pytest.approx(data.max(axis=1), abs=0.001)
+        assert header['physical_min'][:2] == pytest.approx(data.min(axis=1), abs=0.001)
+        assert np.allclose(signals, data, atol=0.01)
+
+    def test_convert_annotates_clock_gaps(self, tmp_path):
+        """Conversion annotates the gaps of the recording's clock, at its fitted rate."""
+        timestamps = START + np.concatenate((np.arange(1000), np.arange(1250, 2000))) / RATE
+        path = str(tmp_path / 'rec.csv')
+        write_recording(path, np.zeros((2, 1750)), timestamps)
+
+        result = edf_export.convert_file(path)
+
+        header, _, annotations = edf_export.read_edf(result['output'])
+        assert header['samples_per_record'][0] == 250
+        assert result['gaps'] == 1
+        assert (4.0, 1.0, 'Gap') in annotations
+
+    def test_convert_host_stamped_recording(self, tmp_path):
+        """The bundled bridge recording converts at its real rate without bogus gaps."""
+        sample = os.path.join(os.path.dirname(__file__), '..', '..', 'python', 'uploads', 'eeg',
+                              'eeg_test_20250415_145522.csv')
+        path = str(tmp_path / 'sample.csv')
+        shutil.copy(sample, path)
+
+        result = edf_export.convert_file(path)
+
+        header, _, _ = edf_export.read_edf(result['output'])
+        assert header['samples_per_record'][0] == pytest.approx(125, rel=0.03)
+        assert result['gaps'] == 0
+
+    def test_convert_reads_markers_file(self, tmp_path):
+        """A <recording>.markers.csv next to the recording is converted to annotations."""
+        t = np.arange(500) / RATE
+        path = str(tmp_path / 'rec.csv')
+        write_recording(path, np.zeros((2, 500)), START + t)
+        with open(path + edf_export.MARKERS_SUFFIX, 'w') as f:
+            f.write('timestamp,duration,text\n')
+            f.write(f'{START + 0.5},,Eyes closed\n')
+            f.write(f'{START + 1.0},0.5,Blink\n')
+
+        result = edf_export.convert_file(path)
+
+        _, _, annotations = edf_export.read_edf(result['output'])
+        assert (0.5, None, 'Eyes closed') in annotations
+        assert (1.0, 0.5, 'Blink') in annotations
+
+    def test_markers_go_into_their_own_records(self, tmp_path):
+        """Markers inside the first chunk are annotated in the data records they fall in."""
+        t = np.arange(1500) / RATE
+        path = str(tmp_path / 'rec.csv')
+        write_recording(path, np.zeros((2, 1500)), START + t)
+        with open(path + edf_export.MARKERS_SUFFIX, 'w') as f:
+            f.write('timestamp,duration,text\n')
+            f.write(f'{START + 4.5},,Late\n')
+            f.write(f'{START + 1.5},,Early\n')
+
+        result = edf_export.convert_file(path)
+
+        header, _, _ = edf_export.read_edf(result['output'])
+        with open(result['output'], 'rb') as f:
+            content = f.read()
+        data_start = 256 * (len(header['labels']) + 1)
+        record_bytes = sum(header['samples_per_record']) * 3
+        assert (content.index(b'Early') - data_start) // record_bytes == 1
+        assert (content.index(b'Late') - data_start) // record_bytes == 4
+
+    def test_convert_files_in_parallel(self, tmp_path):
+        """Several recordings convert in worker processes; failures are reported per file."""
+        t = np.arange(500) / RATE
+        files = []
+        for i in range(3):
+            path = str(tmp_path / f'rec{i}.csv')
+            write_recording(path, np.full((2, 500), float(i)), START + t)
+            files.append(path)
+        files.append(str(tmp_path / 'missing.csv'))
+
+        results = edf_export.convert_files(files, str(tmp_path / 'out'), 'bdf', workers=2)
+
+        assert [result['status'] for result in results] == ['success'] * 3 + ['error']
+        for i, result in enumerate(results[:3]):
+            _, signals, _ = edf_export.read_edf(result['output'])
+            assert signals.shape == (2, 500)
+            assert np.allclose(signals, i, atol=COUNT_UV)
@@ -0,0 +1,124 @@
+"""
+Tests for the timestamp-paced CSV replay engine.
+"""
+import pytest
+import sys
+import os
+import time
+import numpy as np
+
+# Add the python directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'python'))
+
+# Import the module under test
+from eeg_replay import CSVReplayEngine, MAX_SPEED, MIN_SPEED
+from recordings import load_recording
+
+
+def write_recording(path, seconds=2.0, channels=8, rate=250, start=1744743317.0):
+    """Write a recording in the bridge's CSV format and return its data."""
+    count = int(seconds * rate)
+    timestamps = start + np.arange(count) / rate
+    values = np.random.normal(0, 10, (count, channels))
+    header = 'timestamp,' + ','.join(f'channel_{i+1}' for i in range(channels))
+    rows = [header] + [f"{t}," + ','.join(str(v) for v in row) for t, row in zip(timestamps, values)]
+    path.write_text('\n'.join(rows))
+    return timestamps, values
+
+
+class TestCSVReplayEngine:
+    """Test suite for CSVReplayEngine."""
+
+    def test_adapts_to_channel_count(self, tmp_path):
+        """Channel count comes from the file header."""
+        path = tmp_path / 'rec.csv'
+        write_recording(path, seconds=0.5, channels=4)
+
+        engine = CSVReplayEngine(str(path))
+
+        assert engine.channel_count == 4
+        assert engine.row_count == 125
+
+    def test_replays_every_row(self, tmp_path):
+        """All rows, including the last one without a newline, are replayed in order."""
+        path = tmp_path / 'rec.csv'
+        timestamps, values = write_recording(path, seconds=1.0)
+
+        engine = CSVReplayEngine(str(path), speed=MAX_SPEED, block_bytes=4096)
+        batches = list(engine.batches())
+
+        replayed = np.concatenate([b.timestamps for b in batches])
+        np.testing.assert_allclose(replayed, timestamps)
+        np.testing.assert_allclose(np.concatenate([b.values for b in batches]), values)
+
+    def test_paced_by_timestamps(self, tmp_path):
+        """Replay at 4x takes about a quarter of the recorded duration."""
+        path = tmp_path / 'rec.csv'
+        write_recording(path, seconds=2.0)
+
+        engine = CSVReplayEngine(str(path), speed=4.0)
+        started = time.monotonic()
+        count = sum(len(b.timestamps) for b in engine.batches())
+        elapsed = time.monotonic() - started
+
+        assert count == 500
+        assert 0.4 < elapsed < 0.8
+
+    def test_speed_is_clamped(self, tmp_path):
+        """Speed multipliers outside 0.25x-100x are clamped."""
+        path = tmp_path / 'rec.csv'
+        write_recording(path, seconds=0.1)
+
+        engine = CSVReplayEngine(str(path), speed=1000)
+        assert engine.speed == MAX_SPEED
+        engine.set_speed(0.01)
+        assert engine.speed == MIN_SPEED
+
+    def test_seek_by_time(self, tmp_path):
+        """Seeking starts the replay at the requested time using the index."""
+        path = tmp_path / 'rec.csv'
+        timestamps, _ = write_recording(path, seconds=4.0)
+
+        engine = CSVReplayEngine(str(path), speed=MAX_SPEED, index_interval=100)
+        assert list(engine.index_rows) == list(range(0, 1000, 100))
+
+        engine.seek(3.0)
+        first = next(engine.batches())
+
+        assert first.timestamps[0] == pytest.approx(timestamps[750])
+
+    def test_loop(self, tmp_path):
+        """Looping restarts from the beginning at EOF."""
+        path = tmp_path / 'rec.csv'
+        write_recording(path, seconds=0.2)
+
+        engine = CSVReplayEngine(str(path), speed=MAX_SPEED, loop=True)
+        count = 0
+        for batch in engine.batches():
+            count += len(batch.timestamps)
+            if count >= 150:
+                engine.stop()
+
+        assert count >= 150
+
+    def test_replay_from_cache(self, tmp_path):
+        """A cached recording replays the same rows, seeks exactly and then follows appended rows."""
+        path = tmp_path / 'rec.csv'
+        timestamps, values = write_recording(path, seconds=2.0)
+        cache = load_recording(str(path), str(tmp_path / 'cache'))
+
+        engine = CSVReplayEngine(str(path), speed=MAX_SPEED, block_bytes=4096, cache=cache)
+        assert engine.row_count == 500
+        batches = list(engine.batches())
+        np.testing.assert_allclose(np.concatenate([b.timestamps for b in batches]), timestamps)
+        np.testing.assert_allclose(np.concatenate([b.values for b in batches]), values)
+
+        engine.seek(1.5)
+        assert next(engine.batches()).timestamps[0] == pytest.approx(timestamps[375])
+
+        # Rows written after the cache was built are parsed from the CSV
+        with open(path, 'a') as f:
+            f.write('\n' + ','.join(['1744743400.0'] + ['1.0'] * 8) + '\n')
+        engine.seek(1.9)
+        replayed = np.concatenate([b.timestamps for b in engine.batches()])
+        assert replayed[-1] == pytest.approx(1744743400.0)
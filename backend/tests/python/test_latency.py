@@ -0,0 +1,103 @@
+"""
+Tests for per-hop latency histograms.
+"""
+import pytest
+import sys
+import os
+import numpy as np
+
+# Add the python directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'python'))
+
+# Import the module under test
+from latency import LatencyHistogram, LatencyTracker, RollingLatencyTracker, probe_packet
+
+
+class TestLatencyHistogram:
+    """Test suite for LatencyHistogram."""
+
+    def test_percentiles(self):
+        """Percentiles are accurate to the bucket width."""
+        histogram = LatencyHistogram()
+        histogram.record_many(np.arange(1, 1001) / 10.0)
+
+        summary = histogram.summary()
+
+        assert summary['count'] == 1000
+        assert 50 <= summary['p50_ms'] < 50 * 1.13
+        assert 95 <= summary['p95_ms'] < 95 * 1.13
+        assert summary['p99_ms'] <= summary['max_ms'] == 100.0
+
+    def test_negative_latency_counts_as_zero(self):
+        """Clock skew producing negative latencies does not break the histogram."""
+        histogram = LatencyHistogram()
+        histogram.record(-5.0)
+
+        assert histogram.summary()['max_ms'] == 0.0
+
+    def test_empty(self):
+        """An empty histogram only reports its count."""
+        assert LatencyHistogram().summary() == {'count': 0}
+        assert LatencyHistogram().percentile(50) is None
+
+
+class TestLatencyTracker:
+    """Test suite for LatencyTracker."""
+
+    def test_record_seconds_per_hop(self):
+        """Latencies are recorded in seconds and reported in milliseconds."""
+        tracker = LatencyTracker()
+        tracker.record('read->emit', 0.002)
+        tracker.record('board->read', np.array([0.010, 0.020]))
+
+        summary = tracker.summary()
+
+        assert summary['read->emit']['count'] == 1
+        assert summary['board->read']['count'] == 2
+        assert summary['board->read']['max_ms'] == pytest.approx(20.0)
+        assert 'board->read p50' in tracker.format_summary()
+
+    def test_summary_due_once_per_interval(self):
+        """Periodic summaries are due at most once per interval."""
+        tracker = LatencyTracker(summary_interval=0)
+
+        assert tracker.summary_due()
+        tracker.summary_interval = 3600
+        assert not tracker.summary_due()
+
+    def test_probe_packet(self):
+        """Consumer probes record hops from the packet's stamps."""
+        tracker = LatencyTracker()
+        probe_packet(tracker, {'emit_time': 100.0, 'board_timestamp': 99.99}, received=100.005)
+
+        summary = tracker.summary()
+
+        assert summary['emit->consumer']['max_ms'] == pytest.approx(5.0)
+        assert summary['board->consumer']['max_ms'] == pytest.approx(15.0)
+
+
+class TestRollingLatencyTracker:
+    """Test suite for RollingLatencyTracker."""
+
+    def test_old_windows_roll_off(self):
+        """Summaries cover the last two windows; the session view keeps everything."""
+        tracker = RollingLatencyTracker(window=3600)
+        tracker.record('draw', 0.001)
+        tracker.window = 0
+        tracker.record('draw', 0.002)   # Rotates: first record is in the previous window
+        tracker.record('draw', 0.003)   # Rotates again: first record drops out
+
+        assert tracker.summary()['draw']['count'] == 2
+        assert tracker.session_summary()['draw']['count'] == 3
+
+    def test_combine_histograms(self):
+        """Combined histograms add counts and keep the largest value."""
+        first, second = LatencyHistogram(), LatencyHistogram()
+        first.record(1.0)
+        second.record_many([2.0, 5.0])
+
+        combined = LatencyHistogram.combine(first, None, second)
+
+        assert combined.count == 3
+        assert combined.max_ms == 5.0
+        assert first.count == 1
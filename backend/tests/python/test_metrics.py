@@ -0,0 +1,79 @@
+"""
+Tests for the bridge metrics registry.
+"""
+import pytest
+import sys
+import os
+import threading
+import urllib.request
+
+# Add the python directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'python'))
+
+# Import the module under test
+from metrics import MetricsRegistry, serve_metrics
+
+
+class TestMetricsRegistry:
+    """Test suite for MetricsRegistry."""
+
+    def setup_method(self):
+        """Setup for each test method."""
+        self.registry = MetricsRegistry(prefix='test_')
+        self.samples = self.registry.counter('samples_total', 'Samples seen')
+        self.depth = self.registry.gauge('queue_depth', 'Queue depth')
+        self.uptime = self.registry.gauge('uptime_seconds', 'Uptime', lambda: 42)
+        self.poll = self.registry.timer('poll_seconds', 'Poll time')
+
+    def test_snapshot(self):
+        """Snapshots report counters, gauges and timer summaries by short name."""
+        self.samples.inc(10)
+        self.samples.inc()
+        self.depth.set(3)
+        self.poll.observe(0.002)
+
+        snapshot = self.registry.snapshot()
+
+        assert snapshot['samples_total'] == 11
+        assert snapshot['queue_depth'] == 3
+        assert snapshot['uptime_seconds'] == 42
+        assert snapshot['poll_seconds']['count'] == 1
+        assert snapshot['poll_seconds']['max_ms'] == pytest.approx(2.0)
+
+    def test_counter_from_several_threads(self):
+        """Increments from several threads are all counted."""
+        threads = [threading.Thread(target=lambda: [self.samples.inc(3) for _ in range(10000)]) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert self.registry.snapshot()['samples_total'] == 8 * 10000 * 3
+
+    def test_prometheus_text(self):
+        """Metrics render in the Prometheus text exposition format."""
+        self.samples.inc(5)
+        self.poll.observe(0.5)
+
+        text = self.registry.prometheus_text()
+
+        assert '# TYPE test_samples_total counter' in text
+        assert 'test_samples_total 5' in text
+        assert '# TYPE test_uptime_seconds gauge' in text
+        assert 'test_poll_seconds{quantile="0.5"} 0.5' in text
+        assert 'test_poll_seconds_count 1' in text
+
+    def test_serve_metrics(self):
+        """The metrics endpoint serves the Prometheus text."""
+        self.samples.inc(7)
+        server = serve_metrics(self.registry, 0)
+        try:
+            port = server.server_address[1]
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics', timeout=5) as response:
+                body = response.read().decode('utf-8')
+                content_type = response.headers['Content-Type']
+        finally:
+            server.shutdown()
+
+        assert 'test_samples_total 7' in body
+        assert content_type.startswith('text/plain')
@@ -5,6 +5,9 @@ import pytest
 import sys
 import os
 import json
+import subprocess
+import time
+import uuid
 import numpy as np
 from unittest.mock import Mock, patch, MagicMock
 from datetime import datetime
@@ -19,6 +22,14 @@ sys.modules['brainflow.board_shim'] = Mock()
 # Import the module under test
 import openbci_bridge
 
+
+@pytest.fixture(autouse=True)
+def board_cache_file(tmp_path, monkeypatch):
+    """Keep each test's board type cache in its own directory."""
+    path = tmp_path / 'board_cache.json'
+    monkeypatch.setattr(openbci_bridge, 'BOARD_CACHE_FILE', str(path))
+    return path
+
 class TestOpenBCIBridge:
     """Test suite for OpenBCI bridge functionality."""
     
@@ -31,13 +42,7 @@ class TestOpenBCIBridge:
         openbci_bridge.visualizer_process = None
         openbci_bridge.stream_running = False
         openbci_bridge.data_thread = None
-        
-        # Clear the data queue
-        while not openbci_bridge.data_queue.empty():
-            try:
-                openbci_bridge.data_queue.get_nowait()
-            except:
-                break
+        openbci_bridge.acquisition_bus = None
     
     def test_brainflow_not_available(self):
         """Test behavior when BrainFlow is not available."""
@@ -480,26 +485,745 @@ class TestOpenBCIBridgeIntegration:
     
     @pytest.mark.slow
     def test_data_queue_performance(self):
-        """Test data queue performance under load."""
+        """Test acquisition bus performance under load."""
         import time
+        from acquisition_bus import AcquisitionBus, make_chunk
         
-        # Fill queue with test data
-        test_data = np.random.rand(8, 1000)  # 8 channels, 1000 samples
+        bus = AcquisitionBus()
+        subscriptions = [bus.subscribe(name, maxsize=128) for name in ('web', 'recorder')]
+        openbci_bridge.acquisition_bus = bus
         
         start_time = time.time()
-        for _ in range(100):
-            openbci_bridge.data_queue.put(test_data)
+        for i in range(100):
+            # 8 channels, 1000 samples
+            bus.publish(make_chunk(i, i * 1000, np.random.rand(8, 1000), np.arange(1000.0)))
         
         # Measure queue operations
         queue_time = time.time() - start_time
         assert queue_time < 1.0  # Should complete within 1 second
         
-        # Verify queue size
-        assert openbci_bridge.data_queue.qsize() == 100
+        # Every subscriber holds every chunk, and the gauge reports them all
+        assert [s.depth() for s in subscriptions] == [100, 100]
+        assert openbci_bridge.metrics.snapshot()['data_queue_depth'] == 200
+        
+        bus.close()
+        openbci_bridge.acquisition_bus = None
+
+
+class TestGeneratorBoardSource:
+    """Tests for running the bridge against the synthetic EEG generator."""
+    
+    def setup_method(self):
+        """Setup for each test method."""
+        openbci_bridge.current_board = None
+        openbci_bridge.current_board_id = None
+        openbci_bridge.is_streaming = False
+        openbci_bridge.stream_running = False
+        openbci_bridge.data_thread = None
+        openbci_bridge.recording_writer = None
+        openbci_bridge.recording_export = None
+    
+    def teardown_method(self):
+        """Stop any streaming thread started by the test."""
+        openbci_bridge.stop_visualizer()
+        openbci_bridge.board_source = 'cyton'
+        openbci_bridge.export_format = None
+    
+    def test_use_generator(self):
+        """The generator becomes the current board."""
+        result = openbci_bridge.use_generator(channel_count=32, sampling_rate=1000)
+        
+        assert result['status'] == 'success'
+        assert result['board_type'] == 'generator'
+        assert openbci_bridge.current_board_id == openbci_bridge.GENERATOR_BOARD_ID
+        assert openbci_bridge.get_eeg_channels(openbci_bridge.current_board_id) == list(range(1, 33))
+    
+    def test_record_with_generator(self, tmp_path, monkeypatch):
+        """A start/stop recording cycle saves generated data."""
+        monkeypatch.chdir(tmp_path)
+        openbci_bridge.use_generator(channel_count=8, sampling_rate=1000)
+        
+        start = openbci_bridge.start_recording('generator', 'load test')
+        assert start['status'] == 'success'
+        time.sleep(0.1)
+        
+        result = openbci_bridge.stop_recording('generator', 'exp1', output_file='gen.csv')
+        
+        assert result['status'] == 'success'
+        assert result['channels'] == 8
+        assert result['sampling_rate'] == 1000
+        assert result['samples'] > 0
+        assert (tmp_path / 'uploads' / 'eeg' / 'gen.csv').exists()
+    
+    @pytest.mark.parametrize('fault', ['failed', 'stalled'])
+    def test_stream_resumes_after_board_fault(self, tmp_path, monkeypatch, capsys, fault):
+        """A board that fails or stalls is reopened and the stream goes on in the same recording."""
+        monkeypatch.chdir(tmp_path)
+        if fault == 'stalled':
+            monkeypatch.setattr(openbci_bridge, 'STALL_TIMEOUT', 0.2)
+        openbci_bridge.use_generator(channel_count=4, sampling_rate=500)
+        reconnects = openbci_bridge.reconnects.value
+        openbci_bridge.start_recording('generator', 'reconnect')
+        time.sleep(0.3)
+        
+        # The board is unplugged: reads fail, or return nothing
+        board = openbci_bridge.current_board
+        if fault == 'failed':
+            board.get_board_data = Mock(side_effect=Exception("Board unplugged"))
+        else:
+            board.get_board_data = Mock(return_value=np.empty((board.num_rows, 0)))
+        time.sleep(0.8)
+        
+        assert openbci_bridge.current_board is not board
+        result = openbci_bridge.stop_recording('generator', 'exp1', output_file='gen.csv')
+        
+        assert result['status'] == 'success'
+        assert openbci_bridge.reconnects.value == reconnects + 1
+        packets = [json.loads(line[len('EEG_STREAM:'):]) for line in capsys.readouterr().out.splitlines()
+                   if line.startswith('EEG_STREAM:')]
+        markers = [packet for packet in packets if packet['type'] == 'discontinuity']
+        samples = [packet['sample_number'] for packet in packets if packet['type'] == 'eeg_data']
+        assert len(markers) == 1
+        assert markers[0]['reason'] == fault
+        assert markers[0]['gap_seconds'] >= 0.2
+        # Sample numbers run on across the gap; the marker sits where it happened
+        assert samples == list(range(len(samples)))
+        assert 0 < markers[0]['sample_number'] < len(samples)
+        
+        # One recording, with the gap as a marker and as dropped samples in its clock
+        eeg_dir = tmp_path / 'uploads' / 'eeg'
+        assert sorted(os.listdir(eeg_dir)) == ['gen.csv', 'gen.csv.clock.json', 'gen.csv.idx',
+                                               'gen.csv.markers.csv', 'gen.csv.summary.json']
+        with open(eeg_dir / 'gen.csv.markers.csv') as f:
+            header, marker = f.read().splitlines()
+        timestamp, duration, text = marker.split(',')
+        assert text == f'Board reconnected after it {fault}'
+        assert float(duration) == pytest.approx(markers[0]['gap_seconds'], abs=0.01)
+        with open(eeg_dir / 'gen.csv.clock.json') as f:
+            clock = json.load(f)
+        assert clock['dropped'] == pytest.approx(float(duration) * 500, abs=2)
+    
+    def test_stop_while_reconnecting_saves_recording(self, tmp_path, monkeypatch):
+        """Stopping while the board cannot be reopened still saves what was streamed."""
+        monkeypatch.chdir(tmp_path)
+        openbci_bridge.use_generator(channel_count=4, sampling_rate=500)
+        openbci_bridge.start_recording('generator', 'reconnect')
+        time.sleep(0.3)
+        
+        def create_board(board_type, serial_port):
+            raise Exception("Board unplugged")
+        
+        monkeypatch.setattr(openbci_bridge, 'create_board', create_board)
+        openbci_bridge.current_board.get_board_data = Mock(side_effect=Exception("Board unplugged"))
+        time.sleep(0.5)
+        assert openbci_bridge.get_status()['reconnecting']
+        
+        result = openbci_bridge.stop_recording('generator', 'exp1', output_file='gen.csv')
+        
+        assert result['status'] == 'success'
+        assert result['samples'] > 0
+        with open(tmp_path / 'uploads' / 'eeg' / 'gen.csv.markers.csv') as f:
+            assert f.read().splitlines()[1].endswith(',,Board reconnected after it failed')
+    
+    def test_stop_latency(self, tmp_path, monkeypatch):
+        """Stopping a streaming session takes tens of milliseconds, not the record duration."""
+        monkeypatch.chdir(tmp_path)
+        openbci_bridge.use_generator(channel_count=8, sampling_rate=250)
+        latencies = []
+        for i in range(20):
+            openbci_bridge.start_recording('generator', 'latency')
+            time.sleep(0.05)
+            started = time.monotonic()
+            result = openbci_bridge.stop_recording('generator', 'exp1', output_file=f'gen{i}.csv')
+            latencies.append(time.monotonic() - started)
+            assert result['status'] == 'success'
+            assert result['samples'] > 0
+        
+        assert np.percentile(latencies, 99) < 0.1
+        assert openbci_bridge.metrics.snapshot()['stop_seconds']['count'] >= 20
+    
+    def test_async_finalize_announces_export(self, tmp_path, monkeypatch, capsys):
+        """With finalize_async the export finishes after the stop returns and is announced."""
+        monkeypatch.chdir(tmp_path)
+        openbci_bridge.export_format = 'bdf'
+        openbci_bridge.use_generator(channel_count=4, sampling_rate=250)
+        openbci_bridge.start_recording('generator', 'async')
+        time.sleep(0.2)
+        
+        result = openbci_bridge.stop_recording('generator', 'exp1', output_file='gen.csv', finalize_async=True)
+        openbci_bridge.wait_for_finalizers()
+        
+        assert result['status'] == 'success'
+        assert result['export_pending'] is True
+        assert result['export_file'] is None
+        packets = [json.loads(line[len('EEG_STREAM:'):]) for line in capsys.readouterr().out.splitlines()
+                   if line.startswith('EEG_STREAM:')]
+        finalized = [packet for packet in packets if packet['type'] == 'recording_finalized']
+        assert len(finalized) == 1
+        assert finalized[0]['status'] == 'success'
+        assert finalized[0]['file_path'] == result['file_path']
+        assert finalized[0]['export_file'] == os.path.join('uploads', 'eeg', 'gen.bdf')
+        assert os.path.exists(tmp_path / 'uploads' / 'eeg' / 'gen.bdf')
+    
+    def test_stop_request_to_stream_process(self, tmp_path, monkeypatch):
+        """stop_recording in another process asks a running stream session to save, without recording itself."""
+        bridge = subprocess.Popen(
+            [sys.executable, os.path.join(os.path.dirname(__file__), '..', '..', 'python', 'openbci_bridge.py'),
+             '--action', 'stream', '--serial_port', 'none', '--board', 'generator', '--generator_channels', '4',
+             '--duration', '0'],
+            cwd=str(tmp_path), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        try:
+            monkeypatch.chdir(tmp_path)
+            openbci_bridge.board_source = 'generator'
+            deadline = time.monotonic() + 20
+            while openbci_bridge.read_session() is None:
+                assert time.monotonic() < deadline and bridge.poll() is None
+                time.sleep(0.05)
+            time.sleep(0.3)
+            
+            started = time.monotonic()
+            result = openbci_bridge.stop_recording('none', 'exp1', output_file='session.csv')
+            elapsed = time.monotonic() - started
+            
+            assert result['status'] == 'success'
+            assert result['file_path'] == os.path.join('uploads', 'eeg', 'session.csv')
+            assert result['samples'] > 0
+            assert elapsed < 1.0
+            output, _ = bridge.communicate(timeout=10)
+        finally:
+            if bridge.poll() is None:
+                bridge.kill()
+                bridge.wait()
+        
+        assert bridge.returncode == 0
+        assert json.loads(output.strip().splitlines()[-1])['filename'] == 'session.csv'
+        assert not os.path.exists(tmp_path / openbci_bridge.SESSION_FILE)
+    
+    def test_slow_stdout_reader_does_not_affect_recording(self, tmp_path, monkeypatch):
+        """A stream process whose stdout nobody reads drops stream packets, never recorded samples."""
+        rate = 4000
+        stderr = open(tmp_path / 'bridge.err', 'w')
+        bridge = subprocess.Popen(
+            [sys.executable, os.path.join(os.path.dirname(__file__), '..', '..', 'python', 'openbci_bridge.py'),
+             '--action', 'stream', '--serial_port', 'none', '--board', 'generator', '--generator_channels', '4',
+             '--generator_rate', str(rate), '--duration', '0'],
+            cwd=str(tmp_path), stdout=subprocess.PIPE, stderr=stderr, text=True)
+        try:
+            monkeypatch.chdir(tmp_path)
+            openbci_bridge.board_source = 'generator'
+            deadline = time.monotonic() + 20
+            while openbci_bridge.read_session() is None:
+                assert time.monotonic() < deadline and bridge.poll() is None
+                time.sleep(0.05)
+            # Nothing reads the pipe: it fills within a fraction of a second, then the queue overflows
+            time.sleep(2)
+            
+            result = openbci_bridge.stop_recording('none', 'exp1', output_file='stalled.csv')
+            output, _ = bridge.communicate(timeout=10)
+        finally:
+            if bridge.poll() is None:
+                bridge.kill()
+                bridge.wait()
+            stderr.close()
+        
+        assert result['status'] == 'success'
+        # The stop did not wait for the stalled stream: its drain was cut off and the queue discarded
+        assert 'Node is not reading the stream' in (tmp_path / 'bridge.err').read_text()
+        assert result['stdout_stream']['queued_chunks'] == 0
+        assert result['stdout_stream']['dropped_samples'] > 0
+        
+        # The recording has every sample of the session, without gaps
+        timestamps = np.loadtxt(tmp_path / 'uploads' / 'eeg' / 'stalled.csv', delimiter=',', skiprows=1,
+                                usecols=0)
+        assert len(timestamps) == result['samples'] > 2 * rate
+        assert np.diff(timestamps).max() < 1.5 / rate
+        
+        # The stream only got what fit in the pipe, in order and with the result line last
+        numbers = [json.loads(line[len('EEG_STREAM:'):])['sample_number']
+                   for line in output.splitlines() if line.startswith('EEG_STREAM:')]
+        assert numbers == sorted(numbers)
+        assert len(numbers) < result['samples'] / 2
+        assert json.loads(output.strip().splitlines()[-1])['filename'] == 'stalled.csv'
+    
+    def test_recording_updates_metrics(self, tmp_path, monkeypatch):
+        """Acquired, emitted and written samples and file bytes are counted."""
+        monkeypatch.chdir(tmp_path)
+        before = openbci_bridge.metrics.snapshot()
+        openbci_bridge.use_generator(channel_count=8, sampling_rate=1000)
+        openbci_bridge.start_recording('generator', 'metrics')
+        time.sleep(0.2)
+        
+        result = openbci_bridge.stop_recording('generator', 'exp1', output_file='gen.csv')
+        after = openbci_bridge.get_status()['metrics']
+        
+        assert after['samples_emitted_total'] > before['samples_emitted_total']
+        assert after['samples_acquired_total'] - before['samples_acquired_total'] >= result['samples']
+        assert after['samples_written_total'] - before['samples_written_total'] == result['samples']
+        assert after['file_bytes_written_total'] - before['file_bytes_written_total'] == \
+            (tmp_path / 'uploads' / 'eeg' / 'gen.csv').stat().st_size
+        assert after['poll_seconds']['count'] > before['poll_seconds']['count']
+    
+    def test_streamed_samples_are_saved(self, tmp_path, monkeypatch):
+        """Samples taken by the stream thread are written to the recording, with its index."""
+        monkeypatch.chdir(tmp_path)
+        openbci_bridge.use_generator(channel_count=4, sampling_rate=1000)
+        emitted = openbci_bridge.samples_emitted.value
+        openbci_bridge.start_recording('generator', 'incremental')
+        time.sleep(0.5)
+        
+        result = openbci_bridge.stop_recording('generator', 'exp1', output_file='gen.csv')
+        
+        assert result['status'] == 'success'
+        assert sorted(os.listdir(tmp_path / 'uploads' / 'eeg')) == ['gen.csv', 'gen.csv.clock.json', 'gen.csv.idx',
+                                                                       'gen.csv.summary.json']
+        rows = np.loadtxt(tmp_path / 'uploads' / 'eeg' / 'gen.csv', delimiter=',', skiprows=1)
+        assert len(rows) == result['samples']
+        # Roughly 0.5 s at 1 kHz, far more than the board buffer holds between polls
+        assert result['samples'] >= 400
+        assert np.all(np.diff(rows[:, 0]) > 0)
+        assert openbci_bridge.samples_emitted.value > emitted
+        assert openbci_bridge.recording_writer is None
+        
+        # The summary accumulated while streaming covers the whole file
+        with open(result['summary_file']) as f:
+            summary = json.load(f)
+        assert summary == result['summary']
+        assert summary['samples'] == len(rows)
+        assert summary['channels'] == 4
+        assert summary['channel_stats'][0]['rms_uv'] == pytest.approx(np.sqrt(np.mean(rows[:, 1] ** 2)), rel=1e-3)
+    
+    def test_first_sample_latency_is_measured(self, tmp_path, monkeypatch):
+        """The time from connect to the first streamed sample goes to the metrics."""
+        monkeypatch.chdir(tmp_path)
+        before = openbci_bridge.metrics.snapshot()['first_sample_seconds']['count']
+        openbci_bridge.board_source = 'generator'
+        openbci_bridge.start_recording('generator', 'first sample')
+        time.sleep(0.2)
+        openbci_bridge.stop_visualizer()
+        
+        first_sample = openbci_bridge.metrics.snapshot()['first_sample_seconds']
+        assert first_sample['count'] == before + 1
+        assert first_sample['max_ms'] < 200
+    
+    def test_live_bdf_export(self, tmp_path, monkeypatch):
+        """With an export format, a BDF+ copy is written alongside the CSV while streaming."""
+        from edf_export import read_edf
+        monkeypatch.chdir(tmp_path)
+        openbci_bridge.export_format = 'bdf'
+        openbci_bridge.use_generator(channel_count=4, sampling_rate=250)
+        openbci_bridge.start_recording('generator', 'bdf')
+        time.sleep(0.3)
+        
+        result = openbci_bridge.stop_recording('generator', 'exp1', output_file='gen.csv')
+        
+        assert result['status'] == 'success'
+        assert result['export_file'] == os.path.join('uploads', 'eeg', 'gen.bdf')
+        assert openbci_bridge.recording_export is None
+        header, signals, _ = read_edf(result['export_file'])
+        rows = np.loadtxt(tmp_path / 'uploads' / 'eeg' / 'gen.csv', delimiter=',', skiprows=1)
+        assert header['labels'][:4] == ['EEG channel_1', 'EEG channel_2', 'EEG channel_3', 'EEG channel_4']
+        # Padded to whole records; the CSV has six decimals, BDF+ steps of 0.022 uV
+        assert signals.shape[1] >= len(rows)
+        assert np.allclose(signals[:, :len(rows)], rows[:, 1:].T, atol=0.012)
+    
+    def test_open_board_keeps_stdout_clean(self, capsys):
+        """Opening a board, as reconnects do from the stream thread, logs to stderr only."""
+        openbci_bridge.use_generator(channel_count=4, sampling_rate=250)
+        capsys.readouterr()
+        
+        board, _, _ = openbci_bridge.open_board('', start=True)
+        board.stop_stream()
+        board.release_session()
+        
+        captured = capsys.readouterr()
+        assert captured.out == ''
+        assert 'board ready' in captured.err
+    
+    def test_recorder_logs_dropped_chunks(self, tmp_path, monkeypatch):
+        """Chunks dropped from a full recorder queue are counted and recorded as a gap in the clock."""
+        from acquisition_bus import Subscription, make_chunk
+        monkeypatch.chdir(tmp_path)
+        subscription = Subscription('recorder', maxsize=2, policy='drop_newest')
+        timestamps = 1000.0 + np.arange(500) / 250.0
+        for first in (0, 100, 200, 300):
+            subscription.offer(make_chunk(first // 100, first, np.zeros((2, 100)), timestamps[first:first + 100],
+                                          np.arange(first, first + 100) % 256, sampling_rate=250))
+        # The chunks of samples 200-399 did not fit; the next one takes the slot freed here
+        subscription.get()
+        subscription.offer(make_chunk(4, 400, np.zeros((2, 100)), timestamps[400:], np.arange(400, 500) % 256,
+                                      sampling_rate=250))
+        subscription.close()
+        dropped = openbci_bridge.recorder_dropped_samples.value
+        
+        openbci_bridge.record_board_data(subscription)
+        
+        writer = openbci_bridge.recording_writer
+        writer.close()
+        assert openbci_bridge.recorder_dropped_samples.value - dropped == 200
+        assert writer.clock.gaps == [(100, 200)]
+        with open(writer.file_path + '.markers.csv') as f:
+            assert '200 samples dropped' in f.read()
+    
+    def test_stop_waits_for_slow_recorder(self, tmp_path, monkeypatch, capsys):
+        """A recorder still writing after the join timeout is waited for, so the recording is complete."""
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(openbci_bridge, 'CONSUMER_JOIN_TIMEOUT', 0.01)
+        write_samples = openbci_bridge.write_recording_samples
+        
+        def slow_write(*args):
+            time.sleep(0.05)
+            write_samples(*args)
+        
+        monkeypatch.setattr(openbci_bridge, 'write_recording_samples', slow_write)
+        openbci_bridge.use_generator(channel_count=4, sampling_rate=1000)
+        openbci_bridge.start_recording('generator', 'slow disk')
+        time.sleep(0.3)
+        recorder = openbci_bridge.recorder_thread
+        
+        openbci_bridge.stop_visualizer()
+        
+        assert not recorder.is_alive()
+        assert 'still writing queued chunks' in capsys.readouterr().err
+        subscription = [s for s in openbci_bridge.acquisition_bus.subscriptions if s.name == 'recorder'][0]
+        assert subscription.depth() == 0
+        assert openbci_bridge.recording_writer.clock.rows == subscription.delivered_samples
+        openbci_bridge.recording_writer.close()
+    
+    def test_shared_memory_ring(self, tmp_path, monkeypatch):
+        """With a shared memory name, a local reader sees the recorded samples in the ring until stop."""
+        from shm_ring import RingReader
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(openbci_bridge, 'shm_name', f'eeg_test_{uuid.uuid4().hex[:12]}')
+        openbci_bridge.use_generator(channel_count=4, sampling_rate=1000)
+        openbci_bridge.start_recording('generator', 'shm')
+        reader = RingReader(openbci_bridge.shm_name)
+        try:
+            assert (reader.channel_count, reader.sampling_rate) == (4, 1000)
+            assert reader.layout['board_type'] == 'generator'
+            time.sleep(0.3)
+            segments, start, stop = reader.read(0)
+            ring_timestamps = np.concatenate([timestamps for timestamps, _ in segments])
+            assert start == 0 and stop > 0
+            assert openbci_bridge.get_status()['shm']['write_index'] >= stop
+            del segments
+            
+            result = openbci_bridge.stop_recording('generator', 'exp1', output_file='gen.csv')
+            assert reader.closed
+        finally:
+            reader.close()
+        
+        assert result['status'] == 'success'
+        assert openbci_bridge.shm_writer is None
+        rows = np.loadtxt(tmp_path / 'uploads' / 'eeg' / 'gen.csv', delimiter=',', skiprows=1)
+        # The ring held the same samples the recording saved
+        np.testing.assert_allclose(ring_timestamps, rows[:len(ring_timestamps), 0], atol=1e-6)
+
+
+class TestBoardSources:
+    """Tests for pluggable board selection."""
+    
+    def setup_method(self):
+        """Setup for each test method."""
+        openbci_bridge.current_board = None
+        openbci_bridge.current_board_id = None
+        openbci_bridge.is_streaming = False
+        openbci_bridge.stream_running = False
+        openbci_bridge.data_thread = None
+    
+    def teardown_method(self):
+        """Restore the default board source."""
+        openbci_bridge.stop_visualizer()
+        openbci_bridge.board_source = 'cyton'
+        openbci_bridge.playback_file = None
+    
+    def test_falls_back_through_source_board_types(self, monkeypatch):
+        """The cyton source tries Cyton+Daisy first, then Cyton."""
+        tried = []
+        
+        def create_board(board_type, serial_port):
+            tried.append(board_type)
+            board = Mock()
+            if board_type == 'cyton_daisy':
+                board.prepare_session.side_effect = Exception("No daisy")
+            return board, board_type
+        
+        monkeypatch.setattr(openbci_bridge, 'create_board', create_board)
+        openbci_bridge.board_source = 'cyton'
+        
+        board, board_id, board_type = openbci_bridge.open_board('/dev/ttyUSB0', start=True)
+        
+        assert tried == ['cyton_daisy', 'cyton']
+        assert board_type == 'cyton'
+        board.start_stream.assert_called_once()
+    
+    def fake_cyton_rig(self, monkeypatch, installed, tried, failure_seconds=0.0):
+        """Stand-in for a rig whose prepare_session only works for the `installed` board type."""
+        board_ids = {'cyton': 0, 'cyton_daisy': 2}
+        
+        def create_board(board_type, serial_port):
+            tried.append(board_type)
+            board = Mock()
+            if board_type != installed:
+                def fail():
+                    # A wrong board type fails only after the board read times out
+                    time.sleep(failure_seconds)
+                    raise Exception(f"No {board_type} board")
+                board.prepare_session.side_effect = fail
+            return board, board_ids[board_type]
+        
+        board_shim = Mock()
+        board_shim.get_eeg_channels.side_effect = lambda board_id: list(range(1, 9 if board_id == 0 else 17))
+        board_shim.get_sampling_rate.side_effect = lambda board_id: 250 if board_id == 0 else 125
+        monkeypatch.setattr(openbci_bridge, 'create_board', create_board)
+        monkeypatch.setattr(openbci_bridge, 'BoardShim', board_shim)
+        openbci_bridge.board_source = 'cyton'
+    
+    def test_board_type_cached_per_port(self, monkeypatch, board_cache_file):
+        """A Cyton-only rig pays for the failed Cyton+Daisy attempt once, not on every connection."""
+        tried = []
+        self.fake_cyton_rig(monkeypatch, 'cyton', tried, failure_seconds=0.2)
+        
+        started = time.monotonic()
+        assert openbci_bridge.open_board('/dev/ttyUSB0')[2] == 'cyton'
+        first = time.monotonic() - started
+        assert tried == ['cyton_daisy', 'cyton']
+        
+        cache = json.loads(board_cache_file.read_text())
+        assert cache['/dev/ttyUSB0']['board_type'] == 'cyton'
+        assert cache['/dev/ttyUSB0']['eeg_channels'] == list(range(1, 9))
+        assert cache['/dev/ttyUSB0']['sampling_rate'] == 250
+        
+        del tried[:]
+        hits = openbci_bridge.board_cache_hits.value
+        started = time.monotonic()
+        assert openbci_bridge.open_board('/dev/ttyUSB0')[2] == 'cyton'
+        second = time.monotonic() - started
+        assert tried == ['cyton']
+        assert openbci_bridge.board_cache_hits.value == hits + 1
+        # The first connection waited out the failed attempt, the cached one did not
+        assert first >= 0.2 > second
+        
+        # Other ports are detected on their own
+        del tried[:]
+        openbci_bridge.open_board('/dev/ttyUSB1')
+        assert tried == ['cyton_daisy', 'cyton']
+    
+    def test_cached_board_type_invalidated_on_failure(self, monkeypatch, board_cache_file):
+        """When the cached type fails, it is dropped and the type that works is cached."""
+        tried = []
+        self.fake_cyton_rig(monkeypatch, 'cyton', tried)
+        openbci_bridge.open_board('/dev/ttyUSB0')
+        
+        # The Daisy module is added to the rig
+        del tried[:]
+        self.fake_cyton_rig(monkeypatch, 'cyton_daisy', tried)
+        assert openbci_bridge.open_board('/dev/ttyUSB0')[2] == 'cyton_daisy'
+        assert tried == ['cyton', 'cyton_daisy']
+        assert json.loads(board_cache_file.read_text())['/dev/ttyUSB0']['board_type'] == 'cyton_daisy'
+        
+        # Nothing connects: the port is not cached at all
+        self.fake_cyton_rig(monkeypatch, None, tried)
+        with pytest.raises(Exception):
+            openbci_bridge.open_board('/dev/ttyUSB0')
+        assert '/dev/ttyUSB0' not in json.loads(board_cache_file.read_text())
+    
+    def test_all_board_types_failing(self, monkeypatch):
+        """An error lists every board type that failed."""
+        def create_board(board_type, serial_port):
+            raise Exception(f"{board_type} missing")
+        
+        monkeypatch.setattr(openbci_bridge, 'create_board', create_board)
+        openbci_bridge.board_source = 'cyton'
+        
+        with pytest.raises(Exception) as error:
+            openbci_bridge.open_board('/dev/ttyUSB0')
+        
+        assert 'cyton_daisy missing' in str(error.value)
+        assert 'cyton missing' in str(error.value)
+    
+    @pytest.mark.skipif(not hasattr(os, 'openpty'), reason='needs a pseudo terminal')
+    def test_connect_retries_until_board_responds(self, monkeypatch):
+        """A Cyton on a serial device connects as soon as its session opens, not after a fixed wait."""
+        attempts = []
+        
+        def create_board(board_type, serial_port):
+            attempts.append(board_type)
+            board = Mock()
+            if len(attempts) <= 4:
+                board.prepare_session.side_effect = Exception("Board not responding")
+            return board, board_type
+        
+        monkeypatch.setattr(openbci_bridge, 'create_board', create_board)
+        openbci_bridge.board_source = 'cyton'
+        before = openbci_bridge.metrics.snapshot()
+        master, slave = os.openpty()
+        try:
+            started = time.monotonic()
+            board, board_id, board_type = openbci_bridge.connect_board(os.ttyname(slave))
+            elapsed = time.monotonic() - started
+        finally:
+            os.close(master)
+            os.close(slave)
+        
+        # Two failed rounds of Cyton+Daisy then Cyton, then Cyton+Daisy opens
+        assert board_type == 'cyton_daisy'
+        assert elapsed < 1.0
+        after = openbci_bridge.metrics.snapshot()
+        assert after['connect_attempts_total'] - before['connect_attempts_total'] == 3
+        assert after['connect_seconds']['count'] == before['connect_seconds']['count'] + 1
+    
+    def test_connect_times_out_with_board_error(self, tmp_path, monkeypatch):
+        """A serial device that never appears fails at the deadline."""
+        openbci_bridge.board_source = 'cyton'
+        monkeypatch.setattr(openbci_bridge, 'connect_timeout', 0.2)
+        before = openbci_bridge.metrics.snapshot()
+        
+        with pytest.raises(Exception) as error:
+            openbci_bridge.connect_board(str(tmp_path / 'ttyUSB0'))
+        
+        assert 'not ready' in str(error.value)
+        assert openbci_bridge.metrics.snapshot()['connect_failures_total'] == before['connect_failures_total'] + 1
+    
+    @pytest.mark.skipif(not hasattr(os, 'openpty'), reason='needs a pseudo terminal')
+    def test_discover_boards_in_parallel(self, monkeypatch, board_cache_file):
+        """Discovery reports the board on each port and takes about one slow probe, not their sum."""
+        tried = []
+        self.fake_cyton_rig(monkeypatch, 'cyton', tried, failure_seconds=0.3)
+        pairs = [os.openpty() for _ in range(3)]
+        ports = [os.ttyname(slave) for _, slave in pairs]
+        try:
+            started = time.monotonic()
+            result = openbci_bridge.discover_boards(ports + ['/dev/openbci-missing'])
+            elapsed = time.monotonic() - started
+        finally:
+            for master, slave in pairs:
+                os.close(master)
+                os.close(slave)
+        
+        assert result['status'] == 'success'
+        assert [board['port'] for board in result['boards']] == ports
+        assert all(board['board_type'] == 'cyton' and board['channels'] == 8 for board in result['boards'])
+        assert result['ports'][-1]['status'] == 'busy'
+        # Each port waits 0.3 s for the failed Cyton+Daisy attempt; in series that is 0.9 s
+        assert elapsed < 0.6
+        assert set(json.loads(board_cache_file.read_text())) == set(ports)
+    
+    def test_discover_needs_cyton_source(self):
+        """Only the cyton source is discovered on serial ports."""
+        openbci_bridge.board_source = 'generator'
+        assert openbci_bridge.discover_boards([])['status'] == 'error'
+    
+    def test_stop_recording_without_session(self, tmp_path, monkeypatch):
+        """Without a streaming session, stop_recording fails at once instead of recording from a new board."""
+        monkeypatch.chdir(tmp_path)
+        openbci_bridge.board_source = 'generator'
+        connect_board = Mock()
+        monkeypatch.setattr(openbci_bridge, 'connect_board', connect_board)
+        
+        result = openbci_bridge.stop_recording('none', 'exp1', output_file='gen.csv')
+        
+        assert result == {'status': 'error', 'message': 'No active recording session'}
+        connect_board.assert_not_called()
+        assert not (tmp_path / 'uploads' / 'eeg' / 'gen.csv').exists()
+    
+    def test_prepare_playback_file(self, tmp_path, monkeypatch):
+        """Recordings are converted to BrainFlow's layout for the recorded board."""
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / 'uploads' / 'eeg').mkdir(parents=True)
+        (tmp_path / 'uploads' / 'eeg' / 'rec.csv').write_text(
+            "timestamp,channel_1,channel_2\n1.0,10,20\n2.0,11,21\n")
+        
+        board_shim = Mock()
+        board_shim.get_num_rows.return_value = 5
+        board_shim.get_timestamp_channel.return_value = 4
+        board_shim.get_eeg_channels.return_value = [1, 2, 3]
+        data_filter = Mock()
+        monkeypatch.setattr(openbci_bridge, 'BoardShim', board_shim)
+        monkeypatch.setitem(sys.modules, 'brainflow.data_filter', Mock(DataFilter=data_filter))
+        
+        path, master_board_id = openbci_bridge.prepare_playback_file('rec.csv')
+        
+        assert master_board_id == openbci_bridge.BoardIds.CYTON_BOARD
+        data, written_path, mode = data_filter.write_file.call_args[0]
+        assert written_path == path
+        np.testing.assert_array_equal(data[4], [1.0, 2.0])
+        np.testing.assert_array_equal(data[1:3], [[10, 11], [20, 21]])
+        assert not data[3].any()
+
+
+def brainflow_installed():
+    """True when the real BrainFlow package can be imported (this module mocks it)."""
+    return subprocess.run([sys.executable, '-c', 'import brainflow'], capture_output=True).returncode == 0
+
+
+@pytest.mark.skipif(not brainflow_installed(), reason="Requires the BrainFlow package")
+class TestBrainFlowSyntheticBoard:
+    """Runs the bridge against BrainFlow's synthetic board, no hardware needed."""
+    
+    def run_bridge(self, cwd, *args):
+        script = os.path.join(os.path.dirname(__file__), '..', '..', 'python', 'openbci_bridge.py')
+        output = subprocess.run([sys.executable, script, '--serial_port', 'none', *args],
+                                cwd=cwd, capture_output=True, text=True, timeout=60).stdout
+        return json.loads(output.strip().splitlines()[-1])
+    
+    def test_record_and_play_back(self, tmp_path):
+        """A synthetic recording can be replayed through the playback board."""
+        recorded = self.run_bridge(tmp_path, '--action', 'stop_recording', '--board', 'synthetic',
+                                   '--duration', '1', '--output_file', 'synthetic.csv')
+        assert recorded['status'] == 'success'
+        assert recorded['board_type'] == 'synthetic'
+        assert recorded['samples'] > 0
+        
+        replayed = self.run_bridge(tmp_path, '--action', 'stop_recording', '--board', 'playback',
+                                   '--playback_file', 'synthetic.csv', '--duration', '1',
+                                   '--output_file', 'replayed.csv')
+        assert replayed['status'] == 'success'
+        assert replayed['board_type'] == 'playback'
+        assert replayed['channels'] == recorded['channels']
+
+
+class TestStreamLatency:
+    """Tests for latency stamps on streamed packets."""
+    
+    def test_packets_carry_timing_stamps(self):
+        """Each packet carries board, read and emit times."""
+        eeg_data = np.array([[1.0, 2.0], [3.0, 4.0]])
+        board_timestamps = np.array([100.0, 100.004])
+        
+        packets = openbci_bridge.build_stream_packets(eeg_data, 10, 'exp', 'cyton', board_timestamps,
+                                                      read_time=100.01, emit_time=100.02)
+        
+        assert len(packets) == 2
+        assert packets[0].startswith('EEG_STREAM:')
+        packet = json.loads(packets[1][len('EEG_STREAM:'):])
+        assert packet['channels'] == [2.0, 4.0]
+        assert packet['sample_number'] == 11
+        assert packet['board_timestamp'] == 100.004
+        assert packet['read_time'] == 100.01
+        assert packet['emit_time'] == packet['timestamp'] == 100.02
+    
+    def test_status_reports_latency(self):
+        """Recorded bridge hops show up in the status."""
+        openbci_bridge.latency_tracker.reset()
+        openbci_bridge.record_stream_latency(np.array([100.0, 100.004]), 100.01, 100.02, 100.03)
+        
+        latency = openbci_bridge.get_status()['latency']
+        
+        assert latency['board->read']['count'] == 2
+        assert latency['read->emit']['max_ms'] == pytest.approx(10.0, rel=0.01)
+        assert latency['emit->flush']['count'] == 1
+    
+    def test_publish_and_read_status_file(self, tmp_path, monkeypatch):
+        """The streaming process publishes status for the status action."""
+        monkeypatch.setattr(openbci_bridge, 'STATUS_FILE', str(tmp_path / 'status.json'))
+        openbci_bridge.latency_tracker.reset()
+        openbci_bridge.record_stream_latency(np.array([100.0]), 100.01, 100.02, 100.03)
+        
+        openbci_bridge.publish_status()
+        status = openbci_bridge.read_status_file()
         
-        # Clear queue
-        while not openbci_bridge.data_queue.empty():
-            openbci_bridge.data_queue.get()
+        assert status['latency']['board->flush']['count'] == 1
+        assert 'updated' in status
 
 
 @pytest.mark.hardware
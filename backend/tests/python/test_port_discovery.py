@@ -0,0 +1,91 @@
+"""
+Tests for serial port discovery.
+"""
+import pytest
+import sys
+import os
+import time
+
+# Add the python directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'python'))
+
+# Import the module under test
+import port_discovery
+from readiness import serial_port_ready
+
+
+@pytest.fixture
+def ptys():
+    """Four pseudo terminals standing in for USB serial adapters."""
+    if not hasattr(os, 'openpty'):
+        pytest.skip('needs a pseudo terminal')
+    pairs = [os.openpty() for _ in range(4)]
+    yield [os.ttyname(slave) for _, slave in pairs]
+    for master, slave in pairs:
+        os.close(master)
+        os.close(slave)
+
+
+class TestCandidatePorts:
+    """Tests for listing serial ports."""
+
+    def test_globs_patterns(self, tmp_path):
+        """Device names matching any pattern are listed once, sorted."""
+        for name in ['ttyUSB1', 'ttyUSB0', 'ttyACM0', 'ttyS0']:
+            (tmp_path / name).touch()
+        patterns = [str(tmp_path / 'ttyUSB*'), str(tmp_path / 'ttyACM*'), str(tmp_path / 'tty*USB0')]
+        ports = port_discovery.candidate_ports(patterns)
+        assert ports == [str(tmp_path / name) for name in ['ttyACM0', 'ttyUSB0', 'ttyUSB1']]
+
+
+class TestProbeConcurrently:
+    """Tests for probing ports in parallel."""
+
+    def test_takes_about_the_slowest_probe(self, ptys):
+        """Four probes of 0.2-0.3 s finish in about 0.3 s, not their 1.0 s sum."""
+        delays = dict(zip(ptys, [0.2, 0.3, 0.2, 0.3]))
+
+        def probe(port):
+            assert serial_port_ready(port)
+            time.sleep(delays[port])
+            return {'port': port, 'status': 'found'}
+
+        started = time.monotonic()
+        results = port_discovery.probe_concurrently(ptys, probe, timeout=2)
+        elapsed = time.monotonic() - started
+
+        assert [result['port'] for result in results] == ptys
+        assert all(result['status'] == 'found' for result in results)
+        assert elapsed < 0.6
+
+    def test_timeouts_and_errors_per_port(self, ptys):
+        """A hung port times out and a failing one reports its error; the others still answer."""
+        def probe(port):
+            if port == ptys[1]:
+                time.sleep(5)
+            if port == ptys[2]:
+                raise OSError('permission denied')
+            return {'port': port, 'status': 'found'}
+
+        started = time.monotonic()
+        results = port_discovery.probe_concurrently(ptys, probe, timeout=0.2)
+        elapsed = time.monotonic() - started
+
+        assert [result['status'] for result in results] == ['found', 'timeout', 'error', 'found']
+        assert 'permission denied' in results[2]['message']
+        assert elapsed < 1.0
+
+    def test_hung_probe_does_not_block_queued_ports(self, ptys):
+        """With one worker, ports queued behind a hung probe are still probed."""
+        def probe(port):
+            if port == ptys[0]:
+                time.sleep(5)
+            return {'port': port, 'status': 'found'}
+
+        results = port_discovery.probe_concurrently(ptys, probe, timeout=0.2, workers=1)
+
+        assert [result['status'] for result in results] == ['timeout', 'found', 'found', 'found']
+
+    def test_no_ports(self):
+        """Nothing to probe gives no results."""
+        assert port_discovery.probe_concurrently([], lambda port: None) == []
@@ -0,0 +1,52 @@
+"""
+Tests for the run profiler.
+"""
+import sys
+import os
+import gc
+import threading
+import tracemalloc
+
+# Add the python directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'python'))
+
+# Import the module under test
+from profiling import RunProfiler
+
+
+def busy_background_work():
+    """Work done on a background thread."""
+    return sum(i * i for i in range(20000))
+
+
+class TestRunProfiler:
+    """Test suite for RunProfiler."""
+
+    def test_report_covers_background_threads(self, tmp_path):
+        """Threads started after start() are profiled and reported."""
+        profiler = RunProfiler(str(tmp_path / 'report.txt')).start()
+        try:
+            worker = threading.Thread(target=busy_background_work, name='worker')
+            worker.start()
+            worker.join()
+            gc.collect()
+        finally:
+            profiler.finish()
+
+        report = (tmp_path / 'report.txt').read_text()
+
+        assert 'busy_background_work' in report
+        assert 'Allocation growth per call site' in report
+        assert 'generation 2' in report
+        assert (tmp_path / 'report.prof').exists()
+        if sys.version_info < (3, 12):
+            assert '--- Thread worker ---' in report
+
+    def test_stop_is_idempotent(self, tmp_path):
+        """Stopping twice leaves tracing and the GC hook off."""
+        profiler = RunProfiler(str(tmp_path / 'report.txt')).start()
+        profiler.stop()
+        profiler.stop()
+
+        assert profiler._gc_callback not in gc.callbacks
+        assert not tracemalloc.is_tracing()
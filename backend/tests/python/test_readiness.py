@@ -0,0 +1,105 @@
+"""
+Tests for readiness probing with exponential backoff.
+"""
+import pytest
+import sys
+import os
+import threading
+import time
+
+# Add the python directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'python'))
+
+# Import the module under test
+import readiness
+
+
+class FakeClock:
+    """Clock advanced only by the fake sleep."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestWaitUntil:
+    """Tests for the backoff loop."""
+
+    def test_returns_at_first_success(self):
+        """The probe result is returned as soon as it is true, after backing off."""
+        fake = FakeClock()
+        results = iter([False, None, 0, 'ready'])
+        result, attempts, elapsed = readiness.wait_until(lambda: next(results), 5.0, clock=fake.clock,
+                                                         sleep=fake.sleep)
+        assert result == 'ready'
+        assert attempts == 4
+        assert fake.sleeps == [0.01, 0.02, 0.04]
+        assert elapsed == pytest.approx(0.07)
+
+    def test_interval_is_capped(self):
+        """Waits double up to the maximum interval."""
+        fake = FakeClock()
+        calls = []
+        with pytest.raises(readiness.ReadinessTimeout):
+            readiness.wait_until(lambda: calls.append(1), 2.0, clock=fake.clock, sleep=fake.sleep)
+        assert max(fake.sleeps) == readiness.MAX_INTERVAL
+        assert sum(fake.sleeps) == pytest.approx(2.0)
+
+    def test_timeout_keeps_last_error(self):
+        """Errors count as not ready; the last one is reported on timeout."""
+        fake = FakeClock()
+
+        def probe():
+            raise IOError("Board not responding")
+
+        with pytest.raises(readiness.ReadinessTimeout) as error:
+            readiness.wait_until(probe, 0.5, 'Board', clock=fake.clock, sleep=fake.sleep)
+        assert 'Board not ready' in str(error.value)
+        assert 'Board not responding' in str(error.value)
+        assert isinstance(error.value.last_error, IOError)
+
+    def test_zero_timeout_probes_once(self):
+        """Without time left the probe still runs once."""
+        fake = FakeClock()
+        assert readiness.wait_until(lambda: True, 0, clock=fake.clock, sleep=fake.sleep) == (True, 1, 0.0)
+
+
+@pytest.mark.skipif(not hasattr(os, 'openpty'), reason='needs a pseudo terminal')
+class TestSerialPortReady:
+    """Tests for the serial device probe, with a pseudo terminal standing in for the port."""
+
+    def test_pty_is_ready(self):
+        """An existing device that opens is ready."""
+        master, slave = os.openpty()
+        try:
+            assert readiness.serial_port_ready(os.ttyname(slave))
+        finally:
+            os.close(master)
+            os.close(slave)
+
+    def test_missing_device_is_not_ready(self, tmp_path):
+        """A device that does not exist is not ready."""
+        assert not readiness.serial_port_ready(str(tmp_path / 'ttyUSB9'))
+
+    def test_waits_for_device_to_appear(self, tmp_path):
+        """Probing returns shortly after the device appears, not after a fixed delay."""
+        master, slave = os.openpty()
+        port = str(tmp_path / 'ttyUSB0')
+        timer = threading.Timer(0.2, os.symlink, (os.ttyname(slave), port))
+        timer.start()
+        try:
+            started = time.monotonic()
+            _, attempts, elapsed = readiness.wait_until(lambda: readiness.serial_port_ready(port), 5.0)
+            assert 0.2 <= time.monotonic() - started < 0.2 + readiness.MAX_INTERVAL + 0.2
+            assert attempts > 1
+        finally:
+            timer.cancel()
+            os.close(master)
+            os.close(slave)
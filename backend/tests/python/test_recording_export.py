@@ -0,0 +1,133 @@
+"""
+Tests for the chunked recording export API.
+"""
+import pytest
+import sys
+import os
+import gzip
+import io
+import json
+import numpy as np
+
+# Add the python directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'python'))
+
+# Import the module under test
+import recording_export
+from recordings import RecordingWriter
+
+RATE = 250.0
+START = 1700000000.0
+
+
+@pytest.fixture
+def recording(tmp_path):
+    """A 40 s, 4-channel recording with 10 Hz and 60 Hz components."""
+    samples = int(40 * RATE)
+    t = np.arange(samples) / RATE
+    data = np.vstack([(i + 1) * 10 * np.sin(2 * np.pi * 10 * t) + 5 * np.sin(2 * np.pi * 60 * t)
+                      for i in range(4)])
+    path = str(tmp_path / 'rec.csv')
+    writer = RecordingWriter(path, 4)
+    for start in range(0, samples, 500):
+        writer.write(START + t[start:start + 500], data[:, start:start + 500])
+    writer.close()
+    return path, START + t, data
+
+
+def parse_csv(data):
+    return np.loadtxt(io.StringIO(data.decode('utf-8')), delimiter=',', skiprows=1, ndmin=2)
+
+
+class TestExportChunks:
+    """Test chunked exports"""
+
+    def test_fixed_size_chunks(self, recording):
+        """Test that every chunk but the last has the requested size and the CSV round-trips"""
+        path, timestamps, data = recording
+        chunks = list(recording_export.export_chunks(path, chunk_bytes=10000))
+        assert all(len(chunk) == 10000 for chunk in chunks[:-1])
+        assert 0 < len(chunks[-1]) <= 10000
+        rows = parse_csv(b''.join(chunks))
+        np.testing.assert_allclose(rows[:, 0], timestamps, atol=1e-6)
+        np.testing.assert_allclose(rows[:, 1:], data.T, atol=1e-5)
+
+    def test_range_and_channels(self, recording):
+        """Test time-range and channel selection"""
+        path, timestamps, data = recording
+        output = b''.join(recording_export.export_chunks(path, START + 10, START + 12, channels=[3, 1]))
+        assert output.startswith(b'timestamp,channel_3,channel_1\n')
+        rows = parse_csv(output)
+        np.testing.assert_allclose(rows[:, 0], timestamps[2500:3000], atol=1e-6)
+        np.testing.assert_allclose(rows[:, 1:], data[[2, 0], 2500:3000].T, atol=1e-5)
+
+    def test_invalid_options(self, recording):
+        """Test that bad channels or formats are rejected"""
+        path, _, _ = recording
+        with pytest.raises(ValueError):
+            list(recording_export.export_chunks(path, channels=[5]))
+        with pytest.raises(ValueError):
+            list(recording_export.export_chunks(path, fmt='xml'))
+
+    def test_filter_and_decimate(self, recording):
+        """Test that decimation halves the rate and its anti-alias filter removes 60 Hz"""
+        pytest.importorskip('scipy')
+        path, timestamps, data = recording
+        rows = parse_csv(b''.join(recording_export.export_chunks(path, channels=[1], decimate=2)))
+        np.testing.assert_allclose(rows[:, 0], timestamps[::2], atol=1e-6)
+        spectrum = np.abs(np.fft.rfft(rows[1000:, 1]))
+        freqs = np.fft.rfftfreq(len(rows) - 1000, 2 / RATE)
+        # The anti-alias lowpass (50 Hz at the new 125 Hz rate) removes 60 Hz; only 10 Hz remains
+        assert freqs[np.argmax(spectrum)] == pytest.approx(10, abs=0.1)
+        assert np.std(rows[1000:, 1]) == pytest.approx(10 / np.sqrt(2), rel=0.05)
+
+    def test_binary_and_compressed(self, recording):
+        """Test the binary layout and gzip output"""
+        path, timestamps, data = recording
+        output = b''.join(recording_export.export_chunks(path, fmt='binary', compress=True))
+        raw = gzip.decompress(output)
+        header, body = raw.split(b'\n', 1)
+        header = json.loads(header)
+        assert header['columns'][0] == 'timestamp'
+        assert header['sampling_rate'] == pytest.approx(RATE, rel=1e-3)
+        rows = np.frombuffer(body, dtype='<f8').reshape(-1, len(header['columns']))
+        np.testing.assert_array_equal(rows[:, 0], timestamps)
+
+    def test_sampling_rate_from_clock(self, tmp_path):
+        """Test that the rate comes from the writer's clock, or the argument when given"""
+        path = str(tmp_path / 'batched.csv')
+        # Host-stamped batches of 60 samples every 0.48 s: 125 Hz, though steps inside a batch are 10 us
+        timestamps = START + np.repeat(np.arange(20) * 0.48, 60) + np.tile(np.arange(60) * 1e-5, 20)
+        writer = RecordingWriter(path, 1, sampling_rate=125.0)
+        writer.write(timestamps, np.zeros((1, len(timestamps))), np.arange(len(timestamps)) % 256)
+        writer.close()
+
+        def header_rate(**options):
+            output = b''.join(recording_export.export_chunks(path, fmt='binary', **options))
+            return json.loads(output.split(b'\n', 1)[0])['sampling_rate']
+
+        assert header_rate() == pytest.approx(125.0, rel=0.01)
+        assert header_rate(sampling_rate=128.0) == 128.0
+        assert header_rate(sampling_rate=128.0, decimate=2) == 64.0
+
+    @pytest.mark.parametrize('fmt,compress', [('csv', False), ('binary', False), ('binary', True)])
+    def test_resume_from_offset(self, recording, fmt, compress):
+        """Test that resuming at any byte offset continues the same byte stream"""
+        path, _, _ = recording
+        full = b''.join(recording_export.export_chunks(path, fmt=fmt, compress=compress))
+        for offset in (0, 7, 123457, len(full) - 3):
+            rest = b''.join(recording_export.export_chunks(path, fmt=fmt, compress=compress, offset=offset))
+            assert rest == full[offset:]
+
+    def test_export_to_file_resumes(self, recording, tmp_path):
+        """Test that a truncated output file is completed"""
+        path, _, _ = recording
+        output = str(tmp_path / 'out.bin')
+        size = recording_export.export_to_file(path, output, fmt='binary')
+        with open(output, 'rb') as f:
+            complete = f.read()
+        with open(output, 'wb') as f:
+            f.write(complete[:size // 3])
+        assert recording_export.export_to_file(path, output, resume=True, fmt='binary') == size
+        with open(output, 'rb') as f:
+            assert f.read() == complete
@@ -0,0 +1,331 @@
+"""
+Tests for chunked access to CSV recordings.
+"""
+import pytest
+import sys
+import os
+import json
+import numpy as np
+
+# Add the python directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'python'))
+
+# Import the module under test
+import recordings
+
+
+def write_recording(path, samples=1000, channels=4, rate=250.0):
+    """Write a CSV recording in the bridge's export format and return its rows."""
+    timestamps = 1700000000.0 + np.arange(samples) / rate
+    values = np.random.default_rng(0).normal(0, 10, (samples, channels))
+    rows = np.column_stack((timestamps, values))
+    header = 'timestamp,' + ','.join(f'channel_{i + 1}' for i in range(channels))
+    np.savetxt(path, rows, delimiter=',', header=header, comments='', fmt='%.6f')
+    return rows
+
+
+class TestRecordings:
+    """Test reading recordings in chunks"""
+
+    def test_chunks_cover_whole_file(self, tmp_path):
+        """Test that concatenated chunks equal the recording"""
+        path = str(tmp_path / 'rec.csv')
+        rows = write_recording(path)
+        chunks = list(recordings.iter_chunks(path, chunk_rows=100))
+        assert len(chunks) > 1
+        timestamps = np.concatenate([ts for ts, _ in chunks])
+        values = np.concatenate([v for _, v in chunks])
+        np.testing.assert_allclose(timestamps, rows[:, 0])
+        np.testing.assert_allclose(values, rows[:, 1:], atol=1e-6)
+
+    def test_header_and_listing(self, tmp_path):
+        """Test header parsing and directory listing"""
+        write_recording(str(tmp_path / 'b.csv'), samples=10)
+        write_recording(str(tmp_path / 'a.csv'), samples=10)
+        (tmp_path / 'notes.txt').write_text('x')
+        assert recordings.read_header(str(tmp_path / 'a.csv'))[:2] == ['timestamp', 'channel_1']
+        names = [os.path.basename(p) for p in recordings.list_recordings(str(tmp_path))]
+        assert names == ['a.csv', 'b.csv']
+
+    def test_estimate_sampling_rate(self):
+        """Test sampling rate estimation from timestamps"""
+        assert recordings.estimate_sampling_rate(np.arange(100) / 250.0) == pytest.approx(250.0)
+        assert recordings.estimate_sampling_rate(np.array([1.0])) is None
+
+    def test_estimate_sampling_rate_of_host_batches(self):
+        """Test that batches of samples stamped microseconds apart give the rate of the batches"""
+        numbers = np.setdiff1d(np.arange(1200), np.r_[300:360])
+        # 60 samples at 125 Hz arrive every 0.48 s
+        timestamps = 1700000000.0 + (numbers // 60 + 1) * 0.48 + (numbers % 60) * 1e-5
+        assert recordings.estimate_sampling_rate(timestamps) == pytest.approx(125.0, rel=0.02)
+
+    def test_recording_sampling_rate(self, tmp_path):
+        """Test that the rate comes from the argument, the clock fit or the nominal rate, in that order"""
+        path = str(tmp_path / 'rec.csv')
+        writer = recordings.RecordingWriter(path, 1, sampling_rate=250.0)
+        writer.write(1000.0 + np.arange(500) / 240.0, np.zeros((1, 500)), np.arange(500) % 256)
+        writer.close()
+        assert recordings.recording_sampling_rate(path, 200) == 200.0
+        assert recordings.recording_sampling_rate(path) == pytest.approx(240.0)
+
+        writer = recordings.RecordingWriter(path, 1, sampling_rate=250.0)
+        writer.write(np.array([1000.0]), np.zeros((1, 1)))
+        writer.close()
+        assert recordings.recording_sampling_rate(path) == 250.0
+
+        write_recording(path, samples=1)
+        with pytest.raises(ValueError):
+            recordings.recording_sampling_rate(path)
+
+
+class TestRecordingCache:
+    """Test the memory-mapped binary cache of CSV recordings"""
+
+    def test_cached_load_matches_csv(self, tmp_path):
+        """Test that the cached array equals the parsed CSV and is memory-mapped"""
+        path = str(tmp_path / 'rec.csv')
+        rows = write_recording(path)
+        cache_dir = str(tmp_path / 'cache')
+
+        loaded = recordings.load_recording(path, cache_dir)
+        assert loaded.header[0] == 'timestamp'
+        np.testing.assert_allclose(loaded.data, rows, atol=1e-6)
+        assert loaded.data_end == os.path.getsize(path)
+
+        again = recordings.load_recording(path, cache_dir)
+        assert isinstance(again.data, np.memmap)
+        assert recordings.read_cache_info(path, cache_dir)['rows'] == len(rows)
+
+    def test_cache_invalidated_when_source_changes(self, tmp_path):
+        """Test that a rewritten CSV is converted again"""
+        path = str(tmp_path / 'rec.csv')
+        cache_dir = str(tmp_path / 'cache')
+        write_recording(path, samples=100)
+        assert len(recordings.load_recording(path, cache_dir).data) == 100
+
+        write_recording(path, samples=150)
+        os.utime(path, ns=(0, 10 ** 9))
+        assert recordings.read_cache_info(path, cache_dir) is None
+        assert len(recordings.load_recording(path, cache_dir).data) == 150
+        assert len(os.listdir(cache_dir)) == 2
+
+    def test_partial_last_row_not_cached(self, tmp_path):
+        """Test that a half-written last row of a live recording is left out"""
+        path = tmp_path / 'rec.csv'
+        path.write_text('timestamp,channel_1,channel_2\n1.0,2.0,3.0\n\n1.004,5.0,6.0\n1.008,7.')
+        loaded = recordings.load_recording(str(path), str(tmp_path / 'cache'))
+        np.testing.assert_allclose(loaded.data, [[1.0, 2.0, 3.0], [1.004, 5.0, 6.0]])
+        assert loaded.data_end == path.read_bytes().rfind(b'\n') + 1
+
+    def test_iter_chunks_from_cache(self, tmp_path):
+        """Test that cached chunks equal parsed chunks"""
+        path = str(tmp_path / 'rec.csv')
+        write_recording(path)
+        parsed = np.concatenate([v for _, v in recordings.iter_chunks(path, chunk_rows=300)])
+        cached = np.concatenate([v for _, v in recordings.iter_chunks(path, 300, str(tmp_path / 'cache'))])
+        np.testing.assert_array_equal(parsed, cached)
+
+    def test_empty_recording(self, tmp_path):
+        """Test a recording with only a header"""
+        path = tmp_path / 'rec.csv'
+        path.write_text('timestamp,channel_1\n')
+        assert recordings.load_recording(str(path), str(tmp_path / 'cache')).data.shape == (0, 2)
+
+
+class TestTimeRangeIndex:
+    """Test the incremental writer, the sidecar index and time-window reads"""
+
+    def write_incrementally(self, path, samples=5000, channels=4, rate=250.0, block=333):
+        timestamps = 1700000000.0 + np.arange(samples) / rate
+        values = np.random.default_rng(3).normal(0, 10, (channels, samples))
+        writer = recordings.RecordingWriter(path, channels, index_interval=100)
+        for start in range(0, samples, block):
+            writer.write(timestamps[start:start + block], values[:, start:start + block])
+        writer.close()
+        return timestamps, values
+
+    def test_writer_index_points_at_rows(self, tmp_path):
+        """Test that every index entry gives the sample number, timestamp and offset of its row"""
+        path = str(tmp_path / 'rec.csv')
+        timestamps, _ = self.write_incrementally(path)
+        samples, index_timestamps, offsets = recordings.load_index(path)
+        assert list(samples) == list(range(0, 5000, 100))
+        np.testing.assert_array_equal(index_timestamps, timestamps[samples])
+        with open(path, 'rb') as f:
+            for sample, offset in zip(samples[::7], offsets[::7]):
+                f.seek(offset)
+                assert float(f.readline().split(b',')[0]) == timestamps[sample]
+
+    def test_build_index_matches_writer(self, tmp_path):
+        """Test that indexing an existing file reproduces the writer's index"""
+        path = str(tmp_path / 'rec.csv')
+        self.write_incrementally(path)
+        with open(recordings.index_path(path)) as f:
+            written = f.read()
+        recordings.build_index(path, index_interval=100)
+        with open(recordings.index_path(path)) as f:
+            assert f.read() == written
+
+    def test_read_window(self, tmp_path):
+        """Test [t0, t1) windows from the CSV and from the binary cache"""
+        path = str(tmp_path / 'rec.csv')
+        timestamps, values = self.write_incrementally(path)
+        for cache_dir in (None, str(tmp_path / 'cache')):
+            window_ts, window = recordings.read_window(path, timestamps[1234], timestamps[2345], cache_dir)
+            np.testing.assert_array_equal(window_ts, timestamps[1234:2345])
+            np.testing.assert_allclose(window, values[:, 1234:2345].T)
+        assert len(recordings.read_window(path, 0, timestamps[0])[0]) == 0
+
+    def test_index_built_for_old_recordings(self, tmp_path):
+        """Test that a recording without an index gets one on the first window read"""
+        path = str(tmp_path / 'old.csv')
+        write_recording(path, samples=3000)
+        assert not os.path.exists(recordings.index_path(path))
+        window_ts, _ = recordings.read_window(path, 1700000000.0 + 2.0, 1700000000.0 + 3.0)
+        assert len(window_ts) == 250
+        assert os.path.exists(recordings.index_path(path))
+
+    def test_move_renames_index(self, tmp_path):
+        """Test that moving a finished recording keeps its index and clock next to it"""
+        writer = recordings.RecordingWriter(str(tmp_path / 'rec.csv.part'), 2)
+        writer.write(np.arange(5.0), np.zeros((2, 5)))
+        writer.move(str(tmp_path / 'rec.csv'))
+        assert sorted(os.listdir(tmp_path)) == ['rec.csv', 'rec.csv.clock.json', 'rec.csv.idx']
+        assert writer.bytes_written == os.path.getsize(tmp_path / 'rec.csv')
+
+    def test_iter_chunks_time_range(self, tmp_path):
+        """Test chunk iteration limited to [start_time, end_time), from the CSV and the cache"""
+        path = str(tmp_path / 'rec.csv')
+        timestamps, _ = self.write_incrementally(path)
+        for cache_dir in (None, str(tmp_path / 'cache')):
+            chunks = list(recordings.iter_chunks(path, 200, cache_dir, timestamps[2500], timestamps[4321]))
+            np.testing.assert_array_equal(np.concatenate([ts for ts, _ in chunks]), timestamps[2500:4321])
+
+
+class TestSampleClock:
+    """Test the sample clock written with recordings and reads by sample index"""
+
+    def write_with_drops(self, path, rate=250.0, block=97):
+        """A recording with batch-jittered timestamps and samples 1000-1039 and 3000-3299 dropped"""
+        indices = np.setdiff1d(np.arange(5000), np.r_[1000:1040, 3000:3300])
+        # Host arrival times: each block of 10 samples arrives together, late
+        timestamps = 1700000000.0 + (indices // 10 * 10 + 10) / rate + 0.002
+        values = np.vstack([indices, -indices]).astype(float)
+        writer = recordings.RecordingWriter(path, 2, index_interval=100, sampling_rate=rate)
+        for start in range(0, len(indices), block):
+            writer.write(timestamps[start:start + block], values[:, start:start + block],
+                         indices[start:start + block] % 256)
+        writer.close()
+        return indices, timestamps
+
+    def test_discontinuity_is_recorded_as_marker(self, tmp_path):
+        """Test that a gap after mark_discontinuity is written as a marker with its duration"""
+        path = str(tmp_path / 'rec.csv')
+        writer = recordings.RecordingWriter(path, 1, sampling_rate=250.0)
+        writer.write(1000.0 + np.arange(250) / 250.0, np.zeros((1, 250)), np.arange(250) % 256)
+        writer.mark_discontinuity('Board reconnected')
+        writer.write(1003.0 + np.arange(250) / 250.0, np.zeros((1, 250)), np.arange(250) % 256)
+        writer.move(str(tmp_path / 'final.csv'))
+
+        path = str(tmp_path / 'final.csv')
+        assert recordings.list_recordings(str(tmp_path)) == [path]
+        with open(recordings.markers_path(path)) as f:
+            header, marker = f.read().splitlines()
+        timestamp, duration, text = marker.split(',')
+        assert float(timestamp) == 1000.0 + 249 / 250.0
+        assert float(duration) == pytest.approx(2.0 + 1 / 250.0)
+        assert text == 'Board reconnected'
+        clock, gaps = recordings.load_clock(path)
+        assert gaps == [(250, 500)]
+
+    def test_writer_records_clock_and_drops(self, tmp_path):
+        """Test that the writer fits the clock and logs drops from the package numbers"""
+        path = str(tmp_path / 'rec.csv')
+        self.write_with_drops(path)
+        clock, gaps = recordings.load_clock(path)
+        # A 300 sample drop wraps the counter; the timestamps supply the whole periods
+        assert gaps == [(1000, 40), (2960, 300)]
+        assert clock.rate == pytest.approx(250.0, rel=1e-3)
+        assert clock.t0 == pytest.approx(1700000000.0 + 10 / 250.0, abs=0.03)
+
+    def test_read_samples_by_index(self, tmp_path):
+        """Test that sample indices address the same samples with or without filled drops"""
+        path = str(tmp_path / 'rec.csv')
+        self.write_with_drops(path)
+        for cache_dir in (None, str(tmp_path / 'cache')):
+            times, values = recordings.read_samples(path, 990, 1050, cache_dir=cache_dir)
+            np.testing.assert_array_equal(values[:, 0], np.r_[990:1000, 1040:1050])
+            assert np.all(np.diff(times) > 0)
+            times, values = recordings.read_samples(path, 990, 1050, fill='nan', cache_dir=cache_dir)
+            assert len(times) == len(values) == 60
+            np.testing.assert_array_equal(np.isnan(values[:, 0]), (np.arange(990, 1050) >= 1000) &
+                                          (np.arange(990, 1050) < 1040))
+            _, values = recordings.read_samples(path, 2990, 3310, fill='interpolate', cache_dir=cache_dir)
+            np.testing.assert_allclose(values[:, 0], np.arange(2990, 3310))
+
+    def test_read_samples_past_the_end(self, tmp_path):
+        """Test that a range beyond the recording stops at its last sample"""
+        path = str(tmp_path / 'rec.csv')
+        self.write_with_drops(path)
+        _, values = recordings.read_samples(path, 4990, 6000, fill='hold')
+        np.testing.assert_array_equal(values[:, 0], np.arange(4990, 5000))
+
+    def test_windows_located_from_jittered_clock(self, tmp_path):
+        """Test that time windows stay exact when the clock only approximates the timestamps"""
+        path = str(tmp_path / 'rec.csv')
+        indices, timestamps = self.write_with_drops(path)
+        window_ts, window = recordings.read_window(path, timestamps[2000], timestamps[4000])
+        np.testing.assert_array_equal(window_ts, timestamps[2000:4000])
+        np.testing.assert_array_equal(window[:, 0], indices[2000:4000])
+        # Rows of a batch share a timestamp, so windows start and end on batch boundaries
+        chunks = list(recordings.iter_chunks(path, 500, None, timestamps[1230], timestamps[4320]))
+        np.testing.assert_array_equal(np.concatenate([ts for ts, _ in chunks]), timestamps[1230:4320])
+
+    def test_clock_built_for_old_recordings(self, tmp_path):
+        """Test that a recording without a clock gets one, with gaps from its timestamps"""
+        path = str(tmp_path / 'old.csv')
+        with open(path, 'w') as f:
+            f.write('timestamp,channel_1\n')
+            for i in np.r_[0:500, 520:1000]:
+                f.write(f"{1700000000.0 + i / 250.0},{i}\n")
+        clock, gaps = recordings.load_clock(path)
+        assert gaps == [(500, 20)]
+        assert clock.rate == pytest.approx(250.0)
+        assert os.path.exists(recordings.clock_path(path))
+
+    def test_clock_built_for_host_batches(self, tmp_path):
+        """Test that the steps between host batches of an old recording are not taken for gaps"""
+        path = str(tmp_path / 'old.csv')
+        numbers = np.arange(1200)
+        timestamps = 1700000000.0 + (numbers // 60 + 1) * 0.48 + (numbers % 60) * 1e-5
+        np.savetxt(path, np.column_stack((timestamps, numbers)), delimiter=',', header='timestamp,channel_1',
+                   comments='', fmt='%.6f')
+        clock, gaps = recordings.load_clock(path)
+        assert gaps == []
+        assert clock.rate == pytest.approx(125.0, rel=0.02)
+
+    def test_clock_of_writer_without_packages_is_rebuilt(self, tmp_path):
+        """Test that gaps a writer took from host-batched timestamp steps are found again after a clock fit"""
+        path = str(tmp_path / 'rec.csv')
+        timestamps = 1000.0 + np.repeat(np.arange(20) * 0.48, 60) + np.tile(np.arange(60) * 1e-5, 20)
+        writer = recordings.RecordingWriter(path, 1, sampling_rate=125.0)
+        writer.write(timestamps, np.zeros((1, len(timestamps))))
+        writer.close()
+        assert writer.clock.gap_source == 'steps' and writer.clock.gaps
+
+        info = recordings.read_clock(path)
+        assert info['gap_source'] == 'timestamps'
+        assert info['gaps'] == []
+        assert info['nominal_rate'] == 125.0
+        assert info['rate'] == pytest.approx(125.0, rel=0.01)
+
+    def test_clock_from_timestamp_steps_is_rebuilt(self, tmp_path):
+        """Test that a clock an earlier version built from single timestamp steps is built again"""
+        path = str(tmp_path / 'old.csv')
+        write_recording(path)
+        with open(recordings.clock_path(path), 'w') as f:
+            json.dump({'t0': 1700000000.0, 'rate': 58254.0, 'nominal_rate': 116508.0, 'rows': 1000,
+                       'samples': 2000, 'dropped': 1000, 'package_step': None, 'gaps': [[500, 1000]]}, f)
+        clock, gaps = recordings.load_clock(path)
+        assert gaps == []
+        assert clock.rate == pytest.approx(250.0)
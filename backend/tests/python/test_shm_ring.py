@@ -0,0 +1,167 @@
+"""
+Tests for the shared-memory ring buffer.
+"""
+import pytest
+import sys
+import os
+import threading
+import uuid
+import numpy as np
+
+# Add the python directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'python'))
+
+# Import the module under test
+import shm_ring
+from shm_ring import RingWriter, RingReader
+
+
+@pytest.fixture
+def ring_name():
+    """A shared memory name no other test uses."""
+    return f'eeg_test_{uuid.uuid4().hex[:12]}'
+
+
+def samples(start, count, channels=4):
+    """Timestamps and (channels, count) data whose values encode the sample number."""
+    numbers = np.arange(start, start + count, dtype=float)
+    return numbers / 250.0, np.vstack([numbers + 1000 * channel for channel in range(channels)])
+
+
+class TestRing:
+    """Tests for writing and reading the ring."""
+
+    def test_header_and_layout(self, ring_name):
+        """Readers learn the channel count, capacity, rate and channel layout from the header."""
+        writer = RingWriter(ring_name, 4, 500, capacity=64, layout={'board_type': 'generator'})
+        reader = RingReader(ring_name)
+        try:
+            assert (reader.channel_count, reader.capacity, reader.sampling_rate) == (4, 64, 500)
+            assert reader.layout['channels'] == ['channel_1', 'channel_2', 'channel_3', 'channel_4']
+            assert reader.layout['board_type'] == 'generator'
+            assert reader.write_index == 0
+        finally:
+            reader.close()
+            writer.close()
+
+    def test_read_returns_read_only_views(self, ring_name):
+        """Samples come back as read-only views of the shared memory, one row per sample."""
+        writer = RingWriter(ring_name, 4, 250, capacity=64)
+        reader = RingReader(ring_name)
+        try:
+            writer.write(*samples(0, 10))
+            segments, start, stop = reader.read(0)
+            assert (start, stop, reader.sequence) == (0, 10, 1)
+            timestamps, data = segments[0]
+            np.testing.assert_array_equal(data[:, 0], np.arange(10))
+            np.testing.assert_array_equal(data[:, 3], np.arange(10) + 3000)
+            assert np.shares_memory(data, reader.data)
+            with pytest.raises(ValueError):
+                data[0, 0] = 1
+            del timestamps, data, segments
+        finally:
+            reader.close()
+            writer.close()
+
+    def test_wraps_around(self, ring_name):
+        """A range across the end of the ring is read as two segments, and overwritten samples are skipped."""
+        writer = RingWriter(ring_name, 4, 250, capacity=16)
+        reader = RingReader(ring_name)
+        try:
+            writer.write(*samples(0, 12))
+            writer.write(*samples(12, 12))
+            segments, start, stop = reader.read(0)
+            assert (start, stop) == (8, 24)
+            assert [len(t) for t, _ in segments] == [8, 8]
+            numbers = np.concatenate([data[:, 0] for _, data in segments])
+            np.testing.assert_array_equal(numbers, np.arange(8, 24))
+            del segments
+        finally:
+            reader.close()
+            writer.close()
+
+    def test_chunk_larger_than_ring(self, ring_name):
+        """Only the newest samples of a chunk larger than the ring are kept."""
+        writer = RingWriter(ring_name, 4, 250, capacity=16)
+        reader = RingReader(ring_name)
+        try:
+            writer.write(*samples(0, 40))
+            segments, start, stop = reader.read(0)
+            assert (start, stop) == (24, 40)
+            numbers = np.concatenate([data[:, 0] for _, data in segments])
+            np.testing.assert_array_equal(numbers, np.arange(24, 40))
+            del segments
+        finally:
+            reader.close()
+            writer.close()
+
+    def test_intact_detects_overwrite(self, ring_name):
+        """Views used after the writer wrapped over them are reported as not intact."""
+        writer = RingWriter(ring_name, 4, 250, capacity=16)
+        reader = RingReader(ring_name)
+        try:
+            writer.write(*samples(0, 8))
+            assert reader.intact(0)
+            writer.write(*samples(8, 12))
+            assert not reader.intact(0)
+            assert reader.intact(4)
+        finally:
+            reader.close()
+            writer.close()
+
+    def test_follow_until_closed(self, ring_name):
+        """A follower gets every sample written, in order, and stops when the writer closes the ring."""
+        writer = RingWriter(ring_name, 4, 250, capacity=256)
+        reader = RingReader(ring_name)
+        received = []
+        follower = threading.Thread(target=lambda: received.extend(
+            data[:, 0].tolist() for _, data in reader.follow(start=0, poll_interval=0.001)))
+        follower.start()
+        for start in range(0, 100, 10):
+            writer.write(*samples(start, 10))
+        writer.close()
+        follower.join(5)
+        assert not follower.is_alive()
+        assert [n for chunk in received for n in chunk] == list(range(100))
+        assert reader.lost_samples == 0
+        reader.close()
+
+    def test_stale_segment_is_replaced(self, ring_name):
+        """A segment left behind under the same name is replaced by a new writer."""
+        from multiprocessing import shared_memory
+        stale = shared_memory.SharedMemory(name=ring_name, create=True, size=128)
+        stale.close()
+        writer = RingWriter(ring_name, 4, 250, capacity=32)
+        reader = RingReader(ring_name)
+        try:
+            assert (reader.channel_count, reader.write_index) == (4, 0)
+        finally:
+            reader.close()
+            writer.close()
+
+    def test_rejects_other_segments(self, ring_name):
+        """Attaching to a segment that is not a ring fails clearly."""
+        from multiprocessing import shared_memory
+        other = shared_memory.SharedMemory(name=ring_name, create=True, size=shm_ring.HEADER_SIZE)
+        try:
+            with pytest.raises(ValueError):
+                RingReader(ring_name)
+        finally:
+            other.close()
+            other.unlink()
+
+
+class TestCompareTransports:
+    """Tests for the stdin and shared-memory comparison."""
+
+    @pytest.mark.slow
+    def test_ring_is_faster_than_pipe(self, ring_name):
+        """Both transports deliver every sample; the ring has lower latency and higher throughput."""
+        results = shm_ring.compare_transports(channels=8, rate=2000, seconds=0.5, name=ring_name)
+        by_run = {(r['transport'], r['mode']): r for r in results}
+        assert len(by_run) == 4
+        for (transport, mode), result in by_run.items():
+            assert result['samples'] + result['lost_samples'] == 1000
+        assert by_run['shm', 'paced']['lost_samples'] == 0
+        assert by_run['shm', 'paced']['latency']['p50_ms'] < by_run['stdin', 'paced']['latency']['p50_ms']
+        assert by_run['shm', 'throughput']['samples_per_second'] > by_run['stdin', 'throughput']['samples_per_second']
@@ -0,0 +1,105 @@
+"""
+Tests for the bridge soak test harness.
+"""
+import pytest
+import sys
+import os
+
+# Add the python directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'python'))
+
+# Import the module under test
+import soak_test
+
+
+def make_samples(count, rss_step=0.0, threads=3, emitted_per_sample=1000, rate=1000):
+    """Evenly spaced samples one second apart."""
+    return [{
+        'elapsed': float(i),
+        'rss_mb': 100.0 + rss_step * i,
+        'threads': threads,
+        'fds': 4,
+        'session_uptime': float(i + 1),
+        'data_queue_depth': 0,
+        'board_buffer_samples': 40,
+        'samples_acquired': rate * (i + 1),
+        'samples_emitted': emitted_per_sample * (i + 1),
+        'dropped_chunks': 0,
+        'received': emitted_per_sample * (i + 1),
+        'lost': 0,
+    } for i in range(count)]
+
+
+class TestAnalyze:
+    """Test suite for the soak test thresholds."""
+
+    def test_steady_run_passes(self):
+        """A run with flat resources and no loss passes."""
+        samples = make_samples(20)
+
+        summary, failures = soak_test.analyze(samples, {'received': 20000, 'lost': 0, 'out_of_order': 0}, 1000)
+
+        assert failures == []
+        assert summary['loss_rate'] == 0
+        assert summary['rate_drift'] == pytest.approx(0.0)
+
+    def test_memory_leak_fails(self):
+        """Steady RSS growth beyond the limit fails the run."""
+        samples = make_samples(20, rss_step=1.0)
+
+        summary, failures = soak_test.analyze(samples, {'received': 20000, 'lost': 0, 'out_of_order': 0}, 1000)
+
+        assert summary['rss_growth_mb_per_hour'] == pytest.approx(3600.0)
+        assert any('RSS' in failure for failure in failures)
+
+    def test_lost_samples_fail(self):
+        """Samples emitted by the bridge but never received fail the run."""
+        samples = make_samples(20)
+
+        _, failures = soak_test.analyze(samples, {'received': 19000, 'lost': 0, 'out_of_order': 0}, 1000)
+
+        assert any('Lost 1000 samples' in failure for failure in failures)
+
+    def test_rate_drift_fails(self):
+        """Acquisition falling behind the expected rate fails the run."""
+        samples = make_samples(20, rate=900)
+
+        _, failures = soak_test.analyze(samples, {'received': 20000, 'lost': 0, 'out_of_order': 0}, 1000)
+
+        assert any('drifted' in failure for failure in failures)
+
+    def test_missing_result_line_is_reported(self, tmp_path, monkeypatch):
+        """A bridge that exits without its result line gives an error with its exit code and stderr."""
+        monkeypatch.setattr(soak_test, 'BRIDGE_SCRIPT', str(tmp_path / 'missing_bridge.py'))
+
+        _, _, bridge_result, _ = soak_test.run_soak(
+            1, interval=0.1, workdir=str(tmp_path), log=lambda line: None)
+
+        assert bridge_result['status'] == 'error'
+        assert bridge_result['returncode'] != 0
+        assert 'missing_bridge.py' in (tmp_path / soak_test.BRIDGE_STDERR).read_text()
+
+    def test_parse_prometheus(self):
+        """Unlabelled samples are parsed, comments and labelled samples skipped."""
+        text = "# TYPE a counter\na 5\nb{quantile=\"0.5\"} 1\nc 2.5\n"
+
+        assert soak_test.parse_prometheus(text) == {'a': 5.0, 'c': 2.5}
+
+
+@pytest.mark.skipif(not os.path.exists('/proc/self/status'), reason="Requires Linux /proc")
+class TestSoakRun:
+    """Short end-to-end soak run against the generator board."""
+
+    def test_short_run(self, tmp_path):
+        """A few seconds of accelerated streaming pass every check."""
+        samples, final, bridge_result, rate = soak_test.run_soak(
+            6, channels=8, rate=250, acceleration=4, interval=0.5, workdir=str(tmp_path), log=lambda line: None)
+
+        summary, failures = soak_test.analyze(samples, final, rate)
+
+        stderr_tail = (tmp_path / soak_test.BRIDGE_STDERR).read_text()[-2000:]
+        assert bridge_result is not None, stderr_tail
+        assert bridge_result['status'] == 'success', (bridge_result, stderr_tail)
+        assert final['received'] > 0
+        assert summary['samples_lost'] == 0
+        assert failures == []
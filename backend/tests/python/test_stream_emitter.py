@@ -0,0 +1,148 @@
+"""
+Tests for the stdout stream emitter.
+"""
+import pytest
+import sys
+import os
+import io
+import threading
+import numpy as np
+
+# Add the python directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'python'))
+
+# Import the module under test
+from stream_emitter import StreamEmitter
+from acquisition_bus import Subscription, make_chunk
+
+
+def chunk(sequence, samples=8):
+    """A chunk of `samples` samples on 2 channels."""
+    first = sequence * samples
+    return make_chunk(sequence, first, np.zeros((2, samples)), np.arange(first, first + samples) / 250.0)
+
+
+def format_sample_numbers(chunk, step, emit_time):
+    """One line per written sample, holding its sample number."""
+    return ''.join(f'{chunk.first_sample + i}\n' for i in range(0, chunk.eeg.shape[1], step))
+
+
+def queued(count, maxsize=256):
+    """A closed subscription holding `count` chunks, as if the emitter had fallen behind."""
+    subscription = Subscription('web', maxsize=maxsize)
+    for sequence in range(count):
+        subscription.offer(chunk(sequence))
+    subscription.close()
+    return subscription
+
+
+class BlockingStream(io.StringIO):
+    """A stream whose writes wait until `release` is set, like a pipe nobody reads."""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+        self.writing = threading.Event()
+
+    def write(self, text):
+        self.writing.set()
+        self.release.wait(5)
+        return super().write(text)
+
+
+class TestStreamEmitter:
+    """Tests for the emit policies."""
+
+    def test_rejects_unknown_policy(self):
+        """Only the documented emit policies are accepted."""
+        with pytest.raises(ValueError):
+            StreamEmitter(Subscription('web'), format_sample_numbers, policy='drop_newest')
+
+    def test_writes_every_sample_when_keeping_up(self):
+        """A reader that keeps up gets every sample, one write per chunk."""
+        stream = io.StringIO()
+        emitter = StreamEmitter(queued(3), format_sample_numbers, stream, policy='coalesce', behind_chunks=8)
+        emitter.run()
+        assert stream.getvalue().split() == [str(n) for n in range(24)]
+        assert emitter.writes == 3
+        assert emitter.stats()['dropped_samples'] == 0
+
+    def test_drop_oldest_counts_dropped_samples(self):
+        """A stalled reader makes the queue drop its oldest chunks; every dropped sample is counted."""
+        stream = BlockingStream()
+        subscription = Subscription('web', maxsize=4)
+        emitter = StreamEmitter(subscription, format_sample_numbers, stream)
+        thread = threading.Thread(target=emitter.run)
+        thread.start()
+        subscription.offer(chunk(0))
+        assert stream.writing.wait(1)
+        for sequence in range(1, 20):
+            subscription.offer(chunk(sequence))
+        stream.release.set()
+        subscription.close()
+        thread.join(5)
+
+        written = [int(n) for n in stream.getvalue().split()]
+        assert written[:8] == list(range(8))
+        assert written[-1] == 20 * 8 - 1
+        assert emitter.dropped_samples == 15 * 8
+        assert emitter.emitted_samples + emitter.dropped_samples == 20 * 8
+
+    def test_close_drops_backlog(self):
+        """Closing a stalled emitter drops its queue; it ends after the write in progress."""
+        stream = BlockingStream()
+        subscription = Subscription('web')
+        emitter = StreamEmitter(subscription, format_sample_numbers, stream)
+        thread = threading.Thread(target=emitter.run)
+        thread.start()
+        for sequence in range(5):
+            subscription.offer(chunk(sequence))
+        assert stream.writing.wait(1)
+        assert emitter.close() == 4
+        stream.release.set()
+        thread.join(5)
+        assert not thread.is_alive()
+        assert stream.getvalue().split() == [str(n) for n in range(8)]
+        assert emitter.dropped_samples == 32
+
+    def test_decimate_while_behind(self):
+        """While behind, every n-th sample is written with its own sample number."""
+        stream = io.StringIO()
+        emitter = StreamEmitter(queued(10), format_sample_numbers, stream, policy='decimate', decimate_factor=4,
+                                behind_chunks=4)
+        emitter.run()
+        written = [int(n) for n in stream.getvalue().split()]
+        # The first six chunks are taken with at least four queued behind them
+        assert written[:12] == list(range(0, 48, 4))
+        assert written[12:] == list(range(48, 80))
+        assert emitter.decimated_samples == 6 * 6
+        assert emitter.emitted_samples + emitter.decimated_samples == 80
+
+    def test_coalesce_while_behind(self):
+        """While behind, every queued chunk goes out in a single write, nothing left out."""
+        stream = io.StringIO()
+        emitter = StreamEmitter(queued(10), format_sample_numbers, stream, policy='coalesce', behind_chunks=4)
+        emitter.run()
+        assert stream.getvalue().split() == [str(n) for n in range(80)]
+        assert emitter.writes == 1
+        assert emitter.coalesced_chunks == 10
+        assert emitter.coalesced_samples == 80
+
+    def test_written_callback(self):
+        """on_written is called for every chunk of a write, with the samples kept."""
+        written = []
+        emitter = StreamEmitter(queued(6), format_sample_numbers, io.StringIO(), policy='decimate',
+                                decimate_factor=2, behind_chunks=3,
+                                on_written=lambda c, samples, emit_time, flushed: written.append((c.sequence, samples)))
+        emitter.run()
+        assert written == [(0, 4), (1, 4), (2, 4), (3, 8), (4, 8), (5, 8)]
+
+    def test_write_errors_count_as_dropped(self):
+        """Samples of a failed write are counted as dropped and the emitter goes on."""
+        class BrokenStream(io.StringIO):
+            def write(self, text):
+                raise BrokenPipeError('reader went away')
+        emitter = StreamEmitter(queued(2), format_sample_numbers, BrokenStream())
+        emitter.run()
+        assert emitter.dropped_samples == 16
+        assert emitter.emitted_samples == 0
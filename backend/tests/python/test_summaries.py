@@ -0,0 +1,131 @@
+"""
+Tests for precomputed recording summaries.
+"""
+import pytest
+import sys
+import os
+import json
+import shutil
+import numpy as np
+
+# Add the python directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'python'))
+
+# Import the module under test
+import summaries
+from recordings import RecordingWriter
+
+RATE = 250.0
+
+
+def make_data(seconds=20, channels=3):
+    """Timestamps and channels x samples data with a 10 Hz rhythm and one railed channel."""
+    samples = int(seconds * RATE)
+    timestamps = 1700000000.0 + np.arange(samples) / RATE
+    data = 20.0 * np.sin(2 * np.pi * 10 * np.arange(samples) / RATE)[None, :].repeat(channels, axis=0)
+    data[-1, :samples // 4] = summaries.RAIL_UV
+    return timestamps, data
+
+
+class TestRecordingSummary:
+    """Test incremental summaries"""
+
+    def test_incremental_equals_whole(self):
+        """Test that feeding small chunks gives the same summary as one update"""
+        timestamps, data = make_data()
+        whole = summaries.RecordingSummary(3, RATE)
+        whole.update(timestamps, data.T)
+        chunked = summaries.RecordingSummary(3, RATE)
+        for start in range(0, data.shape[1], 25):
+            chunked.update(timestamps[start:start + 25], data[:, start:start + 25].T)
+        assert chunked.result() == whole.result()
+
+    def test_summary_contents(self):
+        """Test per-channel statistics and band powers"""
+        timestamps, data = make_data()
+        summary = summaries.RecordingSummary(3, RATE)
+        summary.update(timestamps, data.T)
+        result = summary.result()
+        assert result['samples'] == data.shape[1]
+        assert result['duration_s'] == pytest.approx(20.0, abs=0.01)
+        assert result['gaps'] == 0
+        first, railed = result['channel_stats'][0], result['channel_stats'][-1]
+        assert first['rms_uv'] == pytest.approx(20.0 / np.sqrt(2), rel=0.01)
+        assert first['band_relative']['alpha'] > 0.9
+        assert railed['rail_pct'] == pytest.approx(25.0)
+
+    def test_gaps_come_from_the_clock(self):
+        """Test that gaps are the clock's drops, not the steps between batches of host timestamps"""
+        timestamps, data = make_data(seconds=4)
+        # Batches of 25 samples stamped on arrival, microseconds apart
+        timestamps = timestamps[::25].repeat(25) + 0.1 + np.tile(np.arange(25) * 1e-5, data.shape[1] // 25)
+        writer_gaps = []
+        summary = summaries.RecordingSummary(3, RATE, writer_gaps)
+        summary.update(timestamps, data.T)
+        assert summary.result()['gaps'] == 0
+        writer_gaps.append((500, 125))
+        assert (summary.result()['gaps'], summary.result()['gap_seconds']) == (1, 0.5)
+
+    def test_empty_summary(self):
+        """Test that a summary without samples is still valid JSON"""
+        result = summaries.RecordingSummary(2, RATE).result()
+        assert result['samples'] == 0
+        json.dumps(result, allow_nan=False)
+
+
+class TestSummaryFiles:
+    """Test writing, reading and listing summaries"""
+
+    def test_listing_reads_only_summaries(self, tmp_path):
+        """Test that listing uses summary files and reports missing ones"""
+        timestamps, data = make_data(seconds=4)
+        for name in ('a', 'b'):
+            path = str(tmp_path / f'{name}.csv')
+            writer = RecordingWriter(path, 3)
+            writer.write(timestamps, data)
+            writer.close()
+        summaries.summarize_file(str(tmp_path / 'a.csv'))
+
+        listing = summaries.list_summaries(str(tmp_path))
+        assert [entry['file'] for entry in listing] == ['a.csv', 'b.csv']
+        assert listing[0]['summary']['samples'] == data.shape[1]
+        assert listing[1]['summary'] is None
+
+        listing = summaries.list_summaries(str(tmp_path), build_missing=True)
+        assert listing[1]['summary']['sampling_rate'] == pytest.approx(RATE, rel=1e-3)
+
+    def test_stale_summary_ignored(self, tmp_path):
+        """Test that a summary older than its recording is not returned"""
+        timestamps, data = make_data(seconds=2)
+        path = str(tmp_path / 'a.csv')
+        writer = RecordingWriter(path, 3)
+        writer.write(timestamps, data)
+        writer.close()
+        summaries.summarize_file(path, sampling_rate=RATE)
+        assert summaries.read_summary(path) is not None
+        os.utime(summaries.summary_path(path), (0, 0))
+        assert summaries.read_summary(path) is None
+
+    def test_summary_of_host_stamped_recording(self, tmp_path):
+        """Test that a bridge recording with batched host timestamps has no gaps and its real rate"""
+        sample = os.path.join(os.path.dirname(__file__), '..', '..', 'python', 'uploads', 'eeg',
+                              'eeg_test_20250415_145522.csv')
+        path = str(tmp_path / 'sample.csv')
+        shutil.copy(sample, path)
+        assert summaries.summarize_file(path, sampling_rate=250)['gaps'] == 0
+        os.remove(summaries.summary_path(path))
+
+        summary = summaries.list_summaries(str(tmp_path), build_missing=True)[0]['summary']
+        assert summary['gaps'] == 0
+        assert summary['sampling_rate'] == pytest.approx(125.0, rel=0.03)
+
+    def test_earlier_version_ignored(self, tmp_path):
+        """Test that a summary of an earlier version is treated as missing"""
+        timestamps, data = make_data(seconds=2)
+        path = str(tmp_path / 'a.csv')
+        writer = RecordingWriter(path, 3)
+        writer.write(timestamps, data)
+        writer.close()
+        with open(summaries.summary_path(path), 'w') as f:
+            json.dump({'version': 1, 'samples': 500, 'gaps': 69}, f)
+        assert summaries.read_summary(path) is None
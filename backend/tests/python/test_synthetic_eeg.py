@@ -0,0 +1,102 @@
+"""
+Tests for the vectorized synthetic EEG generator.
+"""
+import pytest
+import sys
+import os
+import time
+import numpy as np
+
+# Add the python directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'python'))
+
+# Import the module under test
+from synthetic_eeg import SyntheticEEGGenerator, GeneratorBoard, RAIL_UV, PACKAGE_MODULO
+
+
+class TestSyntheticEEGGenerator:
+    """Test suite for SyntheticEEGGenerator."""
+
+    def test_block_shape_and_timestamps(self):
+        """Blocks have one row per channel and evenly spaced timestamps."""
+        generator = SyntheticEEGGenerator(channel_count=32, sampling_rate=1000, seed=1, start_time=100.0)
+
+        timestamps, data = generator.generate(500)
+        next_timestamps, _ = generator.generate(500)
+
+        assert data.shape == (32, 500)
+        assert timestamps[0] == 100.0
+        np.testing.assert_allclose(np.diff(timestamps), 0.001)
+        assert next_timestamps[0] == pytest.approx(100.5)
+
+    def test_rejects_out_of_range_configuration(self):
+        """Channel counts and rates beyond the supported range are rejected."""
+        with pytest.raises(ValueError):
+            SyntheticEEGGenerator(channel_count=512)
+        with pytest.raises(ValueError):
+            SyntheticEEGGenerator(sampling_rate=32000)
+
+    def test_alpha_dominates_spectrum(self):
+        """Without artifacts the strongest non-DC component is in the alpha band or line noise."""
+        generator = SyntheticEEGGenerator(channel_count=8, sampling_rate=250, seed=2,
+                                          blink_rate=0, rail_rate=0, line_noise_amplitude=0,
+                                          alpha_amplitude=50)
+        _, data = generator.generate(250 * 20)
+
+        spectrum = np.abs(np.fft.rfft(data, axis=1)).mean(axis=0)
+        freqs = np.fft.rfftfreq(data.shape[1], 1 / 250)
+        peak = freqs[np.argmax(spectrum[freqs > 2]) + np.sum(freqs <= 2)]
+        assert 8 <= peak <= 12
+
+    def test_rail_events(self):
+        """Rail events saturate a channel at the Cyton full-scale value."""
+        generator = SyntheticEEGGenerator(channel_count=8, sampling_rate=250, seed=3, rail_rate=1.0)
+        _, data = generator.generate(250 * 10)
+
+        assert np.any(np.abs(data) == RAIL_UV)
+
+    def test_high_rate_generation_is_fast(self):
+        """One second of 256 channels at 16 kHz is generated well under real time."""
+        generator = SyntheticEEGGenerator(channel_count=256, sampling_rate=16000, seed=4)
+
+        started = time.perf_counter()
+        for _ in range(10):
+            generator.generate(1600)
+        elapsed = time.perf_counter() - started
+
+        assert elapsed < 1.0
+
+
+class TestGeneratorBoard:
+    """Test suite for the BoardShim-like generator wrapper."""
+
+    def test_board_data_layout(self):
+        """Board data rows are package number, EEG channels and timestamp."""
+        board = GeneratorBoard(SyntheticEEGGenerator(channel_count=4, sampling_rate=1000, seed=5))
+        board.prepare_session()
+        board.start_stream()
+        time.sleep(0.05)
+
+        data = board.get_board_data()
+
+        assert data.shape[0] == 6
+        assert data.shape[1] > 0
+        np.testing.assert_array_equal(data[0], np.arange(data.shape[1]) % PACKAGE_MODULO)
+        assert board.get_board_data_count() < data.shape[1]
+
+    def test_buffer_is_bounded(self):
+        """The oldest samples are dropped once the buffer is full."""
+        board = GeneratorBoard(SyntheticEEGGenerator(channel_count=2, sampling_rate=16000, seed=6),
+                               buffer_size=100)
+        board.prepare_session()
+        board.start_stream()
+        time.sleep(0.05)
+
+        assert board.get_board_data_count() == 100
+
+    def test_start_stream_requires_session(self):
+        """Streaming before prepare_session fails like BrainFlow does."""
+        board = GeneratorBoard(SyntheticEEGGenerator())
+
+        with pytest.raises(RuntimeError):
+            board.start_stream()
@@ -0,0 +1,175 @@
+"""
+Tests for the sample clock model and timestamp regularization.
+"""
+import pytest
+import sys
+import os
+import numpy as np
+
+# Add the python directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'python'))
+
+# Import the module under test
+import timebase
+
+RATE = 250.0
+START = 1700000000.0
+
+
+class TestDroppedSamples:
+    """Tests for finding dropped samples."""
+
+    def test_package_numbers(self):
+        """Counter steps larger than one are drops, across the counter wrap."""
+        packages = np.array([253, 254, 255, 0, 3, 4, 10]) % 256
+        missing = timebase.dropped_samples(packages)
+        assert list(missing) == [0, 0, 0, 0, 2, 0, 5]
+
+    def test_daisy_counter_steps_by_two(self):
+        """With a step of two, only skipped steps count as drops."""
+        packages = np.array([0, 2, 4, 8, 10])
+        assert timebase.package_step(packages) == 2
+        assert list(timebase.dropped_samples(packages, step=2)) == [0, 0, 0, 1, 0]
+
+    def test_timestamps_only(self):
+        """Without package numbers, long timestamp steps are gaps."""
+        timestamps = START + np.r_[0:10, 15:20] / RATE
+        missing = timebase.dropped_samples(timestamps=timestamps, sampling_rate=RATE)
+        assert missing.sum() == 5
+        assert missing[10] == 5
+
+    def test_previous_block_continues(self):
+        """A drop between two blocks is found from the previous block's last sample."""
+        missing = timebase.dropped_samples(np.array([7, 8]), previous_package=4)
+        assert list(missing) == [2, 0]
+
+
+def host_batches(samples, batch=60, rate=125.0, dropped=(), late=()):
+    """Arrival timestamps of samples read in batches, as a host stamps them.
+
+    Every batch is stamped when it arrives, its samples microseconds apart.
+    `dropped` sample numbers are left out; batches in `late` arrive 20 ms late.
+    """
+    numbers = np.setdiff1d(np.arange(samples), dropped)
+    batches = numbers // batch
+    arrival = START + (batches + 1) * batch / rate + np.isin(batches, late) * 0.02
+    return arrival + (numbers % batch) * 1e-5
+
+
+def find_gaps(timestamps, rate, block):
+    """Gaps a TimestampGapFinder reports when fed `block` timestamps at a time."""
+    finder = timebase.TimestampGapFinder(rate)
+    tracker = timebase.ClockTracker(rate)
+    for start in range(0, len(timestamps), block):
+        settled, missing = finder.update(timestamps[start:start + block])
+        tracker.update(settled, missing=missing)
+    settled, missing = finder.finish()
+    tracker.update(settled, missing=missing)
+    assert tracker.rows == len(timestamps)
+    return tracker.gaps
+
+
+class TestTimestampGapFinder:
+    """Tests for finding drops in recordings without package numbers."""
+
+    def test_batches_are_not_gaps(self):
+        """The steps between host batches are no gaps, however the blocks split them."""
+        timestamps = host_batches(600)
+        for block in (37, 60, 700):
+            assert find_gaps(timestamps, 125.0, block) == []
+
+    def test_dropped_samples_in_batches(self):
+        """Drops show as the batches after them arriving ahead of their samples."""
+        timestamps = host_batches(1200, dropped=np.r_[120:180, 400:410])
+        for block in (50, 1200):
+            # Ten samples missing from a batch are placed at the start of the next one
+            assert find_gaps(timestamps, 125.0, block) == [(120, 60), (350, 10)]
+
+    def test_late_batch_is_not_a_gap(self):
+        """A batch that arrives late, followed by one on time, drops nothing."""
+        assert find_gaps(host_batches(1200, late=[5]), 125.0, 100) == []
+
+    def test_one_timestamp_per_sample(self):
+        """With regular timestamps every sample is its own batch."""
+        timestamps = START + np.r_[0:500, 520:1000] / RATE
+        assert find_gaps(timestamps, RATE, 64) == [(500, 20)]
+
+
+class TestClockTracker:
+    """Tests for the incremental clock fit."""
+
+    def test_incremental_fit_matches_whole_fit(self):
+        """Fitting block by block gives the same clock as fitting everything at once."""
+        rng = np.random.default_rng(0)
+        timestamps = START + np.arange(10000) / 250.3 + rng.uniform(0, 0.02, 10000)
+        whole = timebase.ClockTracker()
+        whole.update(timestamps)
+        blocks = timebase.ClockTracker()
+        for start in range(0, 10000, 123):
+            blocks.update(timestamps[start:start + 123])
+        assert blocks.model().rate == pytest.approx(whole.model().rate, rel=1e-9)
+        assert blocks.model().t0 == pytest.approx(whole.model().t0, abs=1e-6)
+        assert whole.model().rate == pytest.approx(250.3, rel=1e-4)
+
+    def test_restart_counts_gap_from_time(self):
+        """After a restart the package counter starts over; the gap is measured in time."""
+        tracker = timebase.ClockTracker(RATE)
+        tracker.update(START + np.arange(100) / RATE, np.arange(100) % 256)
+        tracker.restart()
+        indices = tracker.update(START + np.arange(600, 700) / RATE, np.arange(100) % 256)
+        assert indices[0] == 600
+        assert tracker.gaps == [(100, 500)]
+
+    def test_skip_counts_gap_past_counter_wrap(self):
+        """Samples left out with skip() are counted exactly, though the package counter wrapped."""
+        tracker = timebase.ClockTracker(RATE)
+        tracker.update(START + np.arange(100) / RATE, np.arange(100) % 256)
+        tracker.skip(300)
+        indices = tracker.update(START + np.arange(400, 500) / RATE, np.arange(400, 500) % 256)
+        assert indices[0] == 400
+        assert tracker.gaps == [(100, 300)]
+
+    def test_index_and_time_round_trip(self):
+        """index_at gives back the index of a clock time."""
+        clock = timebase.ClockModel(START, RATE)
+        indices = np.arange(0, 100000, 777)
+        np.testing.assert_array_equal(timebase.index_at(clock, timebase.time_at(clock, indices)), indices)
+
+    def test_rows_and_samples(self):
+        """Rows and sample indices convert both ways around gaps."""
+        gaps = [(3, 2), (5, 1)]
+        assert list(timebase.rows_to_samples(np.arange(7), gaps)) == [0, 1, 2, 5, 6, 8, 9]
+        # Dropped samples 3, 4 and 7 map to the row after their gap
+        assert list(timebase.samples_to_rows(np.arange(10), gaps)) == [0, 1, 2, 3, 3, 3, 4, 5, 5, 6]
+
+
+class TestRegularize:
+    """Tests for putting samples on a regular clock."""
+
+    def test_fill_modes(self):
+        """Dropped samples are marked with NaN, held or interpolated."""
+        indices = np.array([0, 1, 2, 5, 6])
+        timestamps = START + indices / RATE
+        values = indices[:, None] * 2.0
+
+        marked = timebase.regularize(timestamps, values, indices, RATE, fill='nan')
+        np.testing.assert_array_equal(np.isnan(marked.values[:, 0]), [0, 0, 0, 1, 1, 0, 0])
+        np.testing.assert_allclose(marked.timestamps, START + np.arange(7) / RATE)
+
+        held = timebase.regularize(timestamps, values, indices, RATE, fill='hold')
+        np.testing.assert_array_equal(held.values[:, 0], [0, 2, 4, 4, 4, 10, 12])
+
+        interpolated = timebase.regularize(timestamps, values, indices, RATE, fill='interpolate')
+        np.testing.assert_allclose(interpolated.values[:, 0], np.arange(7) * 2.0)
+
+    def test_without_fill_keeps_rows(self):
+        """Without a fill mode the rows stay as they are, with clock times."""
+        timestamps = START + np.arange(20) / RATE + np.tile([0.004, 0.0], 10)
+        result = timebase.regularize(timestamps, np.zeros((20, 1)), np.arange(20))
+        assert list(result.indices) == list(range(20))
+        assert np.allclose(np.diff(result.timestamps), 1 / result.clock.rate, atol=1e-6)
+
+    def test_unknown_fill_mode(self):
+        """Unknown fill modes are rejected."""
+        with pytest.raises(ValueError):
+            timebase.regularize(np.arange(3.0), np.zeros((3, 1)), fill='zero')
@@ -28,6 +28,7 @@ jest.mock('../../../services/openBCIService', () => ({
   startRecording: jest.fn(),
   stopRecording: jest.fn(),
   scanPorts: jest.fn(),
+  getLatencySummary: jest.fn(() => ({})),
   serialPort: null,
   isConnected: false
 }));
@@ -553,6 +554,20 @@ describe('OpenBCI Controller', () => {
       expect(openBCIService.checkConnection).toHaveBeenCalled();
     });
 
+    it('should include the stream latency summary', async () => {
+      const latency = {
+        'emit->node': { count: 120, mean_ms: 2.1, p50_ms: 1.8, p95_ms: 4.2, p99_ms: 6.5, max_ms: 9.0 }
+      };
+      openBCIService.checkConnection.mockResolvedValue({ connected: true, message: 'Connected to COM3' });
+      openBCIService.getLatencySummary.mockReturnValueOnce(latency);
+
+      const response = await request(app)
+        .get('/openbci/status')
+        .expect(200);
+
+      expect(response.body.latency).toEqual(latency);
+    });
+
     it('should handle status check errors', async () => {
       openBCIService.checkConnection.mockRejectedValue(new Error('Status check failed'));
 
@@ -707,7 +722,6 @@ describe('OpenBCI Controller', () => {
       expect(response.body.recordingId).toBeDefined();
       expect(openBCIService.stopRecording).toHaveBeenCalledWith(
         testExperiment._id.toString(),
-        10,
         'Test Experiment'
       );
 
@@ -722,6 +736,33 @@ describe('OpenBCI Controller', () => {
       expect(savedRecording.filePath).toBe('/path/to/recording.csv');
     });
 
+    it('should save the recording summary with the recording', async () => {
+      const summary = {
+        samples: 2500,
+        duration_s: 10,
+        gaps: 0,
+        channel_stats: [{ channel: 1, rms_uv: 12.5, rail_pct: 0 }]
+      };
+      openBCIService.stopRecording.mockResolvedValue({
+        status: 'success',
+        sampling_rate: 250,
+        channels: 1,
+        samples: 2500,
+        file_path: '/path/to/recording.csv',
+        summary_file: '/path/to/recording.csv.summary.json',
+        summary
+      });
+
+      const response = await request(app)
+        .post('/openbci/stop-recording')
+        .send({ experimentId: testExperiment._id.toString(), duration: 10 })
+        .expect(200);
+
+      const savedRecording = await EEGRecording.findById(response.body.recordingId);
+      expect(savedRecording.summaryPath).toBe('/path/to/recording.csv.summary.json');
+      expect(savedRecording.summary.channel_stats[0].rms_uv).toBe(12.5);
+    });
+
     it('should require experiment ID', async () => {
       const response = await request(app)
         .post('/openbci/stop-recording')
@@ -751,7 +792,6 @@ describe('OpenBCI Controller', () => {
 
       expect(openBCIService.stopRecording).toHaveBeenCalledWith(
         testExperiment._id.toString(),
-        5, // default duration
         '' // default experiment name
       );
 
@@ -0,0 +1,46 @@
+const { LatencyProbe, LatencyHistogram } = require('../../../services/latencyProbe');
+
+describe('Latency Probe', () => {
+  describe('LatencyHistogram', () => {
+    it('should report percentiles within bucket resolution', () => {
+      const histogram = new LatencyHistogram();
+      for (let i = 1; i <= 1000; i++) {
+        histogram.record(i / 10);
+      }
+
+      const summary = histogram.summary();
+
+      expect(summary.count).toBe(1000);
+      expect(summary.p50_ms).toBeGreaterThanOrEqual(50);
+      expect(summary.p50_ms).toBeLessThan(50 * 1.13);
+      expect(summary.p99_ms).toBeLessThanOrEqual(100);
+      expect(summary.max_ms).toBe(100);
+    });
+
+    it('should return only a count when empty', () => {
+      expect(new LatencyHistogram().summary()).toEqual({ count: 0 });
+    });
+  });
+
+  describe('probePacket', () => {
+    it('should record emit and board hops from packet timestamps', () => {
+      const probe = new LatencyProbe();
+      const packet = { emit_time: 1000.000, board_timestamp: 999.990, channels: [1, 2] };
+
+      probe.probePacket(packet, 1000005);
+
+      const summary = probe.summary();
+      expect(summary['emit->node'].count).toBe(1);
+      expect(summary['emit->node'].max_ms).toBeCloseTo(5, 3);
+      expect(summary['board->node'].max_ms).toBeCloseTo(15, 3);
+    });
+
+    it('should ignore packets without timing fields', () => {
+      const probe = new LatencyProbe();
+
+      probe.probePacket({ channels: [1, 2] });
+
+      expect(probe.summary()).toEqual({});
+    });
+  });
+});